@@ -1,15 +1,18 @@
 # Ensure that the following packages are installed before running this script:
 # sklearn
-# funcy
-# shutil
 
-import os
+import argparse
+import errno
 import json
-import funcy
+import os
 import shutil
+import warnings
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
 from sklearn.model_selection import train_test_split
 
-# User configs:
+# User configs (defaults of the command line arguments):
 seed = 2022
 train_ratio = 0.7
 val_ratio = 0.2
@@ -19,60 +22,135 @@ ann_file_path = "./data/sp_ppe/all_ann.json"
 image_path = "./data/sp_ppe/raw_img"
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Split a COCO annotation file and its images into train, val and test sets')
+    parser.add_argument('--ann-file', default=ann_file_path, help='COCO annotation file to split')
+    parser.add_argument('--img-dir', default=image_path, help='directory of the images')
+    parser.add_argument('--out-dir', default=data_root_dir, help='directory to write the splits to')
+    parser.add_argument('--val-ratio', type=float, default=val_ratio)
+    parser.add_argument('--test-ratio', type=float, default=test_ratio)
+    parser.add_argument('--seed', type=int, default=seed)
+    parser.add_argument(
+        '--stratify', action='store_true',
+        help='keep the category_id distribution similar across the splits')
+    parser.add_argument(
+        '--mode', choices=['copy', 'hardlink', 'symlink'], default='hardlink',
+        help='how to place the images in the split directories, hard links '
+        'fall back to copies across file systems')
+    parser.add_argument('--workers', type=int, default=min(32, (os.cpu_count() or 1) * 4),
+                        help='number of threads used to place the images')
+    return parser.parse_args()
+
+
 def save_coco(file, images, annotations, categories):
+    """Write a COCO file one record at a time instead of building the whole
+    json string in memory."""
     with open(file, 'wt', encoding='UTF-8') as coco:
-        json.dump({'images': images, 'annotations': annotations, 'categories': categories}, coco, indent=2, sort_keys=True)
+        coco.write('{')
+        for i, (key, records) in enumerate(
+                [('annotations', annotations), ('categories', categories), ('images', images)]):
+            coco.write(f'{"," if i else ""}\n"{key}": [')
+            for j, record in enumerate(records):
+                coco.write(',\n' if j else '\n')
+                coco.write(json.dumps(record, sort_keys=True))
+            coco.write('\n]')
+        coco.write('\n}\n')
+
+
+def index_annotations(annotations):
+    """Group annotations by image id in a single pass."""
+    img_to_anns = defaultdict(list)
+    for ann in annotations:
+        img_to_anns[int(ann['image_id'])].append(ann)
+    return img_to_anns
+
+
+def filter_annotations(img_to_anns, images):
+    return [ann for img in images for ann in img_to_anns.get(int(img['id']), [])]
+
+
+def stratify_labels(images, img_to_anns, cat_counts):
+    """Label each image by its rarest category_id, so that rare classes are
+    spread over all the splits. Labels with too few images to be split are
+    merged into one group, which is folded into the most common label if it
+    is still too small."""
+    labels = []
+    for img in images:
+        cat_ids = {ann['category_id'] for ann in img_to_anns.get(int(img['id']), [])}
+        labels.append(min(cat_ids, key=lambda c: (cat_counts[c], c)) if cat_ids else -1)
+    label_counts = Counter(labels)
+    labels = [label if label_counts[label] >= 3 else -2 for label in labels]
+    label_counts = Counter(labels)
+    if 0 < label_counts[-2] < 3 and len(label_counts) > 1:
+        most_common = next(label for label, _ in label_counts.most_common() if label != -2)
+        labels = [most_common if label == -2 else label for label in labels]
+    return labels
+
+
+def split(images, test_size, seed, img_to_anns=None, cat_counts=None):
+    if img_to_anns is not None:
+        stratify = stratify_labels(images, img_to_anns, cat_counts)
+        try:
+            return train_test_split(images, test_size=test_size, random_state=seed, stratify=stratify)
+        except ValueError as e:
+            # e.g. fewer test images than labels
+            warnings.warn(f'Can not stratify the split ({e}), split randomly instead')
+    return train_test_split(images, test_size=test_size, random_state=seed)
+
+
+def place_file(src, dst, mode):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if mode == 'symlink':
+        os.symlink(os.path.abspath(src), dst)
+    elif mode == 'hardlink':
+        try:
+            os.link(src, dst)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            shutil.copyfile(src, dst)
+    else:
+        shutil.copyfile(src, dst)
+
+
+def place_images(images, src_dir, dst_dir, mode, workers):
+    os.makedirs(dst_dir, exist_ok=True)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # consume the iterator to surface errors raised in the workers
+        list(pool.map(
+            lambda img: place_file(os.path.join(src_dir, img['file_name']),
+                                   os.path.join(dst_dir, img['file_name']), mode),
+            images))
 
-def filter_annotations(annotations, images):
-    image_ids = funcy.lmap(lambda i: int(i['id']), images)
-    return funcy.lfilter(lambda a: int(a['image_id']) in image_ids, annotations)
 
 def main():
-    with open(os.path.join(ann_file_path), 'rt', encoding='UTF-8') as annotations:
+    args = parse_args()
+    with open(args.ann_file, 'rt', encoding='UTF-8') as annotations:
         coco = json.load(annotations)
-        images = coco['images']
-        annotations = coco['annotations']
-        categories = coco['categories']
-
-        # x: train, y: test z: val
-        xz, y = train_test_split(images, test_size=test_ratio, random_state=seed)
-
-        ratio_remaining = 1 - test_ratio
-        val_ratio_adjusted = val_ratio / ratio_remaining
-
-        x, z = train_test_split(xz, test_size=val_ratio_adjusted, random_state=seed)
-        
-        train_path = os.path.join(data_root_dir, 'train')
-        train_image_path = os.path.join(train_path, 'images')
-        val_path = os.path.join(data_root_dir, 'val')
-        val_image_path = os.path.join(val_path, 'images')
-        test_path = os.path.join(data_root_dir, 'test')
-        test_image_path = os.path.join(test_path, 'images')
-
-        for pp in [train_path, val_path, test_path]:
-            if not os.path.exists(pp):
-                os.mkdir(pp)
-            if not os.path.exists(os.path.join(pp, 'images')):
-                os.mkdir(os.path.join(pp, 'images'))
-        
-        for train_image in x:
-            fname = train_image['file_name']
-            shutil.copyfile(os.path.join(image_path, fname), os.path.join(train_image_path, fname))
-        print(f'Completed {len(x)} train images')
-        for test_image in y:
-            fname = test_image['file_name']
-            shutil.copyfile(os.path.join(image_path, fname), os.path.join(test_image_path, fname))
-        print(f'Completed {len(y)} test images')
-        for val_image in z:
-            fname = val_image['file_name']
-            shutil.copyfile(os.path.join(image_path, fname), os.path.join(val_image_path, fname))
-        print(f'Completed {len(z)} val images')
-
-        save_coco(os.path.join(train_path, "train.json"), x, filter_annotations(annotations, x), categories)
-        save_coco(os.path.join(test_path, "test.json"), y, filter_annotations(annotations, y), categories)
-        save_coco(os.path.join(val_path, "val.json"), z, filter_annotations(annotations, z), categories)
-
-        print("Saved {} entries in {}, {} in {}, and {} in {}".format(len(x), train_path, len(y), test_path, len(z), val_path))
+    images = coco['images']
+    annotations = coco['annotations']
+    categories = coco['categories']
+    img_to_anns = index_annotations(annotations)
+    cat_counts = Counter(ann['category_id'] for ann in annotations)
+    stratify_index = (img_to_anns, cat_counts) if args.stratify else (None, None)
+
+    # x: train, y: test z: val
+    xz, y = split(images, args.test_ratio, args.seed, *stratify_index)
+
+    ratio_remaining = 1 - args.test_ratio
+    val_ratio_adjusted = args.val_ratio / ratio_remaining
+
+    x, z = split(xz, val_ratio_adjusted, args.seed, *stratify_index)
+
+    for name, subset in [('train', x), ('test', y), ('val', z)]:
+        split_path = os.path.join(args.out_dir, name)
+        place_images(subset, args.img_dir, os.path.join(split_path, 'images'), args.mode, args.workers)
+        save_coco(os.path.join(split_path, f"{name}.json"), subset,
+                  filter_annotations(img_to_anns, subset), categories)
+        print(f'Completed {len(subset)} {name} images in {split_path}')
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -16,7 +16,10 @@ model = dict(
         num_csp_blocks=3),
     bbox_head=dict(
         type='YOLOXHead', num_classes=8, in_channels=256, feat_channels=256),
-    train_cfg=dict(assigner=dict(type='SimOTAAssigner', center_radius=2.5)),
+    train_cfg=dict(
+        assigner=dict(type='SimOTAAssigner', center_radius=2.5),
+        # assign the gts of all the images in a batch at once
+        batched_assign=True),
     # In order to align the source code, the threshold of the val phase is
     # 0.01, and the threshold of the test phase is 0.001.
     test_cfg=dict(score_thr=0.01, nms=dict(type='nms', iou_threshold=0.65)))
@@ -27,7 +30,7 @@ dataset_type = 'SPPPECocoDataset'
 classes = ("no_ppe", "all_ppe", "helmet", "mask", "vest", "mask_vest", "helmet_mask", "helmet_vest")
 
 train_pipeline = [
-    dict(type='Mosaic', img_scale=img_scale, pad_val=114.0),
+    dict(type='Mosaic', img_scale=img_scale, pad_val=114.0, fast=True),
     dict(
         type='RandomAffine',
         scaling_ratio_range=(0.1, 2),
@@ -36,7 +39,8 @@ train_pipeline = [
         type='MixUp',
         img_scale=img_scale,
         ratio_range=(0.8, 1.6),
-        pad_val=114.0),
+        pad_val=114.0,
+        fast=True),
     dict(type='YOLOXHSVRandomAug'),
     dict(type='RandomFlip', flip_ratio=0.5),
     # According to the official implementation, multi-scale
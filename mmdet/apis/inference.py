@@ -1,4 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import copy
+import time
 import warnings
 from pathlib import Path
 
@@ -90,36 +92,59 @@ class LoadImage:
         return results
 
 
-def inference_detector(model, imgs):
-    """Inference image(s) with the detector.
+def _get_test_pipeline(model, from_ndarray):
+    """Get the prepared test pipeline of a detector, building it if needed.
+
+    The pipeline derived from ``model.cfg.data.test.pipeline`` (with the
+    loading step switched to ``LoadImageFromWebcam`` for ndarray inputs and
+    ``ImageToTensor`` replaced by ``DefaultFormatBundle``) is cached on the
+    model, so that consecutive calls do not copy the config and rebuild the
+    transforms. The cache is invalidated when ``model.cfg`` is replaced or
+    its test pipeline is modified.
 
     Args:
         model (nn.Module): The loaded detector.
-        imgs (str/ndarray or list[str/ndarray] or tuple[str/ndarray]):
-           Either image files or loaded images.
+        from_ndarray (bool): Whether the inputs are loaded images.
 
     Returns:
-        If imgs is a list or tuple, the same length list type results
-        will be returned, otherwise return the detection results directly.
+        :obj:`Compose`: The test pipeline.
     """
-
-    if isinstance(imgs, (list, tuple)):
-        is_batch = True
-    else:
-        imgs = [imgs]
-        is_batch = False
-
     cfg = model.cfg
-    device = next(model.parameters()).device  # model device
+    fingerprint = (id(cfg), repr(cfg.data.test.pipeline))
+    cache = getattr(model, '_test_pipeline_cache', None)
+    if cache is None or cache['fingerprint'] != fingerprint:
+        cache = dict(fingerprint=fingerprint, pipelines=dict())
+        model._test_pipeline_cache = cache
+    if from_ndarray not in cache['pipelines']:
+        pipeline = copy.deepcopy(cfg.data.test.pipeline)
+        if from_ndarray:
+            # set loading pipeline type
+            pipeline[0].type = 'LoadImageFromWebcam'
+        pipeline = replace_ImageToTensor(pipeline)
+        cache['pipelines'][from_ndarray] = Compose(pipeline)
+    return cache['pipelines'][from_ndarray]
+
+
+def _prepare_data(model, imgs):
+    """Run the cached test pipeline and collate ``imgs`` for the detector.
+
+    The time spent in each stage is recorded in ``model.inference_timings``
+    (in seconds), which is reset on every call.
 
-    if isinstance(imgs[0], np.ndarray):
-        cfg = cfg.copy()
-        # set loading pipeline type
-        cfg.data.test.pipeline[0].type = 'LoadImageFromWebcam'
+    Args:
+        model (nn.Module): The loaded detector.
+        imgs (list[str/ndarray]): Either image files or loaded images.
 
-    cfg.data.test.pipeline = replace_ImageToTensor(cfg.data.test.pipeline)
-    test_pipeline = Compose(cfg.data.test.pipeline)
+    Returns:
+        dict: The collated data, scattered to the device of the model.
+    """
+    timings = dict()
+    model.inference_timings = timings
+    tic = time.perf_counter()
+    test_pipeline = _get_test_pipeline(model, isinstance(imgs[0], np.ndarray))
+    timings['build_pipeline'] = time.perf_counter() - tic
 
+    tic = time.perf_counter()
     datas = []
     for img in imgs:
         # prepare data
@@ -132,23 +157,57 @@ def inference_detector(model, imgs):
         # build the data pipeline
         data = test_pipeline(data)
         datas.append(data)
+    timings['pipeline'] = time.perf_counter() - tic
 
+    tic = time.perf_counter()
     data = collate(datas, samples_per_gpu=len(imgs))
     # just get the actual data from DataContainer
     data['img_metas'] = [img_metas.data[0] for img_metas in data['img_metas']]
     data['img'] = [img.data[0] for img in data['img']]
-    if next(model.parameters()).is_cuda:
+    # deployed models, e.g. ONNXRuntimeDetector, may have no parameters
+    param = next(model.parameters(), None)
+    if param is not None and param.is_cuda:
         # scatter to specified GPU
-        data = scatter(data, [device])[0]
+        data = scatter(data, [param.device])[0]
+    else:
+        has_roi_pool = getattr(model, '_has_roi_pool', None)
+        if has_roi_pool is None:
+            has_roi_pool = any(isinstance(m, RoIPool) for m in model.modules())
+            model._has_roi_pool = has_roi_pool
+        assert not has_roi_pool, \
+            'CPU inference with RoIPool is not supported currently.'
+    timings['collate'] = time.perf_counter() - tic
+    return data
+
+
+def inference_detector(model, imgs):
+    """Inference image(s) with the detector.
+
+    Args:
+        model (nn.Module): The loaded detector.
+        imgs (str/ndarray or list[str/ndarray] or tuple[str/ndarray]):
+           Either image files or loaded images.
+
+    Returns:
+        If imgs is a list or tuple, the same length list type results
+        will be returned, otherwise return the detection results directly.
+        The time spent in each stage of the call is recorded in
+        ``model.inference_timings``.
+    """
+
+    if isinstance(imgs, (list, tuple)):
+        is_batch = True
     else:
-        for m in model.modules():
-            assert not isinstance(
-                m, RoIPool
-            ), 'CPU inference with RoIPool is not supported currently.'
+        imgs = [imgs]
+        is_batch = False
+
+    data = _prepare_data(model, imgs)
 
     # forward the model
+    tic = time.perf_counter()
     with torch.no_grad():
         results = model(return_loss=False, rescale=True, **data)
+    model.inference_timings['forward'] = time.perf_counter() - tic
 
     if not is_batch:
         return results[0]
@@ -169,42 +228,7 @@ async def async_inference_detector(model, imgs):
     if not isinstance(imgs, (list, tuple)):
         imgs = [imgs]
 
-    cfg = model.cfg
-    device = next(model.parameters()).device  # model device
-
-    if isinstance(imgs[0], np.ndarray):
-        cfg = cfg.copy()
-        # set loading pipeline type
-        cfg.data.test.pipeline[0].type = 'LoadImageFromWebcam'
-
-    cfg.data.test.pipeline = replace_ImageToTensor(cfg.data.test.pipeline)
-    test_pipeline = Compose(cfg.data.test.pipeline)
-
-    datas = []
-    for img in imgs:
-        # prepare data
-        if isinstance(img, np.ndarray):
-            # directly add img
-            data = dict(img=img)
-        else:
-            # add information into dict
-            data = dict(img_info=dict(filename=img), img_prefix=None)
-        # build the data pipeline
-        data = test_pipeline(data)
-        datas.append(data)
-
-    data = collate(datas, samples_per_gpu=len(imgs))
-    # just get the actual data from DataContainer
-    data['img_metas'] = [img_metas.data[0] for img_metas in data['img_metas']]
-    data['img'] = [img.data[0] for img in data['img']]
-    if next(model.parameters()).is_cuda:
-        # scatter to specified GPU
-        data = scatter(data, [device])[0]
-    else:
-        for m in model.modules():
-            assert not isinstance(
-                m, RoIPool
-            ), 'CPU inference with RoIPool is not supported currently.'
+    data = _prepare_data(model, imgs)
 
     # We don't restore `torch.is_grad_enabled()` value during concurrent
     # inference since execution can overlap
@@ -6,24 +6,69 @@ import tempfile
 import time
 
 import mmcv
+import numpy as np
 import torch
 import torch.distributed as dist
 from mmcv.image import tensor2imgs
 from mmcv.runner import get_dist_info
 
-from mmdet.core import encode_mask_results
+from mmdet.core import DetResults, encode_mask_results
+from mmdet.core.utils.dist_utils import _get_global_gloo_group
+
+
+def _encode_mask_results(result):
+    """Encode the mask results of a batch to save memory."""
+    if isinstance(result[0], tuple):
+        result = [(bbox_results, encode_mask_results(mask_results))
+                  for bbox_results, mask_results in result]
+    # This logic is only used in panoptic segmentation test.
+    elif isinstance(result[0], dict) and 'ins_results' in result[0]:
+        for j in range(len(result)):
+            bbox_results, mask_results = result[j]['ins_results']
+            result[j]['ins_results'] = (bbox_results,
+                                        encode_mask_results(mask_results))
+    return result
 
 
 def single_gpu_test(model,
                     data_loader,
                     show=False,
                     out_dir=None,
-                    show_score_thr=0.3):
+                    show_score_thr=0.3,
+                    flat_results=False,
+                    result_writer=None,
+                    evaluator=None):
+    """Test model with a single gpu.
+
+    Args:
+        model (nn.Module): Model to be tested.
+        data_loader (nn.Dataloader): Pytorch data loader.
+        show (bool): Whether to show the results. Default: False.
+        out_dir (str, optional): Directory to save the painted images.
+            Default: None.
+        show_score_thr (float): Score threshold of the shown bboxes.
+            Default: 0.3.
+        flat_results (bool): Whether to collect the bbox results into a
+            :obj:`DetResults` instead of a list. Default: False.
+        result_writer (object, optional): If given, e.g. the
+            :obj:`COCOResultWriter` of the dataset, the results of each batch
+            are written to it by ``result_writer.write(results)`` while
+            testing instead of collected. Default: None.
+        evaluator (:obj:`OnlineEvaluator`, optional): If given, the results
+            of each batch are evaluated by it while testing instead of
+            collected, and the metrics are computed by
+            ``evaluator.evaluate()``. Default: None.
+
+    Returns:
+        list | :obj:`DetResults`: The prediction results, which are empty if
+            ``result_writer`` or ``evaluator`` is given.
+    """
     model.eval()
     results = []
     dataset = data_loader.dataset
     PALETTE = getattr(dataset, 'PALETTE', None)
     prog_bar = mmcv.ProgressBar(len(dataset))
+    num_tested = 0
     for i, data in enumerate(data_loader):
         with torch.no_grad():
             result = model(return_loss=False, rescale=True, **data)
@@ -60,32 +105,46 @@ def single_gpu_test(model,
                     out_file=out_file,
                     score_thr=show_score_thr)
 
-        # encode mask results
-        if isinstance(result[0], tuple):
-            result = [(bbox_results, encode_mask_results(mask_results))
-                      for bbox_results, mask_results in result]
-        # This logic is only used in panoptic segmentation test.
-        elif isinstance(result[0], dict) and 'ins_results' in result[0]:
-            for j in range(len(result)):
-                bbox_results, mask_results = result[j]['ins_results']
-                result[j]['ins_results'] = (bbox_results,
-                                            encode_mask_results(mask_results))
-
-        results.extend(result)
+        if flat_results:
+            result = DetResults.from_bbox_results(result)
+        else:
+            result = _encode_mask_results(result)
+        if result_writer is not None:
+            result_writer.write(result)
+        if evaluator is not None:
+            evaluator.process(result, range(num_tested,
+                                            num_tested + batch_size))
+        if result_writer is None and evaluator is None:
+            if flat_results:
+                results.append(result)
+            else:
+                results.extend(result)
+        num_tested += batch_size
 
         for _ in range(batch_size):
             prog_bar.update()
+    if flat_results and results:
+        results = DetResults.concat(results)
     return results
 
 
-def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
+def multi_gpu_test(model,
+                   data_loader,
+                   tmpdir=None,
+                   gpu_collect=False,
+                   collect_backend=None,
+                   flat_results=False,
+                   evaluator=None):
     """Test model with multiple gpus.
 
     This method tests model with multiple gpus and collects the results
-    under two different modes: gpu and cpu modes. By setting 'gpu_collect=True'
-    it encodes results to gpu tensors and use gpu communication for results
-    collection. On cpu mode it saves the results on different gpus to 'tmpdir'
-    and collects them by the rank 0 worker.
+    under three different modes: gpu, cpu and columnar modes. By setting
+    'gpu_collect=True' it encodes results to gpu tensors and use gpu
+    communication for results collection. On cpu mode it saves the results on
+    different gpus to 'tmpdir' and collects them by the rank 0 worker. On
+    columnar mode the bbox results are packed into flat arrays and sent to
+    the rank 0 worker over a gloo process group, which also works on hosts
+    without gpus.
 
     Args:
         model (nn.Module): Model to be tested.
@@ -93,9 +152,19 @@ def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
         tmpdir (str): Path of directory to save the temporary results from
             different gpus under cpu mode.
         gpu_collect (bool): Option to use either gpu or cpu to collect results.
+        collect_backend (str, optional): One of 'cpu', 'gpu' and 'columnar'.
+            If specified, it overrides ``gpu_collect``. Default: None.
+        flat_results (bool): Whether to collect the bbox results into a
+            :obj:`DetResults` instead of a list. Default: False.
+        evaluator (:obj:`OnlineEvaluator`, optional): If given, the results
+            of each batch are evaluated by it while testing instead of
+            collected. The statistics of all the ranks are merged into the
+            evaluator of rank 0, whose ``evaluator.evaluate()`` computes the
+            metrics. Default: None.
 
     Returns:
-        list: The prediction results.
+        list | :obj:`DetResults`: The prediction results, which are empty if
+            ``evaluator`` is given.
     """
     model.eval()
     results = []
@@ -103,36 +172,85 @@ def multi_gpu_test(model, data_loader, tmpdir=None, gpu_collect=False):
     rank, world_size = get_dist_info()
     if rank == 0:
         prog_bar = mmcv.ProgressBar(len(dataset))
+    num_tested = 0
     time.sleep(2)  # This line can prevent deadlock problem in some cases.
     for i, data in enumerate(data_loader):
         with torch.no_grad():
             result = model(return_loss=False, rescale=True, **data)
-            # encode mask results
-            if isinstance(result[0], tuple):
-                result = [(bbox_results, encode_mask_results(mask_results))
-                          for bbox_results, mask_results in result]
-            # This logic is only used in panoptic segmentation test.
-            elif isinstance(result[0], dict) and 'ins_results' in result[0]:
-                for j in range(len(result)):
-                    bbox_results, mask_results = result[j]['ins_results']
-                    result[j]['ins_results'] = (
-                        bbox_results, encode_mask_results(mask_results))
-
-        results.extend(result)
+            if flat_results:
+                result = DetResults.from_bbox_results(result)
+            else:
+                result = _encode_mask_results(result)
+            if evaluator is not None:
+                # the i-th sample of rank r is the (i * world_size + r)-th
+                # sample, the dataloader may pad some samples at the end
+                inds = np.arange(num_tested, num_tested + len(result))
+                inds = inds * world_size + rank
+                num_valid = int(np.sum(inds < len(dataset)))
+                evaluator.process(result[:num_valid], inds[:num_valid])
+            elif flat_results:
+                results.append(result)
+            else:
+                results.extend(result)
 
+        batch_size = len(result)
+        num_tested += batch_size
         if rank == 0:
-            batch_size = len(result)
             for _ in range(batch_size * world_size):
                 prog_bar.update()
 
+    if collect_backend is None:
+        collect_backend = 'gpu' if gpu_collect else 'cpu'
+    if evaluator is not None:
+        # collect the statistics of the evaluators instead of the results
+        state = evaluator.get_state()
+        if collect_backend == 'gpu':
+            states = collect_results_gpu([state], world_size)
+        elif collect_backend == 'cpu':
+            states = collect_results_cpu([state], world_size, tmpdir)
+        else:
+            # the statistics are not bbox results, they are pickled and sent
+            # over the cpu process group used by the columnar backend
+            states = [None] * world_size if rank == 0 else None
+            dist.gather_object(
+                state, states, dst=0, group=_get_global_gloo_group())
+        if rank == 0:
+            evaluator.merge(states)
+        return results
+
+    if flat_results:
+        results = DetResults.concat(results)
     # collect results from all ranks
-    if gpu_collect:
+    if collect_backend == 'gpu':
         results = collect_results_gpu(results, len(dataset))
-    else:
+    elif collect_backend == 'cpu':
         results = collect_results_cpu(results, len(dataset), tmpdir)
+    elif collect_backend == 'columnar':
+        results = collect_results_columnar(results, len(dataset))
+    else:
+        raise ValueError(f'Unsupported collect_backend {collect_backend}, '
+                         "expected one of 'cpu', 'gpu' and 'columnar'")
     return results
 
 
+def _merge_results(part_list, size):
+    """Merge the results of all the ranks in the order of the dataset."""
+    if all(isinstance(part, DetResults) for part in part_list):
+        # the i-th result of rank r is the (i * world_size + r)-th result
+        num_results = min(len(part) for part in part_list)
+        offsets = np.cumsum([0] + [len(part) for part in part_list[:-1]])
+        inds = (np.arange(num_results)[:, None] + offsets).ravel()
+        # the dataloader may pad some samples
+        return DetResults.concat(part_list).take(inds[:size])
+    # sort the results
+    ordered_results = []
+    for res in zip(*part_list):
+        ordered_results.extend(list(res))
+    # the dataloader may pad some samples
+    ordered_results = ordered_results[:size]
+    return ordered_results
+
+
 def collect_results_cpu(result_part, size, tmpdir=None):
     rank, world_size = get_dist_info()
     # create a tmp dir if it is not specified
@@ -165,12 +283,7 @@ def collect_results_cpu(result_part, size, tmpdir=None):
         for i in range(world_size):
             part_file = osp.join(tmpdir, f'part_{i}.pkl')
             part_list.append(mmcv.load(part_file))
-        # sort the results
-        ordered_results = []
-        for res in zip(*part_list):
-            ordered_results.extend(list(res))
-        # the dataloader may pad some samples
-        ordered_results = ordered_results[:size]
+        ordered_results = _merge_results(part_list, size)
         # remove tmp dir
         shutil.rmtree(tmpdir)
         return ordered_results
@@ -200,10 +313,179 @@ def collect_results_gpu(result_part, size):
         for recv, shape in zip(part_recv_list, shape_list):
             part_list.append(
                 pickle.loads(recv[:shape[0]].cpu().numpy().tobytes()))
-        # sort the results
-        ordered_results = []
-        for res in zip(*part_list):
-            ordered_results.extend(list(res))
-        # the dataloader may pad some samples
-        ordered_results = ordered_results[:size]
-        return ordered_results
+        return _merge_results(part_list, size)
+
+
+# layout of the header of a packed result part, see `encode_results_columnar`
+_HEADER_FIELDS = ('kind', 'num_imgs', 'num_classes', 'num_cols', 'num_boxes',
+                  'extra_len')
+_COLUMNAR, _PICKLED, _FLAT = 0, 1, 2
+
+
+def _is_bbox_results(bbox_results):
+    return all(
+        isinstance(result, list) and all(
+            isinstance(bboxes, np.ndarray) and bboxes.ndim == 2
+            and bboxes.dtype == np.float32 for bboxes in result)
+        for result in bbox_results)
+
+
+def encode_results_columnar(results):
+    """Pack a list of detection results into one flat byte array.
+
+    The per-class bbox arrays of all the images are concatenated into a
+    single ``(num_boxes, num_cols)`` float32 array, together with an int64
+    array holding the number of boxes of each (image, class). Encoded masks
+    are pickled as a side payload. Results of any other type are pickled as
+    a whole.
+
+    The arrays of :obj:`DetResults` are packed as they are.
+
+    Args:
+        results (list | :obj:`DetResults`): Results of images, each is
+            either a list of bbox arrays or a tuple of (bbox results, encoded
+            mask results).
+
+    Returns:
+        np.ndarray: The packed uint8 array.
+    """
+    if isinstance(results, DetResults):
+        header = (_FLAT, len(results), results.num_classes, 4,
+                  len(results.bboxes), -1)
+        header = np.array(header, dtype=np.int64)
+        return np.concatenate([
+            np.ascontiguousarray(array).view(np.uint8).ravel() for array in [
+                header, results.img_offsets, results.labels, results.bboxes,
+                results.scores
+            ]
+        ])
+
+    bbox_results, extra = results, None
+    if results and all(
+            isinstance(result, tuple) and len(result) == 2
+            for result in results):
+        bbox_results = [result[0] for result in results]
+        extra = [result[1] for result in results]
+
+    num_classes = {len(result) for result in bbox_results}
+    if (not results or len(num_classes) != 1
+            or not _is_bbox_results(bbox_results)):
+        payload = np.frombuffer(
+            pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL),
+            dtype=np.uint8)
+        header = np.array(
+            [_PICKLED, len(results), 0, 0, 0, payload.size], dtype=np.int64)
+        return np.concatenate([header.view(np.uint8), payload])
+
+    num_classes = num_classes.pop()
+    all_bboxes = [bboxes for result in bbox_results for bboxes in result]
+    num_cols = {bboxes.shape[1] for bboxes in all_bboxes}
+    assert len(num_cols) <= 1, 'bbox arrays have different numbers of columns'
+    num_cols = num_cols.pop() if num_cols else 5
+    counts = np.array([len(bboxes) for bboxes in all_bboxes], dtype=np.int64)
+    if all_bboxes:
+        bboxes = np.concatenate(all_bboxes)
+    else:
+        bboxes = np.zeros((0, num_cols), dtype=np.float32)
+    if extra is not None:
+        extra = np.frombuffer(
+            pickle.dumps(extra, protocol=pickle.HIGHEST_PROTOCOL),
+            dtype=np.uint8)
+    extra_len = -1 if extra is None else extra.size
+    header = (_COLUMNAR, len(results), num_classes, num_cols, len(bboxes),
+              extra_len)
+    header = np.array(header, dtype=np.int64)
+    parts = [
+        header.view(np.uint8),
+        counts.view(np.uint8),
+        bboxes.view(np.uint8).ravel()
+    ]
+    if extra is not None:
+        parts.append(extra)
+    return np.concatenate(parts)
+
+
+def decode_results_columnar(buffer):
+    """Unpack the results packed by :func:`encode_results_columnar`.
+
+    The bbox arrays of the returned results are views of ``buffer``.
+
+    Args:
+        buffer (np.ndarray): The packed uint8 array.
+
+    Returns:
+        list: The results of images.
+    """
+    header = dict(
+        zip(_HEADER_FIELDS,
+            np.frombuffer(buffer, np.int64, len(_HEADER_FIELDS)).tolist()))
+    offset = len(_HEADER_FIELDS) * 8
+    if header['kind'] == _PICKLED:
+        return pickle.loads(buffer[offset:offset + header['extra_len']])
+    if header['kind'] == _FLAT:
+        num_boxes = header['num_boxes']
+        arrays = []
+        for dtype, count in [(np.int64, header['num_imgs'] + 1),
+                             (np.int64, num_boxes),
+                             (np.float32, num_boxes * 4),
+                             (np.float32, num_boxes)]:
+            arrays.append(np.frombuffer(buffer, dtype, count, offset))
+            offset += arrays[-1].nbytes
+        img_offsets, labels, bboxes, scores = arrays
+        return DetResults(bboxes, scores, labels, img_offsets,
+                          header['num_classes'])
+
+    num_imgs, num_classes = header['num_imgs'], header['num_classes']
+    counts = np.frombuffer(buffer, np.int64, num_imgs * num_classes, offset)
+    offset += counts.nbytes
+    bboxes = np.frombuffer(buffer, np.float32,
+                           header['num_boxes'] * header['num_cols'],
+                           offset).reshape(-1, header['num_cols'])
+    offset += bboxes.nbytes
+    bboxes = np.split(bboxes, np.cumsum(counts)[:-1])
+    results = [
+        bboxes[i * num_classes:(i + 1) * num_classes] for i in range(num_imgs)
+    ]
+    if header['extra_len'] >= 0:
+        extra = pickle.loads(buffer[offset:offset + header['extra_len']])
+        results = list(zip(results, extra))
+    return results
+
+
+def collect_results_columnar(result_part, size, group=None):
+    """Collect results to the rank 0 worker without temporary files.
+
+    Each rank packs its results with :func:`encode_results_columnar` and sends
+    the packed array to rank 0 over a cpu (gloo) process group, where the
+    parts are decoded one by one. Compared with ``collect_results_cpu`` and
+    ``collect_results_gpu``, bbox results are never pickled and no gpu is
+    needed.
+
+    Args:
+        result_part (list): Results of the current rank.
+        size (int): Size of the dataset, used to drop the padded samples.
+        group (ProcessGroup, optional): A process group of a backend that
+            supports cpu tensors. Defaults to a gloo group of all the ranks.
+
+    Returns:
+        list | None: The ordered results on rank 0 and None on other ranks.
+    """
+    rank, world_size = get_dist_info()
+    if group is None:
+        group = _get_global_gloo_group()
+    part_tensor = torch.from_numpy(encode_results_columnar(result_part))
+    # gather the length of all the parts to allocate the receive buffers
+    len_tensor = torch.tensor([part_tensor.numel()], dtype=torch.long)
+    len_list = [torch.zeros_like(len_tensor) for _ in range(world_size)]
+    dist.all_gather(len_list, len_tensor, group=group)
+
+    if rank != 0:
+        dist.send(part_tensor, dst=0, group=group)
+        return None
+
+    part_list = [decode_results_columnar(part_tensor.numpy())]
+    for i in range(1, world_size):
+        recv = torch.empty(int(len_list[i]), dtype=torch.uint8)
+        dist.recv(recv, src=i, group=group)
+        part_list.append(decode_results_columnar(recv.numpy()))
+    return _merge_results(part_list, size)
@@ -7,6 +7,7 @@ import torch
 from torch.nn.modules.utils import _pair
 
 from .builder import PRIOR_GENERATORS
+from .prior_cache import cached_priors
 
 
 @PRIOR_GENERATORS.register_module()
@@ -213,8 +214,10 @@ class AnchorGenerator:
         else:
             return yy, xx
 
+    @cached_priors
     def grid_priors(self, featmap_sizes, dtype=torch.float32, device='cuda'):
-        """Generate grid anchors in multiple feature levels.
+        """Generate grid anchors in multiple feature levels, which are
+        cached by the shared :class:`PriorCache`.
 
         Args:
             featmap_sizes (list[tuple]): List of feature map sizes in
@@ -389,8 +392,10 @@ class AnchorGenerator:
         # then (0, 1), (0, 2), ...
         return all_anchors
 
+    @cached_priors
     def valid_flags(self, featmap_sizes, pad_shape, device='cuda'):
-        """Generate valid flags of anchors in multiple feature levels.
+        """Generate valid flags of anchors in multiple feature levels, which
+        are cached by the shared :class:`PriorCache`.
 
         Args:
             featmap_sizes (list(tuple)): List of feature map sizes in
@@ -4,6 +4,7 @@ import torch
 from torch.nn.modules.utils import _pair
 
 from .builder import PRIOR_GENERATORS
+from .prior_cache import cached_priors
 
 
 @PRIOR_GENERATORS.register_module()
@@ -77,12 +78,14 @@ class MlvlPointGenerator:
         else:
             return yy.reshape(-1), xx.reshape(-1)
 
+    @cached_priors
     def grid_priors(self,
                     featmap_sizes,
                     dtype=torch.float32,
                     device='cuda',
                     with_stride=False):
-        """Generate grid points of multiple feature levels.
+        """Generate grid points of multiple feature levels, which are cached
+        by the shared :class:`PriorCache`.
 
         Args:
             featmap_sizes (list[tuple]): List of feature map sizes in
@@ -174,8 +177,10 @@ class MlvlPointGenerator:
         all_points = shifts.to(device)
         return all_points
 
+    @cached_priors
     def valid_flags(self, featmap_sizes, pad_shape, device='cuda'):
-        """Generate valid flags of points of multiple feature levels.
+        """Generate valid flags of points of multiple feature levels, which
+        are cached by the shared :class:`PriorCache`.
 
         Args:
             featmap_sizes (list(tuple)): List of feature map sizes in
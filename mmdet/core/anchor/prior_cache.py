@@ -0,0 +1,146 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import functools
+import inspect
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+# unique ids of the prior generators, used in the keys of the cache instead
+# of ``id()`` which may be reused after a generator is garbage collected
+_generator_ids = itertools.count()
+
+
+class PriorCache:
+    """A bounded LRU cache of the priors and the valid flags generated by the
+    prior generators.
+
+    The results of :meth:`grid_priors` and :meth:`valid_flags` of
+    :class:`AnchorGenerator` and :class:`MlvlPointGenerator` only depend on
+    the generator and the feature map sizes, dtype, device and pad shape,
+    which repeat under fixed input sizes or the few sizes of multi-scale
+    training. They are cached in a cache shared by all the dense heads, see
+    :func:`get_prior_cache`, keyed by the generator, the method and its
+    arguments. The cached tensors are returned without being copied, so they
+    should not be modified in place, as the priors shared by the images of
+    a batch are not.
+
+    Args:
+        max_size (int): Max number of cached results, the least recently
+            used ones are evicted first. Nothing is cached if it is 0.
+            Default: 64.
+    """
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._cache)
+
+    def get(self, key, func):
+        """Get the cached result of ``key``, computed by ``func`` and cached
+        on a miss."""
+        with self._lock:
+            value = self._cache.get(key)
+            if value is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return value
+            self.misses += 1
+        value = func()
+        with self._lock:
+            self._cache[key] = value
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Clear the cached results and the counters."""
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Get the counters of the cache.
+
+        Returns:
+            dict: The number of "hits" and "misses", the "size" and the
+                "max_size" of the cache.
+        """
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            size=len(self._cache),
+            max_size=self.max_size)
+
+
+_prior_cache = PriorCache()
+
+
+def get_prior_cache():
+    """Get the :class:`PriorCache` shared by all the prior generators.
+
+    Example:
+        >>> cache = get_prior_cache()
+        >>> cache.stats()
+        {'hits': 0, 'misses': 0, 'size': 0, 'max_size': 64}
+        >>> cache.max_size = 0  # disable the cache
+    """
+    return _prior_cache
+
+
+def _to_key(value):
+    """Convert an argument to a hashable key, raise TypeError if it can not
+    be cached."""
+    if isinstance(value, torch.Tensor):
+        # e.g. the dynamic feature map sizes while exporting to ONNX
+        raise TypeError('tensors can not be cached')
+    if isinstance(value, (list, tuple)):
+        return tuple(_to_key(v) for v in value)
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    hash(value)
+    return value
+
+
+def cached_priors(func):
+    """Decorate a method of the prior generators to cache its results in
+    the shared :class:`PriorCache`.
+
+    The method should return a list of tensors, which only depends on the
+    generator and the arguments. The results are not cached while tracing,
+    e.g. exporting to ONNX.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        cache = _prior_cache
+        if cache.max_size <= 0 or torch.jit.is_tracing() or \
+                torch.onnx.is_in_onnx_export():
+            return func(self, *args, **kwargs)
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        try:
+            key = tuple(
+                _to_key(value) for name, value in bound.arguments.items()
+                if name != 'self')
+        except TypeError:
+            return func(self, *args, **kwargs)
+        generator_id = self.__dict__.get('_prior_cache_id')
+        if generator_id is None:
+            # set lazily as some generators do not call the ``__init__`` of
+            # their parents
+            generator_id = self._prior_cache_id = next(_generator_ids)
+        key = (generator_id, func.__name__) + key
+        # a new list so that the cached one is not modified by the callers
+        return list(cache.get(key, lambda: func(self, *args, **kwargs)))
+
+    return wrapper
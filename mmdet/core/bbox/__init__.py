@@ -4,6 +4,7 @@ from .assigners import (AssignResult, BaseAssigner, CenterRegionAssigner,
 from .builder import build_assigner, build_bbox_coder, build_sampler
 from .coder import (BaseBBoxCoder, DeltaXYWHBBoxCoder, DistancePointBBoxCoder,
                     PseudoBBoxCoder, TBLRBBoxCoder)
+from .det_results import DetResults, dump_results, load_results
 from .iou_calculators import BboxOverlaps2D, bbox_overlaps
 from .samplers import (BaseSampler, CombinedSampler,
                        InstanceBalancedPosSampler, IoUBalancedNegSampler,
@@ -11,8 +12,9 @@ from .samplers import (BaseSampler, CombinedSampler,
                        SamplingResult, ScoreHLRSampler)
 from .transforms import (bbox2distance, bbox2result, bbox2roi,
                          bbox_cxcywh_to_xyxy, bbox_flip, bbox_mapping,
-                         bbox_mapping_back, bbox_rescale, bbox_xyxy_to_cxcywh,
-                         distance2bbox, find_inside_bboxes, roi2bbox)
+                         bbox_mapping_back, bbox_rescale, bbox_result2array,
+                         bbox_xyxy_to_cxcywh, distance2bbox,
+                         find_inside_bboxes, roi2bbox)
 
 __all__ = [
     'bbox_overlaps', 'BboxOverlaps2D', 'BaseAssigner', 'MaxIoUAssigner',
@@ -24,5 +26,6 @@ __all__ = [
     'build_bbox_coder', 'BaseBBoxCoder', 'PseudoBBoxCoder',
     'DeltaXYWHBBoxCoder', 'TBLRBBoxCoder', 'DistancePointBBoxCoder',
     'CenterRegionAssigner', 'bbox_rescale', 'bbox_cxcywh_to_xyxy',
-    'bbox_xyxy_to_cxcywh', 'RegionAssigner', 'find_inside_bboxes'
+    'bbox_xyxy_to_cxcywh', 'RegionAssigner', 'find_inside_bboxes',
+    'bbox_result2array', 'DetResults', 'dump_results', 'load_results'
 ]
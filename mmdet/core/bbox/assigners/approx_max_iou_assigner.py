@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import torch
 
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from ..iou_calculators import build_iou_calculator
 from .max_iou_assigner import MaxIoUAssigner
@@ -57,6 +58,7 @@ class ApproxMaxIoUAssigner(MaxIoUAssigner):
         self.match_low_quality = match_low_quality
         self.iou_calculator = build_iou_calculator(iou_calculator)
 
+    @profiled('assigner')
     def assign(self,
                approxs,
                squares,
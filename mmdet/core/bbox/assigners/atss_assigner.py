@@ -3,6 +3,7 @@ import warnings
 
 import torch
 
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from ..iou_calculators import build_iou_calculator
 from .assign_result import AssignResult
@@ -49,6 +50,7 @@ class ATSSAssigner(BaseAssigner):
     """
 
     # https://github.com/sfzhang15/ATSS/blob/master/atss_core/modeling/rpn/atss/loss.py
+    @profiled('assigner')
     def assign(self,
                bboxes,
                num_level_bboxes,
@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import torch
 
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from ..iou_calculators import build_iou_calculator
 from .assign_result import AssignResult
@@ -123,6 +124,7 @@ class CenterRegionAssigner(BaseAssigner):
         sort_idx = sort_idx.argsort()
         return sort_idx
 
+    @profiled('assigner')
     def assign(self, bboxes, gt_bboxes, gt_bboxes_ignore=None, gt_labels=None):
         """Assign gt to bboxes.
 
@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import torch
 
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from ..iou_calculators import build_iou_calculator
 from .assign_result import AssignResult
@@ -40,6 +41,7 @@ class GridAssigner(BaseAssigner):
         self.gt_max_assign_all = gt_max_assign_all
         self.iou_calculator = build_iou_calculator(iou_calculator)
 
+    @profiled('assigner')
     def assign(self, bboxes, box_responsible_flags, gt_bboxes, gt_labels=None):
         """Assign gt to bboxes. The process is very much like the max iou
         assigner, except that positive samples are constrained within the cell
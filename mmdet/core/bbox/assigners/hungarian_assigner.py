@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import torch
 
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from ..match_costs import build_match_cost
 from ..transforms import bbox_cxcywh_to_xyxy
@@ -50,6 +51,7 @@ class HungarianAssigner(BaseAssigner):
         self.reg_cost = build_match_cost(reg_cost)
         self.iou_cost = build_match_cost(iou_cost)
 
+    @profiled('assigner')
     def assign(self,
                bbox_pred,
                cls_pred,
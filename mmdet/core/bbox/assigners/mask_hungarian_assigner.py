@@ -3,6 +3,7 @@ import torch
 
 from mmdet.core.bbox.builder import BBOX_ASSIGNERS
 from mmdet.core.bbox.match_costs.builder import build_match_cost
+from mmdet.utils import profiled
 from .assign_result import AssignResult
 from .base_assigner import BaseAssigner
 
@@ -43,6 +44,7 @@ class MaskHungarianAssigner(BaseAssigner):
         self.mask_cost = build_match_cost(mask_cost)
         self.dice_cost = build_match_cost(dice_cost)
 
+    @profiled('assigner')
     def assign(self,
                cls_pred,
                mask_pred,
@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import torch
 
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from .assign_result import AssignResult
 from .base_assigner import BaseAssigner
@@ -21,6 +22,7 @@ class PointAssigner(BaseAssigner):
         self.scale = scale
         self.pos_num = pos_num
 
+    @profiled('assigner')
     def assign(self, points, gt_bboxes, gt_bboxes_ignore=None, gt_labels=None):
         """Assign gt to points.
 
@@ -2,6 +2,7 @@
 import torch
 
 from mmdet.core import anchor_inside_flags
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from .assign_result import AssignResult
 from .base_assigner import BaseAssigner
@@ -55,6 +56,7 @@ class RegionAssigner(BaseAssigner):
         self.center_ratio = center_ratio
         self.ignore_ratio = ignore_ratio
 
+    @profiled('assigner')
     def assign(self,
                mlvl_anchors,
                mlvl_valid_flags,
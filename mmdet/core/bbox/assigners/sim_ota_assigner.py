@@ -4,6 +4,7 @@ import warnings
 import torch
 import torch.nn.functional as F
 
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from ..iou_calculators import bbox_overlaps
 from .assign_result import AssignResult
@@ -35,6 +36,7 @@ class SimOTAAssigner(BaseAssigner):
         self.iou_weight = iou_weight
         self.cls_weight = cls_weight
 
+    @profiled('assigner')
     def assign(self,
                pred_scores,
                priors,
@@ -183,6 +185,175 @@ class SimOTAAssigner(BaseAssigner):
         return AssignResult(
             num_gt, assigned_gt_inds, max_overlaps, labels=assigned_labels)
 
+    @profiled('assigner')
+    def batch_assign(self,
+                     pred_scores,
+                     priors,
+                     decoded_bboxes,
+                     gt_bboxes,
+                     gt_labels,
+                     eps=1e-7):
+        """Assign gts to priors of a batch of images using SimOTA at once.
+
+        The gts of the images are padded to the same number, so that the
+        costs, the dynamic ks, the top-k selection and the conflict
+        resolution of all the images are computed by tensor ops over the
+        batch, instead of a loop over the images and their gts. The images
+        are assigned one by one by :meth:`assign` when GPU is out of memory.
+        Args:
+            pred_scores (Tensor): Classification scores of the images,
+                a 3D-Tensor with shape [B, num_priors, num_classes].
+            priors (Tensor): All priors of an image, which are shared by the
+                images, a 2D-Tensor with shape [num_priors, 4] in
+                [cx, xy, stride_w, stride_y] format.
+            decoded_bboxes (Tensor): Predicted bboxes, a 3D-Tensor with shape
+                [B, num_priors, 4] in [tl_x, tl_y, br_x, br_y] format.
+            gt_bboxes (list[Tensor]): Ground truth bboxes of each image, each
+                has shape [num_gts, 4] in [tl_x, tl_y, br_x, br_y] format.
+            gt_labels (list[Tensor]): Ground truth labels of each image, each
+                has shape [num_gts].
+            eps (float): A value added to the denominator for numerical
+                stability. Default 1e-7.
+        Returns:
+            list[:obj:`AssignResult`]: The assigned results of the images,
+                same as the ones of :meth:`assign` up to the rounding error
+                of the classification cost.
+        """
+        try:
+            return self._batch_assign(pred_scores, priors, decoded_bboxes,
+                                      gt_bboxes, gt_labels, eps)
+        except RuntimeError:
+            warnings.warn('OOM RuntimeError is raised due to the huge memory '
+                          'cost during batched label assignment. The images '
+                          'are assigned one by one in this batch.')
+            torch.cuda.empty_cache()
+            return [
+                self.assign(
+                    pred_scores[i],
+                    priors,
+                    decoded_bboxes[i],
+                    gt_bboxes[i],
+                    gt_labels[i],
+                    eps=eps) for i in range(len(gt_bboxes))
+            ]
+
+    def _batch_assign(self, pred_scores, priors, decoded_bboxes, gt_bboxes,
+                      gt_labels, eps):
+        INF = 100000.0
+        num_imgs, num_bboxes = decoded_bboxes.shape[:2]
+        num_gts = [bboxes.size(0) for bboxes in gt_bboxes]
+        max_num_gt = max(num_gts, default=0)
+
+        def _empty_result(num_gt):
+            return AssignResult(
+                num_gt,
+                decoded_bboxes.new_zeros((num_bboxes, ), dtype=torch.long),
+                decoded_bboxes.new_zeros((num_bboxes, )),
+                labels=decoded_bboxes.new_full((num_bboxes, ),
+                                               -1,
+                                               dtype=torch.long))
+
+        if max_num_gt == 0 or num_bboxes == 0:
+            return [_empty_result(num_gt) for num_gt in num_gts]
+
+        # pad the gts of the images to max_num_gt
+        gt_valid = torch.arange(
+            max_num_gt, device=decoded_bboxes.device) < torch.as_tensor(
+                num_gts, device=decoded_bboxes.device).unsqueeze(1)
+        padded_bboxes = decoded_bboxes.new_zeros((num_imgs, max_num_gt, 4))
+        padded_labels = decoded_bboxes.new_zeros((num_imgs, max_num_gt),
+                                                 dtype=torch.long)
+        padded_bboxes[gt_valid] = torch.cat(gt_bboxes).to(padded_bboxes)
+        padded_labels[gt_valid] = torch.cat(gt_labels).long()
+
+        is_in_gts, is_in_cts = self._batch_in_gt_and_in_center_masks(
+            priors, padded_bboxes)
+        is_in_gts &= gt_valid.unsqueeze(1)
+        is_in_cts &= gt_valid.unsqueeze(1)
+        valid_mask = is_in_gts.any(2) | is_in_cts.any(2)
+        invalid_cost = ~(valid_mask.unsqueeze(2) & gt_valid.unsqueeze(1))
+
+        pairwise_ious = bbox_overlaps(decoded_bboxes, padded_bboxes)
+        pairwise_ious = pairwise_ious.masked_fill(invalid_cost, 0)
+        iou_cost = -torch.log(pairwise_ious + eps)
+
+        # binary cross entropy with one-hot targets, summed over the classes
+        # as the cost of the negatives minus the one of the gt label
+        valid_pred_scores = pred_scores.to(dtype=torch.float32).sqrt()
+        pos_log = torch.log(valid_pred_scores).clamp(min=-100)
+        neg_log = torch.log(1 - valid_pred_scores).clamp(min=-100)
+        label_inds = padded_labels.unsqueeze(1).expand(-1, num_bboxes, -1)
+        cls_cost = (-neg_log.sum(-1, keepdim=True) -
+                    (pos_log.gather(2, label_inds) -
+                     neg_log.gather(2, label_inds))).to(
+                         dtype=pred_scores.dtype)
+
+        cost_matrix = (
+            cls_cost * self.cls_weight + iou_cost * self.iou_weight +
+            (~(is_in_gts & is_in_cts)) * INF)
+        # the priors neither in gt bboxes nor in gt centers and the padded
+        # gts are never matched
+        cost_matrix = cost_matrix.masked_fill(invalid_cost, float('inf'))
+
+        matching_matrix = self._batch_dynamic_k_matching(
+            cost_matrix, pairwise_ious, gt_valid)
+        fg_mask = matching_matrix.sum(2) > 0
+        matched_gt_inds = matching_matrix.argmax(2)
+        matched_pred_ious = (matching_matrix * pairwise_ious).sum(2)
+
+        # convert to AssignResult format
+        assigned_gt_inds = torch.where(fg_mask, matched_gt_inds + 1,
+                                       matched_gt_inds.new_zeros(()))
+        assigned_labels = torch.where(fg_mask,
+                                      padded_labels.gather(1, matched_gt_inds),
+                                      padded_labels.new_full((), -1))
+        max_overlaps = torch.where(fg_mask, matched_pred_ious.float(),
+                                   matched_pred_ious.new_full((), -INF))
+        has_valid = valid_mask.any(1).tolist()
+        assign_results = []
+        for i, num_gt in enumerate(num_gts):
+            if num_gt == 0 or not has_valid[i]:
+                assign_results.append(_empty_result(num_gt))
+            else:
+                assign_results.append(
+                    AssignResult(
+                        num_gt,
+                        assigned_gt_inds[i],
+                        max_overlaps[i],
+                        labels=assigned_labels[i]))
+        return assign_results
+
+    def _batch_in_gt_and_in_center_masks(self, priors, gt_bboxes):
+        """Batched version of :meth:`get_in_gt_and_in_center_info`.
+
+        Args:
+            priors (Tensor): Priors with shape [num_priors, 4].
+            gt_bboxes (Tensor): Padded gt bboxes with shape [B, num_gts, 4].
+        Returns:
+            tuple[Tensor]: Whether the prior centers are in the gt bboxes and
+                in the gt centers, both have shape [B, num_priors, num_gts].
+        """
+        x = priors[:, 0].view(1, -1, 1)
+        y = priors[:, 1].view(1, -1, 1)
+        stride_x = priors[:, 2].view(1, -1, 1)
+        stride_y = priors[:, 3].view(1, -1, 1)
+        gt_x1, gt_y1, gt_x2, gt_y2 = gt_bboxes.unsqueeze(1).unbind(-1)
+
+        # is prior centers in gt bboxes
+        is_in_gts = ((x - gt_x1 > 0) & (y - gt_y1 > 0) & (gt_x2 - x > 0) &
+                     (gt_y2 - y > 0))
+
+        # is prior centers in gt centers
+        gt_cxs = (gt_x1 + gt_x2) / 2.0
+        gt_cys = (gt_y1 + gt_y2) / 2.0
+        ct_box_l = gt_cxs - self.center_radius * stride_x
+        ct_box_t = gt_cys - self.center_radius * stride_y
+        ct_box_r = gt_cxs + self.center_radius * stride_x
+        ct_box_b = gt_cys + self.center_radius * stride_y
+        is_in_cts = ((x - ct_box_l > 0) & (y - ct_box_t > 0) &
+                     (ct_box_r - x > 0) & (ct_box_b - y > 0))
+        return is_in_gts, is_in_cts
+
     def get_in_gt_and_in_center_info(self, priors, gt_bboxes):
         num_gt = gt_bboxes.size(0)
 
@@ -228,25 +399,8 @@ class SimOTAAssigner(BaseAssigner):
         return is_in_gts_or_centers, is_in_boxes_and_centers
 
     def dynamic_k_matching(self, cost, pairwise_ious, num_gt, valid_mask):
-        matching_matrix = torch.zeros_like(cost, dtype=torch.uint8)
-        # select candidate topk ious for dynamic-k calculation
-        candidate_topk = min(self.candidate_topk, pairwise_ious.size(0))
-        topk_ious, _ = torch.topk(pairwise_ious, candidate_topk, dim=0)
-        # calculate dynamic k for each gt
-        dynamic_ks = torch.clamp(topk_ious.sum(0).int(), min=1)
-        for gt_idx in range(num_gt):
-            _, pos_idx = torch.topk(
-                cost[:, gt_idx], k=dynamic_ks[gt_idx], largest=False)
-            matching_matrix[:, gt_idx][pos_idx] = 1
-
-        del topk_ious, dynamic_ks, pos_idx
-
-        prior_match_gt_mask = matching_matrix.sum(1) > 1
-        if prior_match_gt_mask.sum() > 0:
-            cost_min, cost_argmin = torch.min(
-                cost[prior_match_gt_mask, :], dim=1)
-            matching_matrix[prior_match_gt_mask, :] *= 0
-            matching_matrix[prior_match_gt_mask, cost_argmin] = 1
+        matching_matrix = self._batch_dynamic_k_matching(
+            cost.unsqueeze(0), pairwise_ious.unsqueeze(0))[0]
         # get foreground mask inside box and center prior
         fg_mask_inboxes = matching_matrix.sum(1) > 0
         valid_mask[valid_mask.clone()] = fg_mask_inboxes
@@ -255,3 +409,42 @@ class SimOTAAssigner(BaseAssigner):
         matched_pred_ious = (matching_matrix *
                              pairwise_ious).sum(1)[fg_mask_inboxes]
         return matched_pred_ious, matched_gt_inds
+
+    def _batch_dynamic_k_matching(self, cost, pairwise_ious, gt_valid=None):
+        """Dynamic-k matching of a batch of cost matrices.
+
+        The top-k priors of all the gts are selected by a single ``topk``
+        with the largest dynamic k, of which the first dynamic k ones are
+        kept for each gt.
+
+        Args:
+            cost (Tensor): Cost matrices with shape [B, num_priors, num_gts].
+            pairwise_ious (Tensor): IoUs between the priors and the gts with
+                shape [B, num_priors, num_gts], which are 0 for the priors
+                neither in gt bboxes nor in gt centers.
+            gt_valid (Tensor, optional): Mask of the gts with shape
+                [B, num_gts], the padded gts are not matched. Default None.
+        Returns:
+            Tensor: The matching matrices with shape [B, num_priors, num_gts],
+                in which each prior matches at most one gt.
+        """
+        matching_matrix = torch.zeros_like(cost, dtype=torch.uint8)
+        # select candidate topk ious for dynamic-k calculation
+        candidate_topk = min(self.candidate_topk, pairwise_ious.size(1))
+        topk_ious, _ = torch.topk(pairwise_ious, candidate_topk, dim=1)
+        # calculate dynamic k for each gt
+        dynamic_ks = torch.clamp(topk_ious.sum(1).int(), min=1)
+        if gt_valid is not None:
+            dynamic_ks = dynamic_ks * gt_valid
+        max_k = int(dynamic_ks.max())
+        _, pos_inds = torch.topk(cost, k=max_k, dim=1, largest=False)
+        pos_mask = torch.arange(
+            max_k, device=cost.device)[:, None] < dynamic_ks.unsqueeze(1)
+        matching_matrix.scatter_(1, pos_inds, pos_mask.to(torch.uint8))
+
+        del topk_ious, dynamic_ks, pos_inds, pos_mask
+
+        # match the priors matching several gts to the gt of the least cost
+        prior_match_gt_mask = matching_matrix.sum(2, keepdim=True) > 1
+        cost_argmin = F.one_hot(cost.argmin(2), cost.size(2)).to(torch.uint8)
+        return torch.where(prior_match_gt_mask, cost_argmin, matching_matrix)
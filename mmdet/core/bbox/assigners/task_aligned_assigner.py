@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import torch
 
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from ..iou_calculators import build_iou_calculator
 from .assign_result import AssignResult
@@ -33,6 +34,7 @@ class TaskAlignedAssigner(BaseAssigner):
         self.topk = topk
         self.iou_calculator = build_iou_calculator(iou_calculator)
 
+    @profiled('assigner')
     def assign(self,
                pred_scores,
                decode_bboxes,
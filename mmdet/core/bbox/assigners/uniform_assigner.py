@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import torch
 
+from mmdet.utils import profiled
 from ..builder import BBOX_ASSIGNERS
 from ..iou_calculators import build_iou_calculator
 from ..transforms import bbox_xyxy_to_cxcywh
@@ -32,6 +33,7 @@ class UniformAssigner(BaseAssigner):
         self.neg_ignore_thr = neg_ignore_thr
         self.iou_calculator = build_iou_calculator(iou_calculator)
 
+    @profiled('assigner')
     def assign(self,
                bbox_pred,
                anchor,
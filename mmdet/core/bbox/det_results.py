@@ -0,0 +1,234 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import struct
+import zipfile
+
+import mmcv
+import numpy as np
+
+
+def _mmap_npz(filename, mmap_mode='r'):
+    """Memory-map the arrays of an uncompressed ``.npz`` file.
+
+    ``np.load`` ignores ``mmap_mode`` for ``.npz`` files, but the arrays of
+    a file saved by ``np.savez`` are stored uncompressed, so each of them can
+    be mapped from its offset in the zip file.
+    """
+    arrays = {}
+    with zipfile.ZipFile(filename) as zip_file, open(filename, 'rb') as f:
+        for info in zip_file.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f'{info.filename} in {filename} is '
+                                 'compressed and can not be memory-mapped.')
+            # skip the local file header, which has a fixed size of 30 bytes
+            # followed by the file name and the extra field
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(f)
+            else:
+                header = np.lib.format.read_array_header_2_0(f)
+            shape, fortran_order, dtype = header
+            name = info.filename[:-len('.npy')]
+            if np.prod(shape) == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(
+                filename,
+                dtype=dtype,
+                mode=mmap_mode,
+                offset=f.tell(),
+                shape=shape,
+                order='F' if fortran_order else 'C')
+    return arrays
+
+
+class DetResults:
+    """Detection results of a dataset in flat arrays.
+
+    Instead of a list of per-class bbox arrays for each image as returned by
+    :func:`bbox2result`, the detections of all the images are concatenated
+    into contiguous arrays of bboxes, scores and labels. The detections of
+    the ``i``-th image are the rows ``img_offsets[i]:img_offsets[i + 1]``,
+    sorted by label as :func:`bbox2result` does.
+
+    Indexing an image returns its results in the format of
+    :func:`bbox2result`, so the results can also be passed to code expecting
+    a list of bbox results, while :func:`eval_map`, the confusion matrix and
+    ``CocoDataset.results2json`` use the arrays directly. The results are
+    saved to a ``.npz`` file by :meth:`save`, which :meth:`load` can
+    memory-map.
+
+    Args:
+        bboxes (ndarray): The bboxes of all the images, has shape (n, 4).
+        scores (ndarray): The scores of the bboxes, has shape (n, ).
+        labels (ndarray): The labels of the bboxes, has shape (n, ).
+        img_offsets (ndarray): The offsets of the images in the bboxes, has
+            shape (num_images + 1, ).
+        num_classes (int): Number of classes.
+    """
+
+    def __init__(self, bboxes, scores, labels, img_offsets, num_classes):
+        self.bboxes = np.asanyarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        self.scores = np.asanyarray(scores, dtype=np.float32)
+        self.labels = np.asanyarray(labels, dtype=np.int64)
+        self.img_offsets = np.asanyarray(img_offsets, dtype=np.int64)
+        self.num_classes = int(num_classes)
+        assert len(self.bboxes) == len(self.scores) == len(self.labels) == \
+            self.img_offsets[-1]
+
+    @classmethod
+    def from_bbox_results(cls, bbox_results, num_classes=None):
+        """Build the results from the bbox results of each image.
+
+        Args:
+            bbox_results (list[list[ndarray]]): The bbox results of each
+                image, see :func:`bbox2result`.
+            num_classes (int, optional): Number of classes. Defaults to the
+                length of the first bbox results.
+        """
+        if not all(isinstance(result, list) for result in bbox_results):
+            raise TypeError('DetResults only holds bbox results, i.e. a list '
+                            'of bbox arrays of each class for each image')
+        if num_classes is None:
+            num_classes = len(bbox_results[0]) if bbox_results else 0
+        assert all(len(result) == num_classes for result in bbox_results)
+        counts = np.array([[len(dets) for dets in result]
+                           for result in bbox_results],
+                          dtype=np.int64).reshape(-1, num_classes)
+        dets = np.concatenate([np.zeros((0, 5), dtype=np.float32)] + [
+            np.asarray(dets).reshape(-1, 5) for result in bbox_results
+            for dets in result
+        ])
+        labels = np.repeat(
+            np.tile(np.arange(num_classes), len(counts)), counts.ravel())
+        img_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts.sum(1), out=img_offsets[1:])
+        return cls(
+            np.ascontiguousarray(dets[:, :4]),
+            np.ascontiguousarray(dets[:, 4]), labels, img_offsets, num_classes)
+
+    @classmethod
+    def concat(cls, results_list):
+        """Concatenate the results of several parts of a dataset."""
+        assert len(results_list) > 0
+        offsets = np.cumsum([0] +
+                            [len(results.bboxes) for results in results_list])
+        img_offsets = np.concatenate([np.zeros(1, dtype=np.int64)] + [
+            results.img_offsets[1:] + offset
+            for results, offset in zip(results_list, offsets)
+        ])
+        return cls(
+            np.concatenate([results.bboxes for results in results_list]),
+            np.concatenate([results.scores for results in results_list]),
+            np.concatenate([results.labels for results in results_list]),
+            img_offsets, results_list[0].num_classes)
+
+    def __len__(self):
+        return len(self.img_offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.take(np.arange(len(self))[idx])
+        bboxes, scores, labels = self.get(idx)
+        order = np.argsort(labels, kind='stable')
+        dets = np.concatenate([bboxes, scores[:, None]], axis=1)[order]
+        counts = np.bincount(labels, minlength=self.num_classes)
+        return np.split(dets, np.cumsum(counts)[:-1])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def get(self, idx):
+        """Get the bboxes, scores and labels of an image.
+
+        Returns:
+            tuple[ndarray]: Views of the arrays of the image.
+        """
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f'image index {idx} is out of range')
+        start, end = self.img_offsets[idx], self.img_offsets[idx + 1]
+        return self.bboxes[start:end], self.scores[start:end], self.labels[
+            start:end]
+
+    @property
+    def img_inds(self):
+        """ndarray: The image index of each bbox."""
+        return np.repeat(np.arange(len(self)), np.diff(self.img_offsets))
+
+    def take(self, inds):
+        """Get the results of the images of the given indices."""
+        inds = np.asarray(inds, dtype=np.int64)
+        starts = self.img_offsets[:-1][inds]
+        counts = np.diff(self.img_offsets)[inds]
+        img_offsets = np.zeros(len(inds) + 1, dtype=np.int64)
+        np.cumsum(counts, out=img_offsets[1:])
+        rows = np.repeat(starts - img_offsets[:-1], counts) + np.arange(
+            img_offsets[-1])
+        return DetResults(self.bboxes[rows], self.scores[rows],
+                          self.labels[rows], img_offsets, self.num_classes)
+
+    def get_cls_dets(self, class_id):
+        """Get the detections of a class in each image.
+
+        Returns:
+            list[ndarray]: The detections of each image, each has shape
+                (n, 5).
+        """
+        keep = self.labels == class_id
+        dets = np.concatenate([self.bboxes[keep], self.scores[keep, None]],
+                              axis=1)
+        counts = np.bincount(self.img_inds[keep], minlength=len(self))
+        return np.split(dets, np.cumsum(counts)[:-1])
+
+    def save(self, filename):
+        """Save the results to an uncompressed ``.npz`` file."""
+        with open(filename, 'wb') as f:
+            np.savez(
+                f,
+                bboxes=self.bboxes,
+                scores=self.scores,
+                labels=self.labels,
+                img_offsets=self.img_offsets,
+                num_classes=np.array(self.num_classes))
+
+    @classmethod
+    def load(cls, filename, mmap_mode=None):
+        """Load the results saved by :meth:`save`.
+
+        Args:
+            filename (str): The ``.npz`` file.
+            mmap_mode (str, optional): If given, e.g. 'r', the arrays are
+                memory-mapped with this mode instead of read into memory.
+                Default: None.
+        """
+        if mmap_mode is None:
+            with np.load(filename) as data:
+                arrays = dict(data)
+        else:
+            arrays = _mmap_npz(filename, mmap_mode)
+        return cls(arrays['bboxes'], arrays['scores'], arrays['labels'],
+                   arrays['img_offsets'], int(arrays['num_classes']))
+
+
+def dump_results(results, filename):
+    """Dump test results, :obj:`DetResults` to a ``.npz`` file and the
+    others with :func:`mmcv.dump`."""
+    if filename.endswith('.npz'):
+        if not isinstance(results, DetResults):
+            results = DetResults.from_bbox_results(results)
+        results.save(filename)
+    else:
+        mmcv.dump(results, filename)
+
+
+def load_results(filename):
+    """Load test results dumped by :func:`dump_results`, ``.npz`` files are
+    memory-mapped as :obj:`DetResults`."""
+    if filename.endswith('.npz'):
+        return DetResults.load(filename, mmap_mode='r')
+    return mmcv.load(filename)
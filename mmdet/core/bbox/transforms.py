@@ -133,6 +133,39 @@ def bbox2result(bboxes, labels, num_classes):
         return [bboxes[labels == i, :] for i in range(num_classes)]
 
 
+def bbox_result2array(bbox_result, score_thr=0., img_shape=None):
+    """Convert the per-class bbox results back to flat arrays.
+
+    This is the inverse of :func:`bbox2result`, with optional score
+    filtering and normalization of the box coordinates to [0, 1].
+
+    Args:
+        bbox_result (list[np.ndarray]): bbox results of each class, each of
+            shape (n, 5).
+        score_thr (float): Boxes with scores lower than it are dropped.
+            Default: 0.
+        img_shape (tuple[int], optional): (height, width) of the image. If
+            given, the box coordinates are divided by the image size.
+            Default: None.
+
+    Returns:
+        tuple[np.ndarray]: bboxes of shape (n, 4), scores of shape (n, ) and
+            labels of shape (n, ).
+    """
+    if len(bbox_result) == 0:
+        dets = np.zeros((0, 5), dtype=np.float32)
+    else:
+        dets = np.concatenate(bbox_result).astype(np.float32, copy=False)
+    num_dets = [len(dets_per_cls) for dets_per_cls in bbox_result]
+    labels = np.repeat(np.arange(len(bbox_result)), num_dets)
+    keep = dets[:, 4] >= score_thr
+    bboxes = dets[keep, :4]
+    if img_shape is not None:
+        h, w = img_shape[:2]
+        bboxes /= np.array([w, h, w, h], dtype=np.float32)
+    return bboxes, dets[keep, 4], labels[keep]
+
+
 def distance2bbox(points, distance, max_shape=None):
     """Decode distance prediction to bounding box.
 
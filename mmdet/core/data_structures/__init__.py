@@ -1,5 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+from .compact_instance_data import CompactInstanceData
 from .general_data import GeneralData
 from .instance_data import InstanceData
 
-__all__ = ['GeneralData', 'InstanceData']
+__all__ = ['GeneralData', 'InstanceData', 'CompactInstanceData']
@@ -0,0 +1,287 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import numpy as np
+import torch
+
+from .instance_data import InstanceData
+
+
+class CompactInstanceData:
+    """A compact version of :class:`InstanceData` for hot paths.
+
+    :class:`InstanceData` checks the type and the length of every value set
+    to it and deep-copies the meta information of each new instance, which
+    costs more than the tensor ops of the dense heads when there are few
+    instances per image. ``CompactInstanceData`` keeps a fixed set of fields,
+    given at construction, whose values are tensors or arrays of the same
+    length, so the values are only checked once. It is slotted, the meta
+    information is shared by the derived instances instead of copied, and
+    slicing returns views of the values.
+
+    The instances of many images can be concatenated by :meth:`cat`, which
+    concatenates each field once, processed by batched tensor ops and split
+    back into views per image by :meth:`split`.
+
+    Args:
+        data (dict): The fields and their values, all the values are
+            :obj:`torch.Tensor` or :obj:`np.ndarray` with the same length.
+        meta_info (dict, optional): The meta information of the image, e.g.
+            `img_shape`, `scale_factor`, which is shared, not copied, and
+            should not be modified. Default: None.
+
+    Examples:
+        >>> from mmdet.core import CompactInstanceData
+        >>> img_meta = dict(img_shape=(800, 1196, 3), pad_shape=(800, 1216, 3))
+        >>> results = CompactInstanceData(
+        >>>     dict(labels=torch.LongTensor([0, 1, 2, 3]),
+        >>>          scores=torch.Tensor([0.01, 0.7, 0.6, 0.3])), img_meta)
+        >>> len(results), results.img_shape
+        (4, (800, 1196, 3))
+        >>> results[results.scores > 0.5].labels
+        tensor([1, 2])
+        >>> results.bboxes = torch.zeros(4, 4)
+        AttributeError: bboxes is not a field of CompactInstanceData
+        >>> batch = CompactInstanceData.cat([results, results[:2]])
+        >>> [len(res) for res in batch.split([4, 2])]
+        [4, 2]
+    """
+
+    __slots__ = ('meta_info', '_data', '_len')
+
+    def __init__(self, data, meta_info=None):
+        assert isinstance(data, dict) and len(data) > 0, \
+            'data should be a non-empty `dict`'
+        lengths = set()
+        for k, v in data.items():
+            assert isinstance(v, (torch.Tensor, np.ndarray)), \
+                f'{k} is a {type(v)}, only support ' \
+                f'{(torch.Tensor, np.ndarray)}'
+            lengths.add(len(v))
+        assert len(lengths) == 1, \
+            f'the lengths of the values {lengths} are not consistent'
+        object.__setattr__(self, 'meta_info',
+                           {} if meta_info is None else meta_info)
+        object.__setattr__(self, '_data', dict(data))
+        object.__setattr__(self, '_len', lengths.pop())
+
+    @classmethod
+    def _create(cls, data, meta_info, length):
+        """Create an instance without checking the values."""
+        new_data = cls.__new__(cls)
+        object.__setattr__(new_data, 'meta_info', meta_info)
+        object.__setattr__(new_data, '_data', data)
+        object.__setattr__(new_data, '_len', length)
+        return new_data
+
+    @classmethod
+    def from_instance_data(cls, instance_data):
+        """Convert an :obj:`InstanceData`."""
+        return cls(
+            dict(instance_data.items()), dict(instance_data.meta_info_items()))
+
+    def to_instance_data(self):
+        """Convert to an :obj:`InstanceData`."""
+        return InstanceData(self.meta_info, dict(self._data))
+
+    def new(self, data):
+        """Return a new instance with the same meta information.
+
+        Args:
+            data (dict): The fields and their values of the new instance.
+        """
+        return self.__class__(data, self.meta_info)
+
+    def keys(self):
+        """
+        Returns:
+            list: Contains all the fields.
+        """
+        return list(self._data)
+
+    def values(self):
+        """
+        Returns:
+            list: Contains the values of all the fields.
+        """
+        return list(self._data.values())
+
+    def items(self):
+        return self._data.items()
+
+    def __getattr__(self, name):
+        # only called for the names which are not found otherwise
+        if name in CompactInstanceData.__slots__:
+            raise AttributeError(name)
+        if name in self._data:
+            return self._data[name]
+        if name in self.meta_info:
+            return self.meta_info[name]
+        raise AttributeError(
+            f'{self.__class__.__name__} has no attribute {name}')
+
+    def __setattr__(self, name, value):
+        if name in CompactInstanceData.__slots__:
+            raise AttributeError(f'{name} has been used as a private '
+                                 'attribute, which is immutable.')
+        if name not in self._data:
+            raise AttributeError(
+                f'{name} is not a field of {self.__class__.__name__}')
+        assert isinstance(value, (torch.Tensor, np.ndarray)), \
+            f'Can set {type(value)}, only support ' \
+            f'{(torch.Tensor, np.ndarray)}'
+        assert len(value) == self._len, \
+            f'the length of values {len(value)} is not consistent with ' \
+            f'the length of this :obj:`{self.__class__.__name__}` ' \
+            f'{self._len}'
+        self._data[name] = value
+
+    def __getstate__(self):
+        return self.meta_info, self._data, self._len
+
+    def __setstate__(self, state):
+        for name, value in zip(CompactInstanceData.__slots__, state):
+            object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError(
+            f'the fields of {self.__class__.__name__} can not be deleted')
+
+    # dict-like methods
+    __setitem__ = __setattr__
+    __delitem__ = __delattr__
+
+    def __contains__(self, item):
+        return item in self._data or item in self.meta_info
+
+    def __len__(self):
+        return self._len
+
+    def __getitem__(self, item):
+        """
+        Args:
+            item (str, int, obj:`slice`, obj:`torch.Tensor`,
+                obj:`np.ndarray`): A field or the indices of the instances,
+                a slice returns views of the values.
+
+        Returns:
+            obj:`CompactInstanceData` | obj:`torch.Tensor` |
+                obj:`np.ndarray`: The instances or the value of the field.
+        """
+        if isinstance(item, str):
+            return self._data[item]
+        if isinstance(item, int):
+            if item >= self._len or item < -self._len:
+                raise IndexError(f'Index {item} out of range!')
+            # keep the dimension
+            item = item % self._len
+            item = slice(item, item + 1)
+        if isinstance(item, slice):
+            data = {k: v[item] for k, v in self._data.items()}
+            return self._create(data, self.meta_info,
+                                len(range(*item.indices(self._len))))
+
+        assert isinstance(item, (torch.Tensor, np.ndarray)) and \
+            item.ndim == 1, 'Only support to get the values along the ' \
+            'first dimension.'
+        if isinstance(item, torch.Tensor):
+            is_mask = item.dtype == torch.bool
+        else:
+            is_mask = item.dtype == np.bool_
+        if is_mask:
+            assert len(item) == self._len, \
+                f'The length of the mask {len(item)} does not match the ' \
+                f'length of the instances {self._len}'
+        tensor_item = item if isinstance(
+            item, torch.Tensor) else torch.from_numpy(item)
+        array_item = None
+        data = dict()
+        for k, v in self._data.items():
+            if isinstance(v, torch.Tensor):
+                data[k] = v[tensor_item.to(v.device)]
+            else:
+                if array_item is None:
+                    array_item = item if isinstance(
+                        item, np.ndarray) else item.cpu().numpy()
+                data[k] = v[array_item]
+        return self._create(data, self.meta_info,
+                            len(next(iter(data.values()))))
+
+    @staticmethod
+    def cat(instances_list):
+        """Concat the instances in the list, each field is concatenated
+        once.
+
+        Args:
+            instances_list (list[:obj:`CompactInstanceData`]): A list
+                of instances with the same fields.
+
+        Returns:
+            obj:`CompactInstanceData`: The concatenated instances, with the
+                meta information of the first one.
+        """
+        assert len(instances_list) > 0
+        if len(instances_list) == 1:
+            return instances_list[0]
+        first = instances_list[0]
+        keys = first.keys()
+        assert all(results.keys() == keys for results in instances_list), \
+            'the instances to concat should have the same fields'
+        data = dict()
+        for k in keys:
+            values = [results._data[k] for results in instances_list]
+            if isinstance(values[0], torch.Tensor):
+                data[k] = torch.cat(values, dim=0)
+            else:
+                data[k] = np.concatenate(values, axis=0)
+        return first._create(data, first.meta_info,
+                             sum(len(results) for results in instances_list))
+
+    def split(self, sizes):
+        """Split the instances into views, e.g. the instances of each image
+        concatenated by :meth:`cat`.
+
+        Args:
+            sizes (list[int]): The number of instances of each split.
+
+        Returns:
+            list[:obj:`CompactInstanceData`]: The splits, whose values are
+                views of the values of this instance.
+        """
+        assert sum(sizes) == self._len, \
+            f'the sizes {sizes} do not sum to {self._len}'
+        offsets = np.cumsum([0] + list(sizes)).tolist()
+        return [
+            self[start:end] for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+
+    def _apply(self, func):
+        data = {
+            k: func(v) if isinstance(v, torch.Tensor) else v
+            for k, v in self._data.items()
+        }
+        return self._create(data, self.meta_info, self._len)
+
+    # Tensor-like methods
+    def to(self, *args, **kwargs):
+        """Apply same name function to all tensors in the fields."""
+        return self._apply(lambda v: v.to(*args, **kwargs))
+
+    def cpu(self):
+        """Apply same name function to all tensors in the fields."""
+        return self._apply(lambda v: v.cpu())
+
+    def cuda(self):
+        """Apply same name function to all tensors in the fields."""
+        return self._apply(lambda v: v.cuda())
+
+    def detach(self):
+        """Apply same name function to all tensors in the fields."""
+        return self._apply(lambda v: v.detach())
+
+    def numpy(self):
+        """Apply same name function to all tensors in the fields."""
+        return self._apply(lambda v: v.detach().cpu().numpy())
+
+    def __repr__(self):
+        fields = ', '.join(f'{k}: {tuple(v.shape)}'
+                           for k, v in self._data.items())
+        return f'<{self.__class__.__name__}(len={self._len}, {fields})>'
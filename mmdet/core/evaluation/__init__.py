@@ -3,8 +3,10 @@ from .class_names import (cityscapes_classes, coco_classes, dataset_aliases,
                           get_classes, imagenet_det_classes,
                           imagenet_vid_classes, oid_challenge_classes,
                           oid_v6_classes, voc_classes)
+from .confusion_matrix import confusion_matrix_per_img, eval_confusion_matrix
 from .eval_hooks import DistEvalHook, EvalHook
 from .mean_ap import average_precision, eval_map, print_map_summary
+from .online_eval import OnlineEvaluator, OnlineMAPEvaluator
 from .panoptic_utils import INSTANCE_OFFSET
 from .recall import (eval_recalls, plot_iou_recall, plot_num_recall,
                      print_recall_summary)
@@ -15,5 +17,6 @@ __all__ = [
     'DistEvalHook', 'EvalHook', 'average_precision', 'eval_map',
     'print_map_summary', 'eval_recalls', 'print_recall_summary',
     'plot_num_recall', 'plot_iou_recall', 'oid_v6_classes',
-    'oid_challenge_classes', 'INSTANCE_OFFSET'
+    'oid_challenge_classes', 'INSTANCE_OFFSET', 'eval_confusion_matrix',
+    'confusion_matrix_per_img', 'OnlineEvaluator', 'OnlineMAPEvaluator'
 ]
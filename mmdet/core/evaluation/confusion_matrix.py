@@ -0,0 +1,157 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+from multiprocessing import Pool
+
+import numpy as np
+from mmcv.ops import nms
+
+from ..bbox import DetResults
+from .bbox_overlaps import bbox_overlaps
+
+
+def confusion_matrix_per_img(det_result,
+                             gt_bboxes,
+                             gt_labels,
+                             num_classes,
+                             score_thr=0,
+                             tp_iou_thr=0.5,
+                             nms_iou_thr=None):
+    """Count the confusion matrix entries of one image.
+
+    Every detection with a score not lower than ``score_thr`` is matched to
+    all the ground truths it overlaps with an IoU not lower than
+    ``tp_iou_thr``, each match counts once in (gt label, det label).
+    Detections without any match count as background false positives and
+    ground truths without a detection of the same class count as false
+    negatives.
+
+    Args:
+        det_result (list[ndarray]): Detection results of each class, each
+            has shape (num_bboxes, 5).
+        gt_bboxes (ndarray): Ground truth bboxes, has shape (num_gt, 4).
+        gt_labels (ndarray): Ground truth labels, has shape (num_gt, ).
+        num_classes (int): Number of classes.
+        score_thr (float): Score threshold to filter bboxes. Default: 0.
+        tp_iou_thr (float): IoU threshold to be considered as matched.
+            Default: 0.5.
+        nms_iou_thr (float, optional): nms IoU threshold, the detection
+            results have done nms in the detector, only applied when users
+            want to change the nms IoU threshold. Default: None.
+
+    Returns:
+        ndarray: The counts of the image, has shape
+            (num_classes + 1, num_classes + 1). The last row and column are
+            background.
+    """
+    det_bboxes = []
+    for det_label, bboxes in enumerate(det_result):
+        if nms_iou_thr:
+            bboxes, _ = nms(
+                bboxes[:, :4],
+                bboxes[:, -1],
+                nms_iou_thr,
+                score_threshold=score_thr)
+        det_bboxes.append(bboxes.reshape(-1, 5))
+    det_labels = np.repeat(
+        np.arange(len(det_bboxes)), [len(bboxes) for bboxes in det_bboxes])
+    det_bboxes = np.concatenate(det_bboxes) if det_bboxes else np.zeros(
+        (0, 5), dtype=np.float32)
+    return _count_confusion(det_bboxes, det_labels, gt_bboxes, gt_labels,
+                            num_classes, score_thr, tp_iou_thr)
+
+
+def _count_confusion(det_bboxes, det_labels, gt_bboxes, gt_labels, num_classes,
+                     score_thr, tp_iou_thr):
+    """Count the confusion matrix entries of the flat detections of one
+    image, see :func:`confusion_matrix_per_img`."""
+    valid = det_bboxes[:, 4] >= score_thr
+    det_bboxes, det_labels = det_bboxes[valid], det_labels[valid]
+    gt_labels = np.asarray(gt_labels, dtype=np.int64)
+
+    ious = bbox_overlaps(det_bboxes[:, :4], gt_bboxes.reshape(-1, 4))
+    matched = ious >= tp_iou_thr
+    det_inds, gt_inds = np.nonzero(matched)
+    size = num_classes + 1
+    # flat indices of the (gt label, det label) entries to count
+    matches = gt_labels[gt_inds] * size + det_labels[det_inds]
+    bg_fps = num_classes * size + det_labels[~matched.any(axis=1)]
+    tps = (matched & (gt_labels[None, :] == det_labels[:, None])).any(axis=0)
+    fns = gt_labels[~tps] * size + num_classes
+    counts = np.bincount(
+        np.concatenate([matches, bg_fps, fns]), minlength=size * size)
+    return counts.reshape(size, size)
+
+
+def _confusion_matrix_per_img_star(args):
+    return confusion_matrix_per_img(*args)
+
+
+def _count_confusion_star(args):
+    return _count_confusion(*args)
+
+
+def eval_confusion_matrix(det_results,
+                          annotations,
+                          score_thr=0,
+                          tp_iou_thr=0.5,
+                          nms_iou_thr=None,
+                          nproc=1):
+    """Calculate the confusion matrix of detection results.
+
+    Args:
+        det_results (list[list | tuple] | :obj:`DetResults`): [[cls1_det,
+            cls2_det, ...], ...]. The outer list indicates images, and the
+            inner list indicates per-class detected bboxes. Results with
+            masks, i.e. tuples of (bbox results, mask results), and flat
+            :obj:`DetResults` are also accepted.
+        annotations (list[dict]): Ground truth annotations where each item of
+            the list indicates an image. Keys of annotations are:
+
+            - `bboxes`: numpy array of shape (n, 4)
+            - `labels`: numpy array of shape (n, )
+        score_thr (float): Score threshold to filter bboxes. Default: 0.
+        tp_iou_thr (float): IoU threshold to be considered as matched.
+            Default: 0.5.
+        nms_iou_thr (float, optional): nms IoU threshold, see
+            :func:`confusion_matrix_per_img`. Default: None.
+        nproc (int): Processes used to process the images. Default: 1.
+
+    Returns:
+        ndarray: The confusion matrix, has shape
+            (num_classes + 1, num_classes + 1), where rows are ground truth
+            labels and columns are predicted labels. The last row and column
+            are background.
+    """
+    assert len(det_results) == len(annotations)
+    if isinstance(det_results, DetResults) and not nms_iou_thr:
+        # count the flat detections of each image directly
+        num_classes = det_results.num_classes
+        tasks = []
+        for i, ann in enumerate(annotations):
+            bboxes, scores, labels = det_results.get(i)
+            det_bboxes = np.concatenate([bboxes, scores[:, None]], axis=1)
+            tasks.append((det_bboxes, labels, ann['bboxes'], ann['labels'],
+                          num_classes, score_thr, tp_iou_thr))
+        count_fn, star_fn = _count_confusion, _count_confusion_star
+    else:
+        if not isinstance(det_results, DetResults):
+            det_results = [
+                det_result[0] if isinstance(det_result, tuple) else det_result
+                for det_result in det_results
+            ]
+        num_classes = len(det_results[0]) if len(det_results) else 0
+        tasks = [(det_result, ann['bboxes'], ann['labels'], num_classes,
+                  score_thr, tp_iou_thr, nms_iou_thr)
+                 for det_result, ann in zip(det_results, annotations)]
+        count_fn = confusion_matrix_per_img
+        star_fn = _confusion_matrix_per_img_star
+    confusion_matrix = np.zeros((num_classes + 1, num_classes + 1))
+    if nproc > 1 and len(tasks) > 1:
+        chunksize = max(1, len(tasks) // (nproc * 4))
+        with Pool(nproc) as pool:
+            for counts in pool.imap_unordered(
+                    star_fn, tasks, chunksize=chunksize):
+                confusion_matrix += counts
+    else:
+        for task in tasks:
+            confusion_matrix += count_fn(*task)
+    return confusion_matrix
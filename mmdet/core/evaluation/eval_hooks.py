@@ -23,9 +23,14 @@ def _calc_dynamic_intervals(start_interval, dynamic_interval_list):
 
 class EvalHook(BaseEvalHook):
 
-    def __init__(self, *args, dynamic_intervals=None, **kwargs):
+    def __init__(self,
+                 *args,
+                 dynamic_intervals=None,
+                 flat_results=False,
+                 **kwargs):
         super(EvalHook, self).__init__(*args, **kwargs)
         self.latest_results = None
+        self.flat_results = flat_results
 
         self.use_dynamic_intervals = dynamic_intervals is not None
         if self.use_dynamic_intervals:
@@ -57,7 +62,11 @@ class EvalHook(BaseEvalHook):
 
         # Changed results to self.results so that MMDetWandbHook can access
         # the evaluation results and log them to wandb.
-        results = single_gpu_test(runner.model, self.dataloader, show=False)
+        results = single_gpu_test(
+            runner.model,
+            self.dataloader,
+            show=False,
+            flat_results=self.flat_results)
         self.latest_results = results
         runner.log_buffer.output['eval_iter_num'] = len(self.dataloader)
         key_score = self.evaluate(runner, results)
@@ -72,9 +81,16 @@ class EvalHook(BaseEvalHook):
 # inherit EvalHook but BaseDistEvalHook.
 class DistEvalHook(BaseDistEvalHook):
 
-    def __init__(self, *args, dynamic_intervals=None, **kwargs):
+    def __init__(self,
+                 *args,
+                 dynamic_intervals=None,
+                 collect_backend=None,
+                 flat_results=False,
+                 **kwargs):
         super(DistEvalHook, self).__init__(*args, **kwargs)
         self.latest_results = None
+        self.collect_backend = collect_backend
+        self.flat_results = flat_results
 
         self.use_dynamic_intervals = dynamic_intervals is not None
         if self.use_dynamic_intervals:
@@ -127,7 +143,9 @@ class DistEvalHook(BaseDistEvalHook):
             runner.model,
             self.dataloader,
             tmpdir=tmpdir,
-            gpu_collect=self.gpu_collect)
+            gpu_collect=self.gpu_collect,
+            collect_backend=self.collect_backend,
+            flat_results=self.flat_results)
         self.latest_results = results
         if runner.rank == 0:
             print('\n')
@@ -1,4 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import os.path as osp
+import tempfile
 from multiprocessing import Pool
 
 import mmcv
@@ -6,6 +8,7 @@ import numpy as np
 from mmcv.utils import print_log
 from terminaltables import AsciiTable
 
+from ..bbox import DetResults
 from .bbox_overlaps import bbox_overlaps
 from .class_names import get_classes
 
@@ -474,18 +477,273 @@ def tpfp_openimages(det_bboxes,
         return tp, fp, det_bboxes
 
 
+def _batched_bbox_overlaps(bboxes1, bboxes2, extra_length=0., eps=1e-6):
+    """Calculate the ious between padded bboxes of a batch of images.
+
+    The arithmetic follows :func:`bbox_overlaps` in float32, so the ious are
+    identical to the ones computed image by image.
+
+    Args:
+        bboxes1 (ndarray): Shape (B, m, 4).
+        bboxes2 (ndarray): Shape (B, n, 4).
+        extra_length (float): 1 for the legacy coordinate system, else 0.
+        eps (float): A value added to the denominator for numerical
+            stability. Default: 1e-6.
+
+    Returns:
+        ndarray: Shape (B, m, n).
+    """
+    bboxes1 = bboxes1.astype(np.float32)
+    bboxes2 = bboxes2.astype(np.float32)
+    area1 = (bboxes1[..., 2] - bboxes1[..., 0] + extra_length) * (
+        bboxes1[..., 3] - bboxes1[..., 1] + extra_length)
+    area2 = (bboxes2[..., 2] - bboxes2[..., 0] + extra_length) * (
+        bboxes2[..., 3] - bboxes2[..., 1] + extra_length)
+    x_start = np.maximum(bboxes1[:, :, None, 0], bboxes2[:, None, :, 0])
+    y_start = np.maximum(bboxes1[:, :, None, 1], bboxes2[:, None, :, 1])
+    x_end = np.minimum(bboxes1[:, :, None, 2], bboxes2[:, None, :, 2])
+    y_end = np.minimum(bboxes1[:, :, None, 3], bboxes2[:, None, :, 3])
+    overlap = np.maximum(x_end - x_start + extra_length, 0) * np.maximum(
+        y_end - y_start + extra_length, 0)
+    union = np.maximum(area1[:, :, None] + area2[:, None, :] - overlap, eps)
+    return overlap / union
+
+
+def _pad_by_image(values, img_inds, ranks, num_imgs, max_len, fill=0):
+    """Scatter flat per-instance values into a (num_imgs, max_len, ...)
+    array."""
+    padded = np.full(
+        (num_imgs, max_len) + values.shape[1:], fill, dtype=values.dtype)
+    padded[img_inds, ranks] = values
+    return padded
+
+
+def tpfp_default_batched(cls_dets,
+                         cls_gts,
+                         cls_gts_ignore,
+                         iou_thr=0.5,
+                         area_ranges=None,
+                         use_legacy_coordinate=False,
+                         chunk_size=256):
+    """Check true/false positives of all images of a class at once.
+
+    This computes the same tp/fp as calling :func:`tpfp_default` on each
+    image, but the images are padded into batches, the ious of a batch are
+    computed in one broadcasted pass and the greedy matching loops over the
+    detection ranks instead of over every detection.
+
+    Args:
+        cls_dets (list[ndarray]): Detected bboxes of each image, each of
+            shape (m, 5).
+        cls_gts (list[ndarray]): GT bboxes of each image, each of shape
+            (n, 4).
+        cls_gts_ignore (list[ndarray]): Ignored gt bboxes of each image, each
+            of shape (k, 4).
+        iou_thr (float): IoU threshold to be considered as matched.
+            Default: 0.5.
+        area_ranges (list[tuple] | None): Range of bbox areas to be
+            evaluated, in the format [(min1, max1), (min2, max2), ...].
+            Default: None.
+        use_legacy_coordinate (bool): Whether to use coordinate system in
+            mmdet v1.x. Default: False.
+        chunk_size (int): Number of images padded into one batch, which
+            bounds the memory of the iou matrices. Default: 256.
+
+    Returns:
+        tuple[np.ndarray]: (tp, fp) whose elements are 0 and 1. The shape of
+        each array is (num_scales, total_dets), with detections ordered as in
+        ``np.vstack(cls_dets)``.
+    """
+    extra_length = 1. if use_legacy_coordinate else 0.
+    if area_ranges is None:
+        area_ranges = [(None, None)]
+    num_scales = len(area_ranges)
+    det_counts = np.array([det.shape[0] for det in cls_dets], dtype=np.int64)
+    det_offsets = np.concatenate(([0], np.cumsum(det_counts)))
+    tp = np.zeros((num_scales, det_offsets[-1]), dtype=np.float32)
+    fp = np.zeros((num_scales, det_offsets[-1]), dtype=np.float32)
+
+    for start in range(0, len(cls_dets), chunk_size):
+        end = min(start + chunk_size, len(cls_dets))
+        num_dets = det_offsets[end] - det_offsets[start]
+        if num_dets == 0:
+            continue
+        num_imgs = end - start
+        counts = det_counts[start:end]
+        dets = np.vstack(cls_dets[start:end])
+        det_imgs = np.repeat(np.arange(num_imgs), counts)
+        # sort the dets of each image in descending order by scores, with
+        # the same sort as tpfp_default so that ties are broken identically
+        chunk_offsets = det_offsets[start:end] - det_offsets[start]
+        order = np.concatenate([
+            np.argsort(-det[:, -1]) + offset
+            for det, offset in zip(cls_dets[start:end], chunk_offsets)
+        ])
+        det_ranks = np.arange(num_dets) - np.repeat(chunk_offsets, counts)
+        max_dets = counts.max()
+        det_pad = _pad_by_image(dets[order, :4], det_imgs[order], det_ranks,
+                                num_imgs, max_dets)
+        det_valid = _pad_by_image(
+            np.ones(num_dets, dtype=bool), det_imgs[order], det_ranks,
+            num_imgs, max_dets, False)
+
+        # stack gt_bboxes and gt_bboxes_ignore for convenience, padded gts
+        # are marked as ignored and never overlap with any det
+        gts = [
+            np.vstack((gt, gt_ignore)) for gt, gt_ignore in zip(
+                cls_gts[start:end], cls_gts_ignore[start:end])
+        ]
+        gt_counts = np.array([gt.shape[0] for gt in gts], dtype=np.int64)
+        max_gts = max(gt_counts.max(), 1)
+        gt_imgs = np.repeat(np.arange(num_imgs), gt_counts)
+        gt_ranks = np.arange(gt_counts.sum()) - np.repeat(
+            np.cumsum(gt_counts) - gt_counts, gt_counts)
+        gt_pad = _pad_by_image(
+            np.vstack(gts).reshape(-1, 4), gt_imgs, gt_ranks, num_imgs,
+            max_gts)
+        gt_ignore_inds = _pad_by_image(
+            np.concatenate([
+                np.arange(gt.shape[0]) >= gt_cls.shape[0]
+                for gt, gt_cls in zip(gts, cls_gts[start:end])
+            ]).astype(bool), gt_imgs, gt_ranks, num_imgs, max_gts, True)
+        gt_valid = _pad_by_image(
+            np.ones(gt_ranks.shape[0], dtype=bool), gt_imgs, gt_ranks,
+            num_imgs, max_gts, False)
+
+        ious = _batched_bbox_overlaps(det_pad, gt_pad, extra_length)
+        ious = np.where(gt_valid[:, None, :], ious, -1)
+        # for each det, the max iou with all gts
+        ious_max = ious.max(axis=2)
+        # for each det, which gt overlaps most with it
+        ious_argmax = ious.argmax(axis=2)
+        matched = det_valid & (ious_max >= iou_thr)
+        det_areas = (det_pad[..., 2] - det_pad[..., 0] + extra_length) * (
+            det_pad[..., 3] - det_pad[..., 1] + extra_length)
+        gt_areas = (gt_pad[..., 2] - gt_pad[..., 0] + extra_length) * (
+            gt_pad[..., 3] - gt_pad[..., 1] + extra_length)
+        img_inds = np.arange(num_imgs)
+        for k, (min_area, max_area) in enumerate(area_ranges):
+            if min_area is None:
+                gt_area_ignore = np.zeros_like(gt_ignore_inds)
+                det_in_range = det_valid
+            else:
+                gt_area_ignore = (gt_areas < min_area) | (gt_areas >= max_area)
+                det_in_range = det_valid & (det_areas >= min_area) & (
+                    det_areas < max_area)
+            gt_skip = gt_ignore_inds | gt_area_ignore
+            # dets matched to ignored gts are neither tp nor fp
+            hit = matched & ~np.take_along_axis(gt_skip, ious_argmax, axis=1)
+            gt_covered = np.zeros((num_imgs, max_gts), dtype=bool)
+            tp_pad = np.zeros((num_imgs, max_dets), dtype=bool)
+            for rank in range(max_dets):
+                hit_rank = hit[:, rank]
+                matched_gt = ious_argmax[:, rank]
+                tp_rank = hit_rank & ~gt_covered[img_inds, matched_gt]
+                tp_pad[:, rank] = tp_rank
+                gt_covered[img_inds[tp_rank], matched_gt[tp_rank]] = True
+            fp_pad = (hit & ~tp_pad) | (~matched & det_in_range)
+            flat_inds = det_offsets[start] + order
+            tp[k, flat_inds] = tp_pad[det_imgs[order], det_ranks]
+            fp[k, flat_inds] = fp_pad[det_imgs[order], det_ranks]
+    return tp, fp
+
+
+def _dump_eval_arrays(det_results, annotations, data_dir):
+    """Flatten the results and annotations of all classes into a few
+    contiguous arrays saved in ``data_dir``, to be memory-mapped by the
+    evaluation workers instead of pickled to each of them."""
+    if isinstance(det_results, DetResults):
+        arrays = dict(
+            det_bboxes=np.concatenate(
+                [det_results.bboxes, det_results.scores[:, None]], axis=1),
+            det_imgs=det_results.img_inds,
+            det_labels=det_results.labels)
+    else:
+        num_classes = len(det_results[0])
+        det_counts = np.array([[len(dets) for dets in img_res]
+                               for img_res in det_results],
+                              dtype=np.int64).reshape(-1, num_classes)
+        arrays = dict(
+            det_bboxes=np.vstack([
+                np.asarray(dets, dtype=np.float32).reshape(-1, 5)
+                for img_res in det_results for dets in img_res
+            ]),
+            det_imgs=np.repeat(np.arange(len(det_results)), det_counts.sum(1)),
+            det_labels=np.concatenate([
+                np.repeat(np.arange(num_classes), counts)
+                for counts in det_counts
+            ]).astype(np.int64))
+    arrays.update(
+        gt_bboxes=np.vstack(
+            [np.empty((0, 4), dtype=np.float32)] +
+            [ann['bboxes'].reshape(-1, 4) for ann in annotations]),
+        gt_imgs=np.repeat(
+            np.arange(len(annotations)),
+            [ann['labels'].shape[0] for ann in annotations]),
+        gt_labels=np.concatenate([np.empty(0, dtype=np.int64)] +
+                                 [ann['labels'] for ann in annotations]),
+        gt_bboxes_ignore=np.vstack([np.empty((0, 4), dtype=np.float32)] + [
+            ann['bboxes_ignore'].reshape(-1, 4) for ann in annotations
+            if ann.get('labels_ignore', None) is not None
+        ]),
+        gt_imgs_ignore=np.repeat(
+            np.arange(len(annotations)), [
+                ann['labels_ignore'].shape[0] if ann.get(
+                    'labels_ignore', None) is not None else 0
+                for ann in annotations
+            ]),
+        gt_labels_ignore=np.concatenate([np.empty(0, dtype=np.int64)] + [
+            ann['labels_ignore'] for ann in annotations
+            if ann.get('labels_ignore', None) is not None
+        ]))
+    for name, array in arrays.items():
+        np.save(osp.join(data_dir, f'{name}.npy'), array)
+
+
+def _split_by_image(bboxes, img_inds, num_imgs):
+    counts = np.bincount(img_inds, minlength=num_imgs)
+    return np.split(np.asarray(bboxes), np.cumsum(counts)[:-1])
+
+
+def _tpfp_default_mmap_worker(data_dir, class_id, num_imgs, iou_thr,
+                              area_ranges, use_legacy_coordinate):
+    """Compute tp/fp of one class from the arrays dumped by
+    :func:`_dump_eval_arrays`."""
+    arrays = {
+        name: np.load(osp.join(data_dir, f'{name}.npy'), mmap_mode='r')
+        for name in [
+            'det_bboxes', 'det_imgs', 'det_labels', 'gt_bboxes', 'gt_imgs',
+            'gt_labels', 'gt_bboxes_ignore', 'gt_imgs_ignore',
+            'gt_labels_ignore'
+        ]
+    }
+    cls_inputs = []
+    for prefix, suffix in [('det', ''), ('gt', ''), ('gt', '_ignore')]:
+        keep = arrays[f'{prefix}_labels{suffix}'] == class_id
+        bbox_key = 'det_bboxes' if prefix == 'det' else f'gt_bboxes{suffix}'
+        cls_inputs.append(
+            _split_by_image(arrays[bbox_key][keep],
+                            arrays[f'{prefix}_imgs{suffix}'][keep], num_imgs))
+    cls_dets, cls_gts, cls_gts_ignore = cls_inputs
+    return tpfp_default_batched(cls_dets, cls_gts, cls_gts_ignore, iou_thr,
+                                area_ranges, use_legacy_coordinate)
+
+
 def get_cls_results(det_results, annotations, class_id):
     """Get det results and gt information of a certain class.
 
     Args:
-        det_results (list[list]): Same as `eval_map()`.
+        det_results (list[list] | :obj:`DetResults`): Same as `eval_map()`.
         annotations (list[dict]): Same as `eval_map()`.
         class_id (int): ID of a specific class.
 
     Returns:
         tuple[list[np.ndarray]]: detected bboxes, gt bboxes, ignored gt bboxes
     """
-    cls_dets = [img_res[class_id] for img_res in det_results]
+    if isinstance(det_results, DetResults):
+        cls_dets = det_results.get_cls_dets(class_id)
+    else:
+        cls_dets = [img_res[class_id] for img_res in det_results]
     cls_gts = []
     cls_gts_ignore = []
     for ann in annotations:
@@ -522,6 +780,90 @@ def get_cls_group_ofs(annotations, class_id):
     return gt_group_ofs
 
 
+def _count_gts(cls_gts, area_ranges, extra_length=0.):
+    """Count the gts of a class in each scale range.
+
+    Ignored gts or gts beyond the specific scale are not counted.
+    """
+    num_scales = len(area_ranges) if area_ranges is not None else 1
+    num_gts = np.zeros(num_scales, dtype=int)
+    for bbox in cls_gts:
+        if area_ranges is None:
+            num_gts[0] += bbox.shape[0]
+        else:
+            gt_areas = (bbox[:, 2] - bbox[:, 0] + extra_length) * (
+                bbox[:, 3] - bbox[:, 1] + extra_length)
+            for k, (min_area, max_area) in enumerate(area_ranges):
+                num_gts[k] += np.sum((gt_areas >= min_area)
+                                     & (gt_areas < max_area))
+    return num_gts
+
+
+def _cls_eval_result(tp, fp, scores, num_gts, scale_ranges, dataset=None):
+    """Compute the recall, precision and AP of a class.
+
+    Args:
+        tp (ndarray): The true positive flags of the dets of all the images,
+            in the order of the images, has shape (num_scales, n).
+        fp (ndarray): The false positive flags of the dets, same shape as
+            ``tp``.
+        scores (ndarray): The scores of the dets, has shape (n, ).
+        num_gts (ndarray): The number of gts of each scale.
+        scale_ranges (list[tuple] | None): Range of scales.
+        dataset (str | None): Dataset name, 'voc07' uses the 11 points AP.
+
+    Returns:
+        dict: The evaluation result of the class.
+    """
+    # sort all det bboxes by score, also sort tp and fp
+    num_dets = scores.shape[0]
+    sort_inds = np.argsort(-scores)
+    tp = tp[:, sort_inds]
+    fp = fp[:, sort_inds]
+    # calculate recall and precision with tp and fp
+    tp = np.cumsum(tp, axis=1)
+    fp = np.cumsum(fp, axis=1)
+    eps = np.finfo(np.float32).eps
+    recalls = tp / np.maximum(num_gts[:, np.newaxis], eps)
+    precisions = tp / np.maximum((tp + fp), eps)
+    # calculate AP
+    if scale_ranges is None:
+        recalls = recalls[0, :]
+        precisions = precisions[0, :]
+        num_gts = num_gts.item()
+    mode = 'area' if dataset != 'voc07' else '11points'
+    ap = average_precision(recalls, precisions, mode)
+    return {
+        'num_gts': num_gts,
+        'num_dets': num_dets,
+        'recall': recalls,
+        'precision': precisions,
+        'ap': ap
+    }
+
+
+def _mean_ap(eval_results, scale_ranges):
+    """Average the AP of the classes with gts."""
+    if scale_ranges is not None:
+        # shape (num_classes, num_scales)
+        all_ap = np.vstack([cls_result['ap'] for cls_result in eval_results])
+        all_num_gts = np.vstack(
+            [cls_result['num_gts'] for cls_result in eval_results])
+        mean_ap = []
+        for i in range(len(scale_ranges)):
+            if np.any(all_num_gts[:, i] > 0):
+                mean_ap.append(all_ap[all_num_gts[:, i] > 0, i].mean())
+            else:
+                mean_ap.append(0.0)
+    else:
+        aps = []
+        for cls_result in eval_results:
+            if cls_result['num_gts'] > 0:
+                aps.append(cls_result['ap'])
+        mean_ap = np.array(aps).mean().item() if aps else 0.0
+    return mean_ap
+
+
 def eval_map(det_results,
              annotations,
              scale_ranges=None,
@@ -532,13 +874,16 @@ def eval_map(det_results,
              tpfp_fn=None,
              nproc=4,
              use_legacy_coordinate=False,
-             use_group_of=False):
+             use_group_of=False,
+             batched=False,
+             pool=None):
     """Evaluate mAP of a dataset.
 
     Args:
-        det_results (list[list]): [[cls1_det, cls2_det, ...], ...].
-            The outer list indicates images, and the inner list indicates
-            per-class detected bboxes.
+        det_results (list[list] | :obj:`DetResults`): [[cls1_det, cls2_det,
+            ...], ...]. The outer list indicates images, and the inner list
+            indicates per-class detected bboxes. The flat arrays of
+            :obj:`DetResults` are also accepted.
         annotations (list[dict]): Ground truth annotations where each item of
             the list indicates an image. Keys of annotations are:
 
@@ -572,6 +917,16 @@ def eval_map(det_results,
             Default: False.
         use_group_of (bool): Whether to use group of when calculate TP and FP,
             which only used in OpenImages evaluation. Default: False.
+        batched (bool): Whether to compute TP and FP of all images of a class
+            in one vectorized pass with :func:`tpfp_default_batched`. Only
+            supported for the default matching rule. When it is used with
+            multiple processes, the detections and annotations are saved
+            once to memory-mapped arrays and each process evaluates whole
+            classes. Default: False.
+        pool (:obj:`multiprocessing.pool.Pool` | None): A persistent pool to
+            run the evaluation in, e.g. one kept across epochs. It is not
+            closed by this function. If None, a pool of ``nproc`` processes
+            is created when needed. Default: None.
 
     Returns:
         tuple: (mAP, [dict, dict, ...])
@@ -583,25 +938,49 @@ def eval_map(det_results,
         extra_length = 1.
 
     num_imgs = len(det_results)
-    num_scales = len(scale_ranges) if scale_ranges is not None else 1
-    num_classes = len(det_results[0])  # positive class num
+    if isinstance(det_results, DetResults):
+        num_classes = det_results.num_classes
+    else:
+        num_classes = len(det_results[0])  # positive class num
     area_ranges = ([(rg[0]**2, rg[1]**2) for rg in scale_ranges]
                    if scale_ranges is not None else None)
 
+    if batched:
+        assert tpfp_fn in (None, tpfp_default) \
+            and dataset not in ['det', 'vid', 'oid_challenge', 'oid_v6'] \
+            and not use_group_of and ioa_thr is None, \
+            '`batched` only supports the matching rule of `tpfp_default`'
+
     # There is no need to use multi processes to process
-    # when num_imgs = 1 .
-    if num_imgs > 1:
+    # when num_imgs = 1 (or a single class in batched mode).
+    if batched:
+        use_pool = pool is not None or (nproc > 1 and num_classes > 1)
+    else:
+        use_pool = num_imgs > 1
+    close_pool = use_pool and pool is None
+    if close_pool:
         assert nproc > 0, 'nproc must be at least one.'
-        nproc = min(nproc, num_imgs)
+        nproc = min(nproc, num_classes if batched else num_imgs)
         pool = Pool(nproc)
 
+    batched_tpfp = None
+    if batched and use_pool:
+        with tempfile.TemporaryDirectory() as data_dir:
+            _dump_eval_arrays(det_results, annotations, data_dir)
+            batched_tpfp = pool.starmap(_tpfp_default_mmap_worker,
+                                        [(data_dir, i, num_imgs, iou_thr,
+                                          area_ranges, use_legacy_coordinate)
+                                         for i in range(num_classes)])
+
     eval_results = []
     for i in range(num_classes):
         # get gt and det bboxes of this class
         cls_dets, cls_gts, cls_gts_ignore = get_cls_results(
             det_results, annotations, i)
         # choose proper function according to datasets to compute tp and fp
-        if tpfp_fn is None:
+        if batched:
+            tpfp_fn = tpfp_default
+        elif tpfp_fn is None:
             if dataset in ['det', 'vid']:
                 tpfp_fn = tpfp_imagenet
             elif dataset in ['oid_challenge', 'oid_v6'] \
@@ -613,7 +992,16 @@ def eval_map(det_results,
             raise ValueError(
                 f'tpfp_fn has to be a function or None, but got {tpfp_fn}')
 
-        if num_imgs > 1:
+        if batched:
+            if batched_tpfp is not None:
+                tp, fp = batched_tpfp[i]
+            else:
+                tp, fp = tpfp_default_batched(cls_dets, cls_gts,
+                                              cls_gts_ignore, iou_thr,
+                                              area_ranges,
+                                              use_legacy_coordinate)
+            tpfp = [(tp, fp)]
+        elif num_imgs > 1:
             # compute tp and fp for each image with multiple processes
             args = []
             if use_group_of:
@@ -648,65 +1036,17 @@ def eval_map(det_results,
             tp, fp, cls_dets = tuple(zip(*tpfp))
         else:
             tp, fp = tuple(zip(*tpfp))
-        # calculate gt number of each scale
-        # ignored gts or gts beyond the specific scale are not counted
-        num_gts = np.zeros(num_scales, dtype=int)
-        for j, bbox in enumerate(cls_gts):
-            if area_ranges is None:
-                num_gts[0] += bbox.shape[0]
-            else:
-                gt_areas = (bbox[:, 2] - bbox[:, 0] + extra_length) * (
-                    bbox[:, 3] - bbox[:, 1] + extra_length)
-                for k, (min_area, max_area) in enumerate(area_ranges):
-                    num_gts[k] += np.sum((gt_areas >= min_area)
-                                         & (gt_areas < max_area))
-        # sort all det bboxes by score, also sort tp and fp
+        num_gts = _count_gts(cls_gts, area_ranges, extra_length)
         cls_dets = np.vstack(cls_dets)
-        num_dets = cls_dets.shape[0]
-        sort_inds = np.argsort(-cls_dets[:, -1])
-        tp = np.hstack(tp)[:, sort_inds]
-        fp = np.hstack(fp)[:, sort_inds]
-        # calculate recall and precision with tp and fp
-        tp = np.cumsum(tp, axis=1)
-        fp = np.cumsum(fp, axis=1)
-        eps = np.finfo(np.float32).eps
-        recalls = tp / np.maximum(num_gts[:, np.newaxis], eps)
-        precisions = tp / np.maximum((tp + fp), eps)
-        # calculate AP
-        if scale_ranges is None:
-            recalls = recalls[0, :]
-            precisions = precisions[0, :]
-            num_gts = num_gts.item()
-        mode = 'area' if dataset != 'voc07' else '11points'
-        ap = average_precision(recalls, precisions, mode)
-        eval_results.append({
-            'num_gts': num_gts,
-            'num_dets': num_dets,
-            'recall': recalls,
-            'precision': precisions,
-            'ap': ap
-        })
-
-    if num_imgs > 1:
+        eval_results.append(
+            _cls_eval_result(
+                np.hstack(tp), np.hstack(fp), cls_dets[:, -1], num_gts,
+                scale_ranges, dataset))
+
+    if close_pool:
         pool.close()
 
-    if scale_ranges is not None:
-        # shape (num_classes, num_scales)
-        all_ap = np.vstack([cls_result['ap'] for cls_result in eval_results])
-        all_num_gts = np.vstack(
-            [cls_result['num_gts'] for cls_result in eval_results])
-        mean_ap = []
-        for i in range(num_scales):
-            if np.any(all_num_gts[:, i] > 0):
-                mean_ap.append(all_ap[all_num_gts[:, i] > 0, i].mean())
-            else:
-                mean_ap.append(0.0)
-    else:
-        aps = []
-        for cls_result in eval_results:
-            if cls_result['num_gts'] > 0:
-                aps.append(cls_result['ap'])
-        mean_ap = np.array(aps).mean().item() if aps else 0.0
+    mean_ap = _mean_ap(eval_results, scale_ranges)
 
     print_map_summary(
         mean_ap, eval_results, dataset, area_ranges, logger=logger)
@@ -0,0 +1,233 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import queue
+import threading
+from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
+
+import numpy as np
+from mmcv.utils import print_log
+
+from ..bbox import DetResults
+from .mean_ap import (_cls_eval_result, _count_gts, _mean_ap, get_cls_results,
+                      print_map_summary, tpfp_default)
+
+
+class OnlineEvaluator(metaclass=ABCMeta):
+    """Base class of the evaluators that evaluate results while testing.
+
+    The results of each batch are matched to the annotations as soon as they
+    arrive in :meth:`process` and only the statistics needed for the final
+    metrics are kept, so the results of the whole dataset do not have to be
+    held until the end of testing. With ``background=True``, the matching
+    runs in a background thread, which overlaps it with the inference of the
+    next batches.
+
+    Subclasses implement :meth:`process_results`, which returns the
+    statistics of a batch, and :meth:`compute_metrics`, which computes the
+    metrics from the statistics of all the batches.
+
+    Args:
+        background (bool): Whether to process the results in a background
+            thread. Default: False.
+        max_pending (int): Max number of batches waiting for the background
+            thread, :meth:`process` blocks when there are more. Default: 8.
+    """
+
+    def __init__(self, background=False, max_pending=8):
+        self.background = background
+        self.max_pending = max_pending
+        self._chunks = []
+        self._queue = None
+        self._thread = None
+        self._error = None
+
+    def process(self, results, indices):
+        """Process the results of a batch.
+
+        Args:
+            results (list | :obj:`DetResults`): The results of the batch.
+            indices (list[int]): The indices of the images of the results in
+                the dataset.
+        """
+        indices = list(indices)
+        assert len(results) == len(indices)
+        if not indices:
+            return
+        if not self.background:
+            self._chunks.append(
+                (indices, self.process_results(results, indices)))
+            return
+        if self._thread is None:
+            self._queue = queue.Queue(self.max_pending)
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+        self._queue.put((results, indices))
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                # drain the queue after an error, which is raised by wait()
+                continue
+            results, indices = item
+            try:
+                self._chunks.append(
+                    (indices, self.process_results(results, indices)))
+            except Exception as e:
+                self._error = e
+
+    def wait(self):
+        """Wait until all the processed results are matched."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def get_state(self):
+        """Get the statistics of the processed results, which can be sent to
+        another process and merged by :meth:`merge`."""
+        self.wait()
+        return self._chunks
+
+    def merge(self, states):
+        """Replace the statistics by the ones of all the given states, e.g.
+        the states of all the ranks in distributed testing."""
+        self.wait()
+        self._chunks = [chunk for state in states for chunk in state]
+
+    def evaluate(self, logger=None):
+        """Compute the metrics of all the processed results.
+
+        Args:
+            logger (logging.Logger | str | None): Logger used for printing
+                related information during evaluation. Default: None.
+
+        Returns:
+            dict[str, float]: The evaluation metrics.
+        """
+        self.wait()
+        return self.compute_metrics(self._chunks, logger=logger)
+
+    @abstractmethod
+    def process_results(self, results, indices):
+        """Compute the statistics of the results of a batch."""
+
+    @abstractmethod
+    def compute_metrics(self, chunks, logger=None):
+        """Compute the metrics from a list of ``(indices, statistics)``."""
+
+
+class OnlineMAPEvaluator(OnlineEvaluator):
+    """Evaluate mAP as :func:`eval_map` while testing.
+
+    Each image is matched by :func:`tpfp_default` once its results arrive
+    and only the tp, fp and scores of the dets and the number of gts are
+    kept. The AP computed from them is identical to the one of
+    :func:`eval_map`.
+
+    Args:
+        get_ann_info (callable): A function returning the annotation of an
+            image by its index in the dataset, see :func:`eval_map` for the
+            keys of the annotation.
+        iou_thrs (float | list[float]): IoU thresholds. Default: 0.5.
+        scale_ranges (list[tuple] | None): Range of scales to be evaluated.
+            Default: None.
+        dataset (list[str] | str | None): Dataset name or dataset classes,
+            same as :func:`eval_map`. Default: None.
+        use_legacy_coordinate (bool): Whether to use coordinate system in
+            mmdet v1.x. Default: False.
+        background (bool): Whether to process the results in a background
+            thread. Default: False.
+    """
+
+    def __init__(self,
+                 get_ann_info,
+                 iou_thrs=0.5,
+                 scale_ranges=None,
+                 dataset=None,
+                 use_legacy_coordinate=False,
+                 background=False):
+        super().__init__(background)
+        self.get_ann_info = get_ann_info
+        self.iou_thrs = [iou_thrs] if isinstance(iou_thrs,
+                                                 float) else list(iou_thrs)
+        self.scale_ranges = scale_ranges
+        self.area_ranges = ([(rg[0]**2, rg[1]**2) for rg in scale_ranges]
+                            if scale_ranges is not None else None)
+        self.dataset = dataset
+        self.use_legacy_coordinate = use_legacy_coordinate
+
+    def process_results(self, results, indices):
+        if isinstance(results, DetResults):
+            results = list(results)
+        extra_length = 1. if self.use_legacy_coordinate else 0.
+        img_inds, labels, scores, tps, fps, num_gts = [], [], [], [], [], 0
+        for result, idx in zip(results, indices):
+            if isinstance(result, tuple):
+                result = result[0]
+            ann = self.get_ann_info(idx)
+            img_num_gts = []
+            for i in range(len(result)):
+                cls_dets, cls_gts, cls_gts_ignore = get_cls_results([result],
+                                                                    [ann], i)
+                dets = cls_dets[0]
+                tpfp = [
+                    tpfp_default(dets, cls_gts[0], cls_gts_ignore[0], iou_thr,
+                                 self.area_ranges, self.use_legacy_coordinate)
+                    for iou_thr in self.iou_thrs
+                ]
+                tps.append(np.stack([tp for tp, _ in tpfp]))
+                fps.append(np.stack([fp for _, fp in tpfp]))
+                img_inds.append(np.full(len(dets), idx))
+                labels.append(np.full(len(dets), i))
+                scores.append(dets[:, -1])
+                img_num_gts.append(
+                    _count_gts(cls_gts, self.area_ranges, extra_length))
+            num_gts = num_gts + np.stack(img_num_gts)
+        return dict(
+            img_inds=np.concatenate(img_inds),
+            labels=np.concatenate(labels),
+            scores=np.concatenate(scores),
+            tp=np.concatenate(tps, axis=-1),
+            fp=np.concatenate(fps, axis=-1),
+            num_gts=num_gts)
+
+    def compute_metrics(self, chunks, logger=None):
+        stats = [stat for _, stat in chunks]
+        num_gts = sum(stat['num_gts'] for stat in stats)
+        # order the dets by image as eval_map does, so that the dets with
+        # the same score are sorted in the same way
+        img_inds = np.concatenate([stat['img_inds'] for stat in stats])
+        order = np.argsort(img_inds, kind='stable')
+        labels, scores, tp, fp = (
+            np.concatenate([stat[key] for stat in stats], axis=-1)[..., order]
+            for key in ('labels', 'scores', 'tp', 'fp'))
+
+        eval_results = OrderedDict()
+        mean_aps = []
+        for t, iou_thr in enumerate(self.iou_thrs):
+            print_log(f'\n{"-" * 15}iou_thr: {iou_thr}{"-" * 15}')
+            cls_results = []
+            for i in range(len(num_gts)):
+                keep = labels == i
+                cls_results.append(
+                    _cls_eval_result(tp[t][..., keep], fp[t][..., keep],
+                                     scores[keep], num_gts[i],
+                                     self.scale_ranges, self.dataset))
+            mean_ap = _mean_ap(cls_results, self.scale_ranges)
+            print_map_summary(
+                mean_ap,
+                cls_results,
+                self.dataset,
+                self.area_ranges,
+                logger=logger)
+            mean_aps.append(mean_ap)
+            eval_results[f'AP{int(iou_thr * 100):02d}'] = round(mean_ap, 3)
+        eval_results['mAP'] = sum(mean_aps) / len(mean_aps)
+        eval_results.move_to_end('mAP', last=False)
+        return eval_results
@@ -94,9 +94,17 @@ class DeployBaseDetector(BaseDetector):
 
 
 class ONNXRuntimeDetector(DeployBaseDetector):
-    """Wrapper for detector's inference with ONNXRuntime."""
+    """Wrapper for detector's inference with ONNXRuntime.
 
-    def __init__(self, onnx_file, class_names, device_id):
+    Args:
+        onnx_file (str): Path of the ONNX model.
+        class_names (list[str]): Names of the classes.
+        device_id (int): The id of the GPU device used if available.
+        num_threads (int, optional): Number of threads used to run the model
+            on CPU. Default: None, the setting of ONNXRuntime is used.
+    """
+
+    def __init__(self, onnx_file, class_names, device_id, num_threads=None):
         super(ONNXRuntimeDetector, self).__init__(class_names, device_id)
         import onnxruntime as ort
 
@@ -109,6 +117,8 @@ class ONNXRuntimeDetector(DeployBaseDetector):
             warnings.warn('If input model has custom op from mmcv, \
                 you may have to build mmcv with ONNXRuntime from source.')
         session_options = ort.SessionOptions()
+        if num_threads is not None:
+            session_options.intra_op_num_threads = num_threads
         # register custom op for onnxruntime
         if osp.exists(ort_custom_op_path):
             session_options.register_custom_ops_library(ort_custom_op_path)
@@ -3,6 +3,7 @@ from .checkloss_hook import CheckInvalidLossHook
 from .ema import ExpMomentumEMAHook, LinearMomentumEMAHook
 from .memory_profiler_hook import MemoryProfilerHook
 from .set_epoch_info_hook import SetEpochInfoHook
+from .span_profiler_hook import SpanProfilerHook
 from .sync_norm_hook import SyncNormHook
 from .sync_random_size_hook import SyncRandomSizeHook
 from .wandblogger_hook import MMDetWandbHook
@@ -13,5 +14,5 @@ __all__ = [
     'SyncRandomSizeHook', 'YOLOXModeSwitchHook', 'SyncNormHook',
     'ExpMomentumEMAHook', 'LinearMomentumEMAHook', 'YOLOXLrUpdaterHook',
     'CheckInvalidLossHook', 'SetEpochInfoHook', 'MemoryProfilerHook',
-    'MMDetWandbHook'
+    'MMDetWandbHook', 'SpanProfilerHook'
 ]
@@ -0,0 +1,71 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os.path as osp
+
+from mmcv.runner import get_dist_info
+from mmcv.runner.hooks import HOOKS, Hook
+
+from mmdet.utils import SpanProfiler
+
+
+@HOOKS.register_module()
+class SpanProfilerHook(Hook):
+    """Profile the named spans of mmdet, e.g. backbone, neck, head,
+    assigner, nms and pipeline, during training.
+
+    The spans are recorded by a :class:`SpanProfiler` started before the
+    run. Their summary is logged by ``runner.logger`` every ``interval``
+    iterations and at the end of the run, when the spans are also exported
+    as a Chrome trace JSON file. The pipeline spans are only recorded when
+    the data is loaded in the main process, i.e. ``workers_per_gpu=0``, the
+    spans in the DataLoader workers are skipped.
+
+    Args:
+        interval (int): Logging interval (every k iterations). Default: 50.
+        trace_file (str, optional): The Chrome trace JSON file exported at
+            the end of the run, relative to ``runner.work_dir``. The rank is
+            appended to the filename in distributed training. No trace is
+            exported if it is None. Default: 'span_trace.json'.
+        reset_after_log (bool): Whether to clear the recorded spans after
+            they are logged, so that each log only covers its interval.
+            Default: False.
+        max_events (int): Max number of spans kept for the trace.
+            Default: 1000000.
+        cuda_sync (bool): Whether to synchronize CUDA around the spans, see
+            :class:`SpanProfiler`. Default: False.
+    """
+
+    def __init__(self,
+                 interval=50,
+                 trace_file='span_trace.json',
+                 reset_after_log=False,
+                 max_events=1000000,
+                 cuda_sync=False):
+        self.interval = interval
+        self.trace_file = trace_file
+        self.reset_after_log = reset_after_log
+        self.profiler = SpanProfiler(
+            record_events=trace_file is not None,
+            max_events=max_events,
+            cuda_sync=cuda_sync)
+
+    def before_run(self, runner):
+        self.profiler.start()
+
+    def after_train_iter(self, runner):
+        if self.every_n_iters(runner, self.interval):
+            self.profiler.log_summary(logger=runner.logger)
+            if self.reset_after_log:
+                self.profiler.reset()
+
+    def after_run(self, runner):
+        self.profiler.stop()
+        self.profiler.log_summary(logger=runner.logger)
+        if self.trace_file is None:
+            return
+        filename = osp.join(runner.work_dir, self.trace_file)
+        rank, world_size = get_dist_info()
+        if world_size > 1:
+            root, ext = osp.splitext(filename)
+            filename = f'{root}_rank{rank}{ext}'
+        self.profiler.export_chrome_trace(filename)
+        runner.logger.info(f'The span trace is exported to {filename}')
@@ -3,8 +3,10 @@ import torch
 from mmcv.ops.nms import batched_nms
 
 from mmdet.core.bbox.iou_calculators import bbox_overlaps
+from mmdet.utils import profiled
 
 
+@profiled('nms')
 def multiclass_nms(multi_bboxes,
                    multi_scores,
                    score_thr,
@@ -0,0 +1,489 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""NMS operations implemented with NumPy only.
+
+The functions follow the semantics of the NMS ops of mmcv and the torch
+post-processing functions of mmdet, e.g. :func:`batched_nms` has the same
+behavior as ``mmcv.ops.batched_nms`` and :func:`multiclass_nms` has the
+same behavior as :func:`mmdet.core.multiclass_nms`, but take and return
+numpy arrays. They can be used to post-process the outputs of exported
+models on devices without torch or mmcv. This module only imports numpy, so
+it can also be copied or loaded from its path without importing mmdet.
+"""
+import numpy as np
+
+
+def _areas(bboxes, offset=0):
+    return (bboxes[:, 2] - bboxes[:, 0] + offset) * (
+        bboxes[:, 3] - bboxes[:, 1] + offset)
+
+
+def _ious(bbox, area, bboxes, areas, offset=0):
+    """IoUs between a bbox and bboxes, in the precision of the inputs."""
+    w = np.maximum(
+        np.minimum(bbox[2], bboxes[:, 2]) - np.maximum(bbox[0], bboxes[:, 0]) +
+        offset, 0)
+    h = np.maximum(
+        np.minimum(bbox[3], bboxes[:, 3]) - np.maximum(bbox[1], bboxes[:, 1]) +
+        offset, 0)
+    inter = w * h
+    return inter / (area + areas - inter)
+
+
+def _greedy_nms(boxes, iou_threshold, offset=0, max_num=-1, block_size=64):
+    """Greedy NMS of boxes sorted by scores, returns the kept indices.
+
+    The IoUs are computed for blocks of ``block_size`` boxes against the
+    boxes after them which are not suppressed yet, so only the loop over the
+    boxes of a block runs in Python.
+    """
+    areas = _areas(boxes, offset)
+    iou_threshold = np.float32(iou_threshold)
+    suppressed = np.zeros(len(boxes), dtype=bool)
+    keep = []
+    for start in range(0, len(boxes), block_size):
+        cols = start + np.flatnonzero(~suppressed[start:])
+        num_rows = np.searchsorted(cols, start + block_size)
+        if num_rows == 0:
+            continue
+        col_boxes, col_areas = boxes[cols], areas[cols]
+        row_boxes, row_areas = col_boxes[:num_rows, None], col_areas[:num_rows]
+        w = np.maximum(
+            np.minimum(row_boxes[..., 2], col_boxes[:, 2]) -
+            np.maximum(row_boxes[..., 0], col_boxes[:, 0]) + offset, 0)
+        h = np.maximum(
+            np.minimum(row_boxes[..., 3], col_boxes[:, 3]) -
+            np.maximum(row_boxes[..., 1], col_boxes[:, 1]) + offset, 0)
+        inter = w * h
+        ious = inter / (row_areas[:, None] + col_areas - inter)
+        # a box can only be suppressed by the boxes before it
+        suppress = np.triu(ious > iou_threshold, 1)
+        for row, i in enumerate(cols[:num_rows]):
+            if suppressed[i]:
+                continue
+            keep.append(i)
+            if len(keep) == max_num:
+                return np.array(keep, dtype=np.int64)
+            suppressed[cols[suppress[row]]] = True
+    return np.array(keep, dtype=np.int64)
+
+
+def nms(boxes, scores, iou_threshold, offset=0, score_threshold=0, max_num=-1):
+    """Greedy NMS, the same as ``mmcv.ops.nms`` on CPU.
+
+    Args:
+        boxes (np.ndarray): Boxes in shape (N, 4).
+        scores (np.ndarray): Scores in shape (N, ).
+        iou_threshold (float): Boxes with IoUs higher than it with a box of
+            higher score are suppressed.
+        offset (int, 0 or 1): Boxes' width or height is (x2 - x1 + offset).
+            Default: 0.
+        score_threshold (float): Boxes with scores not higher than it are
+            removed before NMS if it is positive. Default: 0.
+        max_num (int): Maximum number of boxes after NMS. Default: -1, which
+            means no limit.
+
+    Returns:
+        tuple[np.ndarray]: Kept dets (boxes and scores) in shape (K, 5) and
+            their indices in shape (K, ), in descending order of scores.
+    """
+    assert boxes.shape[1] == 4 and boxes.shape[0] == scores.shape[0]
+    assert offset in (0, 1)
+    boxes = np.asarray(boxes, dtype=np.float32)
+    scores = np.asarray(scores, dtype=np.float32)
+    valid_inds = np.arange(len(scores))
+    if score_threshold > 0:
+        valid_inds = np.flatnonzero(scores > score_threshold)
+    order = np.argsort(-scores[valid_inds], kind='stable')
+    sorted_boxes = boxes[valid_inds[order]]
+    keep = order[_greedy_nms(sorted_boxes, iou_threshold, offset, max_num)]
+    inds = valid_inds[keep]
+    dets = np.concatenate([boxes[inds], scores[inds, None]], axis=1)
+    return dets, inds
+
+
+def soft_nms(boxes,
+             scores,
+             iou_threshold=0.3,
+             sigma=0.5,
+             min_score=1e-3,
+             method='linear',
+             offset=0):
+    """Soft NMS, the same as ``mmcv.ops.soft_nms``.
+
+    Args:
+        boxes (np.ndarray): Boxes in shape (N, 4).
+        scores (np.ndarray): Scores in shape (N, ).
+        iou_threshold (float): IoU threshold for the 'naive' and 'linear'
+            methods. Default: 0.3.
+        sigma (float): Hyperparameter of the 'gaussian' method.
+            Default: 0.5.
+        min_score (float): Boxes whose decayed scores are lower than it are
+            removed. Default: 1e-3.
+        method (str): 'naive', 'linear' or 'gaussian'. Default: 'linear'.
+        offset (int, 0 or 1): Boxes' width or height is (x2 - x1 + offset).
+            Default: 0.
+
+    Returns:
+        tuple[np.ndarray]: Kept dets (boxes and decayed scores) in shape
+            (K, 5) and their indices in shape (K, ).
+    """
+    assert boxes.shape[1] == 4 and boxes.shape[0] == scores.shape[0]
+    assert offset in (0, 1)
+    assert method in ('naive', 'linear', 'gaussian')
+    # columns of x1, y1, x2, y2, score, area, the rows are reordered in the
+    # same way as the loop of the CPU implementation of mmcv
+    data = np.empty((len(boxes), 6), dtype=np.float32)
+    data[:, :4] = boxes
+    data[:, 4] = scores
+    data[:, 5] = _areas(data, offset)
+    inds = np.arange(len(boxes))
+    dets = np.empty((len(boxes), 5), dtype=np.float32)
+    iou_threshold = np.float32(iou_threshold)
+    sigma = np.float32(sigma)
+    min_score = np.float32(min_score)
+
+    num_boxes = len(boxes)
+    i = 0
+    while i < num_boxes:
+        max_pos = i + int(np.argmax(data[i:num_boxes, 4]))
+        data[[i, max_pos]] = data[[max_pos, i]]
+        inds[[i, max_pos]] = inds[[max_pos, i]]
+        dets[i] = data[i, :5]
+
+        rest = data[i + 1:num_boxes]
+        ious = _ious(data[i], data[i, 5], rest, rest[:, 5], offset)
+        if method == 'naive':
+            weights = np.where(ious >= iou_threshold, np.float32(0),
+                               np.float32(1))
+        elif method == 'linear':
+            weights = np.where(ious >= iou_threshold, 1 - ious, np.float32(1))
+        else:
+            weights = np.exp(-(ious * ious) / sigma)
+        rest[:, 4] *= weights
+
+        discard = rest[:, 4] < min_score
+        num_discard = int(discard.sum())
+        if num_discard:
+            # mmcv fills each discarded slot with the last remaining box,
+            # i.e. the holes before the new end are filled by the kept boxes
+            # after it, from the last one
+            num_rest = len(rest) - num_discard
+            holes = np.flatnonzero(discard[:num_rest])
+            fillers = np.flatnonzero(~discard[num_rest:])[::-1] + num_rest
+            rest[holes] = rest[fillers]
+            rest_inds = inds[i + 1:num_boxes]
+            rest_inds[holes] = rest_inds[fillers]
+            num_boxes -= num_discard
+        i += 1
+    return dets[:num_boxes], inds[:num_boxes]
+
+
+_NMS_OPS = dict(nms=nms, soft_nms=soft_nms)
+
+
+def batched_nms(boxes, scores, idxs, nms_cfg, class_agnostic=False):
+    """Class-aware NMS, the same as ``mmcv.ops.batched_nms``.
+
+    Boxes of different ``idxs`` are shifted by offsets larger than the
+    maximal coordinate, so that they never overlap and a single NMS is
+    applied to all the boxes. If there are more than ``split_thr`` boxes,
+    NMS is applied to the boxes of each index separately.
+
+    Args:
+        boxes (np.ndarray): Boxes in shape (N, 4).
+        scores (np.ndarray): Scores in shape (N, ).
+        idxs (np.ndarray): Class indices of the boxes in shape (N, ).
+        nms_cfg (dict | None): Type ('nms' or 'soft_nms') and arguments of
+            the NMS op, and optionally ``class_agnostic`` and ``split_thr``
+            (default 10000). NMS is skipped if it is None.
+        class_agnostic (bool): If True, NMS is applied across the indices.
+            Default: False.
+
+    Returns:
+        tuple[np.ndarray]: Kept dets (boxes and scores) in shape (K, 5) and
+            their indices in shape (K, ).
+    """
+    boxes = np.asarray(boxes, dtype=np.float32)
+    scores = np.asarray(scores, dtype=np.float32)
+    if nms_cfg is None:
+        inds = np.argsort(-scores, kind='stable')
+        return np.concatenate([boxes[inds], scores[inds, None]], -1), inds
+
+    nms_cfg_ = nms_cfg.copy()
+    if 'iou_thr' in nms_cfg_:
+        nms_cfg_['iou_threshold'] = nms_cfg_.pop('iou_thr')
+    class_agnostic = nms_cfg_.pop('class_agnostic', class_agnostic)
+    nms_op = _NMS_OPS[nms_cfg_.pop('type', 'nms')]
+    split_thr = nms_cfg_.pop('split_thr', 10000)
+    if len(boxes) == 0:
+        return np.zeros((0, 5), dtype=np.float32), np.zeros(0, np.int64)
+    if class_agnostic:
+        boxes_for_nms = boxes
+    else:
+        offsets = idxs.astype(np.float32) * (boxes.max() + np.float32(1))
+        boxes_for_nms = boxes + offsets[:, None]
+
+    if len(boxes_for_nms) < split_thr:
+        dets, keep = nms_op(boxes_for_nms, scores, **nms_cfg_)
+        boxes = boxes[keep]
+        scores = dets[:, -1]
+    else:
+        max_num = nms_cfg_.pop('max_num', -1)
+        total_mask = np.zeros(len(scores), dtype=bool)
+        scores_after_nms = np.zeros_like(scores)
+        for idx in np.unique(idxs):
+            mask = np.flatnonzero(idxs == idx)
+            dets, keep = nms_op(boxes_for_nms[mask], scores[mask], **nms_cfg_)
+            total_mask[mask[keep]] = True
+            scores_after_nms[mask[keep]] = dets[:, -1]
+        keep = np.flatnonzero(total_mask)
+        inds = np.argsort(-scores_after_nms[keep], kind='stable')
+        keep = keep[inds]
+        boxes = boxes[keep]
+        scores = scores_after_nms[keep]
+        if max_num > 0:
+            keep = keep[:max_num]
+            boxes = boxes[:max_num]
+            scores = scores[:max_num]
+    return np.concatenate([boxes, scores[:, None]], -1), keep
+
+
+def multiclass_nms(multi_bboxes,
+                   multi_scores,
+                   score_thr,
+                   nms_cfg,
+                   max_num=-1,
+                   score_factors=None,
+                   return_inds=False):
+    """NMS for multi-class bboxes, the same as
+    :func:`mmdet.core.multiclass_nms`.
+
+    Args:
+        multi_bboxes (np.ndarray): shape (n, #class*4) or (n, 4)
+        multi_scores (np.ndarray): shape (n, #class), where the last column
+            contains scores of the background class, but this will be ignored.
+        score_thr (float): bbox threshold, bboxes with scores lower than it
+            will not be considered.
+        nms_cfg (dict): a dict that contains the arguments of nms operations
+        max_num (int, optional): if there are more than max_num bboxes after
+            NMS, only top max_num will be kept. Default to -1.
+        score_factors (np.ndarray, optional): The factors multiplied to scores
+            before applying NMS. Default to None.
+        return_inds (bool, optional): Whether return the indices of kept
+            bboxes. Default to False.
+
+    Returns:
+        tuple: (dets, labels, indices (optional)), arrays of shape (k, 5),
+            (k), and (k). Dets are boxes with scores. Labels are 0-based.
+    """
+    num_bboxes = multi_scores.shape[0]
+    num_classes = multi_scores.shape[1] - 1
+    # exclude background category
+    if multi_bboxes.shape[1] > 4:
+        bboxes = multi_bboxes.reshape(num_bboxes, -1, 4)
+    else:
+        bboxes = np.broadcast_to(multi_bboxes[:, None],
+                                 (num_bboxes, num_classes, 4))
+    scores = multi_scores[:, :-1]
+    labels = np.broadcast_to(np.arange(num_classes), scores.shape)
+
+    bboxes = bboxes.reshape(-1, 4)
+    scores = scores.reshape(-1)
+    labels = labels.reshape(-1)
+
+    # remove low scoring boxes
+    valid_mask = scores > score_thr
+    # multiply score_factor after threshold to preserve more bboxes, improve
+    # mAP by 1% for YOLOv3
+    if score_factors is not None:
+        scores = scores * np.repeat(score_factors.reshape(-1), num_classes)
+    inds = np.flatnonzero(valid_mask)
+    bboxes, scores, labels = bboxes[inds], scores[inds], labels[inds]
+
+    if bboxes.size == 0:
+        dets = np.concatenate([bboxes, scores[:, None]], -1)
+        if return_inds:
+            return dets, labels, inds
+        else:
+            return dets, labels
+
+    dets, keep = batched_nms(bboxes, scores, labels, nms_cfg)
+    if max_num > 0:
+        dets = dets[:max_num]
+        keep = keep[:max_num]
+
+    if return_inds:
+        return dets, labels[keep], inds[keep]
+    else:
+        return dets, labels[keep]
+
+
+def _pairwise_ious(bboxes, eps=1e-6):
+    """IoUs between the bboxes of each group, bboxes are in shape
+    (..., n, 4) and the IoUs are in shape (..., n, n)."""
+    areas = (bboxes[..., 2] - bboxes[..., 0]) * (
+        bboxes[..., 3] - bboxes[..., 1])
+    lt = np.maximum(bboxes[..., :, None, :2], bboxes[..., None, :, :2])
+    rb = np.minimum(bboxes[..., :, None, 2:], bboxes[..., None, :, 2:])
+    wh = np.maximum(rb - lt, 0)
+    overlap = wh[..., 0] * wh[..., 1]
+    union = areas[..., :, None] + areas[..., None, :] - overlap
+    return overlap / np.maximum(union, np.asarray(eps, union.dtype))
+
+
+def fast_nms(multi_bboxes,
+             multi_scores,
+             multi_coeffs,
+             score_thr,
+             iou_thr,
+             top_k,
+             max_num=-1):
+    """Fast NMS in `YOLACT <https://arxiv.org/abs/1904.02689>`_, the same as
+    :func:`mmdet.core.fast_nms`.
+
+    Args:
+        multi_bboxes (np.ndarray): shape (n, 4)
+        multi_scores (np.ndarray): shape (n, #class+1), where the last column
+            contains scores of the background class, but this will be ignored.
+        multi_coeffs (np.ndarray): shape (n, coeffs_dim).
+        score_thr (float): bbox threshold, bboxes with scores lower than it
+            will not be considered.
+        iou_thr (float): IoU threshold to be considered as conflicted.
+        top_k (int): if there are more than top_k bboxes before NMS,
+            only top top_k will be kept.
+        max_num (int): if there are more than max_num bboxes after NMS,
+            only top max_num will be kept. If -1, keep all the bboxes.
+            Default: -1.
+
+    Returns:
+        tuple: (dets, labels, coefficients), arrays of shape (k, 5), (k, ),
+            and (k, coeffs_dim). Dets are boxes with scores.
+            Labels are 0-based.
+    """
+    scores = multi_scores[:, :-1].T  # [#class, n]
+    idx = np.argsort(-scores, axis=1, kind='stable')[:, :top_k]
+    scores = np.take_along_axis(scores, idx, axis=1)  # [#class, topk]
+    num_classes, num_dets = idx.shape
+    boxes = multi_bboxes[idx.reshape(-1)].reshape(num_classes, num_dets, 4)
+    coeffs = multi_coeffs[idx.reshape(-1)].reshape(num_classes, num_dets, -1)
+
+    iou = np.triu(_pairwise_ious(boxes), k=1)  # [#class, topk, topk]
+    iou_max = iou.max(axis=1) if num_dets else np.zeros_like(scores)
+
+    # Now just filter out the ones higher than the threshold
+    keep = iou_max <= iou_thr
+    # Second thresholding introduces 0.2 mAP gain at negligible time cost
+    keep &= scores > score_thr
+
+    # Assign each kept detection to its corresponding class
+    classes = np.broadcast_to(np.arange(num_classes)[:, None], keep.shape)
+    classes = classes[keep]
+    boxes = boxes[keep]
+    coeffs = coeffs[keep]
+    scores = scores[keep]
+
+    # Only keep the top max_num highest scores across all classes
+    idx = np.argsort(-scores, kind='stable')
+    if max_num > 0:
+        idx = idx[:max_num]
+    cls_dets = np.concatenate([boxes[idx], scores[idx, None]], axis=1)
+    return cls_dets, classes[idx], coeffs[idx]
+
+
+def matrix_nms(bboxes_or_masks,
+               labels,
+               scores,
+               filter_thr=-1,
+               nms_pre=-1,
+               max_num=-1,
+               kernel='gaussian',
+               sigma=2.0,
+               mask_area=None):
+    """Matrix NMS of `SOLOv2 <https://arxiv.org/abs/2003.10152>`_.
+
+    It has the same semantics as :func:`mmdet.core.mask_matrix_nms`, and
+    also supports bboxes, whose IoUs are computed from the coordinates.
+
+    Args:
+        bboxes_or_masks (np.ndarray): Bboxes in shape (n, 4) or binary masks
+            in shape (n, h, w).
+        labels (np.ndarray): Labels of the instances, has shape (n, ).
+        scores (np.ndarray): Scores of the instances, has shape (n, ).
+        filter_thr (float): Score threshold to filter the instances after
+            matrix nms. Default: -1, which means do not use filter_thr.
+        nms_pre (int): The max number of instances to do the matrix nms.
+            Default: -1, which means do not use nms_pre.
+        max_num (int, optional): If there are more than max_num instances
+            after matrix nms, only top max_num will be kept. Default: -1,
+            which means do not use max_num.
+        kernel (str): 'linear' or 'gaussian'.
+        sigma (float): std in gaussian method.
+        mask_area (np.ndarray): The areas of masks, only used for masks.
+
+    Returns:
+        tuple(np.ndarray): Updated scores, labels, the kept bboxes or masks
+            and their indices in the inputs.
+    """
+    assert len(labels) == len(bboxes_or_masks) == len(scores)
+    is_mask = bboxes_or_masks.ndim == 3
+    if kernel not in ('gaussian', 'linear'):
+        raise NotImplementedError(
+            f'{kernel} kernel is not supported in matrix nms!')
+
+    def _empty():
+        return (np.zeros(0, dtype=np.float32), labels[:0], bboxes_or_masks[:0],
+                np.zeros(0, dtype=np.int64))
+
+    if len(labels) == 0:
+        return _empty()
+
+    # sort and keep top nms_pre
+    keep_inds = np.argsort(-scores, kind='stable')
+    if nms_pre > 0:
+        keep_inds = keep_inds[:nms_pre]
+    scores = scores[keep_inds].astype(np.float32)
+    labels = labels[keep_inds]
+    instances = bboxes_or_masks[keep_inds]
+
+    num_instances = len(labels)
+    if is_mask:
+        flatten_masks = instances.reshape(num_instances, -1).astype(np.float32)
+        if mask_area is None:
+            mask_area = flatten_masks.sum(1)
+        else:
+            assert len(mask_area) == len(bboxes_or_masks)
+            mask_area = mask_area[keep_inds].astype(np.float32)
+        inter_matrix = flatten_masks @ flatten_masks.T
+        iou_matrix = inter_matrix / (
+            mask_area[None, :] + mask_area[:, None] - inter_matrix)
+    else:
+        iou_matrix = _pairwise_ious(instances.astype(np.float32))
+    # upper triangle iou matrix of the instances of the same label
+    decay_iou = np.triu(iou_matrix * (labels[:, None] == labels[None, :]), 1)
+
+    # IoU compensation
+    compensate_iou = decay_iou.max(0)[:, None]
+    # Calculate the decay coefficient
+    if kernel == 'gaussian':
+        decay_matrix = np.exp(-1 * sigma * (decay_iou**2))
+        compensate_matrix = np.exp(-1 * sigma * (compensate_iou**2))
+        decay_coefficient = (decay_matrix / compensate_matrix).min(0)
+    else:
+        decay_matrix = (1 - decay_iou) / (1 - compensate_iou)
+        decay_coefficient = decay_matrix.min(0)
+    # update the score.
+    scores = (scores * decay_coefficient).astype(np.float32)
+
+    if filter_thr > 0:
+        keep = scores >= filter_thr
+        if not keep.any():
+            return _empty()
+        keep_inds, scores = keep_inds[keep], scores[keep]
+        labels, instances = labels[keep], instances[keep]
+
+    # sort and keep top max_num
+    sort_inds = np.argsort(-scores, kind='stable')
+    if max_num > 0:
+        sort_inds = sort_inds[:max_num]
+    return (scores[sort_inds], labels[sort_inds], instances[sort_inds],
+            keep_inds[sort_inds])
@@ -1,7 +1,10 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 from .coco_api import COCO, COCOeval
+from .coco_store import COCOStore, build_coco_store
+from .fast_coco_eval import FastCOCOeval
 from .panoptic_evaluation import pq_compute_multi_core, pq_compute_single_core
 
 __all__ = [
-    'COCO', 'COCOeval', 'pq_compute_multi_core', 'pq_compute_single_core'
+    'COCO', 'COCOeval', 'COCOStore', 'FastCOCOeval', 'build_coco_store',
+    'pq_compute_multi_core', 'pq_compute_single_core'
 ]
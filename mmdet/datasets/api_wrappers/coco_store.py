@@ -0,0 +1,420 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import json
+import os
+import os.path as osp
+from collections.abc import Mapping
+
+import numpy as np
+import pycocotools.mask as maskUtils
+from pycocotools.coco import COCO as _COCO
+
+STORE_VERSION = 1
+# the columns of the images and annotations, see `build_coco_store`
+_IMG_COLUMNS = ('img_ids', 'img_sizes', 'img_offsets', 'img_records')
+_ANN_COLUMNS = ('ann_ids', 'ann_image_ids', 'ann_cat_ids', 'ann_areas',
+                'ann_iscrowd', 'ann_offsets', 'ann_records')
+# the columns looked up by value, each has a stable argsort `{name}_order`
+# and the sorted values `{name}_sorted`
+_INDEXED_COLUMNS = ('img_ids', 'ann_ids', 'ann_image_ids', 'ann_cat_ids')
+
+
+def _is_array_like(obj):
+    return hasattr(obj, '__iter__') and hasattr(obj, '__len__')
+
+
+class _LazyMap(Mapping):
+    """A read-only mapping whose values are loaded when accessed.
+
+    Like the ``defaultdict`` of pycocotools, missing keys are mapped to
+    ``default()`` if it is given.
+    """
+
+    def __init__(self, keys, load, default=None):
+        self._keys = keys
+        self._load = load
+        self._default = default
+
+    def __getitem__(self, key):
+        if key not in self:
+            if self._default is None:
+                raise KeyError(key)
+            return self._default()
+        return self._load(key)
+
+    def __contains__(self, key):
+        try:
+            return key in self._keys
+        except TypeError:
+            return False
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class _UniqueIds:
+    """The unique values of an indexed column of a :class:`COCOStore`, in
+    ascending order, used as the keys of its mappings."""
+
+    def __init__(self, store, name):
+        sorted_values = store._open()[f'{name}_sorted']
+        unique = np.ones(len(sorted_values), dtype=bool)
+        unique[1:] = sorted_values[1:] != sorted_values[:-1]
+        self._values = sorted_values[unique]
+
+    def __contains__(self, key):
+        i = np.searchsorted(self._values, key)
+        return bool(i < len(self._values) and self._values[i] == key)
+
+    def __iter__(self):
+        return iter(self._values.tolist())
+
+    def __len__(self):
+        return len(self._values)
+
+
+class COCOStore:
+    """A read-only COCO api backed by a columnar, memory-mapped store.
+
+    The :class:`COCO` api keeps the whole annotation file as Python dicts and
+    indexes them eagerly, so each forked dataloader worker ends up with its
+    own copy of the dicts once their reference counts are touched. The store
+    is built once from the annotation file by :func:`build_coco_store`
+    instead, as a directory of:
+
+    - ``meta.json``: the categories and the other small fields.
+    - ``img_*.npy``: the ids and sizes of the images and their records.
+    - ``ann_*.npy``: the ids, image ids, category ids, areas and crowd flags
+      of the annotations and their records.
+    - ``*_order.npy`` and ``*_sorted.npy``: the indices of the ids, which
+      are looked up with binary search.
+
+    The records are the JSON-encoded dicts of the images and annotations,
+    decoded on demand. The files are opened lazily with ``np.load(...,
+    mmap_mode='r')`` in each process, so all the dataloader workers read
+    from the same pages of the OS page cache.
+
+    The store implements the part of the :class:`COCO` api used by the
+    datasets and by :class:`COCOeval`, e.g. ``get_ann_ids``, ``load_anns``
+    and ``loadRes``, and returns new dicts for each call. ``anns``, ``imgs``,
+    ``img_ann_map`` and ``cat_img_map`` are read-only mappings loaded on
+    access.
+
+    Args:
+        store_dir (str): Directory of the store.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(osp.join(store_dir, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f'{store_dir} is built by another version of '
+                             'build_coco_store, please build it again.')
+        self.info = meta['info']
+        self.categories = meta['categories']
+        self.cats = {cat['id']: cat for cat in self.categories}
+        self._arrays = None
+
+    def __getstate__(self):
+        # do not pickle the opened memmaps, e.g. when the dataset is sent to
+        # the dataloader workers, each process maps the files by itself.
+        state = self.__dict__.copy()
+        state['_arrays'] = None
+        return state
+
+    def _open(self):
+        if self._arrays is None:
+            names = _IMG_COLUMNS + _ANN_COLUMNS + tuple(
+                f'{name}_{suffix}' for name in _INDEXED_COLUMNS
+                for suffix in ('order', 'sorted'))
+            self._arrays = {
+                name: np.load(
+                    osp.join(self.store_dir, f'{name}.npy'), mmap_mode='r')
+                for name in names
+            }
+        return self._arrays
+
+    def _lookup(self, name, keys):
+        """Find the rows whose ``name`` column equals each of ``keys``.
+
+        Returns:
+            ndarray: The rows, grouped by the keys in the given order, the
+                rows of a key are in the order of the annotation file.
+        """
+        arrays = self._open()
+        sorted_values = arrays[f'{name}_sorted']
+        keys = np.asarray(keys, dtype=np.int64)
+        starts = np.searchsorted(sorted_values, keys, side='left')
+        counts = np.searchsorted(sorted_values, keys, side='right') - starts
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        return arrays[f'{name}_order'][offsets + np.arange(counts.sum())]
+
+    def _find(self, name, key):
+        """Find the last row whose ``name`` column equals ``key``, which is
+        the one kept by the dicts of :class:`COCO`."""
+        arrays = self._open()
+        end = np.searchsorted(arrays[f'{name}_sorted'], key, side='right')
+        if end == 0 or arrays[f'{name}_sorted'][end - 1] != key:
+            raise KeyError(key)
+        return int(arrays[f'{name}_order'][end - 1])
+
+    def _load_records(self, prefix, rows):
+        arrays = self._open()
+        offsets = arrays[f'{prefix}_offsets']
+        records = arrays[f'{prefix}_records']
+        return [
+            json.loads(records[offsets[row]:offsets[row + 1]].tobytes())
+            for row in rows
+        ]
+
+    def _img_size(self, img_id):
+        height, width = self._open()['img_sizes'][self._find(
+            'img_ids', img_id)]
+        return int(height), int(width)
+
+    def _cat_img_ids(self, cat_id):
+        rows = self._lookup('ann_cat_ids', [cat_id])
+        return self._open()['ann_image_ids'][rows].tolist()
+
+    def _img_anns(self, img_id):
+        rows = self._lookup('ann_image_ids', [img_id])
+        return self._load_records('ann', rows)
+
+    @property
+    def anns(self):
+        return _LazyMap(
+            _UniqueIds(self, 'ann_ids'),
+            lambda ann_id: self.loadAnns(ann_id)[0])
+
+    @property
+    def imgs(self):
+        return _LazyMap(
+            _UniqueIds(self, 'img_ids'),
+            lambda img_id: self.loadImgs(img_id)[0])
+
+    @property
+    def img_ann_map(self):
+        return _LazyMap(
+            _UniqueIds(self, 'ann_image_ids'), self._img_anns, default=list)
+
+    @property
+    def cat_img_map(self):
+        return _LazyMap(
+            _UniqueIds(self, 'ann_cat_ids'), self._cat_img_ids, default=list)
+
+    imgToAnns = img_ann_map
+    catToImgs = cat_img_map
+
+    def get_img_ids_with_anns(self):
+        """Get the ids of the images with annotations from the image ids of
+        the annotations, without decoding the annotations.
+
+        Returns:
+            set[int]: The ids of the images.
+        """
+        return set(_UniqueIds(self, 'ann_image_ids'))
+
+    def get_img_cat_ids(self, img_ids):
+        """Get the category ids of the annotations of images from the
+        columns, without decoding the annotations.
+
+        Args:
+            img_ids (list[int]): The ids of the images.
+
+        Returns:
+            tuple[ndarray]: The index in ``img_ids`` of the image of each
+                annotation and its category id, grouped by the images.
+        """
+        arrays = self._open()
+        sorted_values = arrays['ann_image_ids_sorted']
+        img_ids = np.asarray(img_ids, dtype=np.int64)
+        counts = np.searchsorted(
+            sorted_values, img_ids, side='right') - np.searchsorted(
+                sorted_values, img_ids, side='left')
+        img_inds = np.repeat(np.arange(len(img_ids)), counts)
+        rows = self._lookup('ann_image_ids', img_ids)
+        return img_inds, arrays['ann_cat_ids'][rows]
+
+    def getAnnIds(self, imgIds=[], catIds=[], areaRng=[], iscrowd=None):
+        """Get the ids of the annotations satisfying all the given
+        conditions, see :meth:`COCO.getAnnIds`."""
+        imgIds = imgIds if _is_array_like(imgIds) else [imgIds]
+        catIds = catIds if _is_array_like(catIds) else [catIds]
+        arrays = self._open()
+        if len(imgIds) == 0:
+            rows = np.arange(len(arrays['ann_ids']))
+        else:
+            rows = self._lookup('ann_image_ids', imgIds)
+        if len(catIds) > 0:
+            rows = rows[np.isin(arrays['ann_cat_ids'][rows], catIds)]
+        if len(areaRng) > 0:
+            areas = arrays['ann_areas'][rows]
+            rows = rows[(areas > areaRng[0]) & (areas < areaRng[1])]
+        if iscrowd is not None:
+            rows = rows[arrays['ann_iscrowd'][rows] == iscrowd]
+        return arrays['ann_ids'][rows].tolist()
+
+    def getCatIds(self, catNms=[], supNms=[], catIds=[]):
+        """Get the ids of the categories satisfying all the given
+        conditions, see :meth:`COCO.getCatIds`."""
+        catNms = catNms if _is_array_like(catNms) else [catNms]
+        supNms = supNms if _is_array_like(supNms) else [supNms]
+        catIds = catIds if _is_array_like(catIds) else [catIds]
+        cats = self.categories
+        if len(catNms) > 0:
+            cats = [cat for cat in cats if cat['name'] in catNms]
+        if len(supNms) > 0:
+            cats = [cat for cat in cats if cat['supercategory'] in supNms]
+        if len(catIds) > 0:
+            cats = [cat for cat in cats if cat['id'] in catIds]
+        return [cat['id'] for cat in cats]
+
+    def getImgIds(self, imgIds=[], catIds=[]):
+        """Get the ids of the images satisfying all the given conditions,
+        see :meth:`COCO.getImgIds`."""
+        imgIds = imgIds if _is_array_like(imgIds) else [imgIds]
+        catIds = catIds if _is_array_like(catIds) else [catIds]
+        if len(imgIds) == len(catIds) == 0:
+            return self._open()['img_ids'].tolist()
+        ids = set(imgIds)
+        for i, catId in enumerate(catIds):
+            if i == 0 and len(ids) == 0:
+                ids = set(self._cat_img_ids(catId))
+            else:
+                ids &= set(self._cat_img_ids(catId))
+        return list(ids)
+
+    def loadAnns(self, ids=[]):
+        """Load the annotations with the given ids."""
+        ids = ids if _is_array_like(ids) else [ids]
+        return self._load_records('ann',
+                                  [self._find('ann_ids', id) for id in ids])
+
+    def loadCats(self, ids=[]):
+        """Load the categories with the given ids."""
+        ids = ids if _is_array_like(ids) else [ids]
+        return [self.cats[id] for id in ids]
+
+    def loadImgs(self, ids=[]):
+        """Load the images with the given ids."""
+        ids = ids if _is_array_like(ids) else [ids]
+        return self._load_records('img',
+                                  [self._find('img_ids', id) for id in ids])
+
+    # snake case aliases, as in `COCO`
+    def get_ann_ids(self, img_ids=[], cat_ids=[], area_rng=[], iscrowd=None):
+        return self.getAnnIds(img_ids, cat_ids, area_rng, iscrowd)
+
+    def get_cat_ids(self, cat_names=[], sup_names=[], cat_ids=[]):
+        return self.getCatIds(cat_names, sup_names, cat_ids)
+
+    def get_img_ids(self, img_ids=[], cat_ids=[]):
+        return self.getImgIds(img_ids, cat_ids)
+
+    def load_anns(self, ids):
+        return self.loadAnns(ids)
+
+    def load_cats(self, ids):
+        return self.loadCats(ids)
+
+    def load_imgs(self, ids):
+        return self.loadImgs(ids)
+
+    def annToRLE(self, ann):
+        """Convert the segmentation of an annotation to RLE, see
+        :meth:`COCO.annToRLE`."""
+        height, width = self._img_size(ann['image_id'])
+        segm = ann['segmentation']
+        if isinstance(segm, list):
+            # polygons of a single object
+            return maskUtils.merge(maskUtils.frPyObjects(segm, height, width))
+        if isinstance(segm['counts'], list):
+            # uncompressed RLE
+            return maskUtils.frPyObjects(segm, height, width)
+        return segm
+
+    def annToMask(self, ann):
+        """Convert the segmentation of an annotation to a binary mask."""
+        return maskUtils.decode(self.annToRLE(ann))
+
+    def loadRes(self, resFile):
+        """Load a result file as a :class:`COCO` api object, see
+        :meth:`COCO.loadRes`.
+
+        Only the images and categories of the store are loaded into the
+        result api object.
+        """
+        coco = _COCO()
+        coco.dataset = dict(
+            info=self.info,
+            images=self.loadImgs(self.getImgIds()),
+            categories=self.categories)
+        coco.createIndex()
+        return coco.loadRes(resFile)
+
+
+def _encode_records(records):
+    encoded = [
+        json.dumps(record, separators=(',', ':')).encode()
+        for record in records
+    ]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(record) for record in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def build_coco_store(ann_file, store_dir):
+    """Convert a COCO style annotation file into a :class:`COCOStore`.
+
+    The ids of the images, annotations and categories must be integers. As
+    in :class:`COCO`, images with the same id are merged into the last one.
+
+    Args:
+        ann_file (str): Path of the annotation file.
+        store_dir (str): Directory to write the store to.
+
+    Returns:
+        :obj:`COCOStore`: The store.
+    """
+    with open(ann_file, 'r') as f:
+        dataset = json.load(f)
+    os.makedirs(store_dir, exist_ok=True)
+    images = list({img['id']: img
+                   for img in dataset.get('images', [])}.values())
+    anns = dataset.get('annotations', [])
+
+    columns = dict(
+        img_ids=np.array([img['id'] for img in images], dtype=np.int64),
+        img_sizes=np.array([[img['height'], img['width']] for img in images],
+                           dtype=np.int64).reshape(-1, 2),
+        ann_ids=np.array([ann['id'] for ann in anns], dtype=np.int64),
+        ann_image_ids=np.array([ann['image_id'] for ann in anns],
+                               dtype=np.int64),
+        ann_cat_ids=np.array([ann['category_id'] for ann in anns],
+                             dtype=np.int64),
+        ann_areas=np.array([ann.get('area', np.nan) for ann in anns],
+                           dtype=np.float64),
+        ann_iscrowd=np.array([ann.get('iscrowd', 0) for ann in anns],
+                             dtype=np.int64))
+    columns['img_offsets'], columns['img_records'] = _encode_records(images)
+    columns['ann_offsets'], columns['ann_records'] = _encode_records(anns)
+    for name in _INDEXED_COLUMNS:
+        order = np.argsort(columns[name], kind='stable')
+        columns[f'{name}_order'] = order
+        columns[f'{name}_sorted'] = columns[name][order]
+    for name, column in columns.items():
+        np.save(osp.join(store_dir, f'{name}.npy'), column)
+
+    # the meta is written last, so a store with a meta.json is complete
+    meta = dict(
+        version=STORE_VERSION,
+        info=dataset.get('info', {}),
+        categories=dataset.get('categories', []))
+    tmp_file = osp.join(store_dir, 'meta.json.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_file, osp.join(store_dir, 'meta.json'))
+    return COCOStore(store_dir)
@@ -0,0 +1,386 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import copy
+import datetime
+import time
+
+import numpy as np
+from pycocotools import mask as maskUtils
+
+from .coco_api import COCOeval
+
+
+class FastCOCOeval(COCOeval):
+    """A vectorized drop-in replacement of ``COCOeval``.
+
+    ``evaluate`` and ``accumulate`` are re-implemented with NumPy over all
+    images and categories at once instead of looping over every image,
+    category and detection in Python. The matching follows
+    ``COCOeval.evaluateImg`` rule by rule (including tie-breaking), so
+    ``self.eval`` and the stats printed by ``summarize`` are identical to
+    the ones of pycocotools.
+
+    Differences to ``COCOeval``:
+
+    - The per-image results ``evalImgs`` and ``ious`` are not kept, the
+      matching results are stored as flat arrays instead.
+    - ``accumulate`` does not accept customized params.
+    - Keypoints evaluation falls back to the implementation of pycocotools.
+
+    Args:
+        cocoGt (COCO): COCO object with ground truth annotations.
+        cocoDt (COCO): COCO object with detection results.
+        iouType (str): 'segm', 'bbox' or 'keypoints'. Default: 'segm'.
+        max_elements (int): Upper bound of the number of elements of the
+            padded iou matrices processed at once. Default: 1 << 22.
+    """
+
+    def __init__(self,
+                 cocoGt=None,
+                 cocoDt=None,
+                 iouType='segm',
+                 max_elements=1 << 22):
+        super().__init__(cocoGt, cocoDt, iouType)
+        self.max_elements = max_elements
+        self._fast_results = None
+
+    def evaluate(self):
+        """Match detections to ground truths of all images and categories.
+
+        The results are stored in ``self._fast_results``.
+        """
+        p = self.params
+        if p.iouType == 'keypoints':
+            self._fast_results = None
+            return super().evaluate()
+        tic = time.time()
+        print('Running per image evaluation...')
+        # add backward compatibility if useSegm is specified in params
+        if p.useSegm is not None:
+            p.iouType = 'segm' if p.useSegm == 1 else 'bbox'
+            print('useSegm (deprecated) is not None. Running {} evaluation'.
+                  format(p.iouType))
+        print('Evaluate annotation type *{}*'.format(p.iouType))
+        p.imgIds = list(np.unique(p.imgIds))
+        if p.useCats:
+            p.catIds = list(np.unique(p.catIds))
+        p.maxDets = sorted(p.maxDets)
+        self.params = p
+
+        gts, dts = self._flatten_anns()
+        self._fast_results = self._match(gts, dts)
+        self.evalImgs = []
+        self._paramsEval = copy.deepcopy(self.params)
+        toc = time.time()
+        print('DONE (t={:0.2f}s).'.format(toc - tic))
+
+    def _match(self, gts, dts):
+        """Match the flattened dets to the gts of each group.
+
+        Returns:
+            dict: The matching results, with the gt and det arrays in the
+                order of :meth:`_flatten_anns`.
+        """
+        p = self.params
+        num_groups = (len(p.catIds) if p.useCats else 1) * len(p.imgIds)
+        gt_counts = np.bincount(gts['group'], minlength=num_groups)
+        dt_counts = np.bincount(dts['group'], minlength=num_groups)
+        area_rngs = np.array(p.areaRng, dtype=np.float64).reshape(-1, 2)
+        num_thrs = len(p.iouThrs)
+
+        # a gt is ignored if it is crowd or out of the area range
+        gt_ignore = gts['iscrowd'][None, :] | (
+            gts['area'][None, :] < area_rngs[:, :1]) | (
+                gts['area'][None, :] > area_rngs[:, 1:])
+        dt_out_area = (dts['area'][None, :] < area_rngs[:, :1]) | (
+            dts['area'][None, :] > area_rngs[:, 1:])
+        # dets that are not matched (including the ones of images without
+        # gts) are ignored if they are out of the area range
+        dt_matched = np.zeros((len(area_rngs), num_thrs, len(dts['score'])),
+                              dtype=bool)
+        dt_ignore = np.repeat(dt_out_area[:, None, :], num_thrs, axis=1)
+
+        gt_starts = np.concatenate(([0], np.cumsum(gt_counts)))
+        dt_starts = np.concatenate(([0], np.cumsum(dt_counts)))
+        groups = np.nonzero((gt_counts > 0) & (dt_counts > 0))[0]
+        # groups with similar sizes are padded together
+        groups = groups[np.lexsort((dt_counts[groups], gt_counts[groups]))]
+        for chunk in self._chunk_groups(groups, gt_counts, dt_counts):
+            self._match_chunk(chunk, gts, dts, gt_starts, dt_starts, gt_ignore,
+                              dt_out_area, dt_matched, dt_ignore)
+
+        return dict(
+            num_groups=num_groups,
+            gt_group=gts['group'],
+            gt_ignore=gt_ignore,
+            dt_group=dts['group'],
+            dt_rank=dts['rank'],
+            dt_score=dts['score'],
+            dt_matched=dt_matched,
+            dt_ignore=dt_ignore)
+
+    def _flatten_anns(self, dts=None):
+        """Collect gts and dets in the order used by ``COCOeval``.
+
+        Annotations are grouped by (category, image), ordered as the
+        categories and images in params. Dets are sorted by descending score
+        in each group and truncated to the max number of dets.
+
+        Args:
+            dts (list[dict], optional): The dets of the images in params,
+                prepared as ``COCO.loadRes`` does. If not given, they are
+                loaded from ``self.cocoDt``.
+        """
+        p = self.params
+        cat_ids = p.catIds if p.useCats else []
+        gts = self.cocoGt.loadAnns(
+            self.cocoGt.getAnnIds(imgIds=p.imgIds, catIds=cat_ids))
+        if dts is None:
+            dts = self.cocoDt.loadAnns(
+                self.cocoDt.getAnnIds(imgIds=p.imgIds, catIds=cat_ids))
+        elif p.useCats:
+            cat_id_set = set(p.catIds)
+            dts = [ann for ann in dts if ann['category_id'] in cat_id_set]
+        img_inds = {img_id: i for i, img_id in enumerate(p.imgIds)}
+        cat_inds = {}
+        for i, cat_id in enumerate(p.catIds):
+            cat_inds.setdefault(cat_id, i)
+        if not p.useCats:
+            # all categories of an image are evaluated together, ordered
+            # by the category ids in params
+            gts = [ann for ann in gts if ann['category_id'] in cat_inds]
+            dts = [ann for ann in dts if ann['category_id'] in cat_inds]
+
+        def _flatten(anns, is_gt):
+            img = np.array([img_inds[ann['image_id']] for ann in anns],
+                           dtype=np.int64)
+            cat = np.array([cat_inds[ann['category_id']] for ann in anns],
+                           dtype=np.int64)
+            # keys of np.lexsort, from the last to the first sort key
+            if p.useCats:
+                group = cat * len(p.imgIds) + img
+                keys = [group]
+            else:
+                group = img
+                keys = [cat, group]
+            score = None
+            if not is_gt:
+                score = np.array([ann['score'] for ann in anns],
+                                 dtype=np.float64)
+                keys.insert(-1, -score)
+            order = np.lexsort(keys) if len(anns) else np.zeros(0, np.int64)
+            anns = [anns[i] for i in order]
+            group = group[order]
+            counts = np.bincount(group, minlength=1)
+            rank = np.arange(len(anns)) - np.repeat(
+                np.cumsum(counts) - counts, counts)
+            if not is_gt:
+                keep = rank < p.maxDets[-1]
+                anns = [ann for ann, k in zip(anns, keep) if k]
+                group, rank, score = group[keep], rank[keep], score[order][
+                    keep]
+            if p.iouType == 'segm':
+                # the dets are loaded with the images of the gts
+                regions = [self.cocoGt.annToRLE(ann) for ann in anns]
+            else:
+                regions = np.array([ann['bbox'] for ann in anns],
+                                   dtype=np.float64).reshape(-1, 4)
+            results = dict(
+                group=group,
+                rank=rank,
+                area=np.array([ann['area'] for ann in anns], dtype=np.float64),
+                id=np.array([ann['id'] for ann in anns], dtype=np.int64),
+                iscrowd=np.array([int(ann.get('iscrowd', 0)) for ann in anns],
+                                 dtype=bool),
+                regions=regions)
+            if not is_gt:
+                results['score'] = score
+            return results
+
+        return _flatten(gts, True), _flatten(dts, False)
+
+    def _chunk_groups(self, groups, gt_counts, dt_counts):
+        """Split groups into chunks whose padded iou matrices stay under
+        ``self.max_elements``."""
+        start = 0
+        max_gts = max_dts = 0
+        for i, group in enumerate(groups):
+            max_gts = max(max_gts, gt_counts[group])
+            max_dts = max(max_dts, dt_counts[group])
+            if i > start and (i - start + 1) * max_gts * max_dts * len(
+                    self.params.iouThrs) > self.max_elements:
+                yield groups[start:i]
+                start = i
+                max_gts, max_dts = gt_counts[group], dt_counts[group]
+        if start < len(groups):
+            yield groups[start:]
+
+    def _compute_ious(self, chunk, gts, dts, gt_starts, dt_starts, gt_pad,
+                      dt_pad):
+        """Compute the padded ious of a chunk of groups, in the same
+        arithmetic as ``maskUtils.iou``."""
+        num_groups, max_dts = dt_pad.shape
+        max_gts = gt_pad.shape[1]
+        ious = np.full((num_groups, max_dts, max_gts), -1, dtype=np.float64)
+        gt_valid = gt_pad >= 0
+        dt_valid = dt_pad >= 0
+        if self.params.iouType == 'segm':
+            for n, group in enumerate(chunk):
+                gt_inds = np.arange(gt_starts[group], gt_starts[group + 1])
+                dt_inds = np.arange(dt_starts[group], dt_starts[group + 1])
+                ious[n, :len(dt_inds), :len(gt_inds)] = maskUtils.iou(
+                    [dts['regions'][i]
+                     for i in dt_inds], [gts['regions'][i] for i in gt_inds],
+                    [int(gts['iscrowd'][i]) for i in gt_inds])
+            return ious
+        gt_boxes = gts['regions'][np.maximum(gt_pad, 0)]
+        dt_boxes = dts['regions'][np.maximum(dt_pad, 0)]
+        gx, gy, gw, gh = [gt_boxes[:, None, :, i] for i in range(4)]
+        dx, dy, dw, dh = [dt_boxes[:, :, None, i] for i in range(4)]
+        w = np.minimum(dw + dx, gw + gx) - np.maximum(dx, gx)
+        h = np.minimum(dh + dy, gh + gy) - np.maximum(dy, gy)
+        inter = w * h
+        dt_area = dw * dh
+        crowd = gts['iscrowd'][np.maximum(gt_pad, 0)][:, None, :]
+        union = np.where(crowd, dt_area, dt_area + gw * gh - inter)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            overlaps = np.where((w > 0) & (h > 0), inter / union, 0)
+        valid = dt_valid[:, :, None] & gt_valid[:, None, :]
+        ious[valid] = overlaps[valid]
+        return ious
+
+    def _match_chunk(self, chunk, gts, dts, gt_starts, dt_starts, gt_ignore,
+                     dt_out_area, dt_matched, dt_ignore):
+        """Greedily match the dets of a chunk of groups for all area ranges
+        and iou thresholds, following ``COCOeval.evaluateImg``."""
+        num_groups = len(chunk)
+        gt_counts = gt_starts[chunk + 1] - gt_starts[chunk]
+        dt_counts = dt_starts[chunk + 1] - dt_starts[chunk]
+        max_gts, max_dts = gt_counts.max(), dt_counts.max()
+        # flat indices of the padded gts and dets, -1 for padding
+        gt_pad = gt_starts[chunk][:, None] + np.arange(max_gts)
+        gt_pad[np.arange(max_gts) >= gt_counts[:, None]] = -1
+        dt_pad = dt_starts[chunk][:, None] + np.arange(max_dts)
+        dt_pad[np.arange(max_dts) >= dt_counts[:, None]] = -1
+        ious = self._compute_ious(chunk, gts, dts, gt_starts, dt_starts,
+                                  gt_pad, dt_pad)
+
+        gt_safe = np.maximum(gt_pad, 0)
+        gt_ids = gts['id'][gt_safe]
+        gt_crowd = gts['iscrowd'][gt_safe]
+        dt_ids = dts['id'][np.maximum(dt_pad, 0)]
+        iou_thrs = np.minimum(np.asarray(self.params.iouThrs), 1 - 1e-10)
+        for a in range(gt_ignore.shape[0]):
+            gt_ig = gt_ignore[a][gt_safe]
+            gt_covered = np.zeros((num_groups, len(iou_thrs), max_gts),
+                                  dtype=bool)
+            for d in range(max_dts):
+                iou_d = ious[:, None, d, :]
+                # gts already matched can only be matched again if crowd
+                cand = (iou_d >= iou_thrs[None, :, None]) & (
+                    ~gt_covered | gt_crowd[:, None, :])
+                # regular gts are preferred over ignored ones, and the last
+                # gt with the highest iou wins
+                match = np.full((num_groups, len(iou_thrs)), -1)
+                for ignored in (True, False):
+                    cand_ig = cand & (gt_ig[:, None, :] == ignored)
+                    vals = np.where(cand_ig, iou_d, -2)[..., ::-1]
+                    last_max = max_gts - 1 - vals.argmax(axis=2)
+                    match = np.where(cand_ig.any(axis=2), last_max, match)
+                has_match = (match >= 0) & (dt_pad[:, d, None] >= 0)
+                match = np.maximum(match, 0)
+                flat_inds = dt_pad[:, d][:, None].repeat(len(iou_thrs), 1)
+                n_inds, t_inds = np.nonzero(has_match)
+                dt_matched[a, t_inds,
+                           flat_inds[n_inds,
+                                     t_inds]] = gt_ids[n_inds,
+                                                       match[n_inds,
+                                                             t_inds]] != 0
+                dt_ignore[a, t_inds, flat_inds[
+                    n_inds, t_inds]] = gt_ig[n_inds, match[n_inds, t_inds]] | (
+                        (gt_ids[n_inds, match[n_inds, t_inds]] == 0)
+                        & dt_out_area[a, flat_inds[n_inds, t_inds]])
+                n_inds, t_inds = np.nonzero(has_match
+                                            & (dt_ids[:, d, None] > 0))
+                gt_covered[n_inds, t_inds, match[n_inds, t_inds]] = True
+
+    def accumulate(self, p=None):
+        """Accumulate the matching results of ``evaluate`` into
+        ``self.eval``, identical to ``COCOeval.accumulate``."""
+        if self._fast_results is None:
+            return super().accumulate(p)
+        assert p is None, 'FastCOCOeval does not support customized params'
+        print('Accumulating evaluation results...')
+        tic = time.time()
+        p = self.params
+        p.catIds = p.catIds if p.useCats == 1 else [-1]
+        res = self._fast_results
+        T = len(p.iouThrs)
+        R = len(p.recThrs)
+        K = len(p.catIds) if p.useCats else 1
+        A = len(p.areaRng)
+        M = len(p.maxDets)
+        # -1 for the precision of absent categories
+        precision = -np.ones((T, R, K, A, M))
+        recall = -np.ones((T, K, A, M))
+        scores = -np.ones((T, R, K, A, M))
+
+        num_imgs = max(res['num_groups'] // K, 1)
+        gt_cat = res['gt_group'] // num_imgs
+        dt_cat = res['dt_group'] // num_imgs
+        gt_bounds = np.searchsorted(gt_cat, np.arange(K + 1))
+        dt_bounds = np.searchsorted(dt_cat, np.arange(K + 1))
+        rec_thrs = np.asarray(p.recThrs)
+        for k in range(K):
+            gt_slice = slice(gt_bounds[k], gt_bounds[k + 1])
+            dt_slice = slice(dt_bounds[k], dt_bounds[k + 1])
+            if gt_slice.start == gt_slice.stop and \
+                    dt_slice.start == dt_slice.stop:
+                continue
+            for m, max_det in enumerate(p.maxDets):
+                keep = res['dt_rank'][dt_slice] < max_det
+                dt_scores = res['dt_score'][dt_slice][keep]
+                # mergesort is used to be consistent with pycocotools
+                inds = np.argsort(-dt_scores, kind='mergesort')
+                dt_scores_sorted = dt_scores[inds]
+                nd = len(inds)
+                for a in range(A):
+                    npig = np.count_nonzero(~res['gt_ignore'][a, gt_slice])
+                    if npig == 0:
+                        continue
+                    dtm = res['dt_matched'][a, :, dt_slice][:, keep][:, inds]
+                    dtig = res['dt_ignore'][a, :, dt_slice][:, keep][:, inds]
+                    tps = np.logical_and(dtm, np.logical_not(dtig))
+                    fps = np.logical_and(
+                        np.logical_not(dtm), np.logical_not(dtig))
+                    tp_sum = np.cumsum(tps, axis=1).astype(dtype=float)
+                    fp_sum = np.cumsum(fps, axis=1).astype(dtype=float)
+                    rc = tp_sum / npig
+                    pr = tp_sum / (fp_sum + tp_sum + np.spacing(1))
+                    recall[:, k, a, m] = rc[:, -1] if nd else 0
+                    # make the precision monotonically decreasing
+                    pr = np.maximum.accumulate(pr[:, ::-1], axis=1)[:, ::-1]
+                    for t in range(T):
+                        pinds = np.searchsorted(rc[t], rec_thrs, side='left')
+                        valid = pinds < nd
+                        q = np.zeros(R)
+                        ss = np.zeros(R)
+                        q[valid] = pr[t, pinds[valid]]
+                        ss[valid] = dt_scores_sorted[pinds[valid]]
+                        # pycocotools stops at the first recall threshold
+                        # that can not be reached
+                        invalid = np.nonzero(~valid)[0]
+                        if len(invalid):
+                            q[invalid[0]:] = 0
+                            ss[invalid[0]:] = 0
+                        precision[t, :, k, a, m] = q
+                        scores[t, :, k, a, m] = ss
+        self.eval = {
+            'params': p,
+            'counts': [T, R, K, A, M],
+            'date': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'precision': precision,
+            'recall': recall,
+            'scores': scores,
+        }
+        toc = time.time()
+        print('DONE (t={:0.2f}s).'.format(toc - tic))
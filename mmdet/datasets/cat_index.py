@@ -0,0 +1,177 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import json
+import os
+import warnings
+from itertools import chain
+
+import numpy as np
+
+from .api_wrappers import COCOStore
+
+CAT_INDEX_VERSION = 1
+
+
+class CatIndex:
+    """The category ids of the images of a dataset in CSR format.
+
+    The category ids of the ``i``-th image are
+    ``cat_ids[indptr[i]:indptr[i + 1]]``, sorted and without duplicates,
+    i.e. ``sorted(set(dataset.get_cat_ids(i)))``.
+
+    Args:
+        indptr (ndarray): The offsets of the images in ``cat_ids``, has shape
+            (num_images + 1, ).
+        cat_ids (ndarray): The category ids of all the images, concatenated.
+    """
+
+    def __init__(self, indptr, cat_ids):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.cat_ids = np.asarray(cat_ids, dtype=np.int64)
+        assert self.indptr[-1] == len(self.cat_ids)
+
+    @classmethod
+    def from_pairs(cls, img_inds, cat_ids, num_images):
+        """Build the index from the (image index, category id) pairs of the
+        annotations, in any order and possibly duplicated."""
+        img_inds = np.asarray(img_inds, dtype=np.int64)
+        cat_ids = np.asarray(cat_ids, dtype=np.int64)
+        order = np.lexsort((cat_ids, img_inds))
+        img_inds, cat_ids = img_inds[order], cat_ids[order]
+        unique = np.ones(len(order), dtype=bool)
+        unique[1:] = (img_inds[1:] != img_inds[:-1]) | (
+            cat_ids[1:] != cat_ids[:-1])
+        img_inds, cat_ids = img_inds[unique], cat_ids[unique]
+        indptr = np.zeros(num_images + 1, dtype=np.int64)
+        np.cumsum(np.bincount(img_inds, minlength=num_images), out=indptr[1:])
+        return cls(indptr, cat_ids)
+
+    @classmethod
+    def from_cat_ids(cls, cat_ids_list):
+        """Build the index from the category ids of each image."""
+        num_cats = [len(cat_ids) for cat_ids in cat_ids_list]
+        img_inds = np.repeat(np.arange(len(cat_ids_list)), num_cats)
+        cat_ids = np.fromiter(
+            chain.from_iterable(cat_ids_list),
+            dtype=np.int64,
+            count=len(img_inds))
+        return cls.from_pairs(img_inds, cat_ids, len(cat_ids_list))
+
+    @classmethod
+    def concat(cls, cat_indices):
+        """Concatenate the indices of datasets, e.g. for a
+        :obj:`ConcatDataset`."""
+        offsets = np.cumsum([0] +
+                            [len(index.cat_ids) for index in cat_indices])
+        indptr = np.concatenate([np.zeros(1, dtype=np.int64)] + [
+            index.indptr[1:] + offset
+            for index, offset in zip(cat_indices, offsets)
+        ])
+        cat_ids = np.concatenate([np.zeros(0, dtype=np.int64)] +
+                                 [index.cat_ids for index in cat_indices])
+        return cls(indptr, cat_ids)
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def __getitem__(self, idx):
+        return self.cat_ids[self.indptr[idx]:self.indptr[idx + 1]]
+
+    @property
+    def num_cats(self):
+        """ndarray: The number of categories of each image."""
+        return np.diff(self.indptr)
+
+    @property
+    def img_inds(self):
+        """ndarray: The image index of each entry of ``cat_ids``."""
+        return np.repeat(np.arange(len(self)), self.num_cats)
+
+    def tile(self, times):
+        """The index of the images repeated ``times`` times, e.g. for a
+        :obj:`RepeatDataset`."""
+        return self.concat([self] * times)
+
+    def invert(self):
+        """Get the images of each category, sorted by category.
+
+        Returns:
+            tuple[ndarray]: The category ids, the offsets of the categories in
+                the image indices and the image indices. The images of the
+                ``i``-th category are ``img_inds[cat_indptr[i]:cat_indptr[i +
+                1]]`` in ascending order.
+        """
+        order = np.argsort(self.cat_ids, kind='stable')
+        sorted_cat_ids = self.cat_ids[order]
+        cat_ids, cat_starts = np.unique(sorted_cat_ids, return_index=True)
+        cat_indptr = np.append(cat_starts, len(order))
+        return cat_ids, cat_indptr, self.img_inds[order]
+
+    def save(self, filename, fingerprint):
+        """Save the index to a ``.npz`` file with the fingerprint of the
+        dataset it is built from."""
+        # save to a temporary file first, since multiple processes may build
+        # the index at the same time
+        tmp_file = f'{filename}.{os.getpid()}.tmp.npz'
+        np.savez(
+            tmp_file,
+            indptr=self.indptr,
+            cat_ids=self.cat_ids,
+            fingerprint=np.array(json.dumps(fingerprint, sort_keys=True)))
+        os.replace(tmp_file, filename)
+
+    @classmethod
+    def load(cls, filename, fingerprint):
+        """Load an index saved by :meth:`save`.
+
+        Returns:
+            :obj:`CatIndex` | None: The index, or None if the file does not
+                exist or is saved with a different fingerprint.
+        """
+        if not os.path.isfile(filename):
+            return None
+        with np.load(filename, allow_pickle=False) as data:
+            if str(data['fingerprint']) != json.dumps(
+                    fingerprint, sort_keys=True):
+                return None
+            return cls(data['indptr'], data['cat_ids'])
+
+
+def get_cat_index(dataset):
+    """Get the :obj:`CatIndex` of a dataset.
+
+    Datasets implementing ``get_cat_index`` build it in their own way,
+    e.g. :meth:`CustomDataset.get_cat_index` caches it, otherwise it is built
+    from ``get_cat_ids`` of each image.
+    """
+    if hasattr(dataset, 'get_cat_index'):
+        return dataset.get_cat_index()
+    return CatIndex.from_cat_ids(
+        [dataset.get_cat_ids(i) for i in range(len(dataset))])
+
+
+def save_cat_index_cache(cat_index, filename, fingerprint):
+    """Save the index as a cache, which fails with a warning, e.g. if the
+    directory is not writable."""
+    try:
+        cat_index.save(filename, fingerprint)
+    except OSError as e:
+        warnings.warn(f'Failed to save the category index to {filename}: {e}')
+
+
+def coco_cat_index(coco, img_ids):
+    """Build the :obj:`CatIndex` of images from a COCO or LVIS api object.
+
+    The index of a :obj:`COCOStore` is built from its columns, without
+    decoding the annotations.
+
+    Args:
+        coco (:obj:`COCO` | :obj:`LVIS` | :obj:`COCOStore`): The api object.
+        img_ids (list[int]): The ids of the images of the dataset.
+    """
+    if isinstance(coco, COCOStore):
+        img_inds, cat_ids = coco.get_img_cat_ids(img_ids)
+        return CatIndex.from_pairs(img_inds, cat_ids, len(img_ids))
+    img_ann_map = coco.img_ann_map
+    return CatIndex.from_cat_ids(
+        [[ann['category_id'] for ann in img_ann_map.get(img_id, [])]
+         for img_id in img_ids])
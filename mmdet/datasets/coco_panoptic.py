@@ -255,6 +255,9 @@ class CocoPanopticDataset(CocoDataset):
                (96, 96, 96), (64, 170, 64), (152, 251, 152), (208, 229, 228),
                (206, 186, 171), (152, 161, 64), (116, 112, 0), (0, 114, 143),
                (102, 102, 156), (250, 141, 255)]
+    # panoptic results are not supported by :obj:`COCOResultWriter`
+    result_writer = None
+    online_evaluator = None
 
     def __init__(self,
                  ann_file,
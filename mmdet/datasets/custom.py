@@ -1,4 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import hashlib
+import os
 import os.path as osp
 import warnings
 from collections import OrderedDict
@@ -9,8 +11,9 @@ from mmcv.utils import print_log
 from terminaltables import AsciiTable
 from torch.utils.data import Dataset
 
-from mmdet.core import eval_map, eval_recalls
+from mmdet.core import OnlineMAPEvaluator, eval_map, eval_recalls
 from .builder import DATASETS
+from .cat_index import CAT_INDEX_VERSION, CatIndex, save_cat_index_cache
 from .pipelines import Compose
 
 
@@ -50,6 +53,11 @@ class CustomDataset(Dataset):
             boxes of the dataset's classes will be filtered out. This option
             only works when `test_mode=False`, i.e., we never filter images
             during tests.
+        cache_cat_index (bool, optional): If set true, the category ids of
+            the images, see :meth:`get_cat_index`, are saved to
+            ``{ann_file}.cat_index.npz`` and loaded from it while the
+            annotation file and the dataset settings are unchanged.
+            Default: False.
     """
 
     CLASSES = None
@@ -67,7 +75,8 @@ class CustomDataset(Dataset):
                  proposal_file=None,
                  test_mode=False,
                  filter_empty_gt=True,
-                 file_client_args=dict(backend='disk')):
+                 file_client_args=dict(backend='disk'),
+                 cache_cat_index=False):
         self.ann_file = ann_file
         self.data_root = data_root
         self.img_prefix = img_prefix
@@ -76,6 +85,8 @@ class CustomDataset(Dataset):
         self.proposal_file = proposal_file
         self.test_mode = test_mode
         self.filter_empty_gt = filter_empty_gt
+        self.cache_cat_index = cache_cat_index
+        self._cat_index = None
         self.file_client = mmcv.FileClient(**file_client_args)
         self.CLASSES = self.get_classes(classes)
 
@@ -287,6 +298,51 @@ class CustomDataset(Dataset):
 
         return class_names
 
+    def get_cat_index(self):
+        """Get the category ids of all the images as a :obj:`CatIndex`.
+
+        The index is built once from :meth:`get_cat_ids` of each image, and
+        saved next to the annotation file if ``cache_cat_index`` is set.
+
+        Returns:
+            :obj:`CatIndex`: The category ids of the images.
+        """
+        if self._cat_index is not None:
+            return self._cat_index
+        cache_file = fingerprint = None
+        if self.cache_cat_index:
+            if osp.exists(self.ann_file):
+                cache_file = f'{self.ann_file}.cat_index.npz'
+                fingerprint = self._get_cat_index_fingerprint()
+                self._cat_index = CatIndex.load(cache_file, fingerprint)
+            else:
+                warnings.warn(f'The category index of {self.ann_file} is '
+                              'not cached since it is not a local path.')
+        if self._cat_index is None:
+            self._cat_index = self._build_cat_index()
+            if cache_file is not None:
+                save_cat_index_cache(self._cat_index, cache_file, fingerprint)
+        return self._cat_index
+
+    def _build_cat_index(self):
+        return CatIndex.from_cat_ids(
+            [self.get_cat_ids(i) for i in range(len(self))])
+
+    def _get_cat_index_fingerprint(self):
+        """The annotation file and the settings a cached category index
+        depends on, the images are identified by their filenames."""
+        stat = os.stat(self.ann_file)
+        filenames = '\n'.join(info['filename'] for info in self.data_infos)
+        return dict(
+            version=CAT_INDEX_VERSION,
+            dataset=type(self).__name__,
+            ann_file_size=stat.st_size,
+            ann_file_mtime=stat.st_mtime_ns,
+            classes=list(self.CLASSES),
+            test_mode=self.test_mode,
+            filter_empty_gt=self.filter_empty_gt,
+            images=hashlib.md5(filenames.encode()).hexdigest())
+
     def get_cat2imgs(self):
         """Get a dict with class as key and img_ids as values, which will be
         used in :class:`ClassAwareSampler`.
@@ -300,15 +356,48 @@ class CustomDataset(Dataset):
             raise ValueError('self.CLASSES can not be None')
         # sort the label index
         cat2imgs = {i: [] for i in range(len(self.CLASSES))}
-        for i in range(len(self)):
-            cat_ids = set(self.get_cat_ids(i))
-            for cat in cat_ids:
-                cat2imgs[cat].append(i)
+        cat_ids, cat_indptr, img_inds = self.get_cat_index().invert()
+        for cat, start, end in zip(cat_ids.tolist(), cat_indptr[:-1],
+                                   cat_indptr[1:]):
+            cat2imgs[cat].extend(img_inds[start:end].tolist())
         return cat2imgs
 
     def format_results(self, results, **kwargs):
         """Place holder to format result to dataset specific output."""
 
+    def online_evaluator(self,
+                         metric='mAP',
+                         iou_thr=0.5,
+                         scale_ranges=None,
+                         background=False,
+                         **kwargs):
+        """Get an evaluator computing the mAP of :meth:`evaluate` while
+        testing, see :class:`OnlineMAPEvaluator`.
+
+        Args:
+            metric (str | list[str]): Metrics to be evaluated.
+            iou_thr (float | list[float]): IoU threshold. Default: 0.5.
+            scale_ranges (list[tuple] | None): Scale ranges for evaluating mAP.
+                Default: None.
+            background (bool): Whether to evaluate in a background thread.
+                Default: False.
+
+        Returns:
+            :obj:`OnlineMAPEvaluator` | None: The evaluator, or None if the
+                metric is not 'mAP'.
+        """
+        if not isinstance(metric, str):
+            assert len(metric) == 1
+            metric = metric[0]
+        if metric != 'mAP':
+            return None
+        return OnlineMAPEvaluator(
+            self.get_ann_info,
+            iou_thr,
+            scale_ranges,
+            dataset=self.CLASSES,
+            background=background)
+
     def evaluate(self,
                  results,
                  metric='mAP',
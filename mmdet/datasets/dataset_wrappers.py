@@ -2,14 +2,13 @@
 import bisect
 import collections
 import copy
-import math
-from collections import defaultdict
 
 import numpy as np
 from mmcv.utils import build_from_cfg, print_log
 from torch.utils.data.dataset import ConcatDataset as _ConcatDataset
 
 from .builder import DATASETS, PIPELINES
+from .cat_index import CatIndex, get_cat_index
 from .coco import CocoDataset
 
 
@@ -69,6 +68,15 @@ class ConcatDataset(_ConcatDataset):
             sample_idx = idx - self.cumulative_sizes[dataset_idx - 1]
         return self.datasets[dataset_idx].get_cat_ids(sample_idx)
 
+    def get_cat_index(self):
+        """Get the category ids of all the images as a :obj:`CatIndex`.
+
+        Returns:
+            :obj:`CatIndex`: The indices of the datasets, concatenated.
+        """
+        return CatIndex.concat(
+            [get_cat_index(dataset) for dataset in self.datasets])
+
     def get_ann_info(self, idx):
         """Get annotation of concatenated dataset by index.
 
@@ -189,6 +197,14 @@ class RepeatDataset:
 
         return self.dataset.get_cat_ids(idx % self._ori_len)
 
+    def get_cat_index(self):
+        """Get the category ids of all the images as a :obj:`CatIndex`.
+
+        Returns:
+            :obj:`CatIndex`: The index of the dataset, repeated.
+        """
+        return get_cat_index(self.dataset).tile(self.times)
+
     def get_ann_info(self, idx):
         """Get annotation of repeat dataset by index.
 
@@ -252,16 +268,14 @@ class ClassBalancedDataset:
         self.PALETTE = getattr(dataset, 'PALETTE', None)
 
         repeat_factors = self._get_repeat_factors(dataset, oversample_thr)
-        repeat_indices = []
-        for dataset_idx, repeat_factor in enumerate(repeat_factors):
-            repeat_indices.extend([dataset_idx] * math.ceil(repeat_factor))
-        self.repeat_indices = repeat_indices
+        repeat_times = np.ceil(repeat_factors).astype(np.int64)
+        self.repeat_indices = np.repeat(
+            np.arange(len(repeat_factors)), repeat_times)
 
         flags = []
         if hasattr(self.dataset, 'flag'):
-            for flag, repeat_factor in zip(self.dataset.flag, repeat_factors):
-                flags.extend([flag] * int(math.ceil(repeat_factor)))
-            assert len(flags) == len(repeat_indices)
+            flags = np.repeat(self.dataset.flag, repeat_times)
+            assert len(flags) == len(self.repeat_indices)
         self.flag = np.asarray(flags, dtype=np.uint8)
 
     def _get_repeat_factors(self, dataset, repeat_thr):
@@ -274,43 +288,31 @@ class ClassBalancedDataset:
                 it would be repeated.
 
         Returns:
-            list[float]: The repeat factors for each images in the dataset.
+            ndarray: The repeat factors for each images in the dataset.
         """
+        cat_index = get_cat_index(dataset)
+        num_images = len(dataset)
+        img_inds, cat_ids = cat_index.img_inds, cat_index.cat_ids
+        if not self.filter_empty_gt:
+            # images without annotations are of the background category
+            empty_inds = np.flatnonzero(cat_index.num_cats == 0)
+            img_inds = np.concatenate([img_inds, empty_inds])
+            cat_ids = np.concatenate(
+                [cat_ids, np.full(len(empty_inds), len(self.CLASSES))])
 
         # 1. For each category c, compute the fraction # of images
         #   that contain it: f(c)
-        category_freq = defaultdict(int)
-        num_images = len(dataset)
-        for idx in range(num_images):
-            cat_ids = set(self.dataset.get_cat_ids(idx))
-            if len(cat_ids) == 0 and not self.filter_empty_gt:
-                cat_ids = set([len(self.CLASSES)])
-            for cat_id in cat_ids:
-                category_freq[cat_id] += 1
-        for k, v in category_freq.items():
-            category_freq[k] = v / num_images
+        _, cat_inds = np.unique(cat_ids, return_inverse=True)
+        category_freq = np.bincount(cat_inds) / num_images
 
         # 2. For each category c, compute the category-level repeat factor:
         #    r(c) = max(1, sqrt(t/f(c)))
-        category_repeat = {
-            cat_id: max(1.0, math.sqrt(repeat_thr / cat_freq))
-            for cat_id, cat_freq in category_freq.items()
-        }
+        category_repeat = np.maximum(1.0, np.sqrt(repeat_thr / category_freq))
 
         # 3. For each image I, compute the image-level repeat factor:
         #    r(I) = max_{c in I} r(c)
-        repeat_factors = []
-        for idx in range(num_images):
-            cat_ids = set(self.dataset.get_cat_ids(idx))
-            if len(cat_ids) == 0 and not self.filter_empty_gt:
-                cat_ids = set([len(self.CLASSES)])
-            repeat_factor = 1
-            if len(cat_ids) > 0:
-                repeat_factor = max(
-                    {category_repeat[cat_id]
-                     for cat_id in cat_ids})
-            repeat_factors.append(repeat_factor)
-
+        repeat_factors = np.ones(num_images)
+        np.maximum.at(repeat_factors, img_inds, category_repeat[cat_inds])
         return repeat_factors
 
     def __getitem__(self, idx):
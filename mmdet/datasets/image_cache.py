@@ -0,0 +1,234 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import json
+import os
+import os.path as osp
+from multiprocessing import Pool
+
+import mmcv
+import numpy as np
+
+CACHE_VERSION = 1
+# fields of an entry of the index, see `build_image_cache`
+_ENTRY_FIELDS = ('shard', 'offset', 'height', 'width', 'channels', 'gt_start',
+                 'gt_end', 'ignore_start', 'ignore_end')
+
+
+class ImageCache:
+    """A memory-mapped cache of decoded images and parsed annotations.
+
+    The cache is a directory built by :func:`build_image_cache`:
+
+    - ``meta.json``: the index from the filename of an image (the
+      ``filename`` of its ``img_info``) to the location of its pixels and
+      annotations.
+    - ``images_{i}.bin``: the raw uint8 pixels of the images, concatenated.
+    - ``bboxes.npy``, ``labels.npy``, ``bboxes_ignore.npy``: the bboxes,
+      labels and ignored bboxes of all the images, concatenated.
+
+    The files are opened lazily with ``np.memmap`` in each process, so all
+    the dataloader workers read from the same pages of the OS page cache.
+
+    Args:
+        cache_dir (str): Directory of the cache.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        with open(osp.join(cache_dir, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        if meta.get('version') != CACHE_VERSION:
+            raise ValueError(f'{cache_dir} is built by another version of '
+                             'build_image_cache, please build it again.')
+        self.img_scale = meta['img_scale']
+        self.with_ignore = meta['with_ignore']
+        self.shards = meta['shards']
+        self.index = meta['index']
+        self._arrays = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, filename):
+        return filename in self.index
+
+    def __getstate__(self):
+        # do not pickle the opened memmaps, e.g. when the dataset is sent to
+        # the dataloader workers, each process maps the files by itself.
+        state = self.__dict__.copy()
+        state['_arrays'] = None
+        return state
+
+    def _open(self):
+        if self._arrays is None:
+            self._arrays = dict(
+                shards=[
+                    np.memmap(
+                        osp.join(self.cache_dir, shard),
+                        dtype=np.uint8,
+                        mode='r') for shard in self.shards
+                ],
+                **{
+                    name: np.load(
+                        osp.join(self.cache_dir, f'{name}.npy'), mmap_mode='r')
+                    for name in ['bboxes', 'labels', 'bboxes_ignore']
+                })
+        return self._arrays
+
+    def get(self, filename):
+        """Get the cached image and annotations of an image.
+
+        The returned arrays are read-only views of the memory-mapped files.
+
+        Args:
+            filename (str): The ``filename`` in the ``img_info`` of the image.
+
+        Returns:
+            dict: A dict with keys "img", "bboxes", "labels" and
+                "bboxes_ignore" (None if the dataset has no ignored bboxes).
+        """
+        try:
+            entry = dict(zip(_ENTRY_FIELDS, self.index[filename]))
+        except KeyError:
+            raise KeyError(f'{filename} is not in the image cache '
+                           f'{self.cache_dir}, please build it again.')
+        arrays = self._open()
+        shape = (entry['height'], entry['width'], entry['channels'])
+        img = arrays['shards'][
+            entry['shard']][entry['offset']:entry['offset'] +
+                            int(np.prod(shape))]
+        img = img.reshape(shape)
+        if entry['channels'] == 1:
+            img = img[..., 0]
+        bboxes_ignore = None
+        if self.with_ignore:
+            bboxes_ignore = arrays['bboxes_ignore'][
+                entry['ignore_start']:entry['ignore_end']]
+        return dict(
+            img=img,
+            bboxes=arrays['bboxes'][entry['gt_start']:entry['gt_end']],
+            labels=arrays['labels'][entry['gt_start']:entry['gt_end']],
+            bboxes_ignore=bboxes_ignore)
+
+
+def _load_image(args):
+    filename, img_scale, color_type, channel_order, file_client_args = args
+    file_client = mmcv.FileClient(**file_client_args)
+    img = mmcv.imfrombytes(
+        file_client.get(filename),
+        flag=color_type,
+        channel_order=channel_order)
+    ori_shape = img.shape
+    if img_scale is not None:
+        img = mmcv.imrescale(img, img_scale)
+    return np.ascontiguousarray(img), ori_shape
+
+
+def build_image_cache(dataset,
+                      cache_dir,
+                      img_scale=None,
+                      color_type='color',
+                      channel_order='bgr',
+                      shard_size=4 << 30,
+                      nproc=4,
+                      file_client_args=dict(backend='disk')):
+    """Decode the images of a dataset into an :class:`ImageCache`.
+
+    The images are decoded in ``nproc`` processes and optionally rescaled to
+    fit in ``img_scale`` while keeping the aspect ratio, the bboxes are
+    rescaled accordingly. The annotations are taken from
+    ``dataset.get_ann_info``, so the cache holds the same bboxes and labels
+    as ``LoadAnnotations`` would load.
+
+    Args:
+        dataset (:obj:`CustomDataset`): The dataset to cache.
+        cache_dir (str): Directory to write the cache to.
+        img_scale (tuple[int] | float, optional): Images are rescaled to
+            this scale with :func:`mmcv.imrescale` if specified. Note that
+            the rescaled images are treated as the original images by the
+            pipeline. Default: None.
+        color_type (str): The flag argument for :func:`mmcv.imfrombytes`.
+            Default: 'color'.
+        channel_order (str): Order of channel, candidates are 'bgr' and
+            'rgb'. Default: 'bgr'.
+        shard_size (int): Maximal number of bytes of an image shard.
+            Default: 4 GB.
+        nproc (int): Number of processes to decode the images. Default: 4.
+        file_client_args (dict): Arguments to instantiate a FileClient.
+            Default: ``dict(backend='disk')``.
+    """
+    mmcv.mkdir_or_exist(cache_dir)
+    data_infos = dataset.data_infos
+    filenames = [info['filename'] for info in data_infos]
+    tasks = [(osp.join(dataset.img_prefix, filename)
+              if dataset.img_prefix is not None else filename, img_scale,
+              color_type, channel_order, file_client_args)
+             for filename in filenames]
+
+    index, shards = {}, []
+    bboxes, labels, bboxes_ignore = [], [], []
+    num_gts = num_ignores = 0
+    with_ignore = False
+    shard_file, shard_offset = None, 0
+    prog_bar = mmcv.ProgressBar(len(tasks))
+    with Pool(nproc) as pool:
+        for i, (img, ori_shape) in enumerate(
+                pool.imap(_load_image, tasks, chunksize=8)):
+            if shard_file is None or shard_offset + img.nbytes > shard_size:
+                if shard_file is not None:
+                    shard_file.close()
+                shards.append(f'images_{len(shards)}.bin')
+                shard_file = open(osp.join(cache_dir, shards[-1]), 'wb')
+                shard_offset = 0
+            shard_file.write(img.tobytes())
+
+            ann_info = dataset.get_ann_info(i)
+            w_scale = img.shape[1] / ori_shape[1]
+            h_scale = img.shape[0] / ori_shape[0]
+            scale = np.array([w_scale, h_scale, w_scale, h_scale],
+                             dtype=np.float32)
+            gt_bboxes = ann_info['bboxes'].reshape(-1, 4) * scale
+            gt_bboxes_ignore = ann_info.get('bboxes_ignore', None)
+            if gt_bboxes_ignore is None:
+                gt_bboxes_ignore = np.zeros((0, 4), dtype=np.float32)
+            else:
+                with_ignore = True
+                gt_bboxes_ignore = gt_bboxes_ignore.reshape(-1, 4) * scale
+            bboxes.append(gt_bboxes.astype(np.float32))
+            labels.append(ann_info['labels'].astype(np.int64))
+            bboxes_ignore.append(gt_bboxes_ignore.astype(np.float32))
+
+            channels = img.shape[2] if img.ndim == 3 else 1
+            index[filenames[i]] = [
+                len(shards) - 1, shard_offset, img.shape[0], img.shape[1],
+                channels, num_gts, num_gts + len(gt_bboxes), num_ignores,
+                num_ignores + len(gt_bboxes_ignore)
+            ]
+            shard_offset += img.nbytes
+            num_gts += len(gt_bboxes)
+            num_ignores += len(gt_bboxes_ignore)
+            prog_bar.update()
+    if shard_file is not None:
+        shard_file.close()
+
+    def _concat(arrays, shape, dtype):
+        return np.concatenate(arrays) if arrays else np.zeros(shape, dtype)
+
+    np.save(
+        osp.join(cache_dir, 'bboxes.npy'), _concat(bboxes, (0, 4), np.float32))
+    np.save(
+        osp.join(cache_dir, 'labels.npy'), _concat(labels, (0, ), np.int64))
+    np.save(
+        osp.join(cache_dir, 'bboxes_ignore.npy'),
+        _concat(bboxes_ignore, (0, 4), np.float32))
+    # the index is written last, so a cache with a meta.json is complete
+    meta = dict(
+        version=CACHE_VERSION,
+        img_scale=img_scale,
+        with_ignore=with_ignore,
+        shards=shards,
+        index=index)
+    tmp_file = osp.join(cache_dir, 'meta.json.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_file, osp.join(cache_dir, 'meta.json'))
+    return ImageCache(cache_dir)
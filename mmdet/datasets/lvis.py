@@ -308,6 +308,9 @@ class LVISV05Dataset(CocoDataset):
             data_infos.append(info)
         return data_infos
 
+    # LVIS metrics can not be evaluated while testing
+    online_evaluator = None
+
     def evaluate(self,
                  results,
                  metric='bbox',
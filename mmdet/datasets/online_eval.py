@@ -0,0 +1,171 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import copy
+
+import numpy as np
+from pycocotools import mask as maskUtils
+
+from mmdet.core import OnlineEvaluator
+from .api_wrappers import FastCOCOeval
+from .result_writer import COCOResultWriter
+
+
+def _prepare_dets(anns, iou_type):
+    """Add the keys added by ``COCO.loadRes`` to the json results."""
+    for i, ann in enumerate(anns):
+        if iou_type == 'segm':
+            # the area of the mask is used instead of the one of the bbox,
+            # see CocoDataset.evaluate_det_segm
+            ann.pop('bbox')
+            ann['area'] = maskUtils.area(ann['segmentation'])
+        else:
+            ann['area'] = ann['bbox'][2] * ann['bbox'][3]
+        ann['id'] = i + 1
+        ann['iscrowd'] = 0
+    return anns
+
+
+class OnlineCOCOEvaluator(OnlineEvaluator):
+    """Evaluate COCO metrics as :meth:`CocoDataset.evaluate` while testing.
+
+    The results of each batch are converted to json results by
+    :class:`COCOResultWriter` and matched to the gts of the images by
+    :class:`FastCOCOeval`, only the matching results of the dets are kept.
+    When evaluating, the matching results of all the batches are merged and
+    accumulated as if the whole dataset was matched at once, so the metrics
+    are identical to the ones of :meth:`CocoDataset.evaluate`.
+
+    Args:
+        dataset (:obj:`CocoDataset`): The dataset to be evaluated.
+        metric (str | list[str]): Metrics to be evaluated. Options are
+            'bbox', 'segm', 'proposal'. Default: 'bbox'.
+        classwise (bool): Whether to evaluating the AP for each class.
+            Default: False.
+        proposal_nums (Sequence[int]): Proposal number used for evaluating
+            recalls. Default: (100, 300, 1000).
+        iou_thrs (Sequence[float], optional): IoU thresholds, see
+            :meth:`CocoDataset.evaluate`. Default: None.
+        metric_items (list[str] | str, optional): Metric items that will
+            be returned, see :meth:`CocoDataset.evaluate`. Default: None.
+        background (bool): Whether to process the results in a background
+            thread. Default: False.
+    """
+
+    allowed_metrics = ['bbox', 'segm', 'proposal']
+
+    def __init__(self,
+                 dataset,
+                 metric='bbox',
+                 classwise=False,
+                 proposal_nums=(100, 300, 1000),
+                 iou_thrs=None,
+                 metric_items=None,
+                 background=False):
+        super().__init__(background)
+        metrics = metric if isinstance(metric, list) else [metric]
+        for metric in metrics:
+            if metric not in self.allowed_metrics:
+                raise KeyError(f'metric {metric} is not supported')
+        if iou_thrs is None:
+            iou_thrs = np.linspace(
+                .5, 0.95, int(np.round((0.95 - .5) / .05)) + 1, endpoint=True)
+        self.dataset = dataset
+        self.metrics = metrics
+        self.classwise = classwise
+        self.proposal_nums = proposal_nums
+        self.iou_thrs = iou_thrs
+        self.metric_items = metric_items
+        dataset.cat_ids = dataset.coco.get_cat_ids(cat_names=dataset.CLASSES)
+        self._params = {metric: self._get_params(metric) for metric in metrics}
+
+    def _get_params(self, metric):
+        """Get the params of ``COCOeval`` set by
+        :meth:`CocoDataset.evaluate_det_segm`, normalized as
+        ``COCOeval.evaluate`` does."""
+        iou_type = 'bbox' if metric == 'proposal' else metric
+        params = FastCOCOeval(self.dataset.coco, iouType=iou_type).params
+        params.catIds = self.dataset.cat_ids
+        params.imgIds = list(np.unique(self.dataset.img_ids))
+        params.maxDets = sorted(self.proposal_nums)
+        params.iouThrs = self.iou_thrs
+        if metric == 'proposal':
+            params.useCats = 0
+        else:
+            params.catIds = list(np.unique(params.catIds))
+        return params
+
+    def process_results(self, results, indices):
+        img_ids = [self.dataset.img_ids[idx] for idx in indices]
+        with COCOResultWriter(img_ids, self.dataset.cat_ids) as writer:
+            writer.write(results)
+        stats = dict()
+        for metric in self.metrics:
+            if metric not in writer.result_files:
+                raise KeyError(f'{metric} is not in results')
+            params = copy.copy(self._params[metric])
+            params.imgIds = list(np.unique(img_ids))
+            coco_eval = FastCOCOeval(self.dataset.coco, iouType=params.iouType)
+            coco_eval.params = params
+            gts, dts = coco_eval._flatten_anns(
+                _prepare_dets(writer.result_files[metric], params.iouType))
+            res = coco_eval._match(gts, dts)
+            # the groups of the batch are indexed by (category, image) and
+            # are remapped to the images of the dataset when evaluating
+            batch_img_ids = np.asarray(params.imgIds)
+            num_imgs = len(batch_img_ids)
+            res.pop('num_groups')
+            gt_group, dt_group = res.pop('gt_group'), res.pop('dt_group')
+            stats[metric] = dict(
+                gt_cat=gt_group // num_imgs,
+                gt_img_id=batch_img_ids[gt_group % num_imgs],
+                dt_cat=dt_group // num_imgs,
+                dt_img_id=batch_img_ids[dt_group % num_imgs],
+                **res)
+        return stats
+
+    def _merge_matching(self, metric, stats):
+        """Build a ``FastCOCOeval`` with the matching results of all the
+        images, ordered as :meth:`FastCOCOeval.evaluate` orders them."""
+        params = self._params[metric]
+        img_ids = np.asarray(params.imgIds)
+        num_cats = len(params.catIds) if params.useCats else 1
+
+        def _concat(key):
+            return np.concatenate([stat[key] for stat in stats], axis=-1)
+
+        def _group(kind):
+            img_inds = np.searchsorted(img_ids, _concat(f'{kind}_img_id'))
+            group = _concat(f'{kind}_cat') * len(img_ids) + img_inds
+            # a group only has the dets of an image, whose order is kept
+            order = np.argsort(group, kind='stable')
+            return group[order], order
+
+        gt_group, gt_order = _group('gt')
+        dt_group, dt_order = _group('dt')
+        coco_eval = FastCOCOeval(self.dataset.coco, iouType=params.iouType)
+        coco_eval.params = copy.deepcopy(params)
+        coco_eval._fast_results = dict(
+            num_groups=num_cats * len(img_ids),
+            gt_group=gt_group,
+            gt_ignore=_concat('gt_ignore')[:, gt_order],
+            dt_group=dt_group,
+            dt_rank=_concat('dt_rank')[dt_order],
+            dt_score=_concat('dt_score')[dt_order],
+            dt_matched=_concat('dt_matched')[..., dt_order],
+            dt_ignore=_concat('dt_ignore')[..., dt_order])
+        coco_eval.evalImgs = []
+        coco_eval._paramsEval = copy.deepcopy(coco_eval.params)
+        return coco_eval
+
+    def compute_metrics(self, chunks, logger=None):
+        # the matched results are evaluated by CocoDataset.evaluate_det_segm
+        result_files = {
+            metric:
+            self._merge_matching(metric,
+                                 [stats[metric] for _, stats in chunks])
+            for metric in self.metrics
+        }
+        return self.dataset.evaluate_det_segm(None, result_files,
+                                              self.dataset.coco, self.metrics,
+                                              logger, self.classwise,
+                                              self.proposal_nums,
+                                              self.iou_thrs, self.metric_items)
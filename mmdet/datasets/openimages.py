@@ -612,6 +612,10 @@ class OpenImagesDataset(CustomDataset):
         """
         return self.get_ann_info(idx)['labels'].astype(np.int).tolist()
 
+    # the mAP of Open Images uses the hierarchy of the classes, which is not
+    # supported by :class:`OnlineMAPEvaluator`
+    online_evaluator = None
+
     def evaluate(self,
                  results,
                  metric='mAP',
@@ -6,9 +6,10 @@ from .compose import Compose
 from .formatting import (Collect, DefaultFormatBundle, ImageToTensor,
                          ToDataContainer, ToTensor, Transpose, to_tensor)
 from .instaboost import InstaBoost
-from .loading import (FilterAnnotations, LoadAnnotations, LoadImageFromFile,
-                      LoadImageFromWebcam, LoadMultiChannelImageFromFiles,
-                      LoadPanopticAnnotations, LoadProposals)
+from .loading import (FilterAnnotations, LoadAnnotations, LoadImageFromCache,
+                      LoadImageFromFile, LoadImageFromWebcam,
+                      LoadMultiChannelImageFromFiles, LoadPanopticAnnotations,
+                      LoadProposals)
 from .test_time_aug import MultiScaleFlipAug
 from .transforms import (Albu, CopyPaste, CutOut, Expand, MinIoURandomCrop,
                          MixUp, Mosaic, Normalize, Pad, PhotoMetricDistortion,
@@ -19,13 +20,13 @@ from .transforms import (Albu, CopyPaste, CutOut, Expand, MinIoURandomCrop,
 __all__ = [
     'Compose', 'to_tensor', 'ToTensor', 'ImageToTensor', 'ToDataContainer',
     'Transpose', 'Collect', 'DefaultFormatBundle', 'LoadAnnotations',
-    'LoadImageFromFile', 'LoadImageFromWebcam', 'LoadPanopticAnnotations',
-    'LoadMultiChannelImageFromFiles', 'LoadProposals', 'FilterAnnotations',
-    'MultiScaleFlipAug', 'Resize', 'RandomFlip', 'Pad', 'RandomCrop',
-    'Normalize', 'SegRescale', 'MinIoURandomCrop', 'Expand',
-    'PhotoMetricDistortion', 'Albu', 'InstaBoost', 'RandomCenterCropPad',
-    'AutoAugment', 'CutOut', 'Shear', 'Rotate', 'ColorTransform',
-    'EqualizeTransform', 'BrightnessTransform', 'ContrastTransform',
-    'Translate', 'RandomShift', 'Mosaic', 'MixUp', 'RandomAffine',
-    'YOLOXHSVRandomAug', 'CopyPaste'
+    'LoadImageFromFile', 'LoadImageFromWebcam', 'LoadImageFromCache',
+    'LoadPanopticAnnotations', 'LoadMultiChannelImageFromFiles',
+    'LoadProposals', 'FilterAnnotations', 'MultiScaleFlipAug', 'Resize',
+    'RandomFlip', 'Pad', 'RandomCrop', 'Normalize', 'SegRescale',
+    'MinIoURandomCrop', 'Expand', 'PhotoMetricDistortion', 'Albu',
+    'InstaBoost', 'RandomCenterCropPad', 'AutoAugment', 'CutOut', 'Shear',
+    'Rotate', 'ColorTransform', 'EqualizeTransform', 'BrightnessTransform',
+    'ContrastTransform', 'Translate', 'RandomShift', 'Mosaic', 'MixUp',
+    'RandomAffine', 'YOLOXHSVRandomAug', 'CopyPaste'
 ]
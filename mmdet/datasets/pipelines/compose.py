@@ -3,6 +3,7 @@ import collections
 
 from mmcv.utils import build_from_cfg
 
+from mmdet.utils import profile_span
 from ..builder import PIPELINES
 
 
@@ -38,7 +39,8 @@ class Compose:
         """
 
         for t in self.transforms:
-            data = t(data)
+            with profile_span(f'pipeline.{type(t).__name__}'):
+                data = t(data)
             if data is None:
                 return None
         return data
@@ -7,6 +7,7 @@ import pycocotools.mask as maskUtils
 
 from mmdet.core import BitmapMasks, PolygonMasks
 from ..builder import PIPELINES
+from ..image_cache import ImageCache
 
 try:
     from panopticapi.utils import rgb2id
@@ -119,6 +120,87 @@ class LoadImageFromWebcam(LoadImageFromFile):
         return results
 
 
+@PIPELINES.register_module()
+class LoadImageFromCache:
+    """Load an image and its annotations from an :obj:`ImageCache`.
+
+    It replaces ``LoadImageFromFile`` followed by ``LoadAnnotations`` with
+    bboxes and labels, the decoded image and the parsed annotations are read
+    from the memory-mapped files built by :func:`build_image_cache` instead.
+    The added or updated keys are the same as these two transforms.
+
+    Note that if the cache is built with ``img_scale``, the rescaled image is
+    treated as the original image, i.e. ``ori_shape`` is its shape.
+
+    Args:
+        cache_dir (str): Directory of the image cache.
+        to_float32 (bool): Whether to convert the loaded image to a float32
+            numpy array. If set to False, the loaded image is an uint8 array.
+            Defaults to False.
+        with_bbox (bool): Whether to load the bbox annotation.
+            Default: True.
+        with_label (bool): Whether to load the label annotation.
+            Default: True.
+    """
+
+    def __init__(self,
+                 cache_dir,
+                 to_float32=False,
+                 with_bbox=True,
+                 with_label=True):
+        self.cache_dir = cache_dir
+        self.to_float32 = to_float32
+        self.with_bbox = with_bbox
+        self.with_label = with_label
+        self.cache = ImageCache(cache_dir)
+
+    def __call__(self, results):
+        """Call functions to load image, meta information and annotations.
+
+        Args:
+            results (dict): Result dict from :obj:`mmdet.CustomDataset`.
+
+        Returns:
+            dict: The dict contains loaded image, meta information and
+                annotations.
+        """
+
+        ori_filename = results['img_info']['filename']
+        cached = self.cache.get(ori_filename)
+        # copy the read-only memory-mapped arrays, transforms may modify them
+        img = cached['img'].astype(
+            np.float32 if self.to_float32 else np.uint8, copy=True)
+
+        if results['img_prefix'] is not None:
+            filename = osp.join(results['img_prefix'], ori_filename)
+        else:
+            filename = ori_filename
+        results['filename'] = filename
+        results['ori_filename'] = ori_filename
+        results['img'] = img
+        results['img_shape'] = img.shape
+        results['ori_shape'] = img.shape
+        results['img_fields'] = ['img']
+
+        if self.with_bbox:
+            results['gt_bboxes'] = np.array(cached['bboxes'])
+            if cached['bboxes_ignore'] is not None:
+                results['gt_bboxes_ignore'] = np.array(cached['bboxes_ignore'])
+                results['bbox_fields'].append('gt_bboxes_ignore')
+            results['bbox_fields'].append('gt_bboxes')
+        if self.with_label:
+            results['gt_labels'] = np.array(cached['labels'])
+        return results
+
+    def __repr__(self):
+        repr_str = (f'{self.__class__.__name__}('
+                    f"cache_dir='{self.cache_dir}', "
+                    f'to_float32={self.to_float32}, '
+                    f'with_bbox={self.with_bbox}, '
+                    f'with_label={self.with_label})')
+        return repr_str
+
+
 @PIPELINES.register_module()
 class LoadMultiChannelImageFromFiles:
     """Load multi-channel images from a list of separate channel files.
@@ -27,6 +27,21 @@ except ImportError:
     Compose = None
 
 
+def _reuse_buffer(buffers, name, shape, dtype):
+    """Get a C-contiguous array backed by a buffer reused across calls.
+
+    The buffer is kept in ``buffers`` and only reallocated when it is too
+    small or of another dtype, which avoids allocating (and page faulting)
+    large temporary images for every sample in a dataloader worker.
+    """
+    size = int(np.prod(shape))
+    buffer = buffers.get(name)
+    if buffer is None or buffer.dtype != dtype or buffer.size < size:
+        buffer = np.empty(size, dtype=dtype)
+        buffers[name] = buffer
+    return buffer[:size].reshape(shape)
+
+
 @PIPELINES.register_module()
 class Resize:
     """Resize images & bbox & mask.
@@ -2003,6 +2018,11 @@ class Mosaic:
         pad_val (int): Pad value. Default to 114.
         prob (float): Probability of applying this transformation.
             Default to 1.0.
+        fast (bool): Whether to use the faster implementation, which does not
+            deep copy the results, resizes the sub-images directly into the
+            mosaic image (or into a reused buffer when they are cropped) and
+            transforms the bboxes of all the sub-images at once. The outputs
+            are identical. Default to False.
     """
 
     def __init__(self,
@@ -2012,7 +2032,8 @@ class Mosaic:
                  bbox_clip_border=True,
                  skip_filter=True,
                  pad_val=114,
-                 prob=1.0):
+                 prob=1.0,
+                 fast=False):
         assert isinstance(img_scale, tuple)
         assert 0 <= prob <= 1.0, 'The probability should be in range [0,1]. '\
             f'got {prob}.'
@@ -2025,6 +2046,8 @@ class Mosaic:
         self.skip_filter = skip_filter
         self.pad_val = pad_val
         self.prob = prob
+        self.fast = fast
+        self._buffers = dict()
 
     def __call__(self, results):
         """Call function to make a mosaic of image.
@@ -2039,6 +2062,8 @@ class Mosaic:
         if random.uniform(0, 1) > self.prob:
             return results
 
+        if self.fast:
+            return self._mosaic_transform_fast(results)
         results = self._mosaic_transform(results)
         return results
 
@@ -2152,6 +2177,99 @@ class Mosaic:
 
         return results
 
+    def _mosaic_transform_fast(self, results):
+        """Faster mosaic transform function with the same outputs as
+        :meth:`_mosaic_transform`.
+
+        Args:
+            results (dict): Result dict.
+
+        Returns:
+            dict: Updated result dict.
+        """
+
+        assert 'mix_results' in results
+        img = results['img']
+        mosaic_img = np.full(
+            (int(self.img_scale[0] * 2), int(self.img_scale[1] * 2)) +
+            img.shape[2:],
+            self.pad_val,
+            dtype=img.dtype)
+
+        # mosaic center x, y
+        center_x = int(
+            random.uniform(*self.center_ratio_range) * self.img_scale[1])
+        center_y = int(
+            random.uniform(*self.center_ratio_range) * self.img_scale[0])
+        center_position = (center_x, center_y)
+
+        loc_strs = ('top_left', 'top_right', 'bottom_left', 'bottom_right')
+        patches = [results] + results['mix_results'][:3]
+        bboxes, labels, scales, pads = [], [], [], []
+        for loc, results_patch in zip(loc_strs, patches):
+            img_i = results_patch['img']
+            h_i, w_i = img_i.shape[:2]
+            # keep_ratio resize
+            scale_ratio_i = min(self.img_scale[0] / h_i,
+                                self.img_scale[1] / w_i)
+            size_i = (int(w_i * scale_ratio_i), int(h_i * scale_ratio_i))
+
+            # compute the combine parameters
+            paste_coord, crop_coord = self._mosaic_combine(
+                loc, center_position, size_i)
+            x1_p, y1_p, x2_p, y2_p = paste_coord
+            x1_c, y1_c, x2_c, y2_c = crop_coord
+
+            # resize and paste the image, directly into the mosaic image if
+            # it is not cropped
+            paste = mosaic_img[y1_p:y2_p, x1_p:x2_p]
+            if crop_coord == (0, 0) + size_i:
+                img_i = mmcv.imresize(img_i, size_i, out=paste)
+            else:
+                out = _reuse_buffer(self._buffers, 'resize',
+                                    size_i[::-1] + img_i.shape[2:],
+                                    img_i.dtype)
+                img_i = mmcv.imresize(
+                    img_i, size_i, out=out)[y1_c:y2_c, x1_c:x2_c]
+            if not np.may_share_memory(img_i, paste):
+                paste[...] = img_i
+
+            bboxes.append(results_patch['gt_bboxes'])
+            labels.append(results_patch['gt_labels'])
+            scales.append(scale_ratio_i)
+            pads.append((x1_p - x1_c, y1_p - y1_c) * 2)
+
+        # adjust coordinate
+        mosaic_bboxes = np.concatenate(bboxes, 0)
+        mosaic_labels = np.concatenate(labels, 0)
+        num_bboxes = [len(bboxes_i) for bboxes_i in bboxes]
+        scales = np.repeat(
+            np.array(scales, dtype=mosaic_bboxes.dtype), num_bboxes)
+        pads = np.repeat(
+            np.array(pads, dtype=mosaic_bboxes.dtype), num_bboxes, axis=0)
+        mosaic_bboxes = mosaic_bboxes * scales[:, None] + pads
+
+        if self.bbox_clip_border:
+            border = np.array(
+                [self.img_scale[1], self.img_scale[0]] * 2,
+                dtype=mosaic_bboxes.dtype) * 2
+            mosaic_bboxes = np.clip(mosaic_bboxes, 0, border)
+
+        if not self.skip_filter:
+            mosaic_bboxes, mosaic_labels = \
+                self._filter_box_candidates(mosaic_bboxes, mosaic_labels)
+
+        # remove outside bboxes
+        inside_inds = find_inside_bboxes(mosaic_bboxes, 2 * self.img_scale[0],
+                                         2 * self.img_scale[1])
+
+        results['img'] = mosaic_img
+        results['img_shape'] = mosaic_img.shape
+        results['gt_bboxes'] = mosaic_bboxes[inside_inds]
+        results['gt_labels'] = mosaic_labels[inside_inds]
+
+        return results
+
     def _mosaic_combine(self, loc, center_position_xy, img_shape_wh):
         """Calculate global coordinate of mosaic image and local coordinate of
         cropped sub-image.
@@ -2228,7 +2346,8 @@ class Mosaic:
         repr_str += f'center_ratio_range={self.center_ratio_range}, '
         repr_str += f'pad_val={self.pad_val}, '
         repr_str += f'min_bbox_size={self.min_bbox_size}, '
-        repr_str += f'skip_filter={self.skip_filter})'
+        repr_str += f'skip_filter={self.skip_filter}, '
+        repr_str += f'fast={self.fast})'
         return repr_str
 
 
@@ -2287,6 +2406,11 @@ class MixUp:
             is True, the filter rule will not be applied, and the
             `min_bbox_size` and `min_area_ratio` and `max_aspect_ratio`
             is invalid. Default to True.
+        fast (bool): Whether to use the faster implementation, which resizes
+            the mixup image into reused buffers, only crops the part of it
+            that is mixed, blends uint8 images with integer arithmetic and
+            transforms the bboxes at once. The outputs are identical.
+            Default to False.
     """
 
     def __init__(self,
@@ -2299,7 +2423,8 @@ class MixUp:
                  min_area_ratio=0.2,
                  max_aspect_ratio=20,
                  bbox_clip_border=True,
-                 skip_filter=True):
+                 skip_filter=True,
+                 fast=False):
         assert isinstance(img_scale, tuple)
         log_img_scale(img_scale, skip_square=True)
         self.dynamic_scale = img_scale
@@ -2312,6 +2437,8 @@ class MixUp:
         self.max_aspect_ratio = max_aspect_ratio
         self.bbox_clip_border = bbox_clip_border
         self.skip_filter = skip_filter
+        self.fast = fast
+        self._buffers = dict()
 
     def __call__(self, results):
         """Call function to make a mixup of image.
@@ -2323,6 +2450,8 @@ class MixUp:
             dict: Result dict with mixup transformed.
         """
 
+        if self.fast:
+            return self._mixup_transform_fast(results)
         results = self._mixup_transform(results)
         return results
 
@@ -2467,6 +2596,135 @@ class MixUp:
 
         return results
 
+    def _mixup_transform_fast(self, results):
+        """Faster MixUp transform function with the same outputs as
+        :meth:`_mixup_transform`.
+
+        Args:
+            results (dict): Result dict.
+
+        Returns:
+            dict: Updated result dict.
+        """
+
+        assert 'mix_results' in results
+        assert len(
+            results['mix_results']) == 1, 'MixUp only support 2 images now !'
+
+        if results['mix_results'][0]['gt_bboxes'].shape[0] == 0:
+            # empty bbox
+            return results
+
+        retrieve_results = results['mix_results'][0]
+        retrieve_img = retrieve_results['img']
+
+        jit_factor = random.uniform(*self.ratio_range)
+        is_filp = random.uniform(0, 1) > self.flip_ratio
+
+        # 1. keep_ratio resize and 2. paste, into a reused canvas, whose
+        # dtype follows `np.ones(..., dtype=retrieve_img.dtype) * pad_val`
+        dtype = np.result_type(np.ones(1, retrieve_img.dtype), self.pad_val)
+        out_img = _reuse_buffer(
+            self._buffers, 'canvas',
+            tuple(self.dynamic_scale) + retrieve_img.shape[2:], dtype)
+        out_img.fill(self.pad_val)
+        scale_ratio = min(self.dynamic_scale[0] / retrieve_img.shape[0],
+                          self.dynamic_scale[1] / retrieve_img.shape[1])
+        size = (int(retrieve_img.shape[1] * scale_ratio),
+                int(retrieve_img.shape[0] * scale_ratio))
+        paste = out_img[:size[1], :size[0]]
+        resized_img = mmcv.imresize(retrieve_img, size, out=paste)
+        if not np.may_share_memory(resized_img, paste):
+            paste[...] = resized_img
+
+        # 3. scale jit
+        scale_ratio *= jit_factor
+        size = (int(out_img.shape[1] * jit_factor),
+                int(out_img.shape[0] * jit_factor))
+        out = _reuse_buffer(self._buffers, 'jit',
+                            size[::-1] + out_img.shape[2:], out_img.dtype)
+        out_img = mmcv.imresize(out_img, size, out=out)
+
+        # 4. flip
+        if is_filp:
+            out_img = out_img[:, ::-1, :]
+
+        # 5. random crop
+        ori_img = results['img']
+        origin_h, origin_w = out_img.shape[:2]
+        target_h, target_w = ori_img.shape[:2]
+        x_offset, y_offset = 0, 0
+        if origin_h > target_h:
+            y_offset = random.randint(0, origin_h - target_h)
+        if origin_w > target_w:
+            x_offset = random.randint(0, origin_w - target_w)
+        # only the part of the mixup image inside the crop, the rest of the
+        # cropped image is zero padding
+        cropped_img = out_img[y_offset:y_offset + target_h,
+                              x_offset:x_offset + target_w]
+
+        # 6. adjust bbox
+        retrieve_gt_bboxes = retrieve_results['gt_bboxes'] * scale_ratio
+        dtype = retrieve_gt_bboxes.dtype
+        if self.bbox_clip_border:
+            retrieve_gt_bboxes = np.clip(
+                retrieve_gt_bboxes, 0,
+                np.array([origin_w, origin_h] * 2, dtype=dtype))
+
+        if is_filp:
+            retrieve_gt_bboxes[:, 0::2] = (
+                origin_w - retrieve_gt_bboxes[:, 0::2][:, ::-1])
+
+        # 7. filter
+        cp_retrieve_gt_bboxes = retrieve_gt_bboxes - np.array(
+            [x_offset, y_offset] * 2, dtype=dtype)
+        if self.bbox_clip_border:
+            cp_retrieve_gt_bboxes = np.clip(
+                cp_retrieve_gt_bboxes, 0,
+                np.array([target_w, target_h] * 2, dtype=dtype))
+
+        # 8. mix up
+        # the mixup image is padded and cropped as uint8
+        cropped_img = cropped_img.astype(np.uint8, copy=False)
+        if ori_img.dtype == np.uint8 \
+                and ori_img.shape[2:] == cropped_img.shape[2:] == (3, ):
+            # 0.5 * a + 0.5 * b is exact in float32 for uint8 values, so
+            # the truncated mean can be computed with integers
+            mixup_img = ori_img >> 1
+            crop_h, crop_w = cropped_img.shape[:2]
+            mixup_img[:crop_h, :crop_w] = (ori_img[:crop_h, :crop_w] +
+                                           cropped_img.astype(np.uint16)) >> 1
+        else:
+            padded_img = np.zeros((target_h, target_w, 3), dtype=np.uint8)
+            padded_img[:cropped_img.shape[0], :cropped_img.shape[1]] = \
+                cropped_img
+            mixup_img = 0.5 * ori_img.astype(np.float32) + \
+                0.5 * padded_img.astype(np.float32)
+            mixup_img = mixup_img.astype(np.uint8)
+
+        retrieve_gt_labels = retrieve_results['gt_labels']
+        if not self.skip_filter:
+            keep_list = self._filter_box_candidates(retrieve_gt_bboxes.T,
+                                                    cp_retrieve_gt_bboxes.T)
+
+            retrieve_gt_labels = retrieve_gt_labels[keep_list]
+            cp_retrieve_gt_bboxes = cp_retrieve_gt_bboxes[keep_list]
+
+        mixup_gt_bboxes = np.concatenate(
+            (results['gt_bboxes'], cp_retrieve_gt_bboxes), axis=0)
+        mixup_gt_labels = np.concatenate(
+            (results['gt_labels'], retrieve_gt_labels), axis=0)
+
+        # remove outside bbox
+        inside_inds = find_inside_bboxes(mixup_gt_bboxes, target_h, target_w)
+
+        results['img'] = mixup_img
+        results['img_shape'] = mixup_img.shape
+        results['gt_bboxes'] = mixup_gt_bboxes[inside_inds]
+        results['gt_labels'] = mixup_gt_labels[inside_inds]
+
+        return results
+
     def _filter_box_candidates(self, bbox1, bbox2):
         """Compute candidate boxes which include following 5 things:
 
@@ -2492,7 +2750,8 @@ class MixUp:
         repr_str += f'min_bbox_size={self.min_bbox_size}, '
         repr_str += f'min_area_ratio={self.min_area_ratio}, '
         repr_str += f'max_aspect_ratio={self.max_aspect_ratio}, '
-        repr_str += f'skip_filter={self.skip_filter})'
+        repr_str += f'skip_filter={self.skip_filter}, '
+        repr_str += f'fast={self.fast})'
         return repr_str
 
 
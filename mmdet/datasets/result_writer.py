@@ -0,0 +1,210 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import json
+from itertools import repeat
+
+import numpy as np
+
+from mmdet.core import DetResults
+
+# the json files written for each type of results
+_RESULT_NAMES = dict(
+    det=('bbox', ), segm=('bbox', 'segm'), proposal=('proposal', ))
+
+
+def _json_default(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f'{type(obj)} is unsupported for json dump')
+
+
+class _JsonArrayWriter:
+    """Write the items of a json array to a file one by one."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._file = open(filename, 'w')
+        self._file.write('[')
+        self._empty = True
+
+    def extend(self, items):
+        for item in items:
+            if not self._empty:
+                self._file.write(', ')
+            self._file.write(json.dumps(item, default=_json_default))
+            self._empty = False
+
+    def close(self):
+        self._file.write(']')
+        self._file.close()
+
+
+def _xyxy2xywh(bboxes):
+    """Convert (n, 4+) bboxes to lists of ``xywh`` python floats, computed in
+    float64 as :meth:`CocoDataset.xyxy2xywh` does."""
+    bboxes = np.asarray(bboxes, dtype=np.float64)[:, :4].copy()
+    bboxes[:, 2:] -= bboxes[:, :2]
+    return bboxes.tolist()
+
+
+def _bbox_json(img_ids, bboxes, scores, cat_ids):
+    return [
+        dict(image_id=img_id, bbox=bbox, score=score, category_id=cat_id)
+        for img_id, bbox, score, cat_id in zip(img_ids, _xyxy2xywh(bboxes),
+                                               scores.tolist(), cat_ids)
+    ]
+
+
+class COCOResultWriter:
+    """Convert testing results to COCO json style image by image.
+
+    The json results are written to the files as soon as the results of an
+    image are converted, so that the results can be written while testing
+    and only the results of a batch are held in memory, which matters for
+    the RLEs of segmentation results. If no ``outfile_prefix`` is given, the
+    json results are kept in lists instead, which can be passed to
+    ``COCO.loadRes`` without dumping them to temporary files.
+
+    There are 3 types of results: proposals, bbox predictions and mask
+    predictions, recognized from the first written result as
+    :meth:`CocoDataset.results2json` does.
+
+    Args:
+        img_ids (list[int]): The image ids of the dataset, the results are
+            written in this order.
+        cat_ids (list[int]): The category ids of the labels.
+        outfile_prefix (str, optional): The filename prefix of the json files.
+            If the prefix is "somepath/xxx", the json files will be named
+            "somepath/xxx.bbox.json", "somepath/xxx.segm.json",
+            "somepath/xxx.proposal.json". Default: None.
+
+    Example:
+        >>> with COCOResultWriter(img_ids, cat_ids, 'res') as writer:
+        >>>     for batch_results in batches:
+        >>>         writer.write(batch_results)
+        >>> writer.result_files
+        {'bbox': 'res.bbox.json', 'proposal': 'res.bbox.json'}
+    """
+
+    def __init__(self, img_ids, cat_ids, outfile_prefix=None):
+        self.img_ids = img_ids
+        self.cat_ids = cat_ids
+        self.outfile_prefix = outfile_prefix
+        self.num_written = 0
+        self.result_files = None
+        self._kind = None
+        self._sinks = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _open(self, kind):
+        if self._kind is None:
+            for name in _RESULT_NAMES[kind]:
+                if self.outfile_prefix is None:
+                    self._sinks[name] = []
+                else:
+                    self._sinks[name] = _JsonArrayWriter(
+                        f'{self.outfile_prefix}.{name}.json')
+            self._kind = kind
+        elif kind != self._kind:
+            raise TypeError('invalid type of results')
+
+    def write(self, results):
+        """Write the results of the next images.
+
+        Args:
+            results (list[list | tuple | ndarray] | :obj:`DetResults`): The
+                results of some images, following the images written before.
+        """
+        assert self.result_files is None, 'the writer is closed'
+        if isinstance(results, DetResults):
+            self._write_flat(results)
+            return
+        for result in results:
+            img_id = self.img_ids[self.num_written]
+            if isinstance(result, list):
+                self._open('det')
+                self._write_det(img_id, result)
+            elif isinstance(result, tuple):
+                self._open('segm')
+                self._write_segm(img_id, *result)
+            elif isinstance(result, np.ndarray):
+                self._open('proposal')
+                self._write_proposal(img_id, result)
+            else:
+                raise TypeError('invalid type of results')
+            self.num_written += 1
+
+    def _det_json(self, img_id, det):
+        labels = np.repeat(np.arange(len(det)), [len(dets) for dets in det])
+        dets = np.zeros((0, 5))
+        if len(det):
+            dets = np.concatenate(
+                [np.asarray(dets).reshape(-1, 5) for dets in det])
+        cat_ids = [self.cat_ids[label] for label in labels.tolist()]
+        return _bbox_json(repeat(img_id), dets, dets[:, 4], cat_ids), labels
+
+    def _write_det(self, img_id, det):
+        self._sinks['bbox'].extend(self._det_json(img_id, det)[0])
+
+    def _write_segm(self, img_id, det, seg):
+        bbox_json, labels = self._det_json(img_id, det)
+        self._sinks['bbox'].extend(bbox_json)
+        segm_json = []
+        # some detectors use different scores for bbox and mask
+        if isinstance(seg, tuple):
+            segms, mask_scores = seg
+        else:
+            segms, mask_scores = seg, [dets[:, 4] for dets in det]
+        for data, label, rank in zip(
+                bbox_json, labels,
+                np.arange(len(labels)) - np.searchsorted(labels, labels)):
+            segm = segms[label][rank]
+            if isinstance(segm['counts'], bytes):
+                segm = dict(segm, counts=segm['counts'].decode())
+            segm_json.append(
+                dict(
+                    data,
+                    score=float(mask_scores[label][rank]),
+                    segmentation=segm))
+        self._sinks['segm'].extend(segm_json)
+
+    def _write_proposal(self, img_id, bboxes):
+        self._sinks['proposal'].extend(
+            _bbox_json(repeat(img_id), bboxes, bboxes[:, 4], repeat(1)))
+
+    def _write_flat(self, results):
+        self._open('det')
+        img_inds = self.num_written + results.img_inds
+        img_ids = np.asarray(self.img_ids)[img_inds].tolist()
+        cat_ids = np.asarray(self.cat_ids)[results.labels].tolist()
+        self._sinks['bbox'].extend(
+            _bbox_json(img_ids, results.bboxes, results.scores, cat_ids))
+        self.num_written += len(results)
+
+    def close(self):
+        """Finish writing and return the written results.
+
+        Returns:
+            dict[str, str | list]: Possible keys are "bbox", "segm",
+                "proposal", and values are the corresponding filenames, or
+                lists of json results if no ``outfile_prefix`` is given.
+        """
+        if self.result_files is not None:
+            return self.result_files
+        result_files = dict()
+        for name, sink in self._sinks.items():
+            if isinstance(sink, _JsonArrayWriter):
+                sink.close()
+                result_files[name] = sink.filename
+            else:
+                result_files[name] = sink
+        if 'bbox' in result_files:
+            result_files['proposal'] = result_files['bbox']
+        self.result_files = result_files
+        return result_files
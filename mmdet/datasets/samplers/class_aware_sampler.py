@@ -1,6 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import math
 
+import numpy as np
 import torch
 from mmcv.runner import get_dist_info
 from torch.utils.data import Sampler
@@ -81,44 +82,53 @@ class ClassAwareSampler(Sampler):
             i for i, length in enumerate(self.num_cat_imgs) if length != 0
         ]
         self.num_classes = len(self.valid_cat_inds)
+        # the images of the valid labels in CSR format, the images of the
+        # i-th valid label are cat_imgs[cat_indptr[i]:cat_indptr[i + 1]]
+        cat_imgs = [
+            np.asarray(self.cat_dict[i], dtype=np.int64)
+            for i in self.valid_cat_inds
+        ]
+        self.cat_indptr = np.cumsum([0] + [len(x) for x in cat_imgs])
+        self.cat_imgs = np.concatenate([np.zeros(0, dtype=np.int64)] +
+                                       cat_imgs)
 
     def __iter__(self):
         # deterministically shuffle based on epoch
         g = torch.Generator()
         g.manual_seed(self.epoch + self.seed)
 
-        # initialize label list
-        label_iter_list = RandomCycleIter(self.valid_cat_inds, generator=g)
-        # initialize each per-label image list
-        data_iter_dict = dict()
-        for i in self.valid_cat_inds:
-            data_iter_dict[i] = RandomCycleIter(self.cat_dict[i], generator=g)
-
-        def gen_cat_img_inds(cls_list, data_dict, num_sample_cls):
-            """Traverse the categories and extract `num_sample_cls` image
-            indexes of the corresponding categories one by one."""
-            id_indices = []
-            for _ in range(len(cls_list)):
-                cls_idx = next(cls_list)
-                for _ in range(num_sample_cls):
-                    id = next(data_dict[cls_idx])
-                    id_indices.append(id)
-            return id_indices
-
-        # deterministically shuffle based on epoch
+        # Each bin traverses the labels in a random order, and extracts
+        # `num_sample_class` images of each label. The images of a label are
+        # extracted in a random order, which is shuffled again after all the
+        # images of the label are traversed, i.e. the same as iterating over
+        # `RandomCycleIter` of the labels and of the images of each label.
         num_bins = int(
             math.ceil(self.total_size * 1.0 / self.num_classes /
                       self.num_sample_class))
-        indices = []
-        for i in range(num_bins):
-            indices += gen_cat_img_inds(label_iter_list, data_iter_dict,
-                                        self.num_sample_class)
+        num_cat_samples = num_bins * self.num_sample_class
+        cat_orders = torch.rand(
+            num_bins, self.num_classes, generator=g).argsort(1).numpy()
+        cat_samples = np.empty((self.num_classes, num_cat_samples),
+                               dtype=np.int64)
+        for i in range(self.num_classes):
+            imgs = self.cat_imgs[self.cat_indptr[i]:self.cat_indptr[i + 1]]
+            num_cycles = int(math.ceil(num_cat_samples / len(imgs)))
+            perms = torch.rand(
+                num_cycles, len(imgs), generator=g).argsort(1).numpy()
+            cat_samples[i] = imgs[perms.reshape(-1)[:num_cat_samples]]
+        # (num_bins, num_classes, num_sample_class) samples of the labels in
+        # the order of each bin
+        cat_samples = cat_samples.reshape(self.num_classes, num_bins, -1)
+        indices = np.take_along_axis(
+            cat_samples.transpose(1, 0, 2), cat_orders[..., None], axis=1)
+        indices = indices.reshape(-1)
 
         # fix extra samples to make it evenly divisible
         if len(indices) >= self.total_size:
             indices = indices[:self.total_size]
         else:
-            indices += indices[:(self.total_size - len(indices))]
+            indices = np.concatenate(
+                [indices, indices[:(self.total_size - len(indices))]])
         assert len(indices) == self.total_size
 
         # subsample
@@ -126,7 +136,7 @@ class ClassAwareSampler(Sampler):
         indices = indices[offset:offset + self.num_samples]
         assert len(indices) == self.num_samples
 
-        return iter(indices)
+        return iter(indices.tolist())
 
     def __len__(self):
         return self.num_samples
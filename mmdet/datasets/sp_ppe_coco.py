@@ -13,10 +13,13 @@ import numpy as np
 from mmcv.utils import print_log
 from terminaltables import AsciiTable
 
-from mmdet.core import eval_recalls
-from .api_wrappers import COCO, COCOeval
+from mmdet.core import DetResults, eval_recalls
+from .api_wrappers import COCO, COCOeval, COCOStore, FastCOCOeval
 from .builder import DATASETS
+from .cat_index import coco_cat_index
 from .custom import CustomDataset
+from .online_eval import OnlineCOCOEvaluator
+from .result_writer import COCOResultWriter
 
 
 @DATASETS.register_module()
@@ -67,13 +70,17 @@ class SPPPECocoDataset(CustomDataset):
         """Load annotation from COCO style annotation file.
 
         Args:
-            ann_file (str): Path of annotation file.
+            ann_file (str): Path of annotation file, or directory of a
+                :class:`COCOStore` built by :func:`build_coco_store`.
 
         Returns:
             list[dict]: Annotation info from COCO api.
         """
 
-        self.coco = COCO(ann_file)
+        if osp.isdir(ann_file):
+            self.coco = COCOStore(ann_file)
+        else:
+            self.coco = COCO(ann_file)
         # The order of returned `cat_ids` will not
         # change with the order of the CLASSES
         self.cat_ids = self.coco.get_cat_ids(cat_names=self.CLASSES)
@@ -122,11 +129,23 @@ class SPPPECocoDataset(CustomDataset):
         ann_info = self.coco.load_anns(ann_ids)
         return [ann['category_id'] for ann in ann_info]
 
+    def _build_cat_index(self):
+        # read the annotations of the images directly instead of calling
+        # get_cat_ids, unless a subclass overrides it
+        if type(self).get_cat_ids is not SPPPECocoDataset.get_cat_ids:
+            return super()._build_cat_index()
+        return coco_cat_index(self.coco,
+                              [info['id'] for info in self.data_infos])
+
     def _filter_imgs(self, min_size=32):
         """Filter images too small or without ground truths."""
         valid_inds = []
         # obtain images that contain annotation
-        ids_with_ann = set(_['image_id'] for _ in self.coco.anns.values())
+        if isinstance(self.coco, COCOStore):
+            # without decoding the annotations of the store
+            ids_with_ann = self.coco.get_img_ids_with_anns()
+        else:
+            ids_with_ann = set(_['image_id'] for _ in self.coco.anns.values())
         # obtain images that contain annotations of the required categories
         ids_in_cat = set()
         for i, class_id in enumerate(self.cat_ids):
@@ -225,115 +244,98 @@ class SPPPECocoDataset(CustomDataset):
             _bbox[3] - _bbox[1],
         ]
 
+    def online_evaluator(self,
+                         metric='bbox',
+                         jsonfile_prefix=None,
+                         classwise=False,
+                         proposal_nums=(100, 300, 1000),
+                         iou_thrs=None,
+                         metric_items=None,
+                         background=False,
+                         **kwargs):
+        """Get an evaluator computing the metrics of :meth:`evaluate` while
+        testing, see :class:`OnlineCOCOEvaluator`.
+
+        The arguments are the same as :meth:`evaluate`. Other arguments of
+        :meth:`evaluate`, e.g. ``fast_eval``, do not change the metrics and
+        are ignored.
+
+        Args:
+            background (bool): Whether to evaluate in a background thread.
+                Default: False.
+
+        Returns:
+            :obj:`OnlineCOCOEvaluator` | None: The evaluator, or None if the
+                metrics can not be evaluated while testing, i.e.
+                'proposal_fast' or the json files are required by
+                ``jsonfile_prefix``.
+        """
+        metrics = metric if isinstance(metric, list) else [metric]
+        if jsonfile_prefix is not None or any(
+                metric not in OnlineCOCOEvaluator.allowed_metrics
+                for metric in metrics):
+            return None
+        return OnlineCOCOEvaluator(self, metrics, classwise, proposal_nums,
+                                   iou_thrs, metric_items, background)
+
+    def result_writer(self, outfile_prefix=None):
+        """Get a writer converting the testing results of the dataset to COCO
+        json style image by image, e.g. while testing.
+
+        Args:
+            outfile_prefix (str, optional): The filename prefix of the json
+                files, see :meth:`results2json`. If not specified, the json
+                results are kept in memory. Default: None.
+
+        Returns:
+            :obj:`COCOResultWriter`: The writer, whose results are written in
+                the order of the images of the dataset.
+        """
+        return COCOResultWriter(self.img_ids, self.cat_ids, outfile_prefix)
+
     def _proposal2json(self, results):
         """Convert proposal results to COCO json style."""
-        json_results = []
-        for idx in range(len(self)):
-            img_id = self.img_ids[idx]
-            bboxes = results[idx]
-            for i in range(bboxes.shape[0]):
-                data = dict()
-                data['image_id'] = img_id
-                data['bbox'] = self.xyxy2xywh(bboxes[i])
-                data['score'] = float(bboxes[i][4])
-                data['category_id'] = 1
-                json_results.append(data)
-        return json_results
+        with COCOResultWriter(self.img_ids, self.cat_ids) as writer:
+            writer.write(results)
+        return writer.result_files['proposal']
 
     def _det2json(self, results):
         """Convert detection results to COCO json style."""
-        json_results = []
-        for idx in range(len(self)):
-            img_id = self.img_ids[idx]
-            result = results[idx]
-            for label in range(len(result)):
-                bboxes = result[label]
-                for i in range(bboxes.shape[0]):
-                    data = dict()
-                    data['image_id'] = img_id
-                    data['bbox'] = self.xyxy2xywh(bboxes[i])
-                    data['score'] = float(bboxes[i][4])
-                    data['category_id'] = self.cat_ids[label]
-                    json_results.append(data)
-        return json_results
+        with COCOResultWriter(self.img_ids, self.cat_ids) as writer:
+            writer.write(results)
+        return writer.result_files['bbox']
 
     def _segm2json(self, results):
         """Convert instance segmentation results to COCO json style."""
-        bbox_json_results = []
-        segm_json_results = []
-        for idx in range(len(self)):
-            img_id = self.img_ids[idx]
-            det, seg = results[idx]
-            for label in range(len(det)):
-                # bbox results
-                bboxes = det[label]
-                for i in range(bboxes.shape[0]):
-                    data = dict()
-                    data['image_id'] = img_id
-                    data['bbox'] = self.xyxy2xywh(bboxes[i])
-                    data['score'] = float(bboxes[i][4])
-                    data['category_id'] = self.cat_ids[label]
-                    bbox_json_results.append(data)
-
-                # segm results
-                # some detectors use different scores for bbox and mask
-                if isinstance(seg, tuple):
-                    segms = seg[0][label]
-                    mask_score = seg[1][label]
-                else:
-                    segms = seg[label]
-                    mask_score = [bbox[4] for bbox in bboxes]
-                for i in range(bboxes.shape[0]):
-                    data = dict()
-                    data['image_id'] = img_id
-                    data['bbox'] = self.xyxy2xywh(bboxes[i])
-                    data['score'] = float(mask_score[i])
-                    data['category_id'] = self.cat_ids[label]
-                    if isinstance(segms[i]['counts'], bytes):
-                        segms[i]['counts'] = segms[i]['counts'].decode()
-                    data['segmentation'] = segms[i]
-                    segm_json_results.append(data)
-        return bbox_json_results, segm_json_results
-
-    def results2json(self, results, outfile_prefix):
+        with COCOResultWriter(self.img_ids, self.cat_ids) as writer:
+            writer.write(results)
+        return writer.result_files['bbox'], writer.result_files['segm']
+
+    def results2json(self, results, outfile_prefix=None):
         """Dump the detection results to a COCO style json file.
 
         There are 3 types of results: proposals, bbox predictions, mask
         predictions, and they have different data types. This method will
-        automatically recognize the type, and dump them to json files.
+        automatically recognize the type, and dump them to json files. The
+        results are converted and written to the files image by image.
 
         Args:
-            results (list[list | tuple | ndarray]): Testing results of the
-                dataset.
-            outfile_prefix (str): The filename prefix of the json files. If the
-                prefix is "somepath/xxx", the json files will be named
-                "somepath/xxx.bbox.json", "somepath/xxx.segm.json",
-                "somepath/xxx.proposal.json".
+            results (list[list | tuple | ndarray] | :obj:`DetResults`):
+                Testing results of the dataset.
+            outfile_prefix (str, optional): The filename prefix of the json
+                files. If the prefix is "somepath/xxx", the json files will be
+                named "somepath/xxx.bbox.json", "somepath/xxx.segm.json",
+                "somepath/xxx.proposal.json". If not specified, the json
+                results are returned instead. Default: None.
 
         Returns:
-            dict[str: str]: Possible keys are "bbox", "segm", "proposal", and \
-                values are corresponding filenames.
+            dict[str: str | list]: Possible keys are "bbox", "segm", \
+                "proposal", and values are corresponding filenames, or lists \
+                of json results if ``outfile_prefix`` is not specified.
         """
-        result_files = dict()
-        if isinstance(results[0], list):
-            json_results = self._det2json(results)
-            result_files['bbox'] = f'{outfile_prefix}.bbox.json'
-            result_files['proposal'] = f'{outfile_prefix}.bbox.json'
-            mmcv.dump(json_results, result_files['bbox'])
-        elif isinstance(results[0], tuple):
-            json_results = self._segm2json(results)
-            result_files['bbox'] = f'{outfile_prefix}.bbox.json'
-            result_files['proposal'] = f'{outfile_prefix}.bbox.json'
-            result_files['segm'] = f'{outfile_prefix}.segm.json'
-            mmcv.dump(json_results[0], result_files['bbox'])
-            mmcv.dump(json_results[1], result_files['segm'])
-        elif isinstance(results[0], np.ndarray):
-            json_results = self._proposal2json(results)
-            result_files['proposal'] = f'{outfile_prefix}.proposal.json'
-            mmcv.dump(json_results, result_files['proposal'])
-        else:
-            raise TypeError('invalid type of results')
-        return result_files
+        with self.result_writer(outfile_prefix) as writer:
+            writer.write(results)
+        return writer.result_files
 
     def fast_eval_recall(self, results, proposal_nums, iou_thrs, logger=None):
         gt_bboxes = []
@@ -363,8 +365,8 @@ class SPPPECocoDataset(CustomDataset):
         """Format the results to json (standard format for COCO evaluation).
 
         Args:
-            results (list[tuple | numpy.ndarray]): Testing results of the
-                dataset.
+            results (list[tuple | numpy.ndarray] | :obj:`DetResults`):
+                Testing results of the dataset.
             jsonfile_prefix (str | None): The prefix of json files. It includes
                 the file path and the prefix of filename, e.g., "a/b/prefix".
                 If not specified, a temp file will be created. Default: None.
@@ -374,7 +376,8 @@ class SPPPECocoDataset(CustomDataset):
                 the json filepaths, tmp_dir is the temporal directory created \
                 for saving json files when jsonfile_prefix is not specified.
         """
-        assert isinstance(results, list), 'results must be a list'
+        assert isinstance(results, (list, DetResults)), \
+            'results must be a list or DetResults'
         assert len(results) == len(self), (
             'The length of results is not equal to the dataset len: {} != {}'.
             format(len(results), len(self)))
@@ -396,14 +399,17 @@ class SPPPECocoDataset(CustomDataset):
                           classwise=False,
                           proposal_nums=(100, 300, 1000),
                           iou_thrs=None,
-                          metric_items=None):
+                          metric_items=None,
+                          fast_eval=False):
         """Instance segmentation and object detection evaluation in COCO
         protocol.
 
         Args:
             results (list[list | tuple | dict]): Testing results of the
                 dataset.
-            result_files (dict[str, str]): a dict contains json file path.
+            result_files (dict[str, str | list | COCOeval]): a dict contains
+                json file path, the json results themselves, or a COCOeval
+                whose results are already matched.
             coco_gt (COCO): COCO API object with ground truth annotation.
             metric (str | list[str]): Metrics to be evaluated. Options are
                 'bbox', 'segm', 'proposal', 'proposal_fast'.
@@ -424,6 +430,10 @@ class SPPPECocoDataset(CustomDataset):
                 used when ``metric=='proposal'``, ``['mAP', 'mAP_50', 'mAP_75',
                 'mAP_s', 'mAP_m', 'mAP_l']`` will be used when
                 ``metric=='bbox' or metric=='segm'``.
+            fast_eval (bool): Whether to use :class:`FastCOCOeval`, which
+                matches and accumulates all images at once with numpy,
+                instead of the per-image loops of ``COCOeval``. The results
+                are the same. Default: False.
 
         Returns:
             dict[str, float]: COCO style evaluation metric.
@@ -459,36 +469,45 @@ class SPPPECocoDataset(CustomDataset):
             iou_type = 'bbox' if metric == 'proposal' else metric
             if metric not in result_files:
                 raise KeyError(f'{metric} is not in results')
-            try:
-                predictions = mmcv.load(result_files[metric])
-                if iou_type == 'segm':
-                    # Refer to https://github.com/cocodataset/cocoapi/blob/master/PythonAPI/pycocotools/coco.py#L331  # noqa
-                    # When evaluating mask AP, if the results contain bbox,
-                    # cocoapi will use the box area instead of the mask area
-                    # for calculating the instance area. Though the overall AP
-                    # is not affected, this leads to different
-                    # small/medium/large mask AP results.
-                    for x in predictions:
-                        x.pop('bbox')
-                    warnings.simplefilter('once')
-                    warnings.warn(
-                        'The key "bbox" is deleted for more accurate mask AP '
-                        'of small/medium/large instances since v2.12.0. This '
-                        'does not change the overall mAP calculation.',
-                        UserWarning)
-                coco_det = coco_gt.loadRes(predictions)
-            except IndexError:
-                print_log(
-                    'The testing results of the whole dataset is empty.',
-                    logger=logger,
-                    level=logging.ERROR)
-                break
-
-            cocoEval = COCOeval(coco_gt, coco_det, iou_type)
-            cocoEval.params.catIds = self.cat_ids
-            cocoEval.params.imgIds = self.img_ids
-            cocoEval.params.maxDets = list(proposal_nums)
-            cocoEval.params.iouThrs = iou_thrs
+            matched = isinstance(result_files[metric], COCOeval)
+            if matched:
+                # the results are matched while testing, e.g. by
+                # OnlineCOCOEvaluator, and only need to be accumulated
+                cocoEval = result_files[metric]
+            else:
+                try:
+                    predictions = result_files[metric]
+                    if isinstance(predictions, str):
+                        predictions = mmcv.load(predictions)
+                    if iou_type == 'segm':
+                        # Refer to https://github.com/cocodataset/cocoapi/blob/master/PythonAPI/pycocotools/coco.py#L331  # noqa
+                        # When evaluating mask AP, if the results contain
+                        # bbox, cocoapi will use the box area instead of the
+                        # mask area for calculating the instance area. Though
+                        # the overall AP is not affected, this leads to
+                        # different small/medium/large mask AP results.
+                        for x in predictions:
+                            x.pop('bbox')
+                        warnings.simplefilter('once')
+                        warnings.warn(
+                            'The key "bbox" is deleted for more accurate mask '
+                            'AP of small/medium/large instances since '
+                            'v2.12.0. This does not change the overall mAP '
+                            'calculation.', UserWarning)
+                    coco_det = coco_gt.loadRes(predictions)
+                except IndexError:
+                    print_log(
+                        'The testing results of the whole dataset is empty.',
+                        logger=logger,
+                        level=logging.ERROR)
+                    break
+
+                eval_cls = FastCOCOeval if fast_eval else COCOeval
+                cocoEval = eval_cls(coco_gt, coco_det, iou_type)
+                cocoEval.params.catIds = self.cat_ids
+                cocoEval.params.imgIds = self.img_ids
+                cocoEval.params.maxDets = list(proposal_nums)
+                cocoEval.params.iouThrs = iou_thrs
             # mapping of cocoEval.stats
             coco_metric_names = {
                 'mAP': 0,
@@ -512,7 +531,8 @@ class SPPPECocoDataset(CustomDataset):
 
             if metric == 'proposal':
                 cocoEval.params.useCats = 0
-                cocoEval.evaluate()
+                if not matched:
+                    cocoEval.evaluate()
                 cocoEval.accumulate()
 
                 # Save coco summarize print information to logger
@@ -532,7 +552,8 @@ class SPPPECocoDataset(CustomDataset):
                         f'{cocoEval.stats[coco_metric_names[item]]:.3f}')
                     eval_results[item] = val
             else:
-                cocoEval.evaluate()
+                if not matched:
+                    cocoEval.evaluate()
                 cocoEval.accumulate()
 
                 # Save coco summarize print information to logger
@@ -601,7 +622,8 @@ class SPPPECocoDataset(CustomDataset):
                  classwise=False,
                  proposal_nums=(100, 300, 1000),
                  iou_thrs=None,
-                 metric_items=None):
+                 metric_items=None,
+                 fast_eval=False):
         """Evaluation in COCO protocol.
 
         Args:
@@ -612,7 +634,8 @@ class SPPPECocoDataset(CustomDataset):
                 related information during evaluation. Default: None.
             jsonfile_prefix (str | None): The prefix of json files. It includes
                 the file path and the prefix of filename, e.g., "a/b/prefix".
-                If not specified, a temp file will be created. Default: None.
+                If not specified, the json results are passed to the
+                evaluator in memory. Default: None.
             classwise (bool): Whether to evaluating the AP for each class.
             proposal_nums (Sequence[int]): Proposal number used for evaluating
                 recalls, such as recall@100, recall@1000.
@@ -628,6 +651,10 @@ class SPPPECocoDataset(CustomDataset):
                 used when ``metric=='proposal'``, ``['mAP', 'mAP_50', 'mAP_75',
                 'mAP_s', 'mAP_m', 'mAP_l']`` will be used when
                 ``metric=='bbox' or metric=='segm'``.
+            fast_eval (bool): Whether to use :class:`FastCOCOeval`, which
+                matches and accumulates all images at once with numpy,
+                instead of the per-image loops of ``COCOeval``. The results
+                are the same. Default: False.
 
         Returns:
             dict[str, float]: COCO style evaluation metric.
@@ -642,12 +669,14 @@ class SPPPECocoDataset(CustomDataset):
         coco_gt = self.coco
         self.cat_ids = coco_gt.get_cat_ids(cat_names=self.CLASSES)
 
-        result_files, tmp_dir = self.format_results(results, jsonfile_prefix)
-        eval_results = self.evaluate_det_segm(results, result_files, coco_gt,
-                                              metrics, logger, classwise,
-                                              proposal_nums, iou_thrs,
-                                              metric_items)
-
-        if tmp_dir is not None:
-            tmp_dir.cleanup()
-        return eval_results
+        if jsonfile_prefix is None:
+            # evaluate the json results without dumping them to temp files
+            assert len(results) == len(self), (
+                'The length of results is not equal to the dataset len: '
+                f'{len(results)} != {len(self)}')
+            result_files = self.results2json(results)
+        else:
+            result_files, _ = self.format_results(results, jsonfile_prefix)
+        return self.evaluate_det_segm(results, result_files, coco_gt, metrics,
+                                      logger, classwise, proposal_nums,
+                                      iou_thrs, metric_items, fast_eval)
@@ -3,7 +3,7 @@ from collections import OrderedDict
 
 from mmcv.utils import print_log
 
-from mmdet.core import eval_map, eval_recalls
+from mmdet.core import OnlineMAPEvaluator, eval_map, eval_recalls
 from .builder import DATASETS
 from .xml_style import XMLDataset
 
@@ -31,6 +31,26 @@ class VOCDataset(XMLDataset):
         else:
             raise ValueError('Cannot infer dataset year from img_prefix')
 
+    def online_evaluator(self,
+                         metric='mAP',
+                         iou_thr=0.5,
+                         background=False,
+                         **kwargs):
+        """Get an evaluator computing the mAP of :meth:`evaluate` while
+        testing, see :meth:`CustomDataset.online_evaluator`."""
+        if not isinstance(metric, str):
+            assert len(metric) == 1
+            metric = metric[0]
+        if metric != 'mAP':
+            return None
+        return OnlineMAPEvaluator(
+            self.get_ann_info,
+            iou_thr,
+            scale_ranges=None,
+            dataset='voc07' if self.year == 2007 else self.CLASSES,
+            use_legacy_coordinate=True,
+            background=background)
+
     def evaluate(self,
                  results,
                  metric='mAP',
@@ -6,7 +6,7 @@ import torch.nn as nn
 import torch.nn.functional as F
 from mmcv.cnn import ConvModule
 
-from mmdet.core import InstanceData, mask_matrix_nms, multi_apply
+from mmdet.core import CompactInstanceData, mask_matrix_nms, multi_apply
 from mmdet.core.utils import center_of_mass, generate_coordinate
 from mmdet.models.builder import HEADS, build_loss
 from mmdet.utils.misc import floordiv
@@ -450,8 +450,8 @@ class SOLOHead(BaseMaskHead):
             img_metas (list[dict]): Meta information of all images.
 
         Returns:
-            list[:obj:`InstanceData`]: Processed results of multiple
-            images.Each :obj:`InstanceData` usually contains
+            list[:obj:`CompactInstanceData`]: Processed results of multiple
+            images.Each :obj:`CompactInstanceData` usually contains
             following keys.
 
                 - scores (Tensor): Classification scores, has shape
@@ -498,7 +498,7 @@ class SOLOHead(BaseMaskHead):
                 Default: None.
 
         Returns:
-            :obj:`InstanceData`: Processed results of single image.
+            :obj:`CompactInstanceData`: Processed results of single image.
              it usually contains following keys.
 
                 - scores (Tensor): Classification scores, has shape
@@ -508,21 +508,21 @@ class SOLOHead(BaseMaskHead):
                   shape (num_instances, h, w).
         """
 
-        def empty_results(results, cls_scores):
+        def empty_results(cls_scores):
             """Generate a empty results."""
-            results.scores = cls_scores.new_ones(0)
-            results.masks = cls_scores.new_zeros(0, *results.ori_shape[:2])
-            results.labels = cls_scores.new_ones(0)
-            return results
+            return CompactInstanceData(
+                dict(
+                    masks=cls_scores.new_zeros(0, *img_meta['ori_shape'][:2]),
+                    labels=cls_scores.new_ones(0),
+                    scores=cls_scores.new_ones(0)), img_meta)
 
         cfg = self.test_cfg if cfg is None else cfg
         assert len(cls_scores) == len(mask_preds)
-        results = InstanceData(img_meta)
 
         featmap_size = mask_preds.size()[-2:]
 
-        img_shape = results.img_shape
-        ori_shape = results.ori_shape
+        img_shape = img_meta['img_shape']
+        ori_shape = img_meta['ori_shape']
 
         h, w, _ = img_shape
         upsampled_size = (featmap_size[0] * 4, featmap_size[1] * 4)
@@ -530,7 +530,7 @@ class SOLOHead(BaseMaskHead):
         score_mask = (cls_scores > cfg.score_thr)
         cls_scores = cls_scores[score_mask]
         if len(cls_scores) == 0:
-            return empty_results(results, cls_scores)
+            return empty_results(cls_scores)
 
         inds = score_mask.nonzero()
         cls_labels = inds[:, 1]
@@ -550,7 +550,7 @@ class SOLOHead(BaseMaskHead):
         sum_masks = masks.sum((1, 2)).float()
         keep = sum_masks > strides
         if keep.sum() == 0:
-            return empty_results(results, cls_scores)
+            return empty_results(cls_scores)
         masks = masks[keep]
         mask_preds = mask_preds[keep]
         sum_masks = sum_masks[keep]
@@ -579,11 +579,8 @@ class SOLOHead(BaseMaskHead):
             mask_preds, size=ori_shape[:2], mode='bilinear').squeeze(0)
         masks = mask_preds > cfg.mask_thr
 
-        results.masks = masks
-        results.labels = labels
-        results.scores = scores
-
-        return results
+        return CompactInstanceData(
+            dict(masks=masks, labels=labels, scores=scores), img_meta)
 
 
 @HEADS.register_module()
@@ -893,8 +890,8 @@ class DecoupledSOLOHead(SOLOHead):
             img_metas (list[dict]): Meta information of all images.
 
         Returns:
-            list[:obj:`InstanceData`]: Processed results of multiple
-            images.Each :obj:`InstanceData` usually contains
+            list[:obj:`CompactInstanceData`]: Processed results of multiple
+            images.Each :obj:`CompactInstanceData` usually contains
             following keys.
 
                 - scores (Tensor): Classification scores, has shape
@@ -953,7 +950,7 @@ class DecoupledSOLOHead(SOLOHead):
             cfg (dict): Config used in test phase.
 
         Returns:
-            :obj:`InstanceData`: Processed results of single image.
+            :obj:`CompactInstanceData`: Processed results of single image.
              it usually contains following keys.
 
                 - scores (Tensor): Classification scores, has shape
@@ -963,18 +960,18 @@ class DecoupledSOLOHead(SOLOHead):
                   shape (num_instances, h, w).
         """
 
-        def empty_results(results, cls_scores):
+        def empty_results(cls_scores):
             """Generate a empty results."""
-            results.scores = cls_scores.new_ones(0)
-            results.masks = cls_scores.new_zeros(0, *results.ori_shape[:2])
-            results.labels = cls_scores.new_ones(0)
-            return results
+            return CompactInstanceData(
+                dict(
+                    masks=cls_scores.new_zeros(0, *img_meta['ori_shape'][:2]),
+                    labels=cls_scores.new_ones(0),
+                    scores=cls_scores.new_ones(0)), img_meta)
 
         cfg = self.test_cfg if cfg is None else cfg
 
-        results = InstanceData(img_meta)
-        img_shape = results.img_shape
-        ori_shape = results.ori_shape
+        img_shape = img_meta['img_shape']
+        ori_shape = img_meta['ori_shape']
         h, w, _ = img_shape
         featmap_size = mask_preds_x.size()[-2:]
         upsampled_size = (featmap_size[0] * 4, featmap_size[1] * 4)
@@ -1022,7 +1019,7 @@ class DecoupledSOLOHead(SOLOHead):
         sum_masks = masks.sum((1, 2)).float()
         keep = sum_masks > strides
         if keep.sum() == 0:
-            return empty_results(results, cls_scores)
+            return empty_results(cls_scores)
 
         masks = masks[keep]
         mask_preds = mask_preds[keep]
@@ -1052,11 +1049,8 @@ class DecoupledSOLOHead(SOLOHead):
             mask_preds, size=ori_shape[:2], mode='bilinear').squeeze(0)
         masks = mask_preds > cfg.mask_thr
 
-        results.masks = masks
-        results.labels = labels
-        results.scores = scores
-
-        return results
+        return CompactInstanceData(
+            dict(masks=masks, labels=labels, scores=scores), img_meta)
 
 
 @HEADS.register_module()
@@ -9,7 +9,7 @@ import torch.nn.functional as F
 from mmcv.cnn import ConvModule
 from mmcv.runner import BaseModule, auto_fp16, force_fp32
 
-from mmdet.core import InstanceData, mask_matrix_nms, multi_apply
+from mmdet.core import CompactInstanceData, mask_matrix_nms, multi_apply
 from mmdet.core.utils import center_of_mass, generate_coordinate
 from mmdet.models.builder import HEADS
 from mmdet.utils.misc import floordiv
@@ -600,8 +600,8 @@ class SOLOV2Head(SOLOHead):
             img_metas (list[dict]): Meta information of all images.
 
         Returns:
-            list[:obj:`InstanceData`]: Processed results of multiple
-            images.Each :obj:`InstanceData` usually contains
+            list[:obj:`CompactInstanceData`]: Processed results of multiple
+            images.Each :obj:`CompactInstanceData` usually contains
             following keys.
 
                 - scores (Tensor): Classification scores, has shape
@@ -663,7 +663,7 @@ class SOLOV2Head(SOLOHead):
                 Default: None.
 
         Returns:
-            :obj:`InstanceData`: Processed results of single image.
+            :obj:`CompactInstanceData`: Processed results of single image.
              it usually contains following keys.
                 - scores (Tensor): Classification scores, has shape
                   (num_instance,).
@@ -672,21 +672,21 @@ class SOLOV2Head(SOLOHead):
                   shape (num_instances, h, w).
         """
 
-        def empty_results(results, cls_scores):
+        def empty_results(cls_scores):
             """Generate a empty results."""
-            results.scores = cls_scores.new_ones(0)
-            results.masks = cls_scores.new_zeros(0, *results.ori_shape[:2])
-            results.labels = cls_scores.new_ones(0)
-            return results
+            return CompactInstanceData(
+                dict(
+                    masks=cls_scores.new_zeros(0, *img_meta['ori_shape'][:2]),
+                    labels=cls_scores.new_ones(0),
+                    scores=cls_scores.new_ones(0)), img_meta)
 
         cfg = self.test_cfg if cfg is None else cfg
         assert len(kernel_preds) == len(cls_scores)
-        results = InstanceData(img_meta)
 
         featmap_size = mask_feats.size()[-2:]
 
-        img_shape = results.img_shape
-        ori_shape = results.ori_shape
+        img_shape = img_meta['img_shape']
+        ori_shape = img_meta['ori_shape']
 
         # overall info
         h, w, _ = img_shape
@@ -697,7 +697,7 @@ class SOLOV2Head(SOLOHead):
         score_mask = (cls_scores > cfg.score_thr)
         cls_scores = cls_scores[score_mask]
         if len(cls_scores) == 0:
-            return empty_results(results, cls_scores)
+            return empty_results(cls_scores)
 
         # cate_labels & kernel_preds
         inds = score_mask.nonzero()
@@ -725,7 +725,7 @@ class SOLOV2Head(SOLOHead):
         sum_masks = masks.sum((1, 2)).float()
         keep = sum_masks > strides
         if keep.sum() == 0:
-            return empty_results(results, cls_scores)
+            return empty_results(cls_scores)
         masks = masks[keep]
         mask_preds = mask_preds[keep]
         sum_masks = sum_masks[keep]
@@ -759,8 +759,5 @@ class SOLOV2Head(SOLOHead):
             align_corners=False).squeeze(0)
         masks = mask_preds > cfg.mask_thr
 
-        results.masks = masks
-        results.labels = labels
-        results.scores = scores
-
-        return results
+        return CompactInstanceData(
+            dict(masks=masks, labels=labels, scores=scores), img_meta)
@@ -13,6 +13,7 @@ from mmcv.runner import force_fp32
 from mmdet.core import (MlvlPointGenerator, bbox_xyxy_to_cxcywh,
                         build_assigner, build_sampler, multi_apply,
                         reduce_mean)
+from mmdet.utils import profile_span
 from ..builder import HEADS, build_loss
 from .base_dense_head import BaseDenseHead
 from .dense_test_mixins import BBoxTestMixin
@@ -126,6 +127,8 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
             self.sampler = build_sampler(sampler_cfg, context=self)
 
         self.fp16_enabled = False
+        # the priors and the buffers of the last input shape in testing
+        self._test_cache = None
         self._init_layers()
 
     def _init_layers(self):
@@ -250,6 +253,9 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
         """
         assert len(cls_scores) == len(bbox_preds) == len(objectnesses)
         cfg = self.test_cfg if cfg is None else cfg
+        if cfg.get('fast_decode', True):
+            return self._get_bboxes_fast(cls_scores, bbox_preds, objectnesses,
+                                         img_metas, cfg, rescale)
         scale_factors = np.array(
             [img_meta['scale_factor'] for img_meta in img_metas])
 
@@ -298,6 +304,114 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
 
         return result_list
 
+    def _get_test_cache(self, featmap_sizes, dtype, device):
+        """Get the flattened priors of the input shape, the number of priors
+        of each level, the cumulative one and the buffers of the scores of
+        the priors, which are cached for the last input shape."""
+        key = (tuple(featmap_sizes), dtype, device)
+        if self._test_cache is None or self._test_cache[0] != key:
+            mlvl_priors = self.prior_generator.grid_priors(
+                featmap_sizes, dtype=dtype, device=device, with_stride=True)
+            priors = torch.cat(mlvl_priors)
+            num_level_priors = [
+                len(level_priors) for level_priors in mlvl_priors
+            ]
+            level_ends = torch.tensor(
+                np.cumsum(num_level_priors), device=device)
+            num_priors = len(priors)
+            buffers = dict(
+                max_scores=priors.new_empty(num_priors),
+                max_labels=priors.new_empty(num_priors, dtype=torch.long),
+                score_factors=priors.new_empty(num_priors),
+                scores=priors.new_empty(num_priors),
+                valid_mask=priors.new_empty(num_priors, dtype=torch.bool))
+            self._test_cache = (key, priors, num_level_priors, level_ends,
+                                buffers)
+        return self._test_cache[1:]
+
+    def _get_bboxes_fast(self, cls_scores, bbox_preds, objectnesses, img_metas,
+                         cfg, rescale):
+        """The fast path of :meth:`get_bboxes`, enabled by
+        ``test_cfg.fast_decode`` (default True).
+
+        The scores are thresholded before decoding, so that only the boxes
+        of the candidates are decoded and only the classification scores of
+        the candidates go through sigmoid. As sigmoid is monotonic, the max
+        score of a prior is the sigmoid of its max classification logit. The
+        priors are cached for the input shape and the scores of all the
+        priors are written into buffers reused across images and calls. The
+        results are the same as the ones of the batched path up to floating
+        point rounding.
+        """
+        featmap_sizes = [cls_score.shape[2:] for cls_score in cls_scores]
+        priors, num_level_priors, level_ends, buffers = self._get_test_cache(
+            featmap_sizes, cls_scores[0].dtype, cls_scores[0].device)
+        mlvl_max_score_bufs = buffers['max_scores'].split(num_level_priors)
+        mlvl_max_label_bufs = buffers['max_labels'].split(num_level_priors)
+        mlvl_score_factor_bufs = buffers['score_factors'].split(
+            num_level_priors)
+
+        result_list = []
+        for img_id, img_meta in enumerate(img_metas):
+            # the scores are only used to select the candidates, which do
+            # not need the gradients
+            for (cls_score, objectness, max_score_buf, max_label_buf,
+                 score_factor_buf) in zip(cls_scores, objectnesses,
+                                          mlvl_max_score_bufs,
+                                          mlvl_max_label_bufs,
+                                          mlvl_score_factor_bufs):
+                torch.max(
+                    cls_score[img_id].detach().flatten(1),
+                    dim=0,
+                    out=(max_score_buf, max_label_buf))
+                torch.sigmoid(
+                    objectness[img_id].detach().flatten(),
+                    out=score_factor_buf)
+            buffers['max_scores'].sigmoid_()
+            torch.mul(
+                buffers['score_factors'],
+                buffers['max_scores'],
+                out=buffers['scores'])
+            torch.ge(
+                buffers['scores'], cfg.score_thr, out=buffers['valid_mask'])
+            inds = buffers['valid_mask'].nonzero(as_tuple=True)[0]
+            if inds.numel() == 0:
+                result_list.append((priors.new_zeros((0, 4)), inds))
+                continue
+
+            # gather the predictions of the candidates of each level, the
+            # candidates before the end of each level are counted without
+            # torch.searchsorted, which requires PyTorch 1.6
+            level_end_inds = (inds[:, None] < level_ends).sum(0)
+            num_level_inds = (level_end_inds - torch.cat(
+                [level_end_inds.new_zeros(1), level_end_inds[:-1]])).tolist()
+            level_start = 0
+            mlvl_cls_scores, mlvl_bbox_preds, mlvl_objectness = [], [], []
+            for level_inds, cls_score, bbox_pred, objectness, num in zip(
+                    inds.split(num_level_inds), cls_scores, bbox_preds,
+                    objectnesses, num_level_priors):
+                level_inds = level_inds - level_start
+                mlvl_cls_scores.append(
+                    cls_score[img_id].flatten(1)[:, level_inds])
+                mlvl_bbox_preds.append(
+                    bbox_pred[img_id].flatten(1)[:, level_inds])
+                mlvl_objectness.append(
+                    objectness[img_id].flatten()[level_inds])
+                level_start += num
+            max_scores, labels = torch.max(
+                torch.cat(mlvl_cls_scores, dim=1).sigmoid(), 0)
+            scores = max_scores * torch.cat(mlvl_objectness).sigmoid()
+            bboxes = self._bbox_decode(priors[inds],
+                                       torch.cat(mlvl_bbox_preds, dim=1).t())
+            if rescale:
+                bboxes /= bboxes.new_tensor(img_meta['scale_factor'])
+
+            with profile_span('nms'):
+                dets, keep = batched_nms(bboxes, scores, labels, cfg.nms)
+            result_list.append((dets, labels[keep]))
+
+        return result_list
+
     def _bbox_decode(self, priors, bbox_preds):
         xys = (bbox_preds[..., :2] * priors[:, 2:]) + priors[:, :2]
         whs = bbox_preds[..., 2:].exp() * priors[:, 2:]
@@ -321,7 +435,8 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
         if labels.numel() == 0:
             return bboxes, labels
         else:
-            dets, keep = batched_nms(bboxes, scores, labels, cfg.nms)
+            with profile_span('nms'):
+                dets, keep = batched_nms(bboxes, scores, labels, cfg.nms)
             return dets, labels[keep]
 
     @force_fp32(apply_to=('cls_scores', 'bbox_preds', 'objectnesses'))
@@ -380,12 +495,18 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
         flatten_priors = torch.cat(mlvl_priors)
         flatten_bboxes = self._bbox_decode(flatten_priors, flatten_bbox_preds)
 
-        (pos_masks, cls_targets, obj_targets, bbox_targets, l1_targets,
-         num_fg_imgs) = multi_apply(
-             self._get_target_single, flatten_cls_preds.detach(),
-             flatten_objectness.detach(),
-             flatten_priors.unsqueeze(0).repeat(num_imgs, 1, 1),
-             flatten_bboxes.detach(), gt_bboxes, gt_labels)
+        if self.train_cfg.get('batched_assign', False):
+            (pos_masks, cls_targets, obj_targets, bbox_targets, l1_targets,
+             num_fg_imgs) = self._get_targets_batched(
+                 flatten_cls_preds.detach(), flatten_objectness.detach(),
+                 flatten_priors, flatten_bboxes.detach(), gt_bboxes, gt_labels)
+        else:
+            (pos_masks, cls_targets, obj_targets, bbox_targets, l1_targets,
+             num_fg_imgs) = multi_apply(
+                 self._get_target_single, flatten_cls_preds.detach(),
+                 flatten_objectness.detach(),
+                 flatten_priors.unsqueeze(0).repeat(num_imgs, 1, 1),
+                 flatten_bboxes.detach(), gt_bboxes, gt_labels)
 
         # The experimental results show that ‘reduce_mean’ can improve
         # performance on the COCO dataset.
@@ -443,18 +564,12 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
                 with shape [num_gts].
         """
 
-        num_priors = priors.size(0)
         num_gts = gt_labels.size(0)
         gt_bboxes = gt_bboxes.to(decoded_bboxes.dtype)
         # No target
         if num_gts == 0:
-            cls_target = cls_preds.new_zeros((0, self.num_classes))
-            bbox_target = cls_preds.new_zeros((0, 4))
-            l1_target = cls_preds.new_zeros((0, 4))
-            obj_target = cls_preds.new_zeros((num_priors, 1))
-            foreground_mask = cls_preds.new_zeros(num_priors).bool()
-            return (foreground_mask, cls_target, obj_target, bbox_target,
-                    l1_target, 0)
+            return self._get_target_from_assign(None, cls_preds, objectness,
+                                                gt_bboxes, priors)
 
         # YOLOX uses center priors with 0.5 offset to assign targets,
         # but use center priors without offset to regress bboxes.
@@ -464,6 +579,56 @@ class YOLOXHead(BaseDenseHead, BBoxTestMixin):
         assign_result = self.assigner.assign(
             cls_preds.sigmoid() * objectness.unsqueeze(1).sigmoid(),
             offset_priors, decoded_bboxes, gt_bboxes, gt_labels)
+        return self._get_target_from_assign(assign_result, cls_preds,
+                                            objectness, gt_bboxes, priors)
+
+    @torch.no_grad()
+    def _get_targets_batched(self, cls_preds, objectness, priors,
+                             decoded_bboxes, gt_bboxes, gt_labels):
+        """Compute the targets of all the images as
+        :meth:`_get_target_single`, but assign the gts of all the images at
+        once by ``assigner.batch_assign``, which is enabled by
+        ``batched_assign=True`` in ``train_cfg``.
+        Args:
+            cls_preds (Tensor): Classification predictions of all images,
+                a 3D-Tensor with shape [num_imgs, num_priors, num_classes]
+            objectness (Tensor): Objectness predictions of all images,
+                a 2D-Tensor with shape [num_imgs, num_priors]
+            priors (Tensor): All priors of one image, a 2D-Tensor with shape
+                [num_priors, 4] in [cx, xy, stride_w, stride_y] format.
+            decoded_bboxes (Tensor): Decoded bboxes predictions of all
+                images, a 3D-Tensor with shape [num_imgs, num_priors, 4] in
+                [tl_x, tl_y, br_x, br_y] format.
+            gt_bboxes (list[Tensor]): Ground truth bboxes of each image.
+            gt_labels (list[Tensor]): Ground truth labels of each image.
+        """
+        gt_bboxes = [bboxes.to(decoded_bboxes.dtype) for bboxes in gt_bboxes]
+        offset_priors = torch.cat(
+            [priors[:, :2] + priors[:, 2:] * 0.5, priors[:, 2:]], dim=-1)
+        assign_results = self.assigner.batch_assign(
+            cls_preds.sigmoid() * objectness.unsqueeze(2).sigmoid(),
+            offset_priors, decoded_bboxes, gt_bboxes, gt_labels)
+        return multi_apply(
+            self._get_target_from_assign,
+            assign_results,
+            cls_preds,
+            objectness,
+            gt_bboxes,
+            priors=priors)
+
+    def _get_target_from_assign(self, assign_result, cls_preds, objectness,
+                                gt_bboxes, priors):
+        """Compute the targets of an image from its assigned result, which
+        is None if the image has no gt."""
+        num_priors = priors.size(0)
+        if assign_result is None or assign_result.num_gts == 0:
+            cls_target = cls_preds.new_zeros((0, self.num_classes))
+            bbox_target = cls_preds.new_zeros((0, 4))
+            l1_target = cls_preds.new_zeros((0, 4))
+            obj_target = cls_preds.new_zeros((num_priors, 1))
+            foreground_mask = cls_preds.new_zeros(num_priors).bool()
+            return (foreground_mask, cls_target, obj_target, bbox_target,
+                    l1_target, 0)
 
         sampling_result = self.sampler.sample(assign_result, priors, gt_bboxes)
         pos_inds = sampling_result.pos_inds
@@ -4,6 +4,7 @@ import warnings
 import torch
 
 from mmdet.core import bbox2result
+from mmdet.utils import profile_span
 from ..builder import DETECTORS, build_backbone, build_head, build_neck
 from .base import BaseDetector
 
@@ -40,9 +41,11 @@ class SingleStageDetector(BaseDetector):
 
     def extract_feat(self, img):
         """Directly extract features from the backbone+neck."""
-        x = self.backbone(img)
+        with profile_span('backbone'):
+            x = self.backbone(img)
         if self.with_neck:
-            x = self.neck(x)
+            with profile_span('neck'):
+                x = self.neck(x)
         return x
 
     def forward_dummy(self, img):
@@ -80,8 +83,9 @@ class SingleStageDetector(BaseDetector):
         """
         super(SingleStageDetector, self).forward_train(img, img_metas)
         x = self.extract_feat(img)
-        losses = self.bbox_head.forward_train(x, img_metas, gt_bboxes,
-                                              gt_labels, gt_bboxes_ignore)
+        with profile_span('head'):
+            losses = self.bbox_head.forward_train(x, img_metas, gt_bboxes,
+                                                  gt_labels, gt_bboxes_ignore)
         return losses
 
     def simple_test(self, img, img_metas, rescale=False):
@@ -99,8 +103,9 @@ class SingleStageDetector(BaseDetector):
                 corresponds to each class.
         """
         feat = self.extract_feat(img)
-        results_list = self.bbox_head.simple_test(
-            feat, img_metas, rescale=rescale)
+        with profile_span('head'):
+            results_list = self.bbox_head.simple_test(
+                feat, img_metas, rescale=rescale)
         bbox_results = [
             bbox2result(det_bboxes, det_labels, self.bbox_head.num_classes)
             for det_bboxes, det_labels in results_list
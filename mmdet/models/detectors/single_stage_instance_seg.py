@@ -186,8 +186,8 @@ class SingleStageInstanceSegmentor(BaseDetector):
         dataset.
 
         Args:
-            results (:obj:`InstanceData`): Processed
-                results of single images. Usually contains
+            results (:obj:`InstanceData` | :obj:`CompactInstanceData`):
+                Processed results of single images. Usually contains
                 following keys.
 
                 - scores (Tensor): Classification scores, has shape
@@ -229,12 +229,14 @@ class SingleStageInstanceSegmentor(BaseDetector):
 
         labels = results.labels.detach().cpu().numpy()
 
-        if 'bboxes' not in results:
-            # create dummy bbox results to store the scores
-            results.bboxes = results.scores.new_zeros(len(results), 4)
+        if 'bboxes' in results:
+            bboxes = results.bboxes
+        else:
+            # create dummy bbox results to store the scores, the results
+            # may have a fixed set of fields, e.g. `CompactInstanceData`
+            bboxes = results.scores.new_zeros(len(results), 4)
 
-        det_bboxes = torch.cat([results.bboxes, results.scores[:, None]],
-                               dim=-1)
+        det_bboxes = torch.cat([bboxes, results.scores[:, None]], dim=-1)
         det_bboxes = det_bboxes.detach().cpu().numpy()
         bbox_results = [
             det_bboxes[labels == i, :]
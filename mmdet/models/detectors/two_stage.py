@@ -3,6 +3,7 @@ import warnings
 
 import torch
 
+from mmdet.utils import profile_span
 from ..builder import DETECTORS, build_backbone, build_head, build_neck
 from .base import BaseDetector
 
@@ -64,9 +65,11 @@ class TwoStageDetector(BaseDetector):
 
     def extract_feat(self, img):
         """Directly extract features from the backbone+neck."""
-        x = self.backbone(img)
+        with profile_span('backbone'):
+            x = self.backbone(img)
         if self.with_neck:
-            x = self.neck(x)
+            with profile_span('neck'):
+                x = self.neck(x)
         return x
 
     def forward_dummy(self, img):
@@ -132,22 +135,25 @@ class TwoStageDetector(BaseDetector):
         if self.with_rpn:
             proposal_cfg = self.train_cfg.get('rpn_proposal',
                                               self.test_cfg.rpn)
-            rpn_losses, proposal_list = self.rpn_head.forward_train(
-                x,
-                img_metas,
-                gt_bboxes,
-                gt_labels=None,
-                gt_bboxes_ignore=gt_bboxes_ignore,
-                proposal_cfg=proposal_cfg,
-                **kwargs)
+            with profile_span('rpn_head'):
+                rpn_losses, proposal_list = self.rpn_head.forward_train(
+                    x,
+                    img_metas,
+                    gt_bboxes,
+                    gt_labels=None,
+                    gt_bboxes_ignore=gt_bboxes_ignore,
+                    proposal_cfg=proposal_cfg,
+                    **kwargs)
             losses.update(rpn_losses)
         else:
             proposal_list = proposals
 
-        roi_losses = self.roi_head.forward_train(x, img_metas, proposal_list,
-                                                 gt_bboxes, gt_labels,
-                                                 gt_bboxes_ignore, gt_masks,
-                                                 **kwargs)
+        with profile_span('roi_head'):
+            roi_losses = self.roi_head.forward_train(x, img_metas,
+                                                     proposal_list, gt_bboxes,
+                                                     gt_labels,
+                                                     gt_bboxes_ignore,
+                                                     gt_masks, **kwargs)
         losses.update(roi_losses)
 
         return losses
@@ -176,12 +182,14 @@ class TwoStageDetector(BaseDetector):
         assert self.with_bbox, 'Bbox head must be implemented.'
         x = self.extract_feat(img)
         if proposals is None:
-            proposal_list = self.rpn_head.simple_test_rpn(x, img_metas)
+            with profile_span('rpn_head'):
+                proposal_list = self.rpn_head.simple_test_rpn(x, img_metas)
         else:
             proposal_list = proposals
 
-        return self.roi_head.simple_test(
-            x, proposal_list, img_metas, rescale=rescale)
+        with profile_span('roi_head'):
+            return self.roi_head.simple_test(
+                x, proposal_list, img_metas, rescale=rescale)
 
     def aug_test(self, imgs, img_metas, rescale=False):
         """Test with augmentations.
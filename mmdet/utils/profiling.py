@@ -1,40 +1,333 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import contextlib
-import sys
+import functools
+import json
+import os
+import threading
 import time
+from collections import OrderedDict
 
 import torch
+from mmcv.utils import print_log
+from torch.utils.data import get_worker_info
 
-if sys.version_info >= (3, 7):
+# the active SpanProfiler, spans are not recorded when it is None. The
+# DataLoader workers inherit a copy of it when they are forked, which is
+# never reported, so the spans are not recorded in the workers either.
+_profiler = None
 
-    @contextlib.contextmanager
-    def profile_time(trace_name,
-                     name,
-                     enabled=True,
-                     stream=None,
-                     end_stream=None):
-        """Print time spent by CPU and GPU.
+# number of buckets of the log2 histograms of the spans, a span of ``dur``
+# us falls in the bucket ``int(dur).bit_length()``, i.e. the ``i``-th bucket
+# holds the spans in [2**(i-1), 2**i) us
+NUM_BUCKETS = 32
 
-        Useful as a temporary context manager to find sweet spots of code
-        suitable for async implementation.
+
+class _NullSpan:
+    """The span returned by :func:`profile_span` when profiling is disabled,
+    which does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _SpanStats:
+    """Aggregated durations of a named span, in microseconds."""
+
+    __slots__ = ('count', 'total', 'min', 'max', 'hist')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.
+        self.min = float('inf')
+        self.max = 0.
+        self.hist = [0] * NUM_BUCKETS
+
+    def add(self, dur):
+        self.count += 1
+        self.total += dur
+        self.min = min(self.min, dur)
+        self.max = max(self.max, dur)
+        self.hist[min(int(dur).bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def percentile(self, q):
+        """Estimate a percentile by the upper bound of the histogram bucket
+        it falls in, clipped to the max duration."""
+        rank = q / 100. * self.count
+        seen = 0
+        for i, num in enumerate(self.hist):
+            seen += num
+            if num and seen >= rank:
+                return min(float(2**i), self.max)
+        return self.max
+
+
+class _Span:
+    """A span being timed, see :func:`profile_span`."""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        if self.profiler.cuda_sync:
+            torch.cuda.synchronize()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        if self.profiler.cuda_sync:
+            torch.cuda.synchronize()
+        end = time.perf_counter()
+        self.profiler.record(self.name, self.start, end)
+        return False
+
+
+class SpanProfiler:
+    """Aggregate the wall time of named spans of code.
+
+    The hot paths of mmdet, e.g. the backbone, the neck, the heads, the
+    assigners, NMS and the data pipelines, are wrapped by
+    :func:`profile_span` or :func:`profiled`, which record spans only while
+    a profiler is started and cost a global lookup otherwise. The durations
+    of each span are aggregated into a count, total, min, max and a log2
+    histogram, and the individual spans can be exported as a Chrome trace
+    JSON file, which can be opened in ``chrome://tracing`` or Perfetto.
+
+    The spans are timed on CPU. With ``cuda_sync=True``, CUDA is
+    synchronized around the spans so that they include the time of the
+    CUDA kernels launched in them, which slows the code down.
+
+    The spans in the DataLoader workers are not recorded, as the workers
+    only hold a copy of the profiler, which would grow without being
+    reported.
+
+    Args:
+        record_events (bool): Whether to keep the individual spans for
+            :meth:`export_chrome_trace`. Default: True.
+        max_events (int): Max number of kept spans, the spans after are only
+            aggregated. Default: 1000000.
+        cuda_sync (bool): Whether to synchronize CUDA when entering and
+            exiting a span. Default: False.
+
+    Example:
+        >>> with SpanProfiler() as profiler:
+        >>>     with profile_span('backbone'):
+        >>>         feats = backbone(img)
+        >>> profiler.log_summary()
+        >>> profiler.export_chrome_trace('trace.json')
+    """
+
+    def __init__(self,
+                 record_events=True,
+                 max_events=1000000,
+                 cuda_sync=False):
+        self.record_events = record_events
+        self.max_events = max_events
+        self.cuda_sync = cuda_sync and torch.cuda.is_available()
+        self.stats = OrderedDict()
+        self.events = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Start recording the spans, replacing the active profiler."""
+        global _profiler
+        _profiler = self
+
+    def stop(self):
+        """Stop recording the spans if this profiler is active."""
+        global _profiler
+        if _profiler is self:
+            _profiler = None
+
+    def reset(self):
+        """Clear the recorded spans."""
+        with self._lock:
+            self.stats = OrderedDict()
+            self.events = []
+
+    def span(self, name):
+        """Time a span of code by this profiler even if it is not active."""
+        return _Span(self, name)
+
+    def record(self, name, start, end):
+        """Record a span from ``start`` to ``end`` given by
+        ``time.perf_counter``."""
+        dur = (end - start) * 1e6
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = _SpanStats()
+            stats.add(dur)
+            if self.record_events and len(self.events) < self.max_events:
+                self.events.append((name, (start - self._origin) * 1e6, dur,
+                                    threading.get_ident()))
+
+    def summary(self):
+        """Get the aggregated durations of the spans.
+
+        Returns:
+            dict[str, dict]: The stats of each span, including "count" and
+                "total", "mean", "min", "max", "p50", "p90", "p99" in ms, the
+                percentiles are estimated from the histogram. The histogram
+                is "hist", whose ``i``-th bucket counts the spans shorter
+                than ``2**i`` us.
         """
-        if (not enabled) or not torch.cuda.is_available():
-            yield
-            return
+        with self._lock:
+            items = list(self.stats.items())
+        summary = OrderedDict()
+        for name, stats in items:
+            summary[name] = dict(
+                count=stats.count,
+                total=stats.total / 1e3,
+                mean=stats.total / stats.count / 1e3,
+                min=stats.min / 1e3,
+                max=stats.max / 1e3,
+                p50=stats.percentile(50) / 1e3,
+                p90=stats.percentile(90) / 1e3,
+                p99=stats.percentile(99) / 1e3,
+                hist=list(stats.hist))
+        return summary
+
+    def format_summary(self):
+        """Format the summary as a table sorted by the total time."""
+        summary = self.summary()
+        width = max([len(name) for name in summary] + [4])
+        keys = ('count', 'total', 'mean', 'p50', 'p90', 'p99', 'max')
+        lines = [
+            f'{"span":<{width}} ' + ' '.join(f'{key:>10}' for key in keys)
+        ]
+        for name, stats in sorted(
+                summary.items(), key=lambda item: -item[1]['total']):
+            values = [f'{stats["count"]:>10d}'
+                      ] + [f'{stats[key]:>10.3f}' for key in keys[1:]]
+            lines.append(f'{name:<{width}} ' + ' '.join(values))
+        return 'Span times (ms)\n' + '\n'.join(lines)
+
+    def log_summary(self, logger=None):
+        """Print the summary table by :func:`print_log`.
+
+        Args:
+            logger (logging.Logger | str | None): The logger, e.g.
+                ``runner.logger``. Default: None.
+        """
+        print_log(self.format_summary(), logger=logger)
+
+    def export_chrome_trace(self, filename):
+        """Export the recorded spans to a Chrome trace JSON file."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        trace_events = [
+            dict(
+                name=name,
+                cat='mmdet',
+                ph='X',
+                ts=round(ts, 3),
+                dur=round(dur, 3),
+                pid=pid,
+                tid=tid) for name, ts, dur, tid in events
+        ]
+        with open(filename, 'w') as f:
+            json.dump(dict(traceEvents=trace_events), f)
+
+
+def get_profiler():
+    """Get the active :class:`SpanProfiler`, None if profiling is
+    disabled or in a DataLoader worker."""
+    if get_worker_info() is not None:
+        return None
+    return _profiler
+
+
+def profile_span(name):
+    """Time a span of code by the active :class:`SpanProfiler`.
+
+    Args:
+        name (str): Name of the span, the spans of the same name are
+            aggregated.
+
+    Example:
+        >>> with profile_span('backbone'):
+        >>>     x = self.backbone(img)
+    """
+    profiler = _profiler
+    if profiler is None or get_worker_info() is not None:
+        return _NULL_SPAN
+    return _Span(profiler, name)
+
+
+def profiled(name):
+    """Decorate a function to be timed as a span by the active
+    :class:`SpanProfiler`, see :func:`profile_span`."""
+
+    def decorator(func):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None or get_worker_info() is not None:
+                return func(*args, **kwargs)
+            with _Span(profiler, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+@contextlib.contextmanager
+def profile_time(trace_name,
+                 name,
+                 enabled=True,
+                 stream=None,
+                 end_stream=None,
+                 logger=None):
+    """Log time spent by CPU and GPU.
+
+    Useful as a temporary context manager to find sweet spots of code
+    suitable for async implementation. The GPU time is only measured when
+    CUDA is available. The time is also recorded as the span
+    ``{trace_name}.{name}`` by the active :class:`SpanProfiler`.
+    """
+    if not enabled:
+        yield
+        return
+    use_cuda = torch.cuda.is_available()
+    if use_cuda:
         stream = stream if stream else torch.cuda.current_stream()
         end_stream = end_stream if end_stream else stream
         start = torch.cuda.Event(enable_timing=True)
         end = torch.cuda.Event(enable_timing=True)
         stream.record_event(start)
-        try:
-            cpu_start = time.monotonic()
-            yield
-        finally:
-            cpu_end = time.monotonic()
+    try:
+        cpu_start = time.perf_counter()
+        yield
+    finally:
+        cpu_end = time.perf_counter()
+        profiler = _profiler
+        if profiler is not None and get_worker_info() is None:
+            profiler.record(f'{trace_name}.{name}', cpu_start, cpu_end)
+        cpu_time = (cpu_end - cpu_start) * 1000
+        msg = f'{trace_name} {name} cpu_time {cpu_time:.2f} ms'
+        if use_cuda:
             end_stream.record_event(end)
             end.synchronize()
-            cpu_time = (cpu_end - cpu_start) * 1000
             gpu_time = start.elapsed_time(end)
-            msg = f'{trace_name} {name} cpu_time {cpu_time:.2f} ms '
-            msg += f'gpu_time {gpu_time:.2f} ms stream {stream}'
-            print(msg, end_stream)
+            msg += f' gpu_time {gpu_time:.2f} ms stream {stream}'
+        print_log(msg, logger=logger)
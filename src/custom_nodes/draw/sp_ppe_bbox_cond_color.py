@@ -25,6 +25,8 @@ from peekingduck.pipeline.nodes.draw.utils.general import (
     project_points_onto_original_image,
 )
 
+from ..utils.ppe import bboxes_to_image_coords, ppe_status_colors
+
 
 def draw_bboxes(
     frame: np.ndarray,
@@ -43,27 +45,28 @@ def draw_bboxes(
     image_size = get_image_size(frame)
     # Get unique label color indexes
     color_idx = {label: idx for idx, label in enumerate(set(bbox_labels))}
+    # Project all bboxes onto the image in one pass
+    coords = bboxes_to_image_coords(bboxes, image_size)
 
-    for i, bbox in enumerate(bboxes):
+    for i, (x1, y1, x2, y2) in enumerate(coords.tolist()):
         if color_choice:
             color = color_choice[i]
         else:
             color = PRIMARY_PALETTE[color_idx[bbox_labels[i]] % TOTAL_COLORS]
         if show_labels:
-            _draw_bbox(frame, bbox, image_size, color, bbox_labels[i])
+            _draw_bbox(frame, (x1, y1), (x2, y2), color, bbox_labels[i])
         else:
-            _draw_bbox(frame, bbox, image_size, color)
+            _draw_bbox(frame, (x1, y1), (x2, y2), color)
 
 
 def _draw_bbox(
     frame: np.ndarray,
-    bbox: np.ndarray,
-    image_size: Tuple[int, int],
+    top_left: Tuple[int, int],
+    bottom_right: Tuple[int, int],
     color: Tuple[int, int, int],
     bbox_label: str = None,
 ) -> None:
-    """Draws a single bounding box."""
-    top_left, bottom_right = project_points_onto_original_image(bbox, image_size)
+    """Draws a single bounding box from its image coords."""
     cv2.rectangle(
         frame,
         (top_left[0], top_left[1]),
@@ -183,17 +186,7 @@ class Node(AbstractNode):
         super().__init__(config, node_path=__name__, **kwargs)
 
     def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        color_ppe_status = []
-        for status in inputs["bbox_labels"]:
-            if status == 'all ppe':
-                color = [0, 255, 0]
-            elif status == "no mask & vest" or status == "no helmet & vest" or status == "no helmet & mask":
-                color = [0, 100, 255]
-            elif status == "no helmet" or status == "no vest" or status == "no mask":
-                color = [0, 200, 255]
-            else:
-                color = [0, 0, 255]
-            color_ppe_status.append(color)
+        color_ppe_status = ppe_status_colors(inputs["bbox_labels"])
         draw_bboxes(
             inputs["img"], inputs["bboxes"], inputs["bbox_labels"], self.show_labels, color_ppe_status
         )
@@ -2,33 +2,11 @@
 Custom node to show object detection scores
 """
 
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict
 import cv2
 from peekingduck.pipeline.nodes.node import AbstractNode
 
-
-def map_bbox_to_image_coords(
-    bbox: List[float], image_size: Tuple[int, int]
-) -> List[int]:
-    """This is a helper function to map bounding box coords (relative) to
-    image coords (absolute).
-    Bounding box coords ranges from 0 to 1
-    where (0, 0) = image top-left, (1, 1) = image bottom-right.
-
-    Args:
-       bbox (List[float]): List of 4 floats x1, y1, x2, y2
-       image_size (Tuple[int, int]): Width, Height of image
-
-    Returns:
-       List[int]: x1, y1, x2, y2 in integer image coords
-    """
-    width, height = image_size[0], image_size[1]
-    x1, y1, x2, y2 = bbox
-    x1 *= width
-    x2 *= width
-    y1 *= height
-    y2 *= height
-    return int(x1), int(y1), int(x2), int(y2)
+from ..utils.ppe import bboxes_to_image_coords, ppe_status_colors
 
 
 class Node(AbstractNode):
@@ -68,25 +46,16 @@ class Node(AbstractNode):
         img_size = (img.shape[1], img.shape[0])  # width, height
 
         # assign conditional colors to text
-        color_score_status = []
-        for status in labels:
-            if status == 'all ppe':
-                score_color = [0, 255, 0]
-            elif status == "no mask & vest" or status == "no helmet & vest" or status == "no helmet & mask":
-                score_color = [0, 100, 255]
-            elif status == "no helmet" or status == "no vest" or status == "no mask":
-                score_color = [0, 200, 255]
-            else:
-                score_color = [0, 0, 255]
-            color_score_status.append(score_color)
+        color_score_status = ppe_status_colors(labels)
+        # compute (x1, y1) top-left, (x2, y2) bottom-right coordinates of all
+        # bounding boxes at once
+        coords = bboxes_to_image_coords(bboxes, img_size)
 
-        for i, bbox in enumerate(bboxes):
+        for i, (x1, y1, x2, y2) in enumerate(coords.tolist()):
             # for each bounding box:
-            #   - compute (x1, y1) top-left, (x2, y2) bottom-right coordinates
             #   - convert score into a two decimal place numeric string
             #   - draw score string onto image using opencv's putText()
             #     (see opencv's API docs for more info)
-            x1, y1, x2, y2 = map_bbox_to_image_coords(bbox, img_size)
             score = scores[i]
             score_str = f"{score:0.2f}"
             color_status = color_score_status[i]
@@ -1,9 +1,77 @@
-from typing import Any, Dict
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Tuple
 import numpy as np
 
 from peekingduck.pipeline.nodes.node import AbstractNode
 
 from mmdet.apis import inference_detector, init_detector
+from mmdet.core import bbox_result2array
+
+
+class FrameBatcher:
+    """Collects frames submitted from several streams into micro-batches.
+
+    A background thread waits for the first pending frame, then keeps
+    collecting until either ``max_batch_size`` frames are queued or
+    ``max_wait_ms`` has elapsed, and sends the whole batch through the model
+    in one forward pass. Each caller gets back the result of its own frame.
+    """
+
+    def __init__(self, model, max_batch_size: int = 8, max_wait_ms: float = 5.0) -> None:
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._pending: List[Tuple[np.ndarray, Future]] = []
+        self._cond = threading.Condition()
+        self._worker = threading.Thread(target=self._loop, daemon=True)
+        self._worker.start()
+
+    def submit(self, img: np.ndarray) -> Future:
+        future: Future = Future()
+        with self._cond:
+            self._pending.append((img, future))
+            self._cond.notify()
+        return future
+
+    def infer(self, imgs: List[np.ndarray]) -> List[Any]:
+        futures = [self.submit(img) for img in imgs]
+        return [future.result() for future in futures]
+
+    def _next_batch(self) -> List[Tuple[np.ndarray, Future]]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            imgs = [img for img, _ in batch]
+            try:
+                results = inference_detector(self.model, imgs)
+            except Exception as e:  # propagate to every waiting stream
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+# Nodes built with the same model settings (e.g. one pipeline per camera
+# running in its own thread) share one model, and one batcher if their
+# batching settings are the same too.
+_SHARED_BATCHERS: Dict[Tuple[str, str, str, int, float], FrameBatcher] = {}
+_SHARED_LOCK = threading.Lock()
 
 
 class Node(AbstractNode):
@@ -14,36 +82,64 @@ class Node(AbstractNode):
         self.checkpoint_file: str      # checkpoint file
         self.device: str               # device used for inference (enter 'cuda' for gpu)
         self.score_thre: float         # confidence score threshold
+        self.batch_size: int           # max frames per forward pass (1 disables batching)
+        self.max_wait_ms: float        # max time to wait for a batch to fill up
         self.classes = {"0": "no ppe", "1": "all ppe", "2": "no mask & vest", "3": "no helmet & vest", "4": "no helmet & mask", "5": "no helmet", "6": "no vest", "7": "no mask"}
-        self.model = self.load_model()
+        self.batch_size = getattr(self, "batch_size", 1)
+        self.max_wait_ms = getattr(self, "max_wait_ms", 5.0)
+        self.batcher = None
+        if self.batch_size > 1:
+            self.batcher = self.load_batcher()
+            self.model = self.batcher.model
+        else:
+            self.model = self.load_model()
 
     def load_model(self):
         model = init_detector(self.config_file, self.checkpoint_file, device=self.device)
         return model
-    
-    def post_process(self, result, height, width):     
-        bboxes = np.empty(shape=(0,4), dtype="float32")
-        class_ids = np.empty(shape=0, dtype="str")
-        scores = np.empty(shape=0, dtype="float32")
-        for id, pred in enumerate(result):
-            if len(pred) > 0:
-                for v in pred:
-                    xyxy = v[0:4].astype("float32")
-                    score = v[4].astype("float32")
-                    if score >= self.score_thre:
-                        class_ids = np.append(class_ids, str(id))
-                        bboxes = np.append(bboxes, [xyxy], axis=0)
-                        scores = np.append(scores, score)
-        for bbox in bboxes:
-            bbox[[0,2]] = bbox[[0,2]] / width
-            bbox[[1,3]] = bbox[[1,3]] / height
+
+    def load_batcher(self) -> FrameBatcher:
+        model_key = (self.config_file, self.checkpoint_file, self.device)
+        key = model_key + (int(self.batch_size), float(self.max_wait_ms))
+        with _SHARED_LOCK:
+            if key not in _SHARED_BATCHERS:
+                # reuse the model of a batcher with other batching settings
+                model = next((batcher.model for other_key, batcher in _SHARED_BATCHERS.items()
+                              if other_key[:3] == model_key), None)
+                if model is None:
+                    model = self.load_model()
+                _SHARED_BATCHERS[key] = FrameBatcher(
+                    model, self.batch_size, self.max_wait_ms)
+            return _SHARED_BATCHERS[key]
+
+    def post_process(self, result, height, width):
+        bboxes, scores, labels = bbox_result2array(
+            result, score_thr=self.score_thre, img_shape=(height, width))
+        class_ids = labels.astype(str)
         return bboxes, class_ids, scores
-    
-    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
-        img = inputs["img"]
-        height, width = img.shape[:2]
-        result = inference_detector(self.model, img)
+
+    def infer(self, imgs: List[np.ndarray]) -> List[Any]:
+        if self.batcher is not None:
+            return self.batcher.infer(imgs)
+        return inference_detector(self.model, imgs)
+
+    def format_outputs(self, result, height, width) -> Dict[str, Any]:
         bboxes, class_ids, scores = self.post_process(result, height, width)
         class_labels = [self.classes[class_id] for class_id in class_ids]
-        outputs = {"bboxes": bboxes, "bbox_labels": class_labels, "bbox_scores": scores}
+        return {"bboxes": bboxes, "bbox_labels": class_labels, "bbox_scores": scores}
+
+    def run(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        img = inputs["img"]
+        # a list of frames (one per source) is batched and split back per stream
+        is_multi = isinstance(img, (list, tuple))
+        imgs = list(img) if is_multi else [img]
+        results = self.infer(imgs)
+        per_stream = [
+            self.format_outputs(result, *frame.shape[:2])
+            for frame, result in zip(imgs, results)
+        ]
+        if not is_multi:
+            return per_stream[0]
+        keys = ("bboxes", "bbox_labels", "bbox_scores")
+        outputs = {key: [out[key] for out in per_stream] for key in keys}
         return outputs
@@ -0,0 +1,51 @@
+"""
+Vectorized helpers shared by the SP-PPE model and draw nodes
+"""
+
+from typing import List, Sequence, Tuple
+import numpy as np
+
+GREEN = (0, 255, 0)            # in BGR format, per opencv's convention
+ORANGE = (0, 100, 255)
+AMBER = (0, 200, 255)
+RED = (0, 0, 255)
+
+PPE_STATUS_COLORS = {
+    "all ppe": GREEN,
+    "no mask & vest": ORANGE,
+    "no helmet & vest": ORANGE,
+    "no helmet & mask": ORANGE,
+    "no helmet": AMBER,
+    "no vest": AMBER,
+    "no mask": AMBER,
+}
+
+
+def ppe_status_colors(bbox_labels: Sequence[str]) -> List[Tuple[int, int, int]]:
+    """Maps each PPE status label to its drawing color.
+
+    Args:
+       bbox_labels (Sequence[str]): PPE status of each detected person.
+
+    Returns:
+       List[Tuple[int, int, int]]: BGR color of each label, red for unknown
+       labels and "no ppe".
+    """
+    return [PPE_STATUS_COLORS.get(label, RED) for label in bbox_labels]
+
+
+def bboxes_to_image_coords(
+    bboxes: np.ndarray, image_size: Tuple[int, int]
+) -> np.ndarray:
+    """Maps all relative bounding box coords to absolute image coords at once.
+
+    Args:
+       bboxes (np.ndarray): (N, 4) array of x1, y1, x2, y2 in [0, 1]
+       image_size (Tuple[int, int]): Width, Height of image
+
+    Returns:
+       np.ndarray: (N, 4) array of x1, y1, x2, y2 in integer image coords
+    """
+    width, height = image_size
+    bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+    return (bboxes * np.array([width, height, width, height])).astype(int)
@@ -0,0 +1,120 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import os.path as osp
+import tempfile
+from collections import Counter
+
+import mmcv
+import numpy as np
+
+from mmdet.datasets import (CatIndex, ConcatDataset, CustomDataset,
+                            RepeatDataset, get_cat_index)
+from mmdet.datasets.samplers import ClassAwareSampler
+
+
+class ToyDataset(CustomDataset):
+    CLASSES = ('a', 'b', 'c', 'd')
+
+    def load_annotations(self, ann_file):
+        return mmcv.load(ann_file)
+
+
+def _create_dataset(tmp_dir, labels_list, **kwargs):
+    ann_file = osp.join(tmp_dir, 'ann.pkl')
+    mmcv.dump([
+        dict(
+            filename=f'{i}.jpg',
+            width=100,
+            height=100,
+            ann=dict(
+                bboxes=np.zeros((len(labels), 4), dtype=np.float32),
+                labels=np.array(labels, dtype=np.int64)))
+        for i, labels in enumerate(labels_list)
+    ], ann_file)
+    return ToyDataset(ann_file, pipeline=[], test_mode=True, **kwargs)
+
+
+def test_cat_index():
+    cat_ids_list = [[3, 1, 3], [], [0], [2, 0, 1, 2]]
+    cat_index = CatIndex.from_cat_ids(cat_ids_list)
+    assert len(cat_index) == 4
+    for i, cat_ids in enumerate(cat_ids_list):
+        assert cat_index[i].tolist() == sorted(set(cat_ids))
+    assert cat_index.num_cats.tolist() == [2, 0, 1, 3]
+
+    cat_ids, cat_indptr, img_inds = cat_index.invert()
+    assert cat_ids.tolist() == [0, 1, 2, 3]
+    assert cat_indptr.tolist() == [0, 2, 4, 5, 6]
+    assert img_inds.tolist() == [2, 3, 0, 3, 3, 0]
+
+    tiled = cat_index.tile(2)
+    assert len(tiled) == 8
+    assert tiled[5].tolist() == [1, 3]
+    concat = CatIndex.concat([cat_index, CatIndex.from_cat_ids([[5]])])
+    assert len(concat) == 5
+    assert concat[4].tolist() == [5]
+
+
+def test_dataset_cat_index():
+    labels_list = [[3, 1, 3], [], [0], [2, 0, 1, 2]]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset = _create_dataset(tmp_dir, labels_list)
+        cat_index = dataset.get_cat_index()
+        for i in range(len(dataset)):
+            assert cat_index[i].tolist() == sorted(set(dataset.get_cat_ids(i)))
+        assert dataset.get_cat2imgs() == {0: [2, 3], 1: [0, 3], 2: [3], 3: [0]}
+        assert not osp.exists(osp.join(tmp_dir, 'ann.pkl.cat_index.npz'))
+
+        # the index is cached next to the annotation file
+        dataset = _create_dataset(tmp_dir, labels_list, cache_cat_index=True)
+        cat_index = dataset.get_cat_index()
+        cache_file = osp.join(tmp_dir, 'ann.pkl.cat_index.npz')
+        assert osp.exists(cache_file)
+        dataset = _create_dataset(tmp_dir, labels_list, cache_cat_index=True)
+        dataset.get_cat_ids = None
+        assert np.array_equal(dataset.get_cat_index().cat_ids,
+                              cat_index.cat_ids)
+        # and built again if the annotations change
+        dataset = _create_dataset(
+            tmp_dir, labels_list + [[1]], cache_cat_index=True)
+        assert len(dataset.get_cat_index()) == 5
+
+        concat_dataset = ConcatDataset([dataset, dataset])
+        assert len(get_cat_index(concat_dataset)) == 10
+        assert get_cat_index(concat_dataset)[9].tolist() == [1]
+        repeat_dataset = RepeatDataset(dataset, 3)
+        assert len(get_cat_index(repeat_dataset)) == 15
+        assert get_cat_index(repeat_dataset)[14].tolist() == [1]
+
+
+def test_class_aware_sampler():
+    labels_list = [[0]] * 10 + [[1]] * 2 + [[2]] * 5 + [[]] * 3
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dataset = _create_dataset(tmp_dir, labels_list)
+        sampler = ClassAwareSampler(
+            dataset, samples_per_gpu=2, num_replicas=1, rank=0)
+        assert sampler.num_classes == 3
+        indices = list(sampler)
+        assert len(indices) == len(sampler) == 20
+        assert indices == list(sampler)
+        # each bin samples each label once
+        labels = [labels_list[idx][0] for idx in indices]
+        for i in range(0, 18, 3):
+            assert sorted(labels[i:i + 3]) == [0, 1, 2]
+        # the images of a label are sampled in cycles
+        counts = Counter(indices[:18])
+        assert counts[10] == counts[11] == 3
+
+        sampler.set_epoch(1)
+        assert list(sampler) != indices
+
+        sampler = ClassAwareSampler(
+            dataset,
+            samples_per_gpu=2,
+            num_replicas=2,
+            rank=1,
+            num_sample_class=2)
+        indices = list(sampler)
+        assert len(indices) == 10
+        labels = [labels_list[idx][0] for idx in indices]
+        for i in range(0, 10, 2):
+            assert labels[i] == labels[i + 1]
@@ -1,11 +1,18 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import os.path as osp
+import pickle
 import tempfile
+from unittest.mock import PropertyMock, patch
 
 import mmcv
+import numpy as np
 import pytest
 
+from mmdet.core import DetResults, encode_mask_results
 from mmdet.datasets import CocoDataset
+from mmdet.datasets.api_wrappers import (COCO, COCOeval, COCOStore,
+                                         FastCOCOeval, build_coco_store)
+from mmdet.datasets.cat_index import coco_cat_index
 
 
 def _create_ids_error_coco_json(json_name):
@@ -56,3 +63,259 @@ def test_coco_annotation_ids_unique():
     # test annotation ids not unique error
     with pytest.raises(AssertionError):
         CocoDataset(ann_file=fake_json_file, classes=('car', ), pipeline=[])
+
+
+def _create_random_coco(num_imgs=30, num_cats=3, seed=0):
+    rng = np.random.RandomState(seed)
+    images, annotations, detections = [], [], []
+    for img_id in range(1, num_imgs + 1):
+        images.append(dict(id=img_id, width=200, height=200, file_name=''))
+        for _ in range(rng.randint(0, 6)):
+            x, y = rng.uniform(0, 150, size=2)
+            w, h = rng.uniform(2, 50, size=2)
+            cat_id = int(rng.randint(1, num_cats + 1))
+            annotations.append(
+                dict(
+                    id=len(annotations) + 1,
+                    image_id=img_id,
+                    category_id=cat_id,
+                    bbox=[x, y, w, h],
+                    area=w * h,
+                    iscrowd=int(rng.rand() < 0.1)))
+            # a jittered detection of the gt and a random false positive
+            jitter = rng.uniform(-5, 5, size=4)
+            detections.append(
+                dict(
+                    image_id=img_id,
+                    category_id=cat_id,
+                    bbox=(np.array([x, y, w, h]) + jitter).clip(1).tolist(),
+                    score=float(rng.rand())))
+            detections.append(
+                dict(
+                    image_id=img_id,
+                    category_id=int(rng.randint(1, num_cats + 1)),
+                    bbox=rng.uniform(1, 100, size=4).tolist(),
+                    score=float(rng.rand())))
+    categories = [dict(id=i, name=f'cat{i}') for i in range(1, num_cats + 1)]
+    coco_gt = COCO()
+    coco_gt.dataset = dict(
+        images=images, annotations=annotations, categories=categories)
+    coco_gt.createIndex()
+    return coco_gt, detections
+
+
+@pytest.mark.parametrize('use_cats', [0, 1])
+@pytest.mark.parametrize('max_elements', [1 << 22, 50])
+def test_fast_coco_eval(use_cats, max_elements):
+    coco_gt, detections = _create_random_coco()
+    coco_dt = coco_gt.loadRes(detections)
+
+    results = []
+    for eval_cls, kwargs in [(COCOeval, {}),
+                             (FastCOCOeval, dict(max_elements=max_elements))]:
+        coco_eval = eval_cls(coco_gt, coco_dt, 'bbox', **kwargs)
+        coco_eval.params.useCats = use_cats
+        coco_eval.evaluate()
+        coco_eval.accumulate()
+        coco_eval.summarize()
+        results.append(coco_eval)
+
+    ref, fast = results
+    for key in ['precision', 'recall', 'scores']:
+        np.testing.assert_allclose(fast.eval[key], ref.eval[key])
+    np.testing.assert_allclose(fast.stats, ref.stats)
+
+
+def test_coco_store():
+    coco_gt, detections = _create_random_coco()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ann_file = osp.join(tmp_dir, 'ann.json')
+        mmcv.dump(coco_gt.dataset, ann_file)
+        store_dir = osp.join(tmp_dir, 'ann_store')
+        build_coco_store(ann_file, store_dir)
+        # the memmaps are opened again after pickling
+        store = pickle.loads(pickle.dumps(COCOStore(store_dir)))
+
+        assert store.get_img_ids() == list(coco_gt.getImgIds())
+        assert store.get_cat_ids(cat_names=['cat3', 'cat1']) == [1, 3]
+        assert store.get_ann_ids() == coco_gt.getAnnIds()
+        assert store.get_ann_ids(img_ids=[3, 1]) == coco_gt.getAnnIds([3, 1])
+        assert store.get_ann_ids(
+            img_ids=5, cat_ids=[2]) == coco_gt.getAnnIds(5, [2])
+        assert store.get_ann_ids(
+            area_rng=[100, 1000], iscrowd=False) == coco_gt.getAnnIds(
+                areaRng=[100, 1000], iscrowd=False)
+        assert store.load_anns([2, 1]) == coco_gt.loadAnns([2, 1])
+        assert store.load_imgs(4) == coco_gt.loadImgs(4)
+        assert dict(store.anns) == coco_gt.anns
+        assert store.get_img_ids_with_anns() == {
+            ann['image_id']
+            for ann in coco_gt.anns.values()
+        }
+        assert store.img_ann_map.get(3, []) == coco_gt.imgToAnns.get(3, [])
+        # the category index is built from the columns of the store
+        img_ids = [4, -1] + coco_gt.getImgIds()[::-1]
+        store_cat_index = coco_cat_index(store, img_ids)
+        cat_index = coco_cat_index(coco_gt, img_ids)
+        np.testing.assert_array_equal(store_cat_index.indptr, cat_index.indptr)
+        np.testing.assert_array_equal(store_cat_index.cat_ids,
+                                      cat_index.cat_ids)
+        assert store.img_ann_map[-1] == []
+        for cat_id in coco_gt.getCatIds():
+            assert sorted(store.cat_img_map[cat_id]) == sorted(
+                coco_gt.catToImgs[cat_id])
+        with pytest.raises(KeyError):
+            store.load_anns(-1)
+
+        # evaluation results are the same
+        stats = []
+        for coco in [coco_gt, store]:
+            coco_eval = COCOeval(coco, coco.loadRes(detections), 'bbox')
+            coco_eval.evaluate()
+            coco_eval.accumulate()
+            coco_eval.summarize()
+            stats.append(coco_eval.stats)
+        np.testing.assert_allclose(stats[0], stats[1])
+
+        # the dataset loads the store if ann_file is its directory
+        classes = ('cat1', 'cat2', 'cat3')
+        dataset = CocoDataset(ann_file, pipeline=[], classes=classes)
+        # the annotations of the store are not decoded to filter the images
+        with patch.object(
+                COCOStore, 'anns', new_callable=PropertyMock) as anns:
+            store_dataset = CocoDataset(
+                store_dir, pipeline=[], classes=classes)
+        anns.assert_not_called()
+        assert isinstance(store_dataset.coco, COCOStore)
+        assert store_dataset.data_infos == dataset.data_infos
+        # nor to build the category index
+        with patch.object(COCOStore, '_img_anns') as img_anns:
+            store_cat_index = store_dataset.get_cat_index()
+        img_anns.assert_not_called()
+        np.testing.assert_array_equal(store_cat_index.cat_ids,
+                                      dataset.get_cat_index().cat_ids)
+        for i in range(len(dataset)):
+            ann_info = dataset.get_ann_info(i)
+            store_ann_info = store_dataset.get_ann_info(i)
+            for key in ['bboxes', 'labels', 'bboxes_ignore']:
+                np.testing.assert_array_equal(store_ann_info[key],
+                                              ann_info[key])
+
+
+def _create_random_results(num_imgs=10, num_cats=3, seed=0):
+    rng = np.random.RandomState(seed)
+    results = []
+    for _ in range(num_imgs):
+        bbox_results, mask_results = [], []
+        for _ in range(num_cats):
+            num = rng.randint(0, 4)
+            x1, y1 = rng.uniform(0, 150, size=(2, num))
+            x2, y2 = np.array([x1, y1]) + rng.uniform(2, 50, size=(2, num))
+            bboxes = np.stack([x1, y1, x2, y2, rng.rand(num)], axis=1)
+            bbox_results.append(bboxes.astype(np.float32))
+            masks = np.zeros((num, 200, 200), dtype=bool)
+            for mask, bbox in zip(masks, bboxes.astype(int)):
+                mask[bbox[1]:bbox[3], bbox[0]:bbox[2]] = True
+            mask_results.append(list(masks))
+        results.append((bbox_results, encode_mask_results(mask_results)))
+    return results
+
+
+def test_coco_result_writer():
+    coco_gt, _ = _create_random_coco(num_imgs=10)
+    results = _create_random_results(num_imgs=10)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ann_file = osp.join(tmp_dir, 'ann.json')
+        mmcv.dump(coco_gt.dataset, ann_file)
+        dataset = CocoDataset(
+            ann_file, pipeline=[], classes=('cat1', 'cat2', 'cat3'))
+
+        expected_bbox, expected_segm = [], []
+        for img_id, result in zip(dataset.img_ids, results):
+            for label, (bboxes, segms) in enumerate(zip(*result)):
+                for bbox, segm in zip(bboxes, segms):
+                    data = dict(
+                        image_id=img_id,
+                        bbox=dataset.xyxy2xywh(bbox),
+                        score=float(bbox[4]),
+                        category_id=dataset.cat_ids[label])
+                    expected_bbox.append(data)
+                    expected_segm.append(
+                        dict(
+                            data,
+                            segmentation=dict(
+                                segm, counts=segm['counts'].decode())))
+
+        # the results can be written batch by batch
+        prefix = osp.join(tmp_dir, 'results')
+        with dataset.result_writer(prefix) as writer:
+            for i in range(0, 10, 4):
+                writer.write(results[i:i + 4])
+        assert writer.result_files == dict(
+            bbox=f'{prefix}.bbox.json',
+            segm=f'{prefix}.segm.json',
+            proposal=f'{prefix}.bbox.json')
+        assert mmcv.load(writer.result_files['bbox']) == expected_bbox
+        assert mmcv.load(writer.result_files['segm']) == expected_segm
+        # the masks are not modified
+        assert all(
+            isinstance(segm['counts'], bytes) for result in results
+            for segms in result[1] for segm in segms)
+        result_files = dataset.results2json(results)
+        assert result_files['bbox'] == expected_bbox
+        assert result_files['segm'] == expected_segm
+
+        bbox_results = [result[0] for result in results]
+        flat_results = DetResults.from_bbox_results(bbox_results)
+        assert dataset.results2json(flat_results)['bbox'] == expected_bbox
+        assert dataset.results2json(bbox_results)['bbox'] == expected_bbox
+        proposals = [np.vstack(result) for result in bbox_results]
+        result_files = dataset.results2json(proposals, prefix)
+        assert result_files == dict(proposal=f'{prefix}.proposal.json')
+        assert len(mmcv.load(result_files['proposal'])) == len(expected_bbox)
+
+        # the json results are evaluated without files
+        metrics = dataset.evaluate(results, metric=['bbox', 'proposal'])
+        assert metrics == dataset.evaluate(
+            results, metric=['bbox', 'proposal'], jsonfile_prefix=prefix)
+
+
+def test_coco_online_evaluator():
+    coco_gt, _ = _create_random_coco(num_imgs=20)
+    for ann in coco_gt.dataset['annotations']:
+        x, y, w, h = ann['bbox']
+        ann['segmentation'] = [[x, y, x + w, y, x + w, y + h, x, y + h]]
+    # more results than the max number of dets of an image
+    results = _create_random_results(num_imgs=20, seed=1)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ann_file = osp.join(tmp_dir, 'ann.json')
+        mmcv.dump(coco_gt.dataset, ann_file)
+        dataset = CocoDataset(
+            ann_file, pipeline=[], classes=('cat1', 'cat2', 'cat3'))
+
+        metric = ['bbox', 'segm', 'proposal']
+        eval_kwargs = dict(
+            metric=metric, classwise=True, proposal_nums=(1, 3, 5))
+        expected = dataset.evaluate(results, **eval_kwargs)
+        for background in [False, True]:
+            evaluator = dataset.online_evaluator(
+                background=background, **eval_kwargs)
+            # the batches of different ranks arrive in any order
+            for i in [1, 0, 2]:
+                inds = list(range(i, 20, 3))
+                evaluator.process([results[j] for j in inds], inds)
+            assert evaluator.evaluate() == expected
+
+        # flat bbox results
+        bbox_results = [result[0] for result in results]
+        evaluator = dataset.online_evaluator(metric='bbox')
+        for i in range(0, 20, 8):
+            evaluator.process(
+                DetResults.from_bbox_results(bbox_results[i:i + 8]),
+                range(i, min(i + 8, 20)))
+        assert evaluator.evaluate() == dataset.evaluate(bbox_results)
+
+        assert dataset.online_evaluator(metric='proposal_fast') is None
+        assert dataset.online_evaluator(jsonfile_prefix=tmp_dir) is None
@@ -7,8 +7,9 @@ import numpy as np
 import pytest
 
 from mmdet.core.mask import BitmapMasks, PolygonMasks
-from mmdet.datasets.pipelines import (FilterAnnotations, LoadImageFromFile,
-                                      LoadImageFromWebcam,
+from mmdet.datasets import build_image_cache
+from mmdet.datasets.pipelines import (FilterAnnotations, LoadImageFromCache,
+                                      LoadImageFromFile, LoadImageFromWebcam,
                                       LoadMultiChannelImageFromFiles)
 
 
@@ -93,6 +94,66 @@ class TestLoading:
         assert results['img_shape'] == (288, 512, 3)
         assert results['ori_shape'] == (288, 512, 3)
 
+    def test_load_img_from_cache(self, tmp_path):
+
+        class ToyDataset:
+            img_prefix = self.data_prefix
+            data_infos = [
+                dict(filename='color.jpg'),
+                dict(filename='gray.jpg')
+            ]
+
+            def get_ann_info(self, idx):
+                return dict(
+                    bboxes=np.array(
+                        [[10, 20, 110, 220]] * (idx + 1), dtype=np.float32),
+                    labels=np.array([idx] * (idx + 1)),
+                    bboxes_ignore=np.zeros((0, 4), dtype=np.float32))
+
+        cache_dir = str(tmp_path / 'cache')
+        # one image per shard
+        cache = build_image_cache(
+            ToyDataset(), cache_dir, shard_size=1, nproc=1)
+        assert len(cache) == 2 and len(cache.shards) == 2
+
+        transform = LoadImageFromCache(cache_dir)
+        results = transform(
+            dict(
+                img_prefix=self.data_prefix,
+                img_info=dict(filename='gray.jpg'),
+                bbox_fields=[]))
+        expected = mmcv.imread(osp.join(self.data_prefix, 'gray.jpg'))
+        np.testing.assert_array_equal(results['img'], expected)
+        assert results['img'].flags.writeable
+        assert results['filename'] == osp.join(self.data_prefix, 'gray.jpg')
+        assert results['ori_filename'] == 'gray.jpg'
+        assert results['img_shape'] == (288, 512, 3)
+        assert results['ori_shape'] == (288, 512, 3)
+        assert results['gt_bboxes'].shape == (2, 4)
+        np.testing.assert_array_equal(results['gt_labels'], [1, 1])
+        assert results['gt_bboxes_ignore'].shape == (0, 4)
+        assert results['bbox_fields'] == ['gt_bboxes_ignore', 'gt_bboxes']
+
+        # pre-resized images and bboxes
+        cache_dir = str(tmp_path / 'resized_cache')
+        build_image_cache(
+            ToyDataset(), cache_dir, img_scale=(256, 256), nproc=1)
+        transform = LoadImageFromCache(cache_dir, to_float32=True)
+        results = transform(
+            dict(
+                img_prefix=self.data_prefix,
+                img_info=dict(filename='color.jpg'),
+                bbox_fields=[]))
+        assert results['img'].shape == (144, 256, 3)
+        assert results['img'].dtype == np.float32
+        np.testing.assert_allclose(results['gt_bboxes'], [[5, 10, 55, 110]])
+        with pytest.raises(KeyError):
+            transform(
+                dict(
+                    img_prefix=self.data_prefix,
+                    img_info=dict(filename='missing.jpg'),
+                    bbox_fields=[]))
+
 
 def _build_filter_annotations_args():
     kwargs = (dict(min_gt_bbox_wh=(100, 100)),
@@ -1000,6 +1000,48 @@ def test_mixup():
     assert results['gt_bboxes_ignore'].dtype == np.float32
 
 
+@pytest.mark.parametrize('transform', [
+    dict(type='Mosaic', img_scale=(64, 80)),
+    dict(type='Mosaic', img_scale=(64, 80), pad_val=114.0, skip_filter=False),
+    dict(type='MixUp', img_scale=(64, 80)),
+    dict(type='MixUp', img_scale=(64, 80), pad_val=114.0, skip_filter=False),
+    dict(
+        type='MixUp',
+        img_scale=(320, 640),
+        ratio_range=(0.5, 2.5),
+        bbox_clip_border=False)
+])
+def test_mosaic_mixup_fast(transform):
+    img = mmcv.imread(
+        osp.join(osp.dirname(__file__), '../../../data/color.jpg'), 'color')
+
+    def _create_results(h, w):
+        gt_bboxes = create_random_bboxes(8, w, h)
+        return dict(
+            img=mmcv.imresize(img, (w, h)),
+            gt_bboxes=gt_bboxes,
+            gt_labels=np.arange(gt_bboxes.shape[0]),
+            bbox_fields=['gt_bboxes'])
+
+    module = build_from_cfg(transform, PIPELINES)
+    fast_module = build_from_cfg(dict(transform, fast=True), PIPELINES)
+    num_mix = 3 if transform['type'] == 'Mosaic' else 1
+    for seed in range(10):
+        np.random.seed(seed)
+        shapes = np.random.randint(20, 400, size=(num_mix + 1, 2)).tolist()
+        results = _create_results(*shapes[0])
+        results['mix_results'] = [_create_results(*s) for s in shapes[1:]]
+
+        np.random.seed(seed)
+        expected = module(copy.deepcopy(results))
+        np.random.seed(seed)
+        results = fast_module(copy.deepcopy(results))
+        for key in ['img', 'gt_bboxes', 'gt_labels']:
+            assert results[key].dtype == expected[key].dtype
+            np.testing.assert_array_equal(results[key], expected[key])
+        assert results['img_shape'] == expected['img_shape']
+
+
 def test_photo_metric_distortion():
     img = mmcv.imread(
         osp.join(osp.dirname(__file__), '../../../data/color.jpg'), 'color')
@@ -0,0 +1,52 @@
+import numpy as np
+
+from mmdet.core import DetResults
+from mmdet.core.evaluation.confusion_matrix import eval_confusion_matrix
+
+gt_bboxes = np.array([[0, 0, 10, 10], [20, 20, 40, 40], [50, 50, 60, 60]],
+                     dtype=np.float32)
+gt_labels = np.array([0, 1, 1])
+det_results = [
+    # class 0: a true positive and a low score detection
+    np.array([[0, 0, 10, 10, 0.9], [50, 50, 60, 60, 0.1]], dtype=np.float32),
+    # class 1: a detection of the class 0 gt and a background false positive
+    np.array([[1, 1, 10, 10, 0.8], [70, 70, 80, 80, 0.7]], dtype=np.float32)
+]
+
+
+def test_eval_confusion_matrix():
+    annotations = [dict(bboxes=gt_bboxes, labels=gt_labels)]
+    confusion_matrix = eval_confusion_matrix([det_results],
+                                             annotations,
+                                             score_thr=0.3)
+    expected = np.array([[1, 1, 0], [0, 0, 2], [0, 1, 0]])
+    np.testing.assert_array_equal(confusion_matrix, expected)
+
+    # without score threshold the class 0 detection of the last gt counts
+    confusion_matrix = eval_confusion_matrix([det_results], annotations)
+    expected = np.array([[1, 1, 0], [1, 0, 2], [0, 1, 0]])
+    np.testing.assert_array_equal(confusion_matrix, expected)
+
+    # results with masks, multiple images and processes
+    confusion_matrix = eval_confusion_matrix(
+        [(det_results, None)] * 4, annotations * 4, score_thr=0.3, nproc=2)
+    np.testing.assert_array_equal(
+        confusion_matrix,
+        np.array([[1, 1, 0], [0, 0, 2], [0, 1, 0]]) * 4)
+
+    # flat results
+    confusion_matrix = eval_confusion_matrix(
+        DetResults.from_bbox_results([det_results] * 4),
+        annotations * 4,
+        score_thr=0.3,
+        nproc=2)
+    np.testing.assert_array_equal(
+        confusion_matrix,
+        np.array([[1, 1, 0], [0, 0, 2], [0, 1, 0]]) * 4)
+
+    # no gt
+    confusion_matrix = eval_confusion_matrix(
+        [det_results], [dict(bboxes=np.zeros((0, 4)), labels=np.zeros(0))],
+        score_thr=0.3)
+    np.testing.assert_array_equal(confusion_matrix,
+                                  np.array([[0, 0, 0], [0, 0, 0], [1, 2, 0]]))
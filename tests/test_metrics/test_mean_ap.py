@@ -1,7 +1,12 @@
+from multiprocessing import Pool
+
 import numpy as np
+import pytest
 
+from mmdet.core import DetResults, OnlineEvaluator, OnlineMAPEvaluator
 from mmdet.core.evaluation.mean_ap import (eval_map, tpfp_default,
-                                           tpfp_imagenet, tpfp_openimages)
+                                           tpfp_default_batched, tpfp_imagenet,
+                                           tpfp_openimages)
 
 det_bboxes = np.array([
     [0, 0, 10, 10],
@@ -67,6 +72,38 @@ def test_tpfp_default():
     assert (fp == np.array([[0, 0, 1]])).all()
 
 
+def test_tpfp_default_batched():
+    rng = np.random.RandomState(0)
+    cls_dets, cls_gts, cls_gts_ignore = [], [], []
+    for _ in range(20):
+        gts = rng.rand(rng.randint(0, 5), 4) * 50
+        gts[:, 2:] += gts[:, :2] + 5
+        dets = np.vstack([gts + rng.randn(*gts.shape), gts[:2] + 3])
+        # repeated scores to check that ties are broken as in tpfp_default
+        scores = rng.choice([0.3, 0.6, 0.9], (dets.shape[0], 1))
+        cls_dets.append(np.hstack([dets, scores]).astype(np.float32))
+        cls_gts.append(gts.astype(np.float32))
+        cls_gts_ignore.append(gts[:1].astype(np.float32) + 1)
+    cls_dets.append(np.zeros((0, 5), dtype=np.float32))
+    cls_gts.append(np.zeros((0, 4), dtype=np.float32))
+    cls_gts_ignore.append(np.zeros((0, 4), dtype=np.float32))
+
+    for area_ranges in [None, [(0, 32**2), (32**2, 1e5)]]:
+        tp, fp = tpfp_default_batched(
+            cls_dets,
+            cls_gts,
+            cls_gts_ignore,
+            iou_thr=0.5,
+            area_ranges=area_ranges,
+            chunk_size=8)
+        results = [
+            tpfp_default(dets, gts, gts_ignore, 0.5, area_ranges)
+            for dets, gts, gts_ignore in zip(cls_dets, cls_gts, cls_gts_ignore)
+        ]
+        assert np.array_equal(tp, np.hstack([res[0] for res in results]))
+        assert np.array_equal(fp, np.hstack([res[1] for res in results]))
+
+
 def test_eval_map():
 
     # 2 image and 2 classes
@@ -185,3 +222,123 @@ def test_tpfp_openimages():
         ioa_thr=0.5)
     fp = result[1]
     assert (fp == np.array([[1, 1, 1, 1, 1, 1]])).all()
+
+
+def test_eval_map_batched():
+    dets = np.hstack([det_bboxes, np.array([[0.9], [0.8], [0.7]])])
+    # 2 image and 2 classes
+    det_results = [[dets, dets], [dets, dets]]
+    gt_info = {
+        'bboxes': gt_bboxes,
+        'bboxes_ignore': gt_ignore,
+        'labels': np.array([0, 1, 1]),
+        'labels_ignore': np.array([0, 1])
+    }
+    annotations = [gt_info, gt_info]
+    mean_ap, eval_results = eval_map(
+        det_results, annotations, use_legacy_coordinate=True)
+
+    batched_mean_ap, batched_results = eval_map(
+        det_results,
+        annotations,
+        use_legacy_coordinate=True,
+        batched=True,
+        nproc=1)
+    assert batched_mean_ap == mean_ap
+
+    # reuse a persistent pool, the detections are memory-mapped
+    pool = Pool(2)
+    batched_mean_ap, batched_results = eval_map(
+        det_results,
+        annotations,
+        use_legacy_coordinate=True,
+        batched=True,
+        pool=pool)
+    pool.close()
+    assert batched_mean_ap == mean_ap
+    for res, batched_res in zip(eval_results, batched_results):
+        assert np.array_equal(res['recall'], batched_res['recall'])
+        assert np.array_equal(res['precision'], batched_res['precision'])
+
+    # flat results are evaluated the same
+    flat_results = DetResults.from_bbox_results(det_results)
+    for batched in [False, True]:
+        flat_mean_ap, flat_eval_results = eval_map(
+            flat_results,
+            annotations,
+            use_legacy_coordinate=True,
+            batched=batched,
+            nproc=2)
+        assert flat_mean_ap == mean_ap
+        for res, flat_res in zip(eval_results, flat_eval_results):
+            assert np.array_equal(res['recall'], flat_res['recall'])
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_online_map_evaluator(background):
+    rng = np.random.RandomState(0)
+    det_results, annotations = [], []
+    for _ in range(20):
+        gts = rng.uniform(0, 50, size=(6, 2))
+        gts = np.hstack([gts, gts + rng.uniform(5, 30, size=(6, 2))])
+        labels = rng.randint(0, 3, size=6)
+        annotations.append({
+            'bboxes': gts[:4],
+            'labels': labels[:4],
+            'bboxes_ignore': gts[4:],
+            'labels_ignore': labels[4:]
+        })
+        # jittered gts and random false positives, with tied scores
+        dets = np.vstack([gts + rng.uniform(-3, 3, size=gts.shape), gts[::-1]])
+        scores = rng.randint(0, 5, size=(12, 1)) / 5
+        dets = np.hstack([dets, scores]).astype(np.float32)
+        dets_labels = np.concatenate([labels, rng.randint(0, 3, size=6)])
+        det_results.append([dets[dets_labels == i] for i in range(3)])
+
+    for dataset in [None, 'voc07']:
+        mean_aps = [
+            eval_map(
+                det_results,
+                annotations,
+                iou_thr=iou_thr,
+                dataset=dataset,
+                use_legacy_coordinate=True,
+                nproc=1)[0] for iou_thr in [0.5, 0.75]
+        ]
+        evaluator = OnlineMAPEvaluator(
+            annotations.__getitem__,
+            iou_thrs=[0.5, 0.75],
+            dataset=dataset,
+            use_legacy_coordinate=True,
+            background=background)
+        # the batches of different ranks arrive in any order
+        for i in [2, 0, 1, 3]:
+            inds = np.arange(i, 20, 4)
+            evaluator.process([det_results[j] for j in inds], inds)
+        metrics = evaluator.evaluate()
+        assert list(metrics) == ['mAP', 'AP50', 'AP75']
+        assert metrics['mAP'] == sum(mean_aps) / 2
+        assert metrics['AP50'] == round(mean_aps[0], 3)
+
+    # the statistics of several evaluators can be merged
+    states = []
+    for rank in range(2):
+        evaluator = OnlineMAPEvaluator(
+            annotations.__getitem__, background=background)
+        flat_results = DetResults.from_bbox_results(det_results[rank::2])
+        evaluator.process(flat_results, range(rank, 20, 2))
+        states.append(evaluator.get_state())
+    evaluator.merge(states)
+    mean_ap = eval_map(det_results, annotations, nproc=1)[0]
+    assert evaluator.evaluate()['mAP'] == mean_ap
+
+    # errors in the background thread are raised when evaluating
+    evaluator = OnlineMAPEvaluator(
+        annotations.__getitem__, background=background)
+    with pytest.raises(IndexError):
+        evaluator.process([det_results[0]], [100])
+        evaluator.evaluate()
+
+    # the base class is abstract
+    with pytest.raises(TypeError):
+        OnlineEvaluator()
@@ -1,5 +1,6 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import mmcv
+import numpy as np
 import torch
 from mmcv.cnn import ConvModule, DepthwiseSeparableConvModule
 
@@ -86,3 +87,78 @@ def test_yolox_head_loss():
     assert empty_box_loss.item() == 0, (
         'there should be no box loss when gt_bboxes out of bound')
     assert empty_obj_loss.item() > 0, 'objectness loss should be non-zero'
+
+
+def test_yolox_head_batched_assign():
+    """Tests the batched assignment gives the same losses as the per-image
+    one."""
+    s = 256
+    img_metas = [{
+        'img_shape': (s, s, 3),
+        'scale_factor': 1,
+        'pad_shape': (s, s, 3)
+    }] * 3
+    train_cfg = mmcv.Config(
+        dict(assigner=dict(type='SimOTAAssigner', center_radius=2.5)))
+    self = YOLOXHead(num_classes=4, in_channels=1, train_cfg=train_cfg)
+    self.use_l1 = True
+    feat = [
+        torch.rand(3, 1, s // feat_size, s // feat_size)
+        for feat_size in [4, 8, 16]
+    ]
+    cls_scores, bbox_preds, objectnesses = self.forward(feat)
+    gt_bboxes = [
+        torch.Tensor([[23.6667, 23.8757, 238.6326, 151.8874],
+                      [10.0, 20.0, 80.0, 120.0]]),
+        torch.empty((0, 4)),
+        torch.Tensor([[s * 4, s * 4, s * 4 + 10, s * 4 + 10]]),
+    ]
+    gt_labels = [
+        torch.LongTensor([2, 0]),
+        torch.LongTensor([]),
+        torch.LongTensor([1])
+    ]
+    losses = self.loss(cls_scores, bbox_preds, objectnesses, gt_bboxes,
+                       gt_labels, img_metas)
+    self.train_cfg.batched_assign = True
+    batched_losses = self.loss(cls_scores, bbox_preds, objectnesses, gt_bboxes,
+                               gt_labels, img_metas)
+    for name, loss in losses.items():
+        assert torch.allclose(loss, batched_losses[name])
+
+
+def test_yolox_head_fast_decode():
+    """Tests the fast path of get_bboxes gives the same results as the
+    batched one."""
+    s = 256
+    img_metas = [{
+        'img_shape': (s, s, 3),
+        'scale_factor':
+        np.array([1.5, 1.2, 1.5, 1.2], dtype=np.float32),
+        'pad_shape': (s, s, 3)
+    }] * 2
+    test_cfg = mmcv.Config(
+        dict(score_thr=0.01, nms=dict(type='nms', iou_threshold=0.65)))
+    self = YOLOXHead(num_classes=4, in_channels=1, test_cfg=test_cfg)
+    batched_cfg = mmcv.Config(dict(test_cfg, fast_decode=False))
+    # the cached priors are regenerated when the input shape changes
+    for size in [s, s // 2, s]:
+        featmap_sizes = [size // stride for stride in [8, 16, 32]]
+        outs = [[
+            torch.randn(2, channels, featmap_size, featmap_size) * 2 - 3
+            for featmap_size in featmap_sizes
+        ] for channels in [4, 4, 1]]
+        results = self.get_bboxes(*outs, img_metas, rescale=True)
+        batched_results = self.get_bboxes(
+            *outs, img_metas, cfg=batched_cfg, rescale=True)
+        assert len(results[0][0]) > 0
+        for (dets, labels), (batched_dets,
+                             batched_labels) in zip(results, batched_results):
+            assert torch.allclose(dets, batched_dets)
+            assert torch.equal(labels, batched_labels)
+
+    # no candidates
+    test_cfg.score_thr = 1.1
+    results = self.get_bboxes(*outs, img_metas)
+    assert results[0][0].shape == (0, 4)
+    assert results[0][1].shape == (0, )
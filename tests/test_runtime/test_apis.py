@@ -1,9 +1,12 @@
 import os
 from pathlib import Path
 
+import numpy as np
 import pytest
 
-from mmdet.apis import init_detector
+from mmdet.apis import inference_detector, init_detector
+from mmdet.apis.test import decode_results_columnar, encode_results_columnar
+from mmdet.core import DetResults
 
 
 def test_init_detector():
@@ -30,3 +33,75 @@ def test_init_detector():
     with pytest.raises(TypeError):
         config_list = [config_file]
         model = init_detector(config_list)  # noqa: F841
+
+
+def test_inference_detector_pipeline_cache():
+    project_dir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+    project_dir = os.path.join(project_dir, '..')
+
+    config_file = os.path.join(
+        project_dir, 'configs/retinanet/retinanet_r18_fpn_1x_coco.py')
+    cfg_options = dict(model=dict(backbone=dict(init_cfg=None)))
+    model = init_detector(config_file, device='cpu', cfg_options=cfg_options)
+    img = np.random.randint(0, 255, (64, 80, 3), dtype=np.uint8)
+
+    result = inference_detector(model, img)
+    assert len(result) == len(model.CLASSES)
+    assert set(model.inference_timings) == {
+        'build_pipeline', 'pipeline', 'collate', 'forward'
+    }
+    pipeline = model._test_pipeline_cache['pipelines'][True]
+    # the model config is not modified by inference
+    assert model.cfg.data.test.pipeline[0].type == 'LoadImageFromFile'
+
+    # the prepared pipeline is reused across calls
+    results = inference_detector(model, [img, img])
+    assert len(results) == 2
+    assert model._test_pipeline_cache['pipelines'][True] is pipeline
+
+    # modifying the test pipeline invalidates the cache
+    model.cfg.data.test.pipeline[1].img_scale = (320, 256)
+    inference_detector(model, img)
+    assert model._test_pipeline_cache['pipelines'][True] is not pipeline
+
+
+def test_encode_results_columnar():
+    rng = np.random.RandomState(0)
+    bbox_results = [[
+        rng.rand(rng.randint(0, 4), 5).astype(np.float32) for _ in range(3)
+    ] for _ in range(5)]
+    decoded = decode_results_columnar(encode_results_columnar(bbox_results))
+    assert len(decoded) == len(bbox_results)
+    for result, expected in zip(decoded, bbox_results):
+        assert len(result) == len(expected)
+        for bboxes, expected_bboxes in zip(result, expected):
+            assert bboxes.dtype == np.float32
+            np.testing.assert_array_equal(bboxes, expected_bboxes)
+
+    # bbox results with encoded masks
+    mask_results = [(result, [[dict(size=[4, 4], counts=b'0')] * len(bboxes)
+                              for bboxes in result])
+                    for result in bbox_results]
+    decoded = decode_results_columnar(encode_results_columnar(mask_results))
+    for (result, masks), expected in zip(decoded, mask_results):
+        expected, expected_masks = expected
+        assert masks == expected_masks
+        for bboxes, expected_bboxes in zip(result, expected):
+            np.testing.assert_array_equal(bboxes, expected_bboxes)
+
+    # flat results
+    results = DetResults.from_bbox_results(bbox_results)
+    decoded = decode_results_columnar(encode_results_columnar(results))
+    assert isinstance(decoded, DetResults)
+    assert decoded.num_classes == 3
+    for name in ['bboxes', 'scores', 'labels', 'img_offsets']:
+        np.testing.assert_array_equal(
+            getattr(decoded, name), getattr(results, name))
+
+    # other results are pickled as a whole
+    pan_results = [dict(pan_results=np.ones((4, 4), dtype=np.int64))] * 2
+    decoded = decode_results_columnar(encode_results_columnar(pan_results))
+    assert len(decoded) == 2
+    np.testing.assert_array_equal(decoded[1]['pan_results'],
+                                  pan_results[1]['pan_results'])
+    assert decode_results_columnar(encode_results_columnar([])) == []
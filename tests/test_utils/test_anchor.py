@@ -767,3 +767,65 @@ def test_guided_anchor():
     anchors = ga_retina_head.square_anchor_generator.grid_anchors(
         featmap_sizes, device)
     assert len(anchors) == 5
+
+
+def test_prior_cache():
+    from mmdet.core.anchor import (PriorCache, build_prior_generator,
+                                   get_prior_cache)
+
+    cache = get_prior_cache()
+    max_size = cache.max_size
+    cache.clear()
+    anchor_generator = build_prior_generator(
+        dict(
+            type='AnchorGenerator',
+            scales=[8],
+            ratios=[0.5, 1.0, 2.0],
+            strides=[4, 8]))
+    point_generator = build_prior_generator(
+        dict(type='MlvlPointGenerator', strides=[4, 8], offset=0))
+    featmap_sizes = [(16, 16), (8, 8)]
+
+    anchors = anchor_generator.grid_priors(featmap_sizes, device='cpu')
+    assert cache.stats() == dict(hits=0, misses=1, size=1, max_size=max_size)
+    # the same arguments given in another way hit the cache
+    cached_anchors = anchor_generator.grid_priors(
+        [torch.Size([16, 16]), (8, 8)], torch.float32, device='cpu')
+    assert cache.hits == 1 and cache.misses == 1
+    assert cached_anchors is not anchors
+    for cached, anchor in zip(cached_anchors, anchors):
+        assert cached is anchor
+    # another dtype, another generator or other sizes miss the cache
+    anchor_generator.grid_priors(
+        featmap_sizes, dtype=torch.float64, device='cpu')
+    points = point_generator.grid_priors(featmap_sizes, device='cpu')
+    point_generator.grid_priors([(8, 8), (4, 4)], device='cpu')
+    assert cache.hits == 1 and cache.misses == 4
+    assert points[0].shape == (256, 2)
+    for generator in [anchor_generator, point_generator]:
+        flags = generator.valid_flags(featmap_sizes, (40, 64, 3), 'cpu')
+        cached_flags = generator.valid_flags(
+            featmap_sizes, pad_shape=(40, 64, 3), device='cpu')
+        for cached, flag in zip(cached_flags, flags):
+            assert cached is flag
+    assert cache.hits == 3 and cache.misses == 6
+
+    # the cached results are the same as the generated ones
+    cache.max_size = 0
+    for cached, anchor in zip(
+            cached_anchors,
+            anchor_generator.grid_priors(featmap_sizes, device='cpu')):
+        assert cached is not anchor
+        assert torch.equal(cached, anchor)
+    assert cache.hits == 3 and cache.misses == 6
+
+    # the least recently used results are evicted
+    cache.max_size = max_size
+    cache.clear()
+    small_cache = PriorCache(max_size=2)
+    for key in ['a', 'b', 'a', 'c']:
+        small_cache.get(key, lambda: [torch.zeros(1)])
+    assert small_cache.stats() == dict(hits=1, misses=3, size=2, max_size=2)
+    small_cache.get('a', lambda: [torch.zeros(1)])
+    small_cache.get('b', lambda: [torch.zeros(1)])
+    assert small_cache.hits == 2 and small_cache.misses == 4
@@ -516,6 +516,42 @@ def test_sim_ota_assigner():
     assert torch.all(assign_result.gt_inds == expected_gt_inds)
 
 
+def test_sim_ota_assigner_batch_assign():
+    self = SimOTAAssigner(center_radius=2.5)
+    torch.manual_seed(0)
+    inds = torch.arange(256)
+    priors = torch.stack(
+        [inds % 16 * 8. + 4, inds // 16 * 8. + 4] + [torch.full(
+            (256, ), 8.)] * 2,
+        dim=1)
+    pred_scores = torch.rand(3, 256, 4)
+    decoded_bboxes = torch.cat([priors[:, :2] - 10, priors[:, :2] + 10],
+                               dim=1).repeat(3, 1, 1)
+    decoded_bboxes += torch.rand(3, 256, 4) * 5
+    gt_bboxes = [
+        torch.Tensor([[10, 10, 60, 50], [40, 30, 100, 120], [0, 64, 40, 128]]),
+        torch.empty((0, 4)),
+        torch.Tensor([[20, 20, 70, 70], [300, 300, 320, 320]]),
+    ]
+    gt_labels = [
+        torch.LongTensor([0, 3, 1]),
+        torch.LongTensor([]),
+        torch.LongTensor([2, 2])
+    ]
+    assign_results = self.batch_assign(pred_scores, priors, decoded_bboxes,
+                                       gt_bboxes, gt_labels)
+    assert len(assign_results) == 3
+    for i, assign_result in enumerate(assign_results):
+        expected = self.assign(pred_scores[i], priors, decoded_bboxes[i],
+                               gt_bboxes[i], gt_labels[i])
+        assert assign_result.num_gts == expected.num_gts
+        assert torch.equal(assign_result.gt_inds, expected.gt_inds)
+        assert torch.equal(assign_result.labels, expected.labels)
+        assert torch.equal(assign_result.max_overlaps, expected.max_overlaps)
+    assert (assign_results[0].gt_inds > 0).any()
+    assert torch.all(assign_results[1].gt_inds == 0)
+
+
 def test_task_aligned_assigner():
     with pytest.raises(AssertionError):
         TaskAlignedAssigner(topk=0)
@@ -0,0 +1,52 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import sys
+from collections import Counter
+from os.path import dirname
+
+import pytest
+
+
+def _import_split():
+    pytest.importorskip('sklearn')
+    sys.path.insert(0, dirname(dirname(dirname(__file__))))
+    import coco_train_val_test_split
+    return coco_train_val_test_split
+
+
+def _dataset(num_imgs, cat_ids):
+    split_script = _import_split()
+    images = [dict(id=i, file_name=f'{i}.jpg') for i in range(num_imgs)]
+    annotations = [
+        dict(id=i, image_id=i, category_id=cat_id)
+        for i, cat_id in enumerate(cat_ids)
+    ]
+    img_to_anns = split_script.index_annotations(annotations)
+    return images, img_to_anns, Counter(cat_ids)
+
+
+def test_stratify_labels():
+    split_script = _import_split()
+    # the only image of category 2 is folded into the most common label
+    images, img_to_anns, cat_counts = _dataset(10, [1] * 9 + [2])
+    labels = split_script.stratify_labels(images, img_to_anns, cat_counts)
+    assert labels == [1] * 10
+    train, test = split_script.split(images, 0.2, 2022, img_to_anns,
+                                     cat_counts)
+    assert len(train) == 8 and len(test) == 2
+
+    # the labels with too few images are merged
+    images, img_to_anns, cat_counts = _dataset(12, [1] * 5 + [2] * 4 +
+                                               [3] * 2 + [4])
+    labels = split_script.stratify_labels(images, img_to_anns, cat_counts)
+    assert labels == [1] * 5 + [2] * 4 + [-2] * 3
+
+
+def test_split_fallback():
+    split_script = _import_split()
+    # fewer test images than labels, the split is not stratified
+    images, img_to_anns, cat_counts = _dataset(12, [1] * 4 + [2] * 4 + [3] * 4)
+    with pytest.warns(UserWarning, match='split randomly'):
+        train, test = split_script.split(images, 2, 2022, img_to_anns,
+                                         cat_counts)
+    assert len(train) == 10 and len(test) == 2
+    assert {img['id'] for img in train + test} == set(range(12))
@@ -1,10 +1,11 @@
 import copy
+import pickle
 
 import numpy as np
 import pytest
 import torch
 
-from mmdet.core import GeneralData, InstanceData
+from mmdet.core import CompactInstanceData, GeneralData, InstanceData
 
 
 def _equal(a, b):
@@ -589,3 +590,99 @@ def test_instance_data():
     instances = InstanceData(data=dict(bboxes=torch.rand(4, 4)))
     # cat only single instance
     assert len(InstanceData.cat([instances])) == 4
+
+
+def test_compact_instance_data():
+    meta_info = dict(img_shape=(256, 256, 3), path='dadfaff')
+    data = dict(
+        bboxes=torch.rand(4, 4),
+        masks=torch.rand(4, 2, 2),
+        labels=np.random.rand(4))
+
+    # test init
+    with pytest.raises(AssertionError):
+        CompactInstanceData(dict())
+    with pytest.raises(AssertionError):
+        CompactInstanceData(dict(size=[(i, i) for i in range(4)]))
+    with pytest.raises(AssertionError):
+        CompactInstanceData(
+            dict(bboxes=torch.rand(4, 4), scores=torch.rand(5)))
+    results = CompactInstanceData(data, meta_info)
+    assert len(results) == 4
+    assert results.keys() == ['bboxes', 'masks', 'labels']
+    assert 'path' in results and 'bboxes' in results
+    assert results.img_shape == (256, 256, 3)
+    assert results.bboxes is data['bboxes']
+    assert results['labels'] is data['labels']
+    with pytest.raises(AttributeError):
+        results.scores
+
+    # the fields are fixed
+    results.bboxes = torch.rand(4, 4)
+    with pytest.raises(AttributeError):
+        results.scores = torch.rand(4)
+    with pytest.raises(AttributeError):
+        results._data = dict()
+    with pytest.raises(AssertionError):
+        results.bboxes = torch.rand(5, 4)
+    with pytest.raises(AssertionError):
+        results.bboxes = [(i, i) for i in range(4)]
+    with pytest.raises(AttributeError):
+        del results.bboxes
+
+    # slices are views sharing the meta info
+    sliced = results[1:3]
+    assert len(sliced) == 2
+    assert sliced.meta_info is results.meta_info
+    assert sliced.bboxes.data_ptr() == results.bboxes[1].data_ptr()
+    assert np.shares_memory(sliced.labels, results.labels)
+    assert len(results[0]) == 1 and len(results[-1]) == 1
+    assert _equal(results[-1].bboxes, results.bboxes[3:])
+    with pytest.raises(IndexError):
+        results[4]
+
+    # index by masks and indices
+    mask = torch.tensor([True, False, True, True])
+    assert len(results[mask]) == 3
+    assert _equal(results[mask].labels, results.labels[mask.numpy()])
+    assert len(results[mask.numpy()]) == 3
+    assert len(results[torch.LongTensor([3, 0])]) == 2
+    assert _equal(results[np.array([3, 0])].bboxes, results.bboxes[[3, 0]])
+    with pytest.raises(AssertionError):
+        results[torch.tensor([True, False])]
+
+    # cat and split
+    cat_results = CompactInstanceData.cat([results, results[:2]])
+    assert len(cat_results) == 6
+    assert cat_results.meta_info is results.meta_info
+    assert CompactInstanceData.cat([results]) is results
+    with pytest.raises(AssertionError):
+        CompactInstanceData.cat(
+            [results,
+             CompactInstanceData(dict(bboxes=torch.rand(2, 4)))])
+    splits = cat_results.split([4, 2])
+    assert [len(split) for split in splits] == [4, 2]
+    assert _equal(splits[1].masks, results.masks[:2])
+    with pytest.raises(AssertionError):
+        cat_results.split([4, 3])
+
+    # pickle
+    loaded = pickle.loads(pickle.dumps(results))
+    assert len(loaded) == 4 and loaded.path == 'dadfaff'
+    assert _equal(loaded.bboxes, results.bboxes)
+
+    # convert from and to InstanceData
+    instance_data = results.to_instance_data()
+    assert isinstance(instance_data, InstanceData)
+    assert len(instance_data) == 4 and instance_data.path == 'dadfaff'
+    compact = CompactInstanceData.from_instance_data(instance_data)
+    assert sorted(compact.keys()) == sorted(results.keys())
+    assert compact.img_shape == (256, 256, 3)
+
+    # tensor-like methods
+    numpy_results = results.numpy()
+    assert isinstance(numpy_results.bboxes, np.ndarray)
+    assert results.to(torch.float64).bboxes.dtype == torch.float64
+    assert isinstance(results.cpu().detach().masks, torch.Tensor)
+    if torch.cuda.is_available():
+        assert results.cuda().bboxes.is_cuda
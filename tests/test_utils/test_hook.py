@@ -1,5 +1,7 @@
 # Copyright (c) OpenMMLab. All rights reserved.
+import json
 import logging
+import os.path as osp
 import shutil
 import sys
 import tempfile
@@ -17,6 +19,7 @@ from torch.utils.data import DataLoader, Dataset
 from mmdet.core.hook import ExpMomentumEMAHook, YOLOXLrUpdaterHook
 from mmdet.core.hook.sync_norm_hook import SyncNormHook
 from mmdet.core.hook.sync_random_size_hook import SyncRandomSizeHook
+from mmdet.utils import get_profiler, profile_span
 
 
 def _build_demo_runner_without_hook(runner_type='EpochBasedRunner',
@@ -413,3 +416,29 @@ def test_memory_profiler_hook():
         assert mock_memory_usage.called
 
     _test_memory_profiler_hook()
+
+
+def test_span_profiler_hook():
+    """Test SpanProfilerHook."""
+
+    class DemoModel(nn.Module):
+
+        def __init__(self):
+            super().__init__()
+            self.linear = nn.Linear(2, 1)
+
+        def train_step(self, x, optimizer, **kwargs):
+            with profile_span('backbone'):
+                loss = self.linear(x)
+            return dict(loss=loss)
+
+    loader = DataLoader(torch.ones((5, 2)))
+    runner = _build_demo_runner()
+    runner.model = DemoModel()
+    runner.register_hook_from_cfg(dict(type='SpanProfilerHook', interval=2))
+    runner.run([loader], [('train', 1)])
+    assert get_profiler() is None
+    with open(osp.join(runner.work_dir, 'span_trace.json')) as f:
+        events = json.load(f)['traceEvents']
+    assert [event['name'] for event in events] == ['backbone'] * 5
+    shutil.rmtree(runner.work_dir)
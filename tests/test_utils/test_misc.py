@@ -6,7 +6,8 @@ import numpy as np
 import pytest
 import torch
 
-from mmdet.core.bbox import distance2bbox
+from mmdet.core.bbox import (DetResults, bbox2result, bbox_result2array,
+                             distance2bbox, dump_results, load_results)
 from mmdet.core.mask.structures import BitmapMasks, PolygonMasks
 from mmdet.core.utils import (center_of_mass, filter_scores_and_topk,
                               flip_tensor, mask2ndarray, select_single_mlvl)
@@ -98,6 +99,80 @@ def test_distance2bbox():
     assert rois.shape == out.shape
 
 
+def test_bbox_result2array():
+    bboxes = np.array(
+        [[10, 20, 30, 40, 0.9], [0, 0, 50, 100, 0.2], [5, 5, 15, 25, 0.6]],
+        dtype=np.float32)
+    labels = np.array([2, 0, 2])
+    bbox_result = bbox2result(bboxes, labels, 3)
+
+    out_bboxes, scores, out_labels = bbox_result2array(bbox_result)
+    assert out_bboxes.shape == (3, 4)
+    # results are ordered by class
+    assert np.array_equal(out_labels, [0, 2, 2])
+    assert np.allclose(scores, [0.2, 0.9, 0.6])
+
+    out_bboxes, scores, out_labels = bbox_result2array(
+        bbox_result, score_thr=0.5, img_shape=(100, 50))
+    assert np.array_equal(out_labels, [2, 2])
+    assert np.allclose(out_bboxes[0], [0.2, 0.2, 0.6, 0.4])
+    # the input results are not modified
+    assert np.allclose(bbox_result[2][0], bboxes[0])
+
+    out_bboxes, scores, out_labels = bbox_result2array(
+        bbox2result(np.zeros((0, 5)), np.zeros((0, )), 3))
+    assert out_bboxes.shape == (0, 4)
+    assert len(scores) == len(out_labels) == 0
+
+
+def test_det_results():
+    rng = np.random.RandomState(0)
+    bbox_results = [[
+        rng.rand(rng.randint(0, 4), 5).astype(np.float32) for _ in range(3)
+    ] for _ in range(5)]
+    results = DetResults.from_bbox_results(bbox_results)
+    assert len(results) == 5 and results.num_classes == 3
+    assert results.img_offsets[-1] == len(results.bboxes)
+    for result, expected in zip(results, bbox_results):
+        for dets, expected_dets in zip(result, expected):
+            np.testing.assert_array_equal(dets, expected_dets)
+    for class_id in range(3):
+        for dets, result in zip(results.get_cls_dets(class_id), bbox_results):
+            np.testing.assert_array_equal(dets, result[class_id])
+
+    # take and concat keep the results of each image
+    taken = results.take([3, 1])
+    assert len(taken) == 2
+    for dets, expected_dets in zip(taken[0], bbox_results[3]):
+        np.testing.assert_array_equal(dets, expected_dets)
+    concat = DetResults.concat([results[:2], results[2:]])
+    np.testing.assert_array_equal(concat.bboxes, results.bboxes)
+    np.testing.assert_array_equal(concat.img_offsets, results.img_offsets)
+    with pytest.raises(IndexError):
+        results.get(5)
+    with pytest.raises(TypeError):
+        DetResults.from_bbox_results([(bbox_results[0], None)])
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        # list results are converted when dumped to a npz file
+        filename = osp.join(tmpdir, 'results.npz')
+        dump_results(bbox_results, filename)
+        loaded = load_results(filename)
+        assert isinstance(loaded, DetResults)
+        assert isinstance(loaded.bboxes, np.memmap)
+        np.testing.assert_array_equal(loaded.scores, results.scores)
+        np.testing.assert_array_equal(loaded.labels, results.labels)
+        assert loaded.num_classes == 3
+        loaded = DetResults.load(filename)
+        np.testing.assert_array_equal(loaded.bboxes, results.bboxes)
+        del loaded
+
+        filename = osp.join(tmpdir, 'empty.npz')
+        DetResults.from_bbox_results([[np.zeros((0, 5))] * 2]).save(filename)
+        loaded = load_results(filename)
+        assert len(loaded) == 1 and len(loaded.bboxes) == 0
+
+
 @pytest.mark.parametrize('mask', [
     torch.ones((28, 28)),
     torch.zeros((28, 28)),
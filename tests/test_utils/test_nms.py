@@ -1,7 +1,10 @@
+import numpy as np
 import pytest
 import torch
+from mmcv.ops import batched_nms, nms, soft_nms
 
-from mmdet.core.post_processing import mask_matrix_nms
+from mmdet.core.post_processing import (fast_nms, mask_matrix_nms,
+                                        multiclass_nms, numpy_nms)
 
 
 def _create_mask(N, h, w):
@@ -73,3 +76,135 @@ def test_nms_input_errors():
                         filter_thr=0.5)
     assert len(score) == 1
     assert score[0] == 1
+
+
+def _random_boxes(num_boxes, rng):
+    xy = rng.random((num_boxes, 2)) * 100
+    wh = rng.random((num_boxes, 2)) * 30 + 1
+    return np.concatenate([xy, xy + wh], axis=1).astype(np.float32)
+
+
+def test_numpy_nms():
+    rng = np.random.default_rng(0)
+    boxes = _random_boxes(300, rng)
+    scores = rng.random(300).astype(np.float32)
+    labels = rng.integers(0, 5, 300)
+
+    for offset in [0, 1]:
+        dets, inds = nms(
+            torch.from_numpy(boxes),
+            torch.from_numpy(scores),
+            0.5,
+            offset=offset)
+        np_dets, np_inds = numpy_nms.nms(boxes, scores, 0.5, offset=offset)
+        assert np.array_equal(np_inds, inds.numpy())
+        assert np.allclose(np_dets, dets.numpy())
+    _, inds = nms(
+        torch.from_numpy(boxes),
+        torch.from_numpy(scores),
+        0.5,
+        score_threshold=0.3,
+        max_num=20)
+    _, np_inds = numpy_nms.nms(
+        boxes, scores, 0.5, score_threshold=0.3, max_num=20)
+    assert np.array_equal(np_inds, inds.numpy())
+    _, np_inds = numpy_nms.nms(boxes[:0], scores[:0], 0.5)
+    assert len(np_inds) == 0
+
+    for method in ['naive', 'linear', 'gaussian']:
+        dets, inds = soft_nms(
+            torch.from_numpy(boxes),
+            torch.from_numpy(scores),
+            min_score=0.05,
+            method=method)
+        np_dets, np_inds = numpy_nms.soft_nms(
+            boxes, scores, min_score=0.05, method=method)
+        assert np.array_equal(np_inds, inds.numpy())
+        assert np.allclose(np_dets, dets.numpy(), atol=1e-6)
+
+    for nms_cfg in [
+            dict(type='nms', iou_threshold=0.5),
+            dict(type='nms', iou_threshold=0.5, class_agnostic=True),
+            dict(type='nms', iou_threshold=0.5, split_thr=100, max_num=50),
+            dict(type='soft_nms', iou_threshold=0.3, min_score=0.05), None
+    ]:
+        dets, keep = batched_nms(
+            torch.from_numpy(boxes), torch.from_numpy(scores),
+            torch.from_numpy(labels), nms_cfg)
+        np_dets, np_keep = numpy_nms.batched_nms(boxes, scores, labels,
+                                                 nms_cfg)
+        assert np.array_equal(np_keep, keep.numpy())
+        assert np.allclose(np_dets, dets.numpy(), atol=1e-6)
+
+
+def test_numpy_multiclass_nms():
+    rng = np.random.default_rng(0)
+    num_classes = 4
+    multi_bboxes = np.concatenate(
+        [_random_boxes(200, rng) for _ in range(num_classes)], axis=1)
+    multi_scores = rng.random((200, num_classes + 1)).astype(np.float32)
+    score_factors = rng.random(200).astype(np.float32)
+    coeffs = rng.random((200, 8)).astype(np.float32)
+    nms_cfg = dict(type='nms', iou_threshold=0.5)
+
+    for bboxes in [multi_bboxes, multi_bboxes[:, :4]]:
+        dets, labels, inds = multiclass_nms(
+            torch.from_numpy(bboxes),
+            torch.from_numpy(multi_scores),
+            0.3,
+            nms_cfg,
+            max_num=100,
+            score_factors=torch.from_numpy(score_factors),
+            return_inds=True)
+        np_dets, np_labels, np_inds = numpy_nms.multiclass_nms(
+            bboxes,
+            multi_scores,
+            0.3,
+            nms_cfg,
+            max_num=100,
+            score_factors=score_factors,
+            return_inds=True)
+        assert np.array_equal(np_inds, inds.numpy())
+        assert np.array_equal(np_labels, labels.numpy())
+        assert np.allclose(np_dets, dets.numpy())
+    np_dets, np_labels = numpy_nms.multiclass_nms(multi_bboxes, multi_scores,
+                                                  1.0, nms_cfg)
+    assert np_dets.shape == (0, 5) and np_labels.shape == (0, )
+
+    results = fast_nms(
+        torch.from_numpy(multi_bboxes[:, :4]), torch.from_numpy(multi_scores),
+        torch.from_numpy(coeffs), 0.3, 0.5, 100, 50)
+    np_results = numpy_nms.fast_nms(multi_bboxes[:, :4], multi_scores, coeffs,
+                                    0.3, 0.5, 100, 50)
+    for result, np_result in zip(results, np_results):
+        assert np.allclose(np_result, result.numpy())
+
+
+def test_numpy_matrix_nms():
+    rng = np.random.default_rng(0)
+    masks = rng.random((100, 28, 28)) > 0.5
+    labels = rng.integers(0, 3, 100)
+    scores = rng.random(100).astype(np.float32)
+    for kwargs in [
+            dict(),
+            dict(filter_thr=0.3, nms_pre=50, max_num=20),
+            dict(kernel='linear', filter_thr=0.2)
+    ]:
+        score, label, mask, keep_ind = mask_matrix_nms(
+            torch.from_numpy(masks), torch.from_numpy(labels),
+            torch.from_numpy(scores), **kwargs)
+        np_score, np_label, np_mask, np_keep_ind = numpy_nms.matrix_nms(
+            masks, labels, scores, **kwargs)
+        assert np.array_equal(np_keep_ind, keep_ind.numpy())
+        assert np.array_equal(np_label, label.numpy())
+        assert np.array_equal(np_mask, mask.numpy())
+        assert np.allclose(np_score, score.numpy(), atol=1e-6)
+
+    # matrix nms of bboxes
+    bboxes = _random_boxes(100, rng)
+    np_score, np_label, np_bbox, np_keep_ind = numpy_nms.matrix_nms(
+        bboxes, labels, scores, filter_thr=0.1)
+    assert np.array_equal(np_bbox, bboxes[np_keep_ind])
+    assert np.all(np_score <= scores[np_keep_ind])
+    with pytest.raises(NotImplementedError):
+        numpy_nms.matrix_nms(bboxes, labels, scores, kernel='None')
@@ -0,0 +1,65 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import logging
+import sys
+from collections import defaultdict
+from os.path import dirname, join
+
+import numpy as np
+import pytest
+
+
+def _import_optimize_anchors():
+    pytest.importorskip('scipy')
+    sys.path.insert(
+        0,
+        join(dirname(dirname(dirname(__file__))), 'tools', 'analysis_tools'))
+    import optimize_anchors
+    return optimize_anchors
+
+
+class _LVIS:
+    """An api like ``lvis.LVIS``, which has ``img_ann_map`` instead of
+    ``imgToAnns``."""
+
+    def __init__(self, anns):
+        self.img_ann_map = defaultdict(list)
+        for ann in anns:
+            self.img_ann_map[ann['image_id']].append(ann)
+
+
+class _LVISDataset:
+
+    def __init__(self):
+        anns = [
+            dict(image_id=1, bbox=[10, 10, 20, 30], area=600, category_id=1),
+            # too small
+            dict(image_id=1, bbox=[0, 0, 0.5, 10], area=5, category_id=1),
+            # not in the categories of the dataset
+            dict(image_id=1, bbox=[5, 5, 10, 10], area=100, category_id=3),
+            # out of the image
+            dict(image_id=2, bbox=[60, 60, 10, 10], area=100, category_id=2),
+            dict(image_id=2, bbox=[0, 0, 40, 20], area=800, category_id=2),
+        ]
+        self.coco = _LVIS(anns)
+        self.cat_ids = [1, 2]
+        self.data_infos = [
+            dict(id=1, width=100, height=80),
+            dict(id=2, width=50, height=50),
+            dict(id=3, width=50, height=50),
+        ]
+
+    def __len__(self):
+        return len(self.data_infos)
+
+
+def test_lvis_whs_and_shapes():
+    optimize_anchors = _import_optimize_anchors()
+    dataset = _LVISDataset()
+    assert not hasattr(dataset.coco, 'imgToAnns')
+    optimizer = optimize_anchors.BaseAnchorOptimizer(
+        dataset, [100, 100], logging.getLogger(__name__), device='cpu')
+    bbox_whs, img_shapes = optimizer.get_whs_and_shapes()
+    assert np.array_equal(bbox_whs, [[20, 30], [40, 20]])
+    assert np.array_equal(img_shapes, [[100, 80], [50, 50]])
+    # resized to the input shape
+    assert np.allclose(optimizer.bbox_whs, [[20, 30], [80, 40]])
@@ -0,0 +1,92 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+import json
+import os.path as osp
+import tempfile
+import time
+from unittest.mock import patch
+
+import pytest
+
+from mmdet.utils import SpanProfiler, get_profiler, profile_span, profiled
+from mmdet.utils.profiling import profile_time
+
+
+@profiled('decorated')
+def _decorated(x):
+    return x + 1
+
+
+def test_span_profiler():
+    # spans are not recorded without an active profiler
+    assert get_profiler() is None
+    with profile_span('span'):
+        pass
+    assert _decorated(1) == 2
+
+    with SpanProfiler() as profiler:
+        assert get_profiler() is profiler
+        for _ in range(3):
+            with profile_span('outer'):
+                with profile_span('inner'):
+                    time.sleep(0.002)
+        assert _decorated(1) == 2
+        with pytest.raises(ValueError):
+            with profile_span('error'):
+                raise ValueError
+    assert get_profiler() is None
+    with profile_span('outer'):
+        pass
+
+    summary = profiler.summary()
+    assert list(summary) == ['inner', 'outer', 'decorated', 'error']
+    assert summary['outer']['count'] == 3
+    assert summary['inner']['min'] >= 2
+    assert summary['outer']['total'] >= summary['inner']['total']
+    assert sum(summary['inner']['hist']) == 3
+    for stats in summary.values():
+        assert stats['min'] <= stats['p50'] <= stats['p99'] <= stats['max']
+    table = profiler.format_summary()
+    assert table.splitlines()[2].startswith('outer')
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        trace_file = osp.join(tmpdir, 'trace.json')
+        profiler.export_chrome_trace(trace_file)
+        with open(trace_file) as f:
+            events = json.load(f)['traceEvents']
+    assert len(events) == 8
+    assert {event['ph'] for event in events} == {'X'}
+    inner, outer = events[:2]
+    assert inner['name'] == 'inner' and outer['name'] == 'outer'
+    assert outer['ts'] <= inner['ts']
+    assert inner['ts'] + inner['dur'] <= outer['ts'] + outer['dur']
+
+    profiler.reset()
+    assert profiler.summary() == {}
+
+    # the spans after max_events are only aggregated
+    with SpanProfiler(max_events=2) as profiler:
+        for _ in range(3):
+            with profile_span('span'):
+                pass
+    assert len(profiler.events) == 2
+    assert profiler.summary()['span']['count'] == 3
+
+    # the spans in the DataLoader workers are not recorded
+    with SpanProfiler() as profiler, patch(
+            'mmdet.utils.profiling.get_worker_info', return_value=object()):
+        assert get_profiler() is None
+        with profile_span('span'):
+            pass
+        assert _decorated(1) == 2
+        with profile_time('trace', 'name'):
+            pass
+    assert profiler.summary() == {}
+
+
+def test_profile_time():
+    with SpanProfiler() as profiler:
+        with profile_time('trace', 'name'):
+            pass
+        with profile_time('trace', 'disabled', enabled=False):
+            pass
+    assert list(profiler.summary()) == ['trace.name']
@@ -0,0 +1,360 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Benchmark the inference of a detector on CPU.
+
+The images are inferred with :func:`mmdet.apis.inference_detector`, with the
+PyTorch model and optionally with an ONNX model run by ONNXRuntime, for
+every combination of the given batch sizes and thread counts. The latency of
+each call is split into the stages below, and the percentiles of the
+latency and the stages are dumped to a json file.
+
+- ``decode``: reading and decoding the image files.
+- ``pipeline``: the rest of the test pipeline and collating the batch.
+- ``forward``: the model, excluding NMS and ``bbox2result``.
+- ``nms``: NMS in the heads of the PyTorch model. It is part of the graph
+  of ONNX models, so it is included in ``forward`` for ONNXRuntime.
+- ``bbox2result``: converting the detections to per-class arrays.
+
+Example:
+    Benchmark YOLOX with 1 and 4 threads and batch sizes 1 and 4::
+
+        python tools/analysis_tools/benchmark_cpu.py ${CONFIG} \
+        --checkpoint ${CHECKPOINT} --onnx-file ${ONNX_FILE} \
+        --batch-sizes 1 4 --num-threads 1 4 --out benchmark.json
+"""
+import argparse
+import contextlib
+import copy
+import functools
+import os
+import os.path as osp
+import platform
+import sys
+import time
+from collections import defaultdict
+
+import mmcv
+import numpy as np
+import torch
+from mmcv import Config, DictAction
+
+from mmdet.apis import inference_detector, init_detector
+from mmdet.datasets import DATASETS, build_dataset
+from mmdet.datasets.pipelines import LoadImageFromFile, LoadImageFromWebcam
+from mmdet.utils import replace_cfg_vals, update_data_root
+
+STAGES = ('decode', 'pipeline', 'forward', 'nms', 'bbox2result')
+# functions timed as a stage wherever they are imported in mmdet modules
+STAGE_FUNCTIONS = dict(
+    multiclass_nms='nms',
+    batched_nms='nms',
+    nms='nms',
+    fast_nms='nms',
+    bbox2result='bbox2result')
+IMG_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='MMDet benchmark a model on CPU')
+    parser.add_argument('config', help='test config file path')
+    parser.add_argument(
+        '--checkpoint',
+        default=None,
+        help='checkpoint file, the model is randomly initialized if not '
+        'specified')
+    parser.add_argument(
+        '--onnx-file',
+        default=None,
+        help='ONNX model exported by tools/deployment/pytorch2onnx.py, '
+        'benchmarked with ONNXRuntime if specified')
+    parser.add_argument(
+        '--backends',
+        nargs='+',
+        choices=['pytorch', 'onnxruntime'],
+        default=None,
+        help='backends to benchmark, defaults to pytorch and onnxruntime if '
+        '--onnx-file is specified')
+    parser.add_argument(
+        '--img-dir',
+        default=None,
+        help='directory of the images, defaults to the images of the test '
+        'dataset in the config')
+    parser.add_argument(
+        '--num-images',
+        type=int,
+        default=50,
+        help='number of different images to infer')
+    parser.add_argument(
+        '--batch-sizes',
+        type=int,
+        nargs='+',
+        default=[1],
+        help='numbers of images in each call of inference_detector')
+    parser.add_argument(
+        '--num-threads',
+        type=int,
+        nargs='+',
+        default=None,
+        help='numbers of CPU threads, defaults to the setting of PyTorch')
+    parser.add_argument(
+        '--warmup', type=int, default=5, help='number of warmup calls')
+    parser.add_argument(
+        '--iters', type=int, default=50, help='number of measured calls')
+    parser.add_argument(
+        '--out', default=None, help='json file to dump the results')
+    parser.add_argument(
+        '--cfg-options',
+        nargs='+',
+        action=DictAction,
+        help='override some settings in the used config, the key-value pair '
+        'in xxx=yyy format will be merged into config file. If the value to '
+        'be overwritten is a list, it should be like key="[a,b]" or key=a,b '
+        'It also allows nested list/tuple values, e.g. key="[(a,b),(c,d)]" '
+        'Note that the quotation marks are necessary and that no white space '
+        'is allowed.')
+    return parser.parse_args()
+
+
+class StageTimer:
+    """Accumulate the time spent in functions by stage.
+
+    The functions are replaced by timed wrappers within :meth:`patch`. Nested
+    calls of the same stage, e.g. ``batched_nms`` called by
+    ``multiclass_nms``, are only counted once.
+    """
+
+    def __init__(self):
+        self.times = defaultdict(float)
+        self._depths = defaultdict(int)
+
+    def reset(self):
+        self.times.clear()
+
+    def wrap(self, func, stage):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if self._depths[stage]:
+                return func(*args, **kwargs)
+            self._depths[stage] += 1
+            tic = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.times[stage] += time.perf_counter() - tic
+                self._depths[stage] -= 1
+
+        return wrapper
+
+    @contextlib.contextmanager
+    def patch(self, targets):
+        """Time the functions of ``targets`` within the context.
+
+        Args:
+            targets (list[tuple]): (owner, attribute name, stage) of each
+                function to time.
+        """
+        originals = []
+        try:
+            for owner, name, stage in targets:
+                func = getattr(owner, name)
+                originals.append((owner, name, func))
+                setattr(owner, name, self.wrap(func, stage))
+            yield self
+        finally:
+            for owner, name, func in reversed(originals):
+                setattr(owner, name, func)
+
+
+def get_stage_targets():
+    """Get the functions to time, see :class:`StageTimer`."""
+    targets = [(LoadImageFromFile, '__call__', 'decode'),
+               (LoadImageFromWebcam, '__call__', 'decode')]
+    for module_name, module in list(sys.modules.items()):
+        if module is None or not module_name.startswith('mmdet.'):
+            continue
+        for name, stage in STAGE_FUNCTIONS.items():
+            func = module.__dict__.get(name)
+            if callable(func) and not isinstance(func, type):
+                targets.append((module, name, stage))
+    return targets
+
+
+def get_img_files(cfg, img_dir, num_images):
+    if img_dir is not None:
+        img_files = [
+            osp.join(img_dir, filename) for filename in sorted(
+                mmcv.scandir(img_dir, IMG_EXTENSIONS, recursive=True))
+        ]
+    else:
+        test_cfg = cfg.data.test
+        if isinstance(test_cfg, list):
+            test_cfg = test_cfg[0]
+        test_cfg.test_mode = True
+        dataset = build_dataset(test_cfg)
+        img_files = [
+            osp.join(dataset.img_prefix, info['filename'])
+            if dataset.img_prefix is not None else info['filename']
+            for info in dataset.data_infos[:num_images]
+        ]
+    assert img_files, 'No image is found.'
+    return img_files[:num_images]
+
+
+def summarize(values):
+    """Mean and percentiles of times in seconds, in milliseconds."""
+    values = np.array(values) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return dict(
+        mean=float(values.mean()),
+        p50=float(p50),
+        p95=float(p95),
+        p99=float(p99))
+
+
+def benchmark(model, img_files, batch_size, warmup, iters):
+    """Benchmark ``inference_detector`` with a model.
+
+    Returns:
+        dict: The percentiles of the latency and of each stage in
+            milliseconds, and the throughput in images per second.
+    """
+    timer = StageTimer()
+    latencies = []
+    stage_times = defaultdict(list)
+    with timer.patch(get_stage_targets()):
+        for i in range(warmup + iters):
+            start = i * batch_size
+            imgs = [
+                img_files[(start + j) % len(img_files)]
+                for j in range(batch_size)
+            ]
+            timer.reset()
+            tic = time.perf_counter()
+            inference_detector(model, imgs)
+            latency = time.perf_counter() - tic
+            if i < warmup:
+                continue
+
+            timings = model.inference_timings
+            times = dict(timer.times)
+            latencies.append(latency)
+            stage_times['decode'].append(times.get('decode', 0))
+            stage_times['pipeline'].append(timings['build_pipeline'] +
+                                           timings['pipeline'] +
+                                           timings['collate'] -
+                                           times.get('decode', 0))
+            stage_times['forward'].append(timings['forward'] -
+                                          times.get('nms', 0) -
+                                          times.get('bbox2result', 0))
+            stage_times['nms'].append(times.get('nms', 0))
+            stage_times['bbox2result'].append(times.get('bbox2result', 0))
+
+    return dict(
+        latency_ms=summarize(latencies),
+        throughput=batch_size * len(latencies) / sum(latencies),
+        stages_ms={stage: summarize(stage_times[stage])
+                   for stage in STAGES})
+
+
+def build_model(backend, cfg, checkpoint, onnx_file, num_threads):
+    if backend == 'pytorch':
+        return init_detector(copy.deepcopy(cfg), checkpoint, device='cpu')
+
+    from mmdet.core.export.model_wrappers import ONNXRuntimeDetector
+    test_cfg = cfg.data.test
+    if isinstance(test_cfg, list):
+        test_cfg = test_cfg[0]
+    class_names = DATASETS.get(test_cfg.type).get_classes(
+        test_cfg.get('classes', None))
+    model = ONNXRuntimeDetector(
+        onnx_file, class_names, device_id=0, num_threads=num_threads)
+    # inference_detector builds the test pipeline from the config
+    model.cfg = cfg
+    return model
+
+
+def get_env_info():
+    env_info = dict(
+        python=platform.python_version(),
+        platform=platform.platform(),
+        processor=platform.processor(),
+        cpu_count=os.cpu_count(),
+        torch=torch.__version__,
+        mmcv=mmcv.__version__)
+    try:
+        import onnxruntime
+        env_info['onnxruntime'] = onnxruntime.__version__
+    except ImportError:
+        pass
+    return env_info
+
+
+def main():
+    args = parse_args()
+
+    cfg = Config.fromfile(args.config)
+
+    # replace the ${key} with the value of cfg.key
+    cfg = replace_cfg_vals(cfg)
+
+    # update data root according to MMDET_DATASETS
+    update_data_root(cfg)
+
+    if args.cfg_options is not None:
+        cfg.merge_from_dict(args.cfg_options)
+
+    backends = args.backends
+    if backends is None:
+        backends = ['pytorch']
+        if args.onnx_file is not None:
+            backends.append('onnxruntime')
+    if 'onnxruntime' in backends and args.onnx_file is None:
+        raise ValueError('--onnx-file is required to benchmark onnxruntime')
+    num_threads_list = args.num_threads or [torch.get_num_threads()]
+
+    img_files = get_img_files(cfg, args.img_dir, args.num_images)
+    results = []
+    for backend in backends:
+        for num_threads in num_threads_list:
+            torch.set_num_threads(num_threads)
+            model = build_model(backend, cfg, args.checkpoint, args.onnx_file,
+                                num_threads)
+            for batch_size in args.batch_sizes:
+                result = dict(
+                    backend=backend,
+                    batch_size=batch_size,
+                    num_threads=num_threads)
+                result.update(
+                    benchmark(model, img_files, batch_size, args.warmup,
+                              args.iters))
+                results.append(result)
+                stages = ', '.join(
+                    f'{stage} {times["p50"]:.1f}'
+                    for stage, times in result['stages_ms'].items())
+                print(
+                    f'{backend} batch size {batch_size}, '
+                    f'{num_threads} threads: latency p50 '
+                    f'{result["latency_ms"]["p50"]:.1f} ms, p95 '
+                    f'{result["latency_ms"]["p95"]:.1f} ms, p99 '
+                    f'{result["latency_ms"]["p99"]:.1f} ms, throughput '
+                    f'{result["throughput"]:.2f} img / s ({stages} ms)',
+                    flush=True)
+
+    if args.out is not None:
+        mmcv.dump(
+            dict(
+                config=args.config,
+                checkpoint=args.checkpoint,
+                onnx_file=args.onnx_file,
+                num_images=len(img_files),
+                warmup=args.warmup,
+                iters=args.iters,
+                env=get_env_info(),
+                results=results),
+            args.out,
+            indent=2)
+
+
+if __name__ == '__main__':
+    main()
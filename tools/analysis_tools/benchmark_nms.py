@@ -0,0 +1,134 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Benchmark the NumPy NMS of ``mmdet.core.post_processing.numpy_nms``
+against the mmcv ops.
+
+Random detections are generated for each number of boxes, the NMS ops are
+timed on them and the kept indices are compared to the ones of mmcv.
+
+Example:
+    python tools/analysis_tools/benchmark_nms.py --num-boxes 1000 10000 \
+    --num-classes 80 --out nms_benchmark.json
+"""
+import argparse
+import time
+from functools import partial
+
+import mmcv
+import numpy as np
+import torch
+from mmcv.ops import batched_nms, nms, soft_nms
+
+from mmdet.core.post_processing import multiclass_nms, numpy_nms
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='MMDet benchmark the NumPy NMS against mmcv')
+    parser.add_argument(
+        '--num-boxes',
+        type=int,
+        nargs='+',
+        default=[100, 1000, 10000],
+        help='numbers of boxes before NMS')
+    parser.add_argument(
+        '--num-classes', type=int, default=80, help='number of classes')
+    parser.add_argument(
+        '--iou-thr', type=float, default=0.5, help='IoU threshold of NMS')
+    parser.add_argument(
+        '--score-thr',
+        type=float,
+        default=0.05,
+        help='score threshold of multiclass NMS')
+    parser.add_argument(
+        '--repeat', type=int, default=20, help='number of timed runs')
+    parser.add_argument(
+        '--seed', type=int, default=0, help='seed of the random boxes')
+    parser.add_argument(
+        '--out', default=None, help='json file to dump the results')
+    return parser.parse_args()
+
+
+def random_detections(num_boxes, num_classes, rng):
+    """Random boxes in a 1000x1000 image, clustered like detections."""
+    centers = rng.random((max(num_boxes // 10, 1), 2)) * 1000
+    xy = centers[rng.integers(0, len(centers), num_boxes)] + rng.normal(
+        0, 10, (num_boxes, 2))
+    wh = rng.random((num_boxes, 2)) * 190 + 10
+    boxes = np.concatenate([xy - wh / 2, xy + wh / 2], axis=1)
+    scores = rng.random((num_boxes, num_classes + 1))
+    return boxes.astype(np.float32), scores.astype(np.float32)
+
+
+def timeit(func, repeat):
+    """Median run time of ``func`` in milliseconds and its result."""
+    result = func()
+    times = []
+    for _ in range(repeat):
+        tic = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - tic)
+    return float(np.median(times)) * 1000, result
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    nms_cfg = dict(type='nms', iou_threshold=args.iou_thr)
+
+    results = []
+    for num_boxes in args.num_boxes:
+        boxes, multi_scores = random_detections(num_boxes, args.num_classes,
+                                                rng)
+        scores = multi_scores[:, 0]
+        labels = multi_scores[:, :-1].argmax(1)
+        # the kept indices are the last outputs of all the ops
+        cases = [
+            ('nms', nms, numpy_nms.nms, (boxes, scores, args.iou_thr), {}),
+            ('soft_nms', soft_nms, numpy_nms.soft_nms, (boxes, scores), {}),
+            ('batched_nms', batched_nms, numpy_nms.batched_nms,
+             (boxes, scores, labels, nms_cfg), {}),
+            ('multiclass_nms', multiclass_nms, numpy_nms.multiclass_nms,
+             (boxes, multi_scores, args.score_thr, nms_cfg),
+             dict(return_inds=True)),
+        ]
+        for op, mmcv_op, numpy_op, op_args, op_kwargs in cases:
+            tensor_args = [
+                torch.from_numpy(arg) if isinstance(arg, np.ndarray) else arg
+                for arg in op_args
+            ]
+            mmcv_time, mmcv_results = timeit(
+                partial(mmcv_op, *tensor_args, **op_kwargs), args.repeat)
+            numpy_time, numpy_results = timeit(
+                partial(numpy_op, *op_args, **op_kwargs), args.repeat)
+            mmcv_inds, numpy_inds = mmcv_results[-1].numpy(), numpy_results[-1]
+            # the order of boxes with equal scores may differ
+            matched = len(mmcv_inds) == len(numpy_inds) and set(
+                mmcv_inds.tolist()) == set(numpy_inds.tolist())
+            results.append(
+                dict(
+                    op=op,
+                    num_boxes=num_boxes,
+                    num_kept=len(numpy_inds),
+                    mmcv_ms=mmcv_time,
+                    numpy_ms=numpy_time,
+                    matched=matched))
+            print(
+                f'{op} of {num_boxes} boxes: mmcv {mmcv_time:.2f} ms, '
+                f'numpy {numpy_time:.2f} ms, {len(numpy_inds)} kept, '
+                f'{"matched" if matched else "MISMATCHED"}',
+                flush=True)
+
+    if args.out is not None:
+        mmcv.dump(
+            dict(
+                num_classes=args.num_classes,
+                iou_thr=args.iou_thr,
+                score_thr=args.score_thr,
+                repeat=args.repeat,
+                results=results),
+            args.out,
+            indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,12 @@
 # Copyright (c) OpenMMLab. All rights reserved.
-import copy
 import os
 from argparse import ArgumentParser
+from collections import defaultdict
 from multiprocessing import Pool
 
 import matplotlib.pyplot as plt
 import numpy as np
+import pycocotools.mask as maskUtils
 from pycocotools.coco import COCO
 from pycocotools.cocoeval import COCOeval
 
@@ -171,64 +172,124 @@ def make_gt_area_histogram_plot(cocoEval, outDir):
     plt.close(fig)
 
 
-def analyze_individual_category(k,
-                                cocoDt,
-                                cocoGt,
-                                catId,
-                                iou_type,
-                                areas=None):
+# read-only state shared by the worker processes of `analyze_results`, it is
+# inherited by forked workers instead of being copied for every category
+_shared_state = {}
+
+
+def _init_shared_state(state):
+    _shared_state.clear()
+    _shared_state.update(state)
+
+
+def _index_by_category(coco):
+    """Group the annotations of a COCO api by category and image."""
+    index = defaultdict(dict)
+    for ann in coco.dataset['annotations']:
+        index[ann['category_id']].setdefault(ann['image_id'], []).append(ann)
+    return dict(index)
+
+
+class CategoryCOCOeval(COCOeval):
+    """COCOeval of a single category on prepared annotations and IoUs.
+
+    The ground truths, detections and IoU matrices of each image are given
+    instead of being collected from COCO apis, so different views of the
+    same annotations can be evaluated without copying the whole dataset.
+    """
+
+    def __init__(self, gts, dts, ious, catId, imgIds, iou_type, areas=None):
+        super().__init__(iouType=iou_type)
+        self._prepared = (gts, dts)
+        self._ious = ious
+        self.params.imgIds = imgIds
+        self.params.catIds = [catId]
+        self.params.maxDets = [100]
+        self.params.iouThrs = [0.1]
+        self.params.useCats = 1
+        if areas:
+            self.params.areaRng = [[0**2, areas[2]], [0**2, areas[0]],
+                                   [areas[0], areas[1]], [areas[1], areas[2]]]
+
+    def _prepare(self):
+        catId = self.params.catIds[0]
+        self._gts = defaultdict(list)
+        self._dts = defaultdict(list)
+        gts, dts = self._prepared
+        for imgId, img_gts in gts.items():
+            self._gts[imgId, catId] = img_gts
+        for imgId, img_dts in dts.items():
+            self._dts[imgId, catId] = img_dts
+        self.evalImgs = defaultdict(list)
+        self.eval = {}
+
+    def computeIoU(self, imgId, catId):
+        return self._ious.get(imgId, [])
+
+
+def analyze_individual_category(k, catId):
+    cocoGt = _shared_state['cocoGt']
+    cocoDt = _shared_state['cocoDt']
+    iou_type = _shared_state['iou_type']
+    areas = _shared_state['areas']
     nm = cocoGt.loadCats(catId)[0]
     print(f'--------------analyzing {k + 1}-{nm["name"]}---------------')
     ps_ = {}
-    dt = copy.deepcopy(cocoDt)
-    nm = cocoGt.loadCats(catId)[0]
     imgIds = cocoGt.getImgIds()
-    dt_anns = dt.dataset['annotations']
-    select_dt_anns = []
-    for ann in dt_anns:
-        if ann['category_id'] == catId:
-            select_dt_anns.append(ann)
-    dt.dataset['annotations'] = select_dt_anns
-    dt.createIndex()
+    child_catIds = set(cocoGt.getCatIds(supNms=[nm['supercategory']]))
+    cat_dts = _shared_state['dt_index'].get(catId, {})
+    # The ground truths of other categories are evaluated as crowd regions
+    # of this category, which are ignored. The ground truths of all the
+    # categories are collected once per image together with their IoUs
+    # with the detections, the two evaluations below select a subset.
+    gts_all, gts_super, ious_all, ious_super = {}, {}, {}, {}
+    for imgId in imgIds:
+        img_anns = cocoGt.imgToAnns.get(imgId, [])
+        if not img_anns:
+            continue
+        gts, in_super = [], []
+        for ann in img_anns:
+            iscrowd = 1 if ann['category_id'] != catId else ann.get(
+                'iscrowd', 0)
+            gts.append(
+                dict(
+                    id=ann['id'],
+                    area=ann['area'],
+                    iscrowd=iscrowd,
+                    ignore=iscrowd))
+            in_super.append(ann['category_id'] in child_catIds)
+        in_super = np.array(in_super, dtype=bool)
+        gts_all[imgId] = gts
+        gts_super[imgId] = [gt for gt, keep in zip(gts, in_super) if keep]
+
+        dts = cat_dts.get(imgId, [])
+        if not dts:
+            continue
+        inds = np.argsort([-dt['score'] for dt in dts], kind='mergesort')
+        dts = [dts[i] for i in inds[:100]]
+        if iou_type == 'segm':
+            g = [cocoGt.annToRLE(ann) for ann in img_anns]
+            d = [cocoDt.annToRLE(dt) for dt in dts]
+        else:
+            g = [ann['bbox'] for ann in img_anns]
+            d = [dt['bbox'] for dt in dts]
+        ious = maskUtils.iou(d, g, [gt['iscrowd'] for gt in gts])
+        ious_all[imgId] = ious
+        if in_super.any():
+            ious_super[imgId] = ious[:, in_super]
+
     # compute precision but ignore superclass confusion
-    gt = copy.deepcopy(cocoGt)
-    child_catIds = gt.getCatIds(supNms=[nm['supercategory']])
-    for idx, ann in enumerate(gt.dataset['annotations']):
-        if ann['category_id'] in child_catIds and ann['category_id'] != catId:
-            gt.dataset['annotations'][idx]['ignore'] = 1
-            gt.dataset['annotations'][idx]['iscrowd'] = 1
-            gt.dataset['annotations'][idx]['category_id'] = catId
-    cocoEval = COCOeval(gt, copy.deepcopy(dt), iou_type)
-    cocoEval.params.imgIds = imgIds
-    cocoEval.params.maxDets = [100]
-    cocoEval.params.iouThrs = [0.1]
-    cocoEval.params.useCats = 1
-    if areas:
-        cocoEval.params.areaRng = [[0**2, areas[2]], [0**2, areas[0]],
-                                   [areas[0], areas[1]], [areas[1], areas[2]]]
+    cocoEval = CategoryCOCOeval(gts_super, cat_dts, ious_super, catId, imgIds,
+                                iou_type, areas)
     cocoEval.evaluate()
     cocoEval.accumulate()
-    ps_supercategory = cocoEval.eval['precision'][0, :, k, :, :]
-    ps_['ps_supercategory'] = ps_supercategory
+    ps_['ps_supercategory'] = cocoEval.eval['precision'][0, :, 0, :, :]
     # compute precision but ignore any class confusion
-    gt = copy.deepcopy(cocoGt)
-    for idx, ann in enumerate(gt.dataset['annotations']):
-        if ann['category_id'] != catId:
-            gt.dataset['annotations'][idx]['ignore'] = 1
-            gt.dataset['annotations'][idx]['iscrowd'] = 1
-            gt.dataset['annotations'][idx]['category_id'] = catId
-    cocoEval = COCOeval(gt, copy.deepcopy(dt), iou_type)
-    cocoEval.params.imgIds = imgIds
-    cocoEval.params.maxDets = [100]
-    cocoEval.params.iouThrs = [0.1]
-    cocoEval.params.useCats = 1
-    if areas:
-        cocoEval.params.areaRng = [[0**2, areas[2]], [0**2, areas[0]],
-                                   [areas[0], areas[1]], [areas[1], areas[2]]]
+    cocoEval = CategoryCOCOeval(gts_all, cat_dts, ious_all, catId, imgIds,
+                                iou_type, areas)
     cocoEval.evaluate()
     cocoEval.accumulate()
-    ps_allcategory = cocoEval.eval['precision'][0, :, k, :, :]
-    ps_['ps_allcategory'] = ps_allcategory
+    ps_['ps_allcategory'] = cocoEval.eval['precision'][0, :, 0, :, :]
     return k, ps_
 
 
@@ -237,7 +298,8 @@ def analyze_results(res_file,
                     res_types,
                     out_dir,
                     extraplots=None,
-                    areas=None):
+                    areas=None,
+                    nproc=None):
     for res_type in res_types:
         assert res_type in ['bbox', 'segm']
     if areas:
@@ -251,6 +313,7 @@ def analyze_results(res_file,
 
     cocoGt = COCO(ann_file)
     cocoDt = cocoGt.loadRes(res_file)
+    dt_index = _index_by_category(cocoDt)
     imgIds = cocoGt.getImgIds()
     for res_type in res_types:
         res_out_dir = out_dir + '/' + res_type + '/'
@@ -259,8 +322,7 @@ def analyze_results(res_file,
             print(f'-------------create {res_out_dir}-----------------')
             os.makedirs(res_directory)
         iou_type = res_type
-        cocoEval = COCOeval(
-            copy.deepcopy(cocoGt), copy.deepcopy(cocoDt), iou_type)
+        cocoEval = COCOeval(cocoGt, cocoDt, iou_type)
         cocoEval.params.imgIds = imgIds
         cocoEval.params.iouThrs = [0.75, 0.5, 0.1]
         cocoEval.params.maxDets = [100]
@@ -272,12 +334,26 @@ def analyze_results(res_file,
         cocoEval.accumulate()
         ps = cocoEval.eval['precision']
         ps = np.vstack([ps, np.zeros((4, *ps.shape[1:]))])
-        catIds = cocoGt.getCatIds()
+        # the precision of cocoEval is in the order of the sorted catIds
+        catIds = sorted(cocoGt.getCatIds())
         recThrs = cocoEval.params.recThrs
-        with Pool(processes=48) as pool:
-            args = [(k, cocoDt, cocoGt, catId, iou_type, areas)
-                    for k, catId in enumerate(catIds)]
-            analyze_results = pool.starmap(analyze_individual_category, args)
+        state = dict(
+            cocoGt=cocoGt,
+            cocoDt=cocoDt,
+            dt_index=dt_index,
+            iou_type=iou_type,
+            areas=areas)
+        args = list(enumerate(catIds))
+        num_workers = min(nproc or os.cpu_count() or 1, len(catIds))
+        if num_workers > 1:
+            with Pool(num_workers, _init_shared_state, (state, )) as pool:
+                analyze_results = pool.starmap(analyze_individual_category,
+                                               args)
+        else:
+            _init_shared_state(state)
+            analyze_results = [
+                analyze_individual_category(*arg) for arg in args
+            ]
         for k, catId in enumerate(catIds):
             nm = cocoGt.loadCats(catId)[0]
             print(f'--------------saving {k + 1}-{nm["name"]}---------------')
@@ -325,6 +401,12 @@ def main():
         nargs='+',
         default=[1024, 9216, 10000000000],
         help='area regions')
+    parser.add_argument(
+        '--nproc',
+        type=int,
+        default=None,
+        help='number of processes to analyze the categories, defaults to '
+        'the number of CPUs')
     args = parser.parse_args()
     analyze_results(
         args.result,
@@ -332,7 +414,8 @@ def main():
         args.types,
         out_dir=args.out_dir,
         extraplots=args.extraplots,
-        areas=args.areas)
+        areas=args.areas,
+        nproc=args.nproc)
 
 
 if __name__ == '__main__':
@@ -2,13 +2,13 @@ import argparse
 import os
 
 import matplotlib.pyplot as plt
-import mmcv
 import numpy as np
 from matplotlib.ticker import MultipleLocator
 from mmcv import Config, DictAction
-from mmcv.ops import nms
 
-from mmdet.core.evaluation.bbox_overlaps import bbox_overlaps
+from mmdet.core import DetResults, load_results
+from mmdet.core.evaluation import (confusion_matrix_per_img,
+                                   eval_confusion_matrix)
 from mmdet.datasets import build_dataset
 from mmdet.utils import replace_cfg_vals, update_data_root
 
@@ -18,7 +18,8 @@ def parse_args():
         description='Generate confusion matrix from detection results')
     parser.add_argument('config', help='test config file path')
     parser.add_argument(
-        'prediction_path', help='prediction path where test .pkl result')
+        'prediction_path',
+        help='prediction path where test .pkl or .npz result')
     parser.add_argument(
         'save_dir', help='directory where confusion matrix will be saved')
     parser.add_argument(
@@ -43,6 +44,11 @@ def parse_args():
         default=None,
         help='nms IoU threshold, only applied when users want to change the'
         'nms IoU threshold.')
+    parser.add_argument(
+        '--nproc',
+        type=int,
+        default=1,
+        help='number of processes used to process the images')
     parser.add_argument(
         '--cfg-options',
         nargs='+',
@@ -61,12 +67,14 @@ def calculate_confusion_matrix(dataset,
                                results,
                                score_thr=0,
                                nms_iou_thr=None,
-                               tp_iou_thr=0.5):
+                               tp_iou_thr=0.5,
+                               nproc=1):
     """Calculate the confusion matrix.
 
     Args:
         dataset (Dataset): Test or val dataset.
-        results (list[ndarray]): A list of detection results in each image.
+        results (list[list] | :obj:`DetResults`): Detection results of each
+            image.
         score_thr (float|optional): Score threshold to filter bboxes.
             Default: 0.
         nms_iou_thr (float|optional): nms IoU threshold, the detection results
@@ -74,22 +82,17 @@ def calculate_confusion_matrix(dataset,
             change the nms IoU threshold. Default: None.
         tp_iou_thr (float|optional): IoU threshold to be considered as matched.
             Default: 0.5.
+        nproc (int): Processes used to process the images. Default: 1.
     """
-    num_classes = len(dataset.CLASSES)
-    confusion_matrix = np.zeros(shape=[num_classes + 1, num_classes + 1])
     assert len(dataset) == len(results)
-    prog_bar = mmcv.ProgressBar(len(results))
-    for idx, per_img_res in enumerate(results):
-        if isinstance(per_img_res, tuple):
-            res_bboxes, _ = per_img_res
-        else:
-            res_bboxes = per_img_res
-        ann = dataset.get_ann_info(idx)
-        gt_bboxes = ann['bboxes']
-        labels = ann['labels']
-        analyze_per_img_dets(confusion_matrix, gt_bboxes, labels, res_bboxes,
-                             score_thr, tp_iou_thr, nms_iou_thr)
-        prog_bar.update()
+    annotations = [dataset.get_ann_info(i) for i in range(len(dataset))]
+    confusion_matrix = eval_confusion_matrix(
+        results,
+        annotations,
+        score_thr=score_thr,
+        tp_iou_thr=tp_iou_thr,
+        nms_iou_thr=nms_iou_thr,
+        nproc=nproc)
     return confusion_matrix
 
 
@@ -117,30 +120,10 @@ def analyze_per_img_dets(confusion_matrix,
             have done nms in the detector, only applied when users want to
             change the nms IoU threshold. Default: None.
     """
-    true_positives = np.zeros_like(gt_labels)
-    for det_label, det_bboxes in enumerate(result):
-        if nms_iou_thr:
-            det_bboxes, _ = nms(
-                det_bboxes[:, :4],
-                det_bboxes[:, -1],
-                nms_iou_thr,
-                score_threshold=score_thr)
-        ious = bbox_overlaps(det_bboxes[:, :4], gt_bboxes)
-        for i, det_bbox in enumerate(det_bboxes):
-            score = det_bbox[4]
-            det_match = 0
-            if score >= score_thr:
-                for j, gt_label in enumerate(gt_labels):
-                    if ious[i, j] >= tp_iou_thr:
-                        det_match += 1
-                        if gt_label == det_label:
-                            true_positives[j] += 1  # TP
-                        confusion_matrix[gt_label, det_label] += 1
-                if det_match == 0:  # BG FP
-                    confusion_matrix[-1, det_label] += 1
-    for num_tp, gt_label in zip(true_positives, gt_labels):
-        if num_tp == 0:  # FN
-            confusion_matrix[gt_label, -1] += 1
+    confusion_matrix += confusion_matrix_per_img(result, gt_bboxes, gt_labels,
+                                                 confusion_matrix.shape[0] - 1,
+                                                 score_thr, tp_iou_thr,
+                                                 nms_iou_thr)
 
 
 def plot_confusion_matrix(confusion_matrix,
@@ -241,9 +224,10 @@ def main():
     if args.cfg_options is not None:
         cfg.merge_from_dict(args.cfg_options)
 
-    results = mmcv.load(args.prediction_path)
-    assert isinstance(results, list)
-    if isinstance(results[0], list):
+    results = load_results(args.prediction_path)
+    if isinstance(results, DetResults):
+        pass
+    elif isinstance(results[0], list):
         pass
     elif isinstance(results[0], tuple):
         results = [result[0] for result in results]
@@ -260,7 +244,7 @@ def main():
     confusion_matrix = calculate_confusion_matrix(dataset, results,
                                                   args.score_thr,
                                                   args.nms_iou_thr,
-                                                  args.tp_iou_thr)
+                                                  args.tp_iou_thr, args.nproc)
     plot_confusion_matrix(
         confusion_matrix,
         dataset.CLASSES + ('background', ),
@@ -1,9 +1,9 @@
 # Copyright (c) OpenMMLab. All rights reserved.
 import argparse
 
-import mmcv
 from mmcv import Config, DictAction
 
+from mmdet.core import load_results
 from mmdet.datasets import build_dataset
 from mmdet.utils import replace_cfg_vals, update_data_root
 
@@ -12,7 +12,8 @@ def parse_args():
     parser = argparse.ArgumentParser(description='Evaluate metric of the '
                                      'results saved in pkl format')
     parser.add_argument('config', help='Config of the model')
-    parser.add_argument('pkl_results', help='Results in pickle format')
+    parser.add_argument(
+        'pkl_results', help='Results in pickle format or npz format')
     parser.add_argument(
         '--format-only',
         action='store_true',
@@ -67,7 +68,7 @@ def main():
     cfg.data.test.test_mode = True
 
     dataset = build_dataset(cfg.data.test)
-    outputs = mmcv.load(args.pkl_results)
+    outputs = load_results(args.pkl_results)
 
     kwargs = {} if args.eval_options is None else args.eval_options
     if args.format_only:
@@ -77,7 +78,7 @@ def main():
         # hard-code way to remove EvalHook args
         for key in [
                 'interval', 'tmpdir', 'start', 'gpu_collect', 'save_best',
-                'rule'
+                'rule', 'collect_backend', 'flat_results'
         ]:
             eval_kwargs.pop(key, None)
         eval_kwargs.update(dict(metric=args.eval, **kwargs))
@@ -17,6 +17,12 @@ Example:
         --algorithm differential_evolution \
         --input-shape ${INPUT_SHAPE [WIDTH HEIGHT]} \
         --output-dir ${OUTPUT_DIR}
+    Use mini-batch k-means on CPU with 8 threads::
+
+        python tools/analysis_tools/optimize_anchors.py ${CONFIG} \
+        --algorithm k-means --input-shape ${INPUT_SHAPE [WIDTH HEIGHT]} \
+        --device cpu --nproc 8 --batch-size 8192 \
+        --output-dir ${OUTPUT_DIR}
 """
 import argparse
 import os.path as osp
@@ -27,7 +33,6 @@ import torch
 from mmcv import Config
 from scipy.optimize import differential_evolution
 
-from mmdet.core import bbox_cxcywh_to_xyxy, bbox_overlaps, bbox_xyxy_to_cxcywh
 from mmdet.datasets import build_dataset
 from mmdet.utils import get_root_logger, replace_cfg_vals, update_data_root
 
@@ -53,6 +58,18 @@ def parse_args():
         default=1000,
         type=int,
         help='Maximum iterations for optimizer.')
+    parser.add_argument(
+        '--batch-size',
+        default=None,
+        type=int,
+        help='Number of bboxes sampled in each iteration of k-means, '
+        'all the bboxes are used if not specified.')
+    parser.add_argument(
+        '--nproc',
+        default=None,
+        type=int,
+        help='Number of threads used for calculating on CPU, '
+        'defaults to the setting of PyTorch.')
     parser.add_argument(
         '--output-dir',
         default=None,
@@ -102,37 +119,108 @@ class BaseAnchorOptimizer:
             shapes with shape (num_bboxes, 2) in [width, height] format.
         """
         self.logger.info('Collecting bboxes from annotation...')
-        bbox_whs = []
-        img_shapes = []
-        prog_bar = mmcv.ProgressBar(len(self.dataset))
-        for idx in range(len(self.dataset)):
-            ann = self.dataset.get_ann_info(idx)
-            data_info = self.dataset.data_infos[idx]
-            img_shape = np.array([data_info['width'], data_info['height']])
-            gt_bboxes = ann['bboxes']
-            for bbox in gt_bboxes:
-                wh = bbox[2:4] - bbox[0:2]
-                img_shapes.append(img_shape)
-                bbox_whs.append(wh)
-            prog_bar.update()
-        print('\n')
-        bbox_whs = np.array(bbox_whs)
-        img_shapes = np.array(img_shapes)
+        coco = getattr(self.dataset, 'coco', None)
+        if hasattr(self.dataset, 'cat_ids') and (hasattr(
+                coco, 'img_ann_map') or hasattr(coco, 'imgToAnns')):
+            bbox_whs, img_shapes = self.get_coco_whs_and_shapes()
+        else:
+            bbox_whs = []
+            img_shapes = []
+            prog_bar = mmcv.ProgressBar(len(self.dataset))
+            for idx in range(len(self.dataset)):
+                ann = self.dataset.get_ann_info(idx)
+                data_info = self.dataset.data_infos[idx]
+                gt_bboxes = ann['bboxes'].reshape(-1, 4)
+                bbox_whs.append(gt_bboxes[:, 2:4] - gt_bboxes[:, 0:2])
+                img_shapes.append(
+                    np.repeat([[data_info['width'], data_info['height']]],
+                              len(gt_bboxes),
+                              axis=0))
+                prog_bar.update()
+            print('\n')
+            bbox_whs = np.concatenate(bbox_whs).reshape(-1, 2)
+            img_shapes = np.concatenate(img_shapes).reshape(-1, 2)
         self.logger.info(f'Collected {bbox_whs.shape[0]} bboxes.')
         return bbox_whs, img_shapes
 
-    def get_zero_center_bbox_tensor(self):
-        """Get a tensor of bboxes centered at (0, 0).
+    def get_coco_whs_and_shapes(self):
+        """Get widths and heights of bboxes and shapes of images from the
+        COCO api of a COCO style dataset, including the LVIS api of LVIS
+        datasets.
+
+        The annotations are read from the index of the COCO api in one pass
+        and filtered in the same way as ``CocoDataset.get_ann_info``, instead
+        of parsing the annotations of each image.
+
+        Returns:
+            tuple[np.ndarray]: Array of bbox shapes and array of image
+            shapes with shape (num_bboxes, 2) in [width, height] format.
+        """
+        coco = self.dataset.coco
+        # `imgToAnns` of pycocotools is `img_ann_map` in the LVIS api
+        img_ann_map = getattr(coco, 'img_ann_map', None)
+        if img_ann_map is None:
+            img_ann_map = coco.imgToAnns
+        anns, img_inds = [], []
+        for idx, data_info in enumerate(self.dataset.data_infos):
+            img_anns = img_ann_map.get(data_info['id'], [])
+            anns.extend(img_anns)
+            img_inds.extend([idx] * len(img_anns))
+        if not anns:
+            return np.zeros((0, 2), np.float32), np.zeros((0, 2), np.int64)
+
+        img_shapes = np.array([[info['width'], info['height']]
+                               for info in self.dataset.data_infos])
+        img_shapes = img_shapes[img_inds]
+        bboxes = np.array([ann['bbox'] for ann in anns], dtype=np.float64)
+        x1, y1, w, h = bboxes.T
+        inter_w = np.maximum(
+            0,
+            np.minimum(x1 + w, img_shapes[:, 0]) - np.maximum(x1, 0))
+        inter_h = np.maximum(
+            0,
+            np.minimum(y1 + h, img_shapes[:, 1]) - np.maximum(y1, 0))
+        areas = np.array([ann['area'] for ann in anns])
+        cat_ids = np.array([ann['category_id'] for ann in anns])
+        ignored = np.array([
+            bool(ann.get('ignore', False)) or bool(ann.get('iscrowd', False))
+            for ann in anns
+        ])
+        valid = (inter_w * inter_h != 0) & (w >= 1) & (h >= 1) & (
+            areas > 0) & np.isin(cat_ids, self.dataset.cat_ids) & ~ignored
+        # same precision as the bboxes returned by `get_ann_info`
+        bboxes = np.stack([x1, y1, x1 + w, y1 + h], axis=1)[valid]
+        bboxes = bboxes.astype(np.float32)
+        return bboxes[:, 2:4] - bboxes[:, 0:2], img_shapes[valid]
+
+    def get_bbox_whs_tensor(self):
+        """Get a tensor of widths and heights of bboxes.
 
         Returns:
-            Tensor: Tensor of bboxes with shape (num_bboxes, 4)
-            in [xmin, ymin, xmax, ymax] format.
+            Tensor: Tensor of bbox shapes with shape (num_bboxes, 2)
+            in [width, height] format.
         """
-        whs = torch.from_numpy(self.bbox_whs).to(
+        return torch.from_numpy(self.bbox_whs).to(
             self.device, dtype=torch.float32)
-        bboxes = bbox_cxcywh_to_xyxy(
-            torch.cat([torch.zeros_like(whs), whs], dim=1))
-        return bboxes
+
+    @staticmethod
+    def wh_iou(bbox_whs, anchor_whs, eps=1e-6):
+        """Calculate IoUs between bboxes and anchors sharing the same center.
+
+        Args:
+            bbox_whs (Tensor): Shapes of bboxes with shape (n, 2).
+            anchor_whs (Tensor): Shapes of anchors with shape (..., k, 2).
+            eps (float): A value added to the denominator for numerical
+                stability. Default: 1e-6.
+
+        Returns:
+            Tensor: IoUs with shape (..., n, k).
+        """
+        inter = torch.min(bbox_whs[:, None, 0], anchor_whs[..., None, :, 0]) \
+            * torch.min(bbox_whs[:, None, 1], anchor_whs[..., None, :, 1])
+        union = bbox_whs.prod(-1)[:, None] + \
+            anchor_whs.prod(-1)[..., None, :] - inter
+        return inter / union.clamp(min=eps)
 
     def optimize(self):
         raise NotImplementedError
@@ -155,13 +243,26 @@ class YOLOKMeansAnchorOptimizer(BaseAnchorOptimizer):
     Args:
         num_anchors (int) : Number of anchors.
         iters (int): Maximum iterations for k-means.
+        batch_size (int, optional): Number of bboxes sampled in each
+            iteration to run mini-batch k-means, which is much cheaper than
+            assigning all the bboxes on large datasets. All the bboxes are
+            used if not specified. Default: None.
+        tol (float): Mini-batch k-means stops when no cluster center moves
+            more than ``tol`` pixels. Default: 1e-3.
     """
 
-    def __init__(self, num_anchors, iters, **kwargs):
+    def __init__(self,
+                 num_anchors,
+                 iters,
+                 batch_size=None,
+                 tol=1e-3,
+                 **kwargs):
 
         super(YOLOKMeansAnchorOptimizer, self).__init__(**kwargs)
         self.num_anchors = num_anchors
         self.iters = iters
+        self.batch_size = batch_size
+        self.tol = tol
 
     def optimize(self):
         anchors = self.kmeans_anchors()
@@ -170,38 +271,78 @@ class YOLOKMeansAnchorOptimizer(BaseAnchorOptimizer):
     def kmeans_anchors(self):
         self.logger.info(
             f'Start cluster {self.num_anchors} YOLO anchors with K-means...')
-        bboxes = self.get_zero_center_bbox_tensor()
+        # bboxes are clustered by their shapes, as all of them are
+        # centered at (0, 0) the cluster centers are shapes of anchors
+        bbox_whs = self.get_bbox_whs_tensor()
         cluster_center_idx = torch.randint(
-            0, bboxes.shape[0], (self.num_anchors, )).to(self.device)
+            0, bbox_whs.shape[0], (self.num_anchors, )).to(self.device)
 
-        assignments = torch.zeros((bboxes.shape[0], )).to(self.device)
-        cluster_centers = bboxes[cluster_center_idx]
+        assignments = torch.zeros((bbox_whs.shape[0], )).to(self.device)
+        cluster_centers = bbox_whs[cluster_center_idx]
         if self.num_anchors == 1:
-            cluster_centers = self.kmeans_maximization(bboxes, assignments,
+            cluster_centers = self.kmeans_maximization(bbox_whs, assignments,
                                                        cluster_centers)
-            anchors = bbox_xyxy_to_cxcywh(cluster_centers)[:, 2:].cpu().numpy()
-            anchors = sorted(anchors, key=lambda x: x[0] * x[1])
+            anchors = sorted(
+                cluster_centers.cpu().numpy(), key=lambda x: x[0] * x[1])
             return anchors
 
+        if self.batch_size is not None:
+            cluster_centers = self.minibatch_kmeans(bbox_whs, cluster_centers)
+        else:
+            prog_bar = mmcv.ProgressBar(self.iters)
+            for i in range(self.iters):
+                converged, assignments = self.kmeans_expectation(
+                    bbox_whs, assignments, cluster_centers)
+                if converged:
+                    self.logger.info(
+                        f'K-means process has converged at iter {i}.')
+                    break
+                cluster_centers = self.kmeans_maximization(
+                    bbox_whs, assignments, cluster_centers)
+                prog_bar.update()
+            print('\n')
+        avg_iou = self.wh_iou(bbox_whs,
+                              cluster_centers).max(1)[0].mean().item()
+
+        anchors = sorted(
+            cluster_centers.cpu().numpy(), key=lambda x: x[0] * x[1])
+        self.logger.info(f'Anchor cluster finish. Average IOU: {avg_iou}')
+
+        return anchors
+
+    def minibatch_kmeans(self, bbox_whs, centers):
+        """Mini-batch k-means.
+
+        In each iteration, ``batch_size`` bboxes are sampled and assigned to
+        the nearest cluster centers, then each center moves towards the mean
+        of its assigned bboxes with a learning rate of the inverse number of
+        bboxes assigned to it so far. Refer to `Web-scale k-means clustering
+        <https://dl.acm.org/doi/10.1145/1772690.1772862>`_.
+        """
+        counts = torch.zeros_like(centers[:, 0])
         prog_bar = mmcv.ProgressBar(self.iters)
         for i in range(self.iters):
-            converged, assignments = self.kmeans_expectation(
-                bboxes, assignments, cluster_centers)
-            if converged:
+            batch_inds = torch.randint(
+                0,
+                bbox_whs.shape[0], (self.batch_size, ),
+                device=bbox_whs.device)
+            batch = bbox_whs[batch_inds]
+            assignments = self.wh_iou(batch, centers).argmax(1)
+            batch_counts = torch.bincount(
+                assignments, minlength=centers.shape[0]).to(centers)
+            batch_sums = torch.zeros_like(centers).index_add_(
+                0, assignments, batch)
+            counts += batch_counts
+            new_centers = centers + (batch_sums - batch_counts[:, None] *
+                                     centers) / counts.clamp(min=1)[:, None]
+            shift = (new_centers - centers).abs().max().item()
+            centers = new_centers
+            prog_bar.update()
+            if shift <= self.tol:
                 self.logger.info(f'K-means process has converged at iter {i}.')
                 break
-            cluster_centers = self.kmeans_maximization(bboxes, assignments,
-                                                       cluster_centers)
-            prog_bar.update()
         print('\n')
-        avg_iou = bbox_overlaps(bboxes,
-                                cluster_centers).max(1)[0].mean().item()
-
-        anchors = bbox_xyxy_to_cxcywh(cluster_centers)[:, 2:].cpu().numpy()
-        anchors = sorted(anchors, key=lambda x: x[0] * x[1])
-        self.logger.info(f'Anchor cluster finish. Average IOU: {avg_iou}')
-
-        return anchors
+        return centers
 
     def kmeans_maximization(self, bboxes, assignments, centers):
         """Maximization part of EM algorithm(Expectation-Maximization)"""
@@ -214,7 +355,7 @@ class YOLOKMeansAnchorOptimizer(BaseAnchorOptimizer):
 
     def kmeans_expectation(self, bboxes, assignments, centers):
         """Expectation part of EM algorithm(Expectation-Maximization)"""
-        ious = bbox_overlaps(bboxes, centers)
+        ious = self.wh_iou(bboxes, centers)
         closest = ious.argmax(1)
         converged = (closest == assignments).all()
         return converged, closest
@@ -253,6 +394,9 @@ class YOLODEAnchorOptimizer(BaseAnchorOptimizer):
             mutation constant. Default: (0.5, 1).
         recombination (float): Recombination constant of crossover probability.
             Default: 0.7.
+        max_elements (int): The costs of the whole population of a
+            generation are calculated in batches of at most ``max_elements``
+            IoUs. Default: 1 << 26.
     """
 
     def __init__(self,
@@ -263,6 +407,7 @@ class YOLODEAnchorOptimizer(BaseAnchorOptimizer):
                  convergence_thr=0.0001,
                  mutation=(0.5, 1),
                  recombination=0.7,
+                 max_elements=1 << 26,
                  **kwargs):
 
         super(YOLODEAnchorOptimizer, self).__init__(**kwargs)
@@ -274,13 +419,14 @@ class YOLODEAnchorOptimizer(BaseAnchorOptimizer):
         self.convergence_thr = convergence_thr
         self.mutation = mutation
         self.recombination = recombination
+        self.max_elements = max_elements
 
     def optimize(self):
         anchors = self.differential_evolution()
         self.save_result(anchors, self.out_dir)
 
     def differential_evolution(self):
-        bboxes = self.get_zero_center_bbox_tensor()
+        bbox_whs = self.get_bbox_whs_tensor()
 
         bounds = []
         for i in range(self.num_anchors):
@@ -289,14 +435,16 @@ class YOLODEAnchorOptimizer(BaseAnchorOptimizer):
         result = differential_evolution(
             func=self.avg_iou_cost,
             bounds=bounds,
-            args=(bboxes, ),
+            args=(bbox_whs, ),
             strategy=self.strategy,
             maxiter=self.iters,
             popsize=self.population_size,
             tol=self.convergence_thr,
             mutation=self.mutation,
             recombination=self.recombination,
-            updating='immediate',
+            updating='deferred',
+            workers=lambda func, population: self.population_avg_iou_cost(
+                population, bbox_whs),
             disp=True)
         self.logger.info(
             f'Anchor evolution finish. Average IOU: {1 - result.fun}')
@@ -305,19 +453,32 @@ class YOLODEAnchorOptimizer(BaseAnchorOptimizer):
         return anchors
 
     @staticmethod
-    def avg_iou_cost(anchor_params, bboxes):
+    def avg_iou_cost(anchor_params, bbox_whs):
         assert len(anchor_params) % 2 == 0
-        anchor_whs = torch.tensor(
-            [[w, h]
-             for w, h in zip(anchor_params[::2], anchor_params[1::2])]).to(
-                 bboxes.device, dtype=bboxes.dtype)
-        anchor_boxes = bbox_cxcywh_to_xyxy(
-            torch.cat([torch.zeros_like(anchor_whs), anchor_whs], dim=1))
-        ious = bbox_overlaps(bboxes, anchor_boxes)
+        anchor_whs = torch.as_tensor(np.asarray(anchor_params).reshape(
+            -1, 2)).to(bbox_whs)
+        ious = BaseAnchorOptimizer.wh_iou(bbox_whs, anchor_whs)
         max_ious, _ = ious.max(1)
         cost = 1 - max_ious.mean().item()
         return cost
 
+    def population_avg_iou_cost(self, population, bbox_whs):
+        """Calculate the costs of a generation with batched tensor ops.
+
+        It is used as the map-like ``workers`` of
+        :func:`scipy.optimize.differential_evolution`, so all the candidates
+        of a generation are evaluated together instead of one by one.
+        """
+        anchor_whs = torch.as_tensor(np.asarray(list(population))).to(bbox_whs)
+        anchor_whs = anchor_whs.reshape(anchor_whs.shape[0], -1, 2)
+        chunk_size = max(
+            1, self.max_elements // (bbox_whs.shape[0] * anchor_whs.shape[1]))
+        costs = [
+            1 - self.wh_iou(bbox_whs, chunk).max(-1)[0].mean(-1)
+            for chunk in anchor_whs.split(chunk_size)
+        ]
+        return torch.cat(costs).tolist()
+
 
 def main():
     logger = get_root_logger()
@@ -334,6 +495,9 @@ def main():
     input_shape = args.input_shape
     assert len(input_shape) == 2
 
+    if args.nproc is not None and args.device == 'cpu':
+        torch.set_num_threads(args.nproc)
+
     anchor_type = cfg.model.bbox_head.anchor_generator.type
     assert anchor_type == 'YOLOAnchorGenerator', \
         f'Only support optimize YOLOAnchor, but get {anchor_type}.'
@@ -353,6 +517,7 @@ def main():
             device=args.device,
             num_anchors=num_anchors,
             iters=args.iters,
+            batch_size=args.batch_size,
             logger=logger,
             out_dir=args.output_dir)
     elif args.algorithm == 'differential_evolution':
@@ -134,7 +134,7 @@ def main():
         # hard-code way to remove EvalHook args
         for key in [
                 'interval', 'tmpdir', 'start', 'gpu_collect', 'save_best',
-                'rule'
+                'rule', 'collect_backend', 'flat_results'
         ]:
             eval_kwargs.pop(key, None)
         eval_kwargs.update(dict(metric=args.eval, **kwargs))
@@ -0,0 +1,36 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Convert a COCO style annotation file into a memory-mapped COCO store.
+
+Here is an example to run this script.
+
+Example:
+    python tools/misc/build_coco_store.py \
+    data/coco/annotations/instances_train2017.json \
+    data/coco/annotations/instances_train2017_store
+
+Then set ``ann_file`` of ``CocoDataset`` in the config to the directory of
+the store.
+"""
+import argparse
+
+from mmdet.datasets.api_wrappers import build_coco_store
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Convert a COCO annotation file into a COCO store')
+    parser.add_argument('ann_file', help='COCO style annotation file path')
+    parser.add_argument('store_dir', help='Directory to write the store to')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = parse_args()
+    store = build_coco_store(args.ann_file, args.store_dir)
+    print(f'Stored {len(store.imgs)} images and {len(store.anns)} '
+          f'annotations to {args.store_dir}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Copyright (c) OpenMMLab. All rights reserved.
+"""Decode the images of a training set into a memory-mapped image cache.
+
+Here is an example to run this script.
+
+Example:
+    python tools/misc/build_image_cache.py ${CONFIG} ${CACHE_DIR} \
+    --img-scale 640 640
+
+Then replace ``LoadImageFromFile`` and ``LoadAnnotations`` in the training
+pipeline with ``dict(type='LoadImageFromCache', cache_dir=${CACHE_DIR})``.
+"""
+import argparse
+
+from mmcv import Config, DictAction
+
+from mmdet.datasets import build_dataset, build_image_cache
+from mmdet.utils import replace_cfg_vals, update_data_root
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Build an image cache')
+    parser.add_argument('config', help='Config file path')
+    parser.add_argument('cache_dir', help='Directory to write the cache to')
+    parser.add_argument(
+        '--split',
+        default='train',
+        choices=['train', 'val', 'test'],
+        help='Which split of ``cfg.data`` to cache')
+    parser.add_argument(
+        '--img-scale',
+        type=int,
+        nargs='+',
+        help='Rescale the images to fit in this scale, e.g. 640 640')
+    parser.add_argument(
+        '--shard-size',
+        type=int,
+        default=4096,
+        help='Maximal size of an image shard in MB')
+    parser.add_argument(
+        '--nproc',
+        default=4,
+        type=int,
+        help='Processes used to decode the images')
+    parser.add_argument(
+        '--cfg-options',
+        nargs='+',
+        action=DictAction,
+        help='override some settings in the used config, the key-value pair '
+        'in xxx=yyy format will be merged into config file. If the value to '
+        'be overwritten is a list, it should be like key="[a,b]" or key=a,b '
+        'It also allows nested list/tuple values, e.g. key="[(a,b),(c,d)]" '
+        'Note that the quotation marks are necessary and that no white space '
+        'is allowed.')
+    args = parser.parse_args()
+    return args
+
+
+def main():
+    args = parse_args()
+    cfg = Config.fromfile(args.config)
+    # replace the ${key} with the value of cfg.key
+    cfg = replace_cfg_vals(cfg)
+    # update data root according to MMDET_DATASETS
+    update_data_root(cfg)
+    if args.cfg_options is not None:
+        cfg.merge_from_dict(args.cfg_options)
+
+    dataset_cfg = cfg.data[args.split]
+    # unwrap the dataset wrappers, e.g. MultiImageMixDataset for YOLOX
+    while 'dataset' in dataset_cfg:
+        dataset_cfg = dataset_cfg['dataset']
+    dataset_cfg['pipeline'] = []
+    dataset = build_dataset(dataset_cfg)
+
+    img_scale = args.img_scale
+    if img_scale is not None:
+        img_scale = tuple(img_scale) if len(img_scale) > 1 else img_scale[0]
+    cache = build_image_cache(
+        dataset,
+        args.cache_dir,
+        img_scale=img_scale,
+        shard_size=args.shard_size << 20,
+        nproc=args.nproc)
+    print(f'\nCached {len(cache)} images to {args.cache_dir}')
+
+
+if __name__ == '__main__':
+    main()
@@ -13,11 +13,12 @@ from mmcv.runner import (get_dist_info, init_dist, load_checkpoint,
                          wrap_fp16_model)
 
 from mmdet.apis import multi_gpu_test, single_gpu_test
+from mmdet.core import dump_results
 from mmdet.datasets import (build_dataloader, build_dataset,
                             replace_ImageToTensor)
 from mmdet.models import build_detector
-from mmdet.utils import (build_ddp, build_dp, compat_cfg, get_device,
-                         replace_cfg_vals, setup_multi_processes,
+from mmdet.utils import (SpanProfiler, build_ddp, build_dp, compat_cfg,
+                         get_device, replace_cfg_vals, setup_multi_processes,
                          update_data_root)
 
 
@@ -29,7 +30,10 @@ def parse_args():
     parser.add_argument(
         '--work-dir',
         help='the directory to save the file containing evaluation metrics')
-    parser.add_argument('--out', help='output result file in pickle format')
+    parser.add_argument(
+        '--out',
+        help='output result file in pickle format, or in npz format for '
+        'bbox results, which are then collected in flat arrays')
     parser.add_argument(
         '--fuse-conv-bn',
         action='store_true',
@@ -59,6 +63,12 @@ def parse_args():
         nargs='+',
         help='evaluation metrics, which depends on the dataset, e.g., "bbox",'
         ' "segm", "proposal" for COCO, and "mAP", "recall" for PASCAL VOC')
+    parser.add_argument(
+        '--online-eval',
+        action='store_true',
+        help='evaluate the results while testing instead of after it, so '
+        'that the results are not kept. It is ignored if "--out" is given or '
+        'the metrics can not be evaluated online')
     parser.add_argument('--show', action='store_true', help='show results')
     parser.add_argument(
         '--show-dir', help='directory where painted images will be saved')
@@ -71,10 +81,21 @@ def parse_args():
         '--gpu-collect',
         action='store_true',
         help='whether to use gpu to collect results.')
+    parser.add_argument(
+        '--collect-backend',
+        choices=['cpu', 'gpu', 'columnar'],
+        help='backend used to collect results from multiple workers, '
+        'overrides gpu-collect. "columnar" does not need gpus nor tmpdir')
     parser.add_argument(
         '--tmpdir',
         help='tmp directory used for collecting results from multiple '
         'workers, available when gpu-collect is not specified')
+    parser.add_argument(
+        '--profile-trace',
+        help='profile the named spans, e.g. backbone, head and nms, while '
+        'testing, print their summary and export them to this Chrome trace '
+        'json file. The pipeline spans are only recorded with '
+        'workers_per_gpu=0')
     parser.add_argument(
         '--cfg-options',
         nargs='+',
@@ -130,8 +151,9 @@ def main():
     if args.eval and args.format_only:
         raise ValueError('--eval and --format_only cannot be both specified')
 
-    if args.out is not None and not args.out.endswith(('.pkl', '.pickle')):
-        raise ValueError('The output file must be a pkl file.')
+    out_exts = ('.pkl', '.pickle', '.npz')
+    if args.out is not None and not args.out.endswith(out_exts):
+        raise ValueError('The output file must be a pkl or npz file.')
 
     cfg = Config.fromfile(args.config)
 
@@ -233,10 +255,49 @@ def main():
     else:
         model.CLASSES = dataset.CLASSES
 
+    # bbox results saved to a npz file are collected in flat arrays
+    flat_results = (args.out is not None and args.out.endswith('.npz')) \
+        or cfg.evaluation.get('flat_results', False)
+    kwargs = {} if args.eval_options is None else args.eval_options
+    # the formatted results are written while testing if only they are saved
+    result_writer = None
+    if args.format_only and not args.out and not distributed \
+            and getattr(dataset, 'result_writer', None) is not None \
+            and kwargs.get('jsonfile_prefix') is not None:
+        result_writer = dataset.result_writer(kwargs['jsonfile_prefix'])
+    if args.eval:
+        eval_kwargs = cfg.get('evaluation', {}).copy()
+        # hard-code way to remove EvalHook args
+        for key in [
+                'interval', 'tmpdir', 'start', 'gpu_collect', 'save_best',
+                'rule', 'dynamic_intervals', 'collect_backend', 'flat_results'
+        ]:
+            eval_kwargs.pop(key, None)
+        eval_kwargs.update(dict(metric=args.eval, **kwargs))
+    # the results are evaluated while testing if they are not saved
+    evaluator = None
+    if args.online_eval and args.eval and not args.out:
+        if getattr(dataset, 'online_evaluator', None) is not None:
+            evaluator = dataset.online_evaluator(
+                background=True, **eval_kwargs)
+        if evaluator is None:
+            warnings.warn('The metrics can not be evaluated online, the '
+                          'results are evaluated after testing instead.')
+    profiler = None
+    if args.profile_trace is not None:
+        profiler = SpanProfiler()
+        profiler.start()
     if not distributed:
         model = build_dp(model, cfg.device, device_ids=cfg.gpu_ids)
-        outputs = single_gpu_test(model, data_loader, args.show, args.show_dir,
-                                  args.show_score_thr)
+        outputs = single_gpu_test(
+            model,
+            data_loader,
+            args.show,
+            args.show_dir,
+            args.show_score_thr,
+            flat_results=flat_results,
+            result_writer=result_writer,
+            evaluator=evaluator)
     else:
         model = build_ddp(
             model,
@@ -244,27 +305,38 @@ def main():
             device_ids=[int(os.environ['LOCAL_RANK'])],
             broadcast_buffers=False)
         outputs = multi_gpu_test(
-            model, data_loader, args.tmpdir, args.gpu_collect
-            or cfg.evaluation.get('gpu_collect', False))
+            model,
+            data_loader,
+            args.tmpdir,
+            args.gpu_collect or cfg.evaluation.get('gpu_collect', False),
+            args.collect_backend
+            or cfg.evaluation.get('collect_backend', None),
+            flat_results=flat_results,
+            evaluator=evaluator)
 
-    rank, _ = get_dist_info()
+    rank, world_size = get_dist_info()
+    if profiler is not None:
+        profiler.stop()
+        trace_file = args.profile_trace
+        if world_size > 1:
+            root, ext = osp.splitext(trace_file)
+            trace_file = f'{root}_rank{rank}{ext}'
+        print()
+        profiler.log_summary()
+        profiler.export_chrome_trace(trace_file)
     if rank == 0:
         if args.out:
             print(f'\nwriting results to {args.out}')
-            mmcv.dump(outputs, args.out)
-        kwargs = {} if args.eval_options is None else args.eval_options
-        if args.format_only:
+            dump_results(outputs, args.out)
+        if result_writer is not None:
+            result_writer.close()
+        elif args.format_only:
             dataset.format_results(outputs, **kwargs)
         if args.eval:
-            eval_kwargs = cfg.get('evaluation', {}).copy()
-            # hard-code way to remove EvalHook args
-            for key in [
-                    'interval', 'tmpdir', 'start', 'gpu_collect', 'save_best',
-                    'rule', 'dynamic_intervals'
-            ]:
-                eval_kwargs.pop(key, None)
-            eval_kwargs.update(dict(metric=args.eval, **kwargs))
-            metric = dataset.evaluate(outputs, **eval_kwargs)
+            if evaluator is not None:
+                metric = evaluator.evaluate()
+            else:
+                metric = dataset.evaluate(outputs, **eval_kwargs)
             print(metric)
             metric_dict = dict(config=args.config, metric=metric)
             if args.work_dir is not None and rank == 0:
@@ -1,24 +1,55 @@
-import os
+import argparse
+import hashlib
 import json
+import os
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
 
-
-# User configs:
-xml_list = "./data/sp_ppe/xml_list.txt"
-xml_dir = "./data/sp_ppe/xml"
-json_file = "./data/sp_ppe/all_ann.json"
-img_ext = ".jpg"
+# User configs (defaults of the command line arguments):
+xml_list = './data/sp_ppe/xml_list.txt'
+xml_dir = './data/sp_ppe/xml'
+json_file = './data/sp_ppe/all_ann.json'
+img_ext = '.jpg'
 START_BOUNDING_BOX_ID = 1
 PRE_DEFINE_CATEGORIES = {
-        "no_ppe": 0,
-        "all_ppe": 1,
-        "helmet": 2,
-        "mask": 3,
-        "vest": 4,
-        "mask_vest": 5,
-        "helmet_mask": 6,
-        "helmet_vest": 7,
+    'no_ppe': 0,
+    'all_ppe': 1,
+    'helmet': 2,
+    'mask': 3,
+    'vest': 4,
+    'mask_vest': 5,
+    'helmet_mask': 6,
+    'helmet_vest': 7,
 }
+MANIFEST_VERSION = 1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Convert VOC xml annotations to a COCO json file')
+    parser.add_argument(
+        '--xml-list',
+        default=xml_list,
+        help='text file listing the xml files to convert')
+    parser.add_argument(
+        '--xml-dir', default=xml_dir, help='directory of the xml files')
+    parser.add_argument(
+        '--json-file', default=json_file, help='output COCO json file')
+    parser.add_argument(
+        '--manifest',
+        default=None,
+        help='manifest of already parsed xml files, defaults to '
+        '<json-file>.manifest')
+    parser.add_argument(
+        '--full',
+        action='store_true',
+        help='ignore the manifest and parse every xml file again')
+    parser.add_argument(
+        '--nproc',
+        type=int,
+        default=os.cpu_count(),
+        help='number of processes used to parse the xml files')
+    return parser.parse_args()
 
 
 def get(root, name):
@@ -29,67 +60,186 @@ def get(root, name):
 def get_and_check(root, name, length):
     vars = root.findall(name)
     if len(vars) == 0:
-        raise NotImplementedError('Can not find %s in %s.'%(name, root.tag))
+        raise NotImplementedError('Can not find %s in %s.' % (name, root.tag))
     if length > 0 and len(vars) != length:
-        raise NotImplementedError('The size of %s is supposed to be %d, but is %d.'%(name, length, len(vars)))
+        raise NotImplementedError(
+            'The size of %s is supposed to be %d, but is %d.' %
+            (name, length, len(vars)))
     if length == 1:
         vars = vars[0]
     return vars
 
-def convert(xml_list, xml_dir, json_file):
-    list_fp = open(xml_list, 'r')
-    json_dict = {"images":[], "type": "instances", "annotations": [],
-                 "categories": []}
-    categories = PRE_DEFINE_CATEGORIES
-    bnd_id = START_BOUNDING_BOX_ID
-    image_id = 0
-    for line in list_fp:
-        line = line.strip()
-        print("Processing %s"%(line))
+
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def parse_xml(xml_f):
+    """Parse one VOC xml file. Runs in the worker processes, so it only
+    returns plain data and leaves id assignment to the main process."""
+    root = ET.parse(xml_f).getroot()
+    size = get_and_check(root, 'size', 1)
+    width = int(get_and_check(size, 'width', 1).text)
+    height = int(get_and_check(size, 'height', 1).text)
+    ## Cruuently we do not support segmentation
+    #  segmented = get_and_check(root, 'segmented', 1).text
+    #  assert segmented == '0'
+    objects = []
+    for obj in get(root, 'object'):
+        category = get_and_check(obj, 'name', 1).text
+        bndbox = get_and_check(obj, 'bndbox', 1)
+        xmin = int(get_and_check(bndbox, 'xmin', 1).text) - 1
+        ymin = int(get_and_check(bndbox, 'ymin', 1).text) - 1
+        xmax = int(get_and_check(bndbox, 'xmax', 1).text)
+        ymax = int(get_and_check(bndbox, 'ymax', 1).text)
+        assert (xmax > xmin), f'{xml_f}: xmax <= xmin'
+        assert (ymax > ymin), f'{xml_f}: ymax <= ymin'
+        objects.append(
+            [category, xmin, ymin,
+             abs(xmax - xmin),
+             abs(ymax - ymin)])
+    return {
+        'width': width,
+        'height': height,
+        'objects': objects,
+        'sha1': file_sha1(xml_f)
+    }
+
+
+def load_manifest(manifest_file):
+    if manifest_file is None or not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, 'r') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest['files']
+
+
+def save_manifest(manifest_file, entries):
+    tmp_file = manifest_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({'version': MANIFEST_VERSION, 'files': entries}, f)
+    os.replace(tmp_file, manifest_file)
+
+
+def write_json(json_file, images, annotations, categories):
+    """Stream the COCO dict to disk one record at a time."""
+    with open(json_file, 'w') as json_fp:
+        json_fp.write('{"type": "instances"')
+        for key, records in [('images', images), ('annotations', annotations),
+                             ('categories', categories)]:
+            json_fp.write(f', "{key}": [')
+            for i, record in enumerate(records):
+                if i:
+                    json_fp.write(', ')
+                json_fp.write(json.dumps(record))
+            json_fp.write(']')
+        json_fp.write('}')
+
+
+def convert(xml_list, xml_dir, json_file, manifest_file=None, nproc=None):
+    """Convert the xml files listed in ``xml_list`` into one COCO json file.
+
+    If ``manifest_file`` is given, the parsed content, mtime and hash of each
+    xml file is kept there and only new or changed files are parsed again.
+    Image ids of already converted files stay the same across runs.
+    """
+    with open(xml_list, 'r') as list_fp:
+        lines = [line.strip() for line in list_fp if line.strip()]
+    cached = load_manifest(manifest_file)
+
+    entries, to_parse = {}, []
+    for line in lines:
         xml_f = os.path.join(xml_dir, line)
-        tree = ET.parse(xml_f)
-        root = tree.getroot()
-        filename = os.path.splitext(line)[0] + img_ext
-        image_id += 1
-        size = get_and_check(root, 'size', 1)
-        width = int(get_and_check(size, 'width', 1).text)
-        height = int(get_and_check(size, 'height', 1).text)
-        image = {'file_name': filename, 'height': height, 'width': width,
-                 'id':image_id}
-        json_dict['images'].append(image)
-        ## Cruuently we do not support segmentation
-        #  segmented = get_and_check(root, 'segmented', 1).text
-        #  assert segmented == '0'
-        for obj in get(root, 'object'):
-            category = get_and_check(obj, 'name', 1).text
-            if category not in categories:
-                new_id = len(categories)
-                categories[category] = new_id
-            category_id = categories[category]
-            bndbox = get_and_check(obj, 'bndbox', 1)
-            xmin = int(get_and_check(bndbox, 'xmin', 1).text) - 1
-            ymin = int(get_and_check(bndbox, 'ymin', 1).text) - 1
-            xmax = int(get_and_check(bndbox, 'xmax', 1).text)
-            ymax = int(get_and_check(bndbox, 'ymax', 1).text)
-            assert(xmax > xmin)
-            assert(ymax > ymin)
-            o_width = abs(xmax - xmin)
-            o_height = abs(ymax - ymin)
-            ann = {'area': o_width*o_height, 'iscrowd': 0, 'image_id':
-                   image_id, 'bbox':[xmin, ymin, o_width, o_height],
-                   'category_id': category_id, 'id': bnd_id, 'ignore': 0,
-                   'segmentation': []}
-            json_dict['annotations'].append(ann)
-            bnd_id = bnd_id + 1
-
-    for cate, cid in categories.items():
-        cat = {'supercategory': 'none', 'id': cid, 'name': cate}
-        json_dict['categories'].append(cat)
-    json_fp = open(json_file, 'w')
-    json_str = json.dumps(json_dict)
-    json_fp.write(json_str)
-    json_fp.close()
-    list_fp.close()
+        stat = os.stat(xml_f)
+        entry = cached.get(line)
+        if entry is not None and (entry['mtime'], entry['size']) != (
+                stat.st_mtime, stat.st_size):
+            # touched but possibly unchanged, compare the content
+            entry = dict(entry, mtime=stat.st_mtime, size=stat.st_size) \
+                if file_sha1(xml_f) == entry['sha1'] else None
+        if entry is None:
+            to_parse.append(line)
+        else:
+            entries[line] = entry
+    print('Parsing %d new or changed xml files, reusing %d' %
+          (len(to_parse), len(entries)))
+
+    if to_parse:
+        with ProcessPoolExecutor(max_workers=nproc) as pool:
+            paths = [os.path.join(xml_dir, line) for line in to_parse]
+            for line, record in zip(to_parse,
+                                    pool.map(parse_xml, paths, chunksize=16)):
+                stat = os.stat(os.path.join(xml_dir, line))
+                record.update(mtime=stat.st_mtime, size=stat.st_size)
+                entries[line] = record
+
+    # keep image ids stable, new files get ids after the existing ones
+    image_id = max([entry.get('image_id', 0) for entry in cached.values()],
+                   default=0)
+    for line in lines:
+        entry = entries[line]
+        if 'image_id' not in entry:
+            old = cached.get(line)
+            if old is not None:
+                entry['image_id'] = old['image_id']
+            else:
+                image_id += 1
+                entry['image_id'] = image_id
+
+    categories = dict(PRE_DEFINE_CATEGORIES)
+    for line in lines:
+        for obj in entries[line]['objects']:
+            if obj[0] not in categories:
+                categories[obj[0]] = len(categories)
+
+    def iter_images():
+        for line in lines:
+            entry = entries[line]
+            filename = os.path.splitext(line)[0] + img_ext
+            yield {
+                'file_name': filename,
+                'height': entry['height'],
+                'width': entry['width'],
+                'id': entry['image_id']
+            }
+
+    def iter_annotations():
+        bnd_id = START_BOUNDING_BOX_ID
+        for line in lines:
+            entry = entries[line]
+            for category, xmin, ymin, o_width, o_height in entry['objects']:
+                yield {
+                    'area': o_width * o_height,
+                    'iscrowd': 0,
+                    'image_id': entry['image_id'],
+                    'bbox': [xmin, ymin, o_width, o_height],
+                    'category_id': categories[category],
+                    'id': bnd_id,
+                    'ignore': 0,
+                    'segmentation': []
+                }
+                bnd_id = bnd_id + 1
+
+    cats = [{
+        'supercategory': 'none',
+        'id': cid,
+        'name': cate
+    } for cate, cid in categories.items()]
+    write_json(json_file, iter_images(), iter_annotations(), cats)
+    if manifest_file is not None:
+        save_manifest(manifest_file, entries)
+
 
 if __name__ == '__main__':
-    convert(xml_list, xml_dir, json_file)
\ No newline at end of file
+    args = parse_args()
+    manifest_file = args.manifest or args.json_file + '.manifest'
+    if args.full and os.path.exists(manifest_file):
+        os.remove(manifest_file)
+    convert(args.xml_list, args.xml_dir, args.json_file, manifest_file,
+            args.nproc)